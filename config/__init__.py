@@ -1,5 +1,5 @@
-from .settings import Settings
-
-settings = Settings()
-
-__all__ = ['settings']
+from .settings import Settings
+
+settings = Settings()
+
+__all__ = ['settings']
@@ -1,139 +1,341 @@
-#config/settings.py
-import os
-import socket
-from pathlib import Path
-from pydantic_settings import BaseSettings, SettingsConfigDict
-from pydantic import Field
-from typing import Optional
-
-
-class Settings(BaseSettings):
-    model_config = SettingsConfigDict(
-        env_file=".env",
-        env_file_encoding="utf-8",
-        case_sensitive=False,
-        extra="ignore"
-    )
-    
-    worker_id: str = Field(default_factory=lambda: f"worker-{socket.gethostname()}")
-    
-    gms_username: str = Field(default="", alias="GMS_USER")
-    gms_password: str = Field(default="", alias="GMS_PASSWORD")
-    
-    rabbitmq_host: str = Field(default="localhost")
-    rabbitmq_port: int = Field(default=5672)
-    rabbitmq_user: str = Field(default="guest")
-    rabbitmq_password: str = Field(default="guest")
-    rabbitmq_queue: str = Field(default="bot-xml-tasks")
-    
-    maestro_api_url: str = Field(default="http://localhost:8080")
-    # WHY: middleware do maestro tem bypass-se-vazio. Quando string vazia,
-    # worker não envia o header X-Worker-API-Key e o maestro aceita. Quando
-    # populada, worker passa em todos os callbacks. Forward-compatible:
-    # ligar auth depois é só popular esta env e a do maestro + restart.
-    maestro_worker_api_key: str = Field(default="", alias="MAESTRO_WORKER_API_KEY")
-
-    maestro_db_host: str = Field(default="postgres")
-    maestro_db_port: int = Field(default=5432)
-    maestro_db_user: str = Field(default="user")
-    maestro_db_password: str = Field(default="password")
-    maestro_db_name: str = Field(default="maestro_db")
-    
-    base_dir: Path = Field(default_factory=lambda: Path(__file__).parent.parent)
-    chrome_driver_path: Optional[str] = None
-    headless: bool = Field(default=True)
-    
-    page_load_timeout: int = Field(default=30, ge=5, le=120)
-    implicit_wait: int = Field(default=10, ge=1, le=60)
-    download_timeout: int = Field(default=900, ge=60, le=3600)
-    default_timeout: int = Field(default=30)
-    
-    log_level: str = Field(default="INFO")
-    log_file: str = "logs/bot.log"
-    log_max_bytes: int = Field(default=10485760)
-    log_backup_count: int = Field(default=5)
-    
-    @property
-    def BASE_DIR(self) -> Path:
-        return self.base_dir
-    
-    @property
-    def LOGS_DIR(self) -> Path:
-        path = self.base_dir / "logs"
-        path.mkdir(parents=True, exist_ok=True)
-        return path
-    
-    @property
-    def DOWNLOADS_DIR(self) -> Path:
-        path = self.base_dir / "downloads"
-        path.mkdir(parents=True, exist_ok=True)
-        return path
-    
-    @property
-    def PENDING_DIR(self) -> Path:
-        # WHY: in containers the downloads dir is often a host bind-mount
-        # (e.g. /mnt/c/... on WSL). Extracting thousands of XMLs there
-        # triggers cross-fs permission errors on move and ENOMEM on traversal.
-        # Keep pending on the container's native fs; only processed/ stays on the mount.
-        override = os.environ.get("BOT_PENDING_DIR")
-        path = Path(override) if override else Path("/tmp/bot-xml-gms/pending")
-        path.mkdir(parents=True, exist_ok=True)
-        return path
-    
-    @property
-    def PROCESSED_DIR(self) -> Path:
-        path = self.DOWNLOADS_DIR / "processed"
-        path.mkdir(parents=True, exist_ok=True)
-        return path
-    
-    @property
-    def DESTINATION_DIR(self) -> Path:
-        return self.PROCESSED_DIR
-    
-    @property
-    def DEFAULT_TIMEOUT(self) -> int:
-        return self.default_timeout
-    
-    @property
-    def SELECTORS_FILE(self) -> Path:
-        return self.base_dir / "config" / "selectors.yaml"
-    
-    def get_log_config(self) -> dict:
-        """Retorna configuração completa de logging"""
-        return {
-            "version": 1,
-            "disable_existing_loggers": False,
-            "formatters": {
-                "detailed": {
-                    "format": "%(asctime)s - [%(name)s] - %(levelname)s - %(message)s",
-                    "datefmt": "%Y-%m-%d %H:%M:%S"
-                },
-                "simple": {
-                    "format": "%(levelname)s - %(message)s"
-                }
-            },
-            "handlers": {
-                "console": {
-                    "class": "logging.StreamHandler",
-                    "level": self.log_level,
-                    "formatter": "detailed",
-                    "stream": "ext://sys.stdout"
-                },
-                "file": {
-                    "class": "logging.handlers.RotatingFileHandler",
-                    "level": self.log_level,
-                    "formatter": "detailed",
-                    "filename": str(self.LOGS_DIR / Path(self.log_file).name),
-                    "maxBytes": self.log_max_bytes,
-                    "backupCount": self.log_backup_count,
-                    "encoding": "utf-8"
-                }
-            },
-            "root": {
-                "level": self.log_level,
-                "handlers": ["console", "file"]
-            }
-        }
-
-
+#config/settings.py
+import os
+import socket
+from pathlib import Path
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from pydantic import Field
+from typing import Any, Dict, List, Optional
+
+
+class Settings(BaseSettings):
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding="utf-8",
+        case_sensitive=False,
+        extra="ignore"
+    )
+    
+    worker_id: str = Field(default_factory=lambda: f"worker-{socket.gethostname()}")
+    
+    gms_username: str = Field(default="", alias="GMS_USER")
+    gms_password: str = Field(default="", alias="GMS_PASSWORD")
+    # Pool de contas GMS (JSON): [{"user": "...", "password": "...",
+    # "max_concurrent": 1, "max_logins_per_hour": 0}, ...]. O GMS serializa
+    # os exports de cada conta; com o pool, jobs sem gms_user nos parâmetros
+    # pegam a conta menos carregada (ver CredentialPool). Vazio = GMS_USER.
+    gms_accounts: List[Dict[str, Any]] = Field(default_factory=list)
+    # Estado compartilhado do pool (leases e logins). Vazio = DATA_DIR; aponte
+    # para um volume comum para workers do mesmo host dividirem as contas.
+    gms_account_pool_path: str = Field(default="")
+    gms_account_wait_seconds: int = Field(default=600, ge=0)
+    gms_account_max_login_failures: int = Field(default=3, ge=0)
+    gms_account_failure_cooldown_seconds: int = Field(default=900, ge=0)
+    # Taxa sustentável do GMS por host (JSON; "*" = qualquer host): logins,
+    # envios de export e refreshes da tabela, em operações por minuto ou
+    # {"per_minute": N, "burst": M}. Token bucket compartilhado por todos que
+    # usam o mesmo gms_rate_limit_path (vazio = DATA_DIR). {} desliga.
+    gms_rate_limits: Dict[str, Dict[str, Any]] = Field(
+        default_factory=lambda: {"*": {"login": 6, "export": 6, "refresh": 60}}
+    )
+    gms_rate_limit_path: str = Field(default="")
+    # Circuit breaker por host do GMS: após N falhas seguidas de conexão/página
+    # de login, jobs do host são adiados sem abrir navegador por open_seconds;
+    # depois um único job sonda o host. 0 desliga.
+    gms_circuit_failure_threshold: int = Field(default=5, ge=0)
+    gms_circuit_open_seconds: float = Field(default=120.0, ge=5.0)
+    gms_circuit_path: str = Field(default="")
+    # Sessão do GMS (cookies + localStorage) salva após o login e injetada
+    # nos Chromes novos da mesma conta; o formulário só é usado quando ela
+    # não vale mais. Cifrada com esta chave Fernet; vazia desliga.
+    gms_session_key: str = Field(default="")
+    gms_session_path: str = Field(default="")
+    gms_session_max_age_seconds: int = Field(default=8 * 3600, ge=0)
+    
+    rabbitmq_host: str = Field(default="localhost")
+    rabbitmq_port: int = Field(default=5672)
+    rabbitmq_user: str = Field(default="guest")
+    rabbitmq_password: str = Field(default="guest")
+    rabbitmq_queue: str = Field(default="bot-xml-tasks")
+    # Exchange topic de controle: cancelamento chega por push com routing key
+    # cancel.<job_id>. Opt-in: só ligue quando o maestro publicar nela — com
+    # a exchange declarada o poll cai para o heartbeat abaixo, e sem
+    # publicador o cancelamento levaria até um heartbeat inteiro. Vazio =
+    # polling de 15s.
+    rabbitmq_control_exchange: str = Field(default="")
+    # Com o push ligado o poll HTTP vira só heartbeat (last_heartbeat_at do
+    # maestro, janela de 5min) — bem abaixo dela, com folga pra falhas.
+    cancellation_heartbeat_seconds: float = Field(default=60.0, ge=5.0, le=240.0)
+
+    # Jobs simultâneos por worker. Cada slot roda o próprio BotRunner + Chrome
+    # com pending isolado (PENDING_DIR/slot-N); o prefetch do RabbitMQ acompanha.
+    worker_slots: int = Field(default=1, ge=1, le=16)
+
+    # "pika" é o núcleo histórico (BlockingConnection + thread por slot);
+    # "asyncio" usa aio-pika + httpx num event loop único e só tira do loop
+    # o trabalho bloqueante do Selenium (ver src/core/async_worker.py).
+    worker_core: str = Field(default="pika", pattern="^(pika|asyncio)$")
+
+    # "fifo" consome a fila principal na ordem de chegada (padrão histórico).
+    # "cost" estima a duração de cada job (lojas × dias × tipo + histórico do
+    # diário) e o roteia para <fila>.small ou <fila>.large; slots reservados
+    # só pegam small e o large mais antigo ganha prioridade após
+    # large_job_max_wait_seconds (aging).
+    job_scheduling: str = Field(default="fifo", pattern="^(fifo|cost)$")
+    small_job_max_seconds: int = Field(default=1800, ge=60)
+    reserved_small_slots: int = Field(default=1, ge=0, le=15)
+    large_job_max_wait_seconds: int = Field(default=1800, ge=0)
+
+    # "thread" roda o BotRunner numa thread do worker (padrão histórico);
+    # "process" roda cada job num processo filho (main.py --ipc) supervisionado,
+    # com limites de RSS/tempo e kill da árvore inteira ao final do job.
+    job_isolation: str = Field(default="thread", pattern="^(thread|process)$")
+    # 0 desativa o limite. O RSS soma python + chromedriver + todos os Chromes.
+    job_max_rss_mb: int = Field(default=3072, ge=0)
+    # Export no GMS pode levar até 180min + download; 0 desativa.
+    job_max_wall_seconds: int = Field(default=4 * 3600, ge=0)
+    
+    maestro_api_url: str = Field(default="http://localhost:8080")
+    # WHY: middleware do maestro tem bypass-se-vazio. Quando string vazia,
+    # worker não envia o header X-Worker-API-Key e o maestro aceita. Quando
+    # populada, worker passa em todos os callbacks. Forward-compatible:
+    # ligar auth depois é só popular esta env e a do maestro + restart.
+    maestro_worker_api_key: str = Field(default="", alias="MAESTRO_WORKER_API_KEY")
+
+    # Fila de logs para o maestro (LogShipper): linhas de INFO são descartadas
+    # (as mais antigas primeiro) quando a fila enche; WARNING+ esperam vaga.
+    log_shipper_max_queue: int = Field(default=1000, ge=10)
+    log_shipper_batch_size: int = Field(default=50, ge=1, le=500)
+    # Corpos JSON acima deste tamanho vão em gzip (Content-Encoding). 0 desliga.
+    # Se o maestro recusar gzip, o cliente reenvia sem compressão sozinho.
+    maestro_gzip_min_bytes: int = Field(default=65536, ge=0)
+
+    # Diário local de jobs finalizados (DATA_DIR/job_journal.sqlite3): resolve
+    # redeliveries sem ir ao maestro e guarda histórico de duração.
+    job_journal_max_entries: int = Field(default=20000, ge=100)
+    job_journal_max_age_days: int = Field(default=30, ge=1)
+
+    # Jobs com os mesmos filtros e lojas/período contidos no de um export em
+    # andamento (ou concluído há menos de coalesce_reuse_seconds) esperam e
+    # reaproveitam a saída dele em vez de pedir outro export ao GMS. A pasta
+    # em processed/ é por tipo e período, não por lojas: outro job do mesmo
+    # período a reescreve, por isso o reaproveitamento de concluídos é opt-in.
+    export_coalescing: bool = Field(default=True)
+    coalesce_reuse_seconds: int = Field(default=0, ge=0)
+
+    # Jobs da mesma conta e host dividem uma sessão do GMS (um Chrome, um
+    # login): o export de cada um é enviado e fica estacionado enquanto o GMS
+    # processa, e uma leitura da tabela a cada 30s acompanha todos. Até
+    # max_in_flight exports por sessão; ela fecha após idle_seconds sem jobs.
+    # Só com job_isolation=thread — suba worker_slots para aproveitar.
+    export_pipelining: bool = Field(default=False)
+    export_pipeline_max_in_flight: int = Field(default=5, ge=1, le=15)
+    export_pipeline_idle_seconds: int = Field(default=120, ge=0)
+
+    # Pool de Chromes logados entre jobs, por host e usuário: o job pega um já
+    # na tela de exportação e o devolve ao terminar bem. size = navegadores
+    # ociosos mantidos (0 desliga); reciclado após max_jobs jobs ou
+    # max_age_seconds, fechado após idle_seconds parado. Só com
+    # job_isolation=thread.
+    browser_pool_size: int = Field(default=0, ge=0, le=16)
+    browser_pool_max_jobs: int = Field(default=20, ge=0)
+    browser_pool_max_age_seconds: int = Field(default=3600, ge=0)
+    browser_pool_idle_seconds: int = Field(default=600, ge=30)
+
+    # Perfil de bloqueio de recursos nas páginas do GMS (via CDP): padrões de
+    # URL (curinga "*") e tipos de recurso (Image, Font, Media, Stylesheet)
+    # que o Chrome não baixa no login nem nos refreshes da tabela de exports;
+    # disable_images desliga também as imagens sem extensão na URL. Compare
+    # com `python main.py --benchmark-resources --params-file ...`.
+    browser_block_resources: bool = Field(default=False)
+    browser_blocked_url_patterns: List[str] = Field(default_factory=lambda: [
+        "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+        "*hotjar.com*", "*clarity.ms*", "*facebook.net*", "*fonts.googleapis.com*",
+    ])
+    browser_blocked_resource_types: List[str] = Field(default_factory=lambda: ["Image", "Font", "Media"])
+    browser_disable_images: bool = Field(default=True)
+
+    # Cache em disco do Chrome compartilhado pelos jobs do nó: cada Chrome
+    # recebe uma cópia do template (bundles do SPA, legadoFrame, Kendo UI) e,
+    # ao fechar limpo, a cópia vira o novo template se o atual tem mais de
+    # refresh_seconds. max_mb = quota do template e de cada cópia (0 desliga).
+    # Vazio = DATA_DIR/chrome-cache; precisa ser fs local.
+    chrome_cache_max_mb: int = Field(default=0, ge=0)
+    chrome_cache_dir: str = Field(default="")
+    chrome_cache_refresh_seconds: int = Field(default=3600, ge=0)
+
+    # Perfil de inicialização do Chrome: "default" ou "lean" (até 2 renderers,
+    # sem site isolation, sem rede/serviços em segundo plano e heap do V8
+    # limitado a browser_js_heap_mb; 0 = sem limite). Meça o RSS por job com
+    # `python main.py --benchmark-memory` antes de subir worker_slots.
+    browser_launch_profile: str = Field(default="default", pattern=r"^(default|lean)$")
+    browser_js_heap_mb: int = Field(default=512, ge=0)
+
+    # Jobs acima destes limites são divididos em shards (períodos de até
+    # job_shard_max_days dias × grupos de até job_shard_max_stores lojas),
+    # cada um um export menor no GMS, mesclados no destino do job. 0 desliga
+    # o corte naquela dimensão (padrão: desligado). Cada shard faz o próprio
+    # login, export e polling; só compensa com JOB_SCHEDULING=cost, em que os
+    # shards pegam slots ociosos em paralelo — no fifo rodam em sequência.
+    job_shard_max_days: int = Field(default=0, ge=0)
+    job_shard_max_stores: int = Field(default=0, ge=0)
+
+    # Falhas transitórias (rede, browser, timeout) voltam para a fila depois
+    # de uma espera crescente (retry_base_delay_seconds × 4^n, até
+    # retry_max_delay_seconds) em filas com TTL; passadas job_retry_max_attempts
+    # tentativas o job vai para a maestro.dlx. 0 manda direto para a DLX.
+    job_retry_max_attempts: int = Field(default=5, ge=0, le=20)
+    retry_base_delay_seconds: int = Field(default=30, ge=1)
+    retry_max_delay_seconds: int = Field(default=3600, ge=1)
+
+    # SIGTERM/SIGINT: o worker para de consumir e espera os jobs em
+    # andamento por até shutdown_grace_seconds. Passado o prazo, jobs na
+    # espera do export no GMS são suspensos e republicados com checkpoint
+    # para outro worker retomar. O stop_grace_period do container precisa
+    # cobrir este prazo + ~1min.
+    shutdown_grace_seconds: int = Field(default=240, ge=0)
+
+    # Janela fora do pico do GMS ("HH:MM-HH:MM", hora local; pode atravessar
+    # a meia-noite). Jobs com estimativa acima de defer_jobs_larger_than_seconds
+    # esperam a janela em filas com TTL (<fila>.defer.<N>s) e os pequenos rodam
+    # na hora. Janela vazia ou limite 0 desligam. Cada job pode trazer
+    # execution_window / defer_if_larger_than_seconds nos parameters.
+    offpeak_window: str = Field(default="", pattern=r"^$|^\d{1,2}:\d{2}-\d{1,2}:\d{2}$")
+    defer_jobs_larger_than_seconds: int = Field(default=0, ge=0)
+
+    # Sinal para autoscaling (GET /capacity): slots livres, segundos restantes
+    # dos jobs em andamento e custo estimado do backlog das filas, em vez de
+    # contagem de mensagens. Porta 0 desliga; as profundidades das filas são
+    # atualizadas a cada capacity_refresh_seconds.
+    capacity_http_host: str = Field(default="0.0.0.0")
+    capacity_http_port: int = Field(default=9102, ge=0, le=65535)
+    capacity_refresh_seconds: float = Field(default=15.0, ge=1.0, le=300.0)
+
+    # main.py --daemon: nó único sem RabbitMQ/maestro. Jobs entram pela API
+    # local (POST /jobs) ou por arquivos .json em DATA_DIR/inbox e rodam em
+    # worker_slots slots; fila, status e logs em DATA_DIR/local_jobs.sqlite3.
+    # Porta 0 deixa só o inbox.
+    local_daemon_host: str = Field(default="127.0.0.1")
+    local_daemon_port: int = Field(default=8770, ge=0, le=65535)
+
+    maestro_db_host: str = Field(default="postgres")
+    maestro_db_port: int = Field(default=5432)
+    maestro_db_user: str = Field(default="user")
+    maestro_db_password: str = Field(default="password")
+    maestro_db_name: str = Field(default="maestro_db")
+    
+    base_dir: Path = Field(default_factory=lambda: Path(__file__).parent.parent)
+    chrome_driver_path: Optional[str] = None
+    headless: bool = Field(default=True)
+    
+    page_load_timeout: int = Field(default=30, ge=5, le=120)
+    implicit_wait: int = Field(default=10, ge=1, le=60)
+    download_timeout: int = Field(default=900, ge=60, le=3600)
+    default_timeout: int = Field(default=30)
+    
+    log_level: str = Field(default="INFO")
+    log_file: str = "logs/bot.log"
+    log_max_bytes: int = Field(default=10485760)
+    log_backup_count: int = Field(default=5)
+    
+    @property
+    def BASE_DIR(self) -> Path:
+        return self.base_dir
+    
+    @property
+    def LOGS_DIR(self) -> Path:
+        path = self.base_dir / "logs"
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+    
+    @property
+    def DOWNLOADS_DIR(self) -> Path:
+        path = self.base_dir / "downloads"
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+    
+    @property
+    def PENDING_DIR(self) -> Path:
+        # WHY: in containers the downloads dir is often a host bind-mount
+        # (e.g. /mnt/c/... on WSL). Extracting thousands of XMLs there
+        # triggers cross-fs permission errors on move and ENOMEM on traversal.
+        # Keep pending on the container's native fs; only processed/ stays on the mount.
+        override = os.environ.get("BOT_PENDING_DIR")
+        path = Path(override) if override else Path("/tmp/bot-xml-gms/pending")
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+    
+    def slot_pending_dir(self, slot_id: int) -> Path:
+        # WHY subdiretório por slot: download_exports e cleanup_pending_directory
+        # limpam o diretório inteiro. Com slots compartilhando o mesmo pending,
+        # um job apagaria o ZIP que outro ainda está baixando.
+        path = self.PENDING_DIR / f"slot-{slot_id}"
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+    
+    @property
+    def DATA_DIR(self) -> Path:
+        # Estado local do worker (outbox e diário SQLite). Precisa sobreviver a restart
+        # do container e ficar em fs nativo — SQLite em bind-mount do WSL
+        # (/mnt/c) não tem lock confiável.
+        override = os.environ.get("BOT_DATA_DIR")
+        path = Path(override) if override else self.base_dir / "data"
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+    
+    @property
+    def PROCESSED_DIR(self) -> Path:
+        path = self.DOWNLOADS_DIR / "processed"
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+    
+    @property
+    def DESTINATION_DIR(self) -> Path:
+        return self.PROCESSED_DIR
+    
+    @property
+    def DEFAULT_TIMEOUT(self) -> int:
+        return self.default_timeout
+    
+    @property
+    def SELECTORS_FILE(self) -> Path:
+        return self.base_dir / "config" / "selectors.yaml"
+    
+    def get_log_config(self) -> dict:
+        """Retorna configuração completa de logging"""
+        return {
+            "version": 1,
+            "disable_existing_loggers": False,
+            "formatters": {
+                "detailed": {
+                    "format": "%(asctime)s - [%(name)s] - %(levelname)s - %(message)s",
+                    "datefmt": "%Y-%m-%d %H:%M:%S"
+                },
+                "simple": {
+                    "format": "%(levelname)s - %(message)s"
+                }
+            },
+            "handlers": {
+                "console": {
+                    "class": "logging.StreamHandler",
+                    "level": self.log_level,
+                    "formatter": "detailed",
+                    "stream": "ext://sys.stdout"
+                },
+                "file": {
+                    "class": "logging.handlers.RotatingFileHandler",
+                    "level": self.log_level,
+                    "formatter": "detailed",
+                    "filename": str(self.LOGS_DIR / Path(self.log_file).name),
+                    "maxBytes": self.log_max_bytes,
+                    "backupCount": self.log_backup_count,
+                    "encoding": "utf-8"
+                }
+            },
+            "root": {
+                "level": self.log_level,
+                "handlers": ["console", "file"]
+            }
+        }
+
+
 settings = Settings()
\ No newline at end of file
@@ -1,50 +1,182 @@
-import logging
-import sys
-import argparse
-import json
-import signal
-from src.core.bot_runner import BotRunner
-from src.utils.logger_config import setup_logger
-
-def load_execution_parameters(params_file_path):
-    try:
-        with open(params_file_path, 'r', encoding='utf-8') as f:
-            params = json.load(f)
-        logging.info(f"Parâmetros de execução carregados com sucesso de {params_file_path}")
-        return params
-    except Exception as e:
-        logging.critical(f"Não foi possível ler o arquivo de parâmetros: {e}", exc_info=True)
-        return None
-
-def handle_termination(sig, frame):
-    logging.warning("🔴 PROCESSO DE AUTOMAÇÃO INTERROMPIDO EXTERNAMENTE (CANCELADO). ENCERRANDO... 🔴")
-    sys.exit(1)
-
-def main():
-    setup_logger()
-
-    signal.signal(signal.SIGTERM, handle_termination)
-
-    parser = argparse.ArgumentParser()
-    parser.add_argument('--params-file', required=True, help='Caminho para o arquivo JSON de parâmetros.')
-    args = parser.parse_args()
-
-    execution_params = load_execution_parameters(args.params_file)
-    if not execution_params:
-        sys.exit(1)
-
-    summary = None
-    try:
-        bot_runner = BotRunner(params=execution_params)
-        summary = bot_runner.run()
-    except Exception as e:
-        logging.critical(f"Erro inesperado na execução principal: {e}", exc_info=True)
-        sys.exit(1)
-    
-    if summary:
-        print("\n---SUMMARY_START---")
-        print(json.dumps(summary, indent=4, ensure_ascii=False))
-        print("---SUMMARY_END---")
-
-if __name__ == "__main__":
-    main()
+import logging
+import sys
+import argparse
+import json
+import signal
+import threading
+from pathlib import Path
+from config import settings
+from src.core.bot_runner import BotRunner
+from src.core.job_messages import is_transient_failure
+from src.core.job_process import IPC_CANCEL_COMMAND, IPC_SUSPEND_COMMAND, encode_ipc_message
+from src.utils.logger_config import setup_logger
+
+_ipc_lock = threading.Lock()
+
+def load_execution_parameters(params_file_path):
+    try:
+        with open(params_file_path, 'r', encoding='utf-8') as f:
+            params = json.load(f)
+        logging.info(f"Parâmetros de execução carregados com sucesso de {params_file_path}")
+        return params
+    except Exception as e:
+        logging.critical(f"Não foi possível ler o arquivo de parâmetros: {e}", exc_info=True)
+        return None
+
+def handle_termination(sig, frame):
+    logging.warning("🔴 PROCESSO DE AUTOMAÇÃO INTERROMPIDO EXTERNAMENTE (CANCELADO). ENCERRANDO... 🔴")
+    sys.exit(1)
+
+def emit_ipc(message):
+    # stdout é o canal IPC com o JobProcessSupervisor; os logs vão pro stderr.
+    with _ipc_lock:
+        sys.stdout.write(encode_ipc_message(message) + "\n")
+        sys.stdout.flush()
+
+def ipc_log_callback(job_id, level, message):
+    emit_ipc({"type": "log", "job_id": job_id, "level": level, "message": message})
+
+def watch_ipc_cancel(cancel_event, suspend_event):
+    # EOF no stdin = supervisor morreu; sem ele ninguém recebe o resultado,
+    # então trata como cancelamento para liberar o browser.
+    for line in sys.stdin:
+        if line.strip() == IPC_SUSPEND_COMMAND:
+            logging.warning("⏸️ Suspensão recebida do supervisor (worker em drain).")
+            suspend_event.set()
+            continue
+        if line.strip() == IPC_CANCEL_COMMAND:
+            break
+    logging.warning("🛑 Cancelamento recebido do supervisor.")
+    cancel_event.set()
+
+def run_daemon(args):
+    # Import tardio: a execução avulsa e o modo --ipc não precisam da fila local.
+    from src.core.local_daemon import LocalDaemon
+    from src.core.local_queue import LocalJobQueue
+
+    queue = LocalJobQueue(settings.DATA_DIR / "local_jobs.sqlite3")
+    daemon = LocalDaemon(
+        queue,
+        slots=args.slots,
+        host=settings.local_daemon_host,
+        port=args.port,
+        inbox_dir=None if args.inbox == "" else Path(args.inbox),
+    )
+
+    def _stop(sig, frame):
+        logging.warning(f"Recebido sinal {sig}. Encerrando o daemon local...")
+        daemon.stop()
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+    try:
+        daemon.run()
+    finally:
+        queue.close()
+
+def run_benchmark(args):
+    # Import tardio: o benchmark abre vários Chromes e não faz parte do job.
+    from src.automation.page_benchmark import run_resource_benchmark
+    from src.utils import data_handler
+
+    params = load_execution_parameters(args.params_file)
+    selectors = data_handler.load_yaml_file(settings.SELECTORS_FILE)
+    if not params or not selectors:
+        sys.exit(1)
+    report = run_resource_benchmark(params, selectors, runs=args.benchmark_runs)
+    print("\n---BENCHMARK_START---")
+    print(json.dumps(report, indent=4, ensure_ascii=False))
+    print("---BENCHMARK_END---")
+
+def run_memory_benchmark(args, parser):
+    # Import tardio, como o --benchmark-resources.
+    from src.automation.launch_profiles import launch_profile_names
+    from src.automation.memory_benchmark import run_memory_benchmark as run
+
+    profiles = [p.strip() for p in args.benchmark_profiles.split(",") if p.strip()]
+    unknown = [p for p in profiles if p not in launch_profile_names()]
+    if not profiles or unknown:
+        parser.error(f"--benchmark-profiles inválido: {', '.join(unknown) or 'vazio'} (use {', '.join(launch_profile_names())})")
+    if args.benchmark_seconds <= 0:
+        parser.error("--benchmark-seconds precisa ser maior que 0")
+    report = run(profiles, seconds=args.benchmark_seconds, headless=True)
+    print("\n---BENCHMARK_START---")
+    print(json.dumps(report, indent=4, ensure_ascii=False))
+    print("---BENCHMARK_END---")
+
+def main():
+    setup_logger()
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--params-file', default=None, help='Caminho para o arquivo JSON de parâmetros.')
+    parser.add_argument('--job-id', default=None, help='ID do job (logs e callbacks).')
+    parser.add_argument('--pending-dir', default=None, help='Diretório pending exclusivo do job.')
+    parser.add_argument('--ipc', action='store_true', help='Modo processo filho do worker: logs e resultado em JSON no stdout, cancelamento via stdin.')
+    parser.add_argument('--daemon', action='store_true', help='Nó único sem RabbitMQ/maestro: fila SQLite local alimentada pela API HTTP e pelo inbox.')
+    parser.add_argument('--slots', type=int, default=settings.worker_slots, help='Jobs simultâneos no modo --daemon.')
+    parser.add_argument('--port', type=int, default=settings.local_daemon_port, help='Porta da API local no modo --daemon (0 desliga).')
+    parser.add_argument('--inbox', default=str(settings.DATA_DIR / "inbox"), help='Diretório de arquivos .json de jobs no modo --daemon ("" desliga).')
+    parser.add_argument('--benchmark-resources', action='store_true', help='Mede tempo de carga e bytes das páginas do GMS sem e com o bloqueio de recursos (usa gms_login_url e credenciais do --params-file).')
+    parser.add_argument('--benchmark-runs', type=int, default=3, help='Rodadas por perfil no --benchmark-resources.')
+    parser.add_argument('--benchmark-memory', action='store_true', help='Mede RSS/PSS de pico e em regime do Chrome de um job por perfil de inicialização, numa página de teste local.')
+    parser.add_argument('--benchmark-profiles', default='default,lean', help='Perfis comparados no --benchmark-memory (separados por vírgula).')
+    parser.add_argument('--benchmark-seconds', type=float, default=30.0, help='Duração da amostragem por perfil no --benchmark-memory.')
+    args = parser.parse_args()
+
+    if args.daemon:
+        run_daemon(args)
+        return
+
+    if args.benchmark_memory:
+        run_memory_benchmark(args, parser)
+        return
+
+    if not args.params_file:
+        parser.error("--params-file é obrigatório (ou use --daemon)")
+
+    if args.benchmark_resources:
+        run_benchmark(args)
+        return
+
+    signal.signal(signal.SIGTERM, handle_termination)
+
+    execution_params = load_execution_parameters(args.params_file)
+    if not execution_params:
+        sys.exit(1)
+
+    cancel_event = threading.Event()
+    suspend_event = threading.Event()
+    if args.ipc:
+        threading.Thread(target=watch_ipc_cancel, args=(cancel_event, suspend_event), name="ipc-cancel", daemon=True).start()
+
+    summary = None
+    try:
+        bot_runner = BotRunner(
+            params=execution_params,
+            job_id=args.job_id,
+            log_callback=ipc_log_callback if args.ipc else None,
+            cancel_event=cancel_event,
+            pending_dir=args.pending_dir,
+            suspend_event=suspend_event,
+        )
+        summary = bot_runner.run()
+    except Exception as e:
+        logging.critical(f"Erro inesperado na execução principal: {e}", exc_info=True)
+        if args.ipc:
+            emit_ipc({"type": "result", "result": {
+                "status": "failed", "error": str(e), "error_type": type(e).__name__,
+                "transient": is_transient_failure(e),
+            }})
+        sys.exit(1)
+
+    if args.ipc:
+        emit_ipc({"type": "result", "result": summary or {}})
+        return
+
+    if summary:
+        print("\n---SUMMARY_START---")
+        print(json.dumps(summary, indent=4, ensure_ascii=False))
+        print("---SUMMARY_END---")
+
+if __name__ == "__main__":
+    main()
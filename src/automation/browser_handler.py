@@ -1,154 +1,211 @@
-import json
-import logging
-from pathlib import Path
-from datetime import datetime
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.chrome.options import Options as ChromeOptions
-from config import settings
-
-logger = logging.getLogger(__name__)
-
-class BrowserHandler:
-    def __init__(self, headless: bool = False):
-        self.headless = headless
-        self.driver: webdriver.Chrome = None
-
-    def start_browser(self) -> webdriver.Chrome:
-        logger.info(f"Iniciando o navegador em modo {'headless' if self.headless else 'com interface'}.")
-        
-        chrome_options = ChromeOptions()
-        
-        download_dir = str(settings.PENDING_DIR)
-        prefs = {
-            "download.default_directory": download_dir,
-            "download.prompt_for_download": False,
-            "download.directory_upgrade": True,
-            "safebrowsing.enabled": True,
-        }
-        chrome_options.add_experimental_option("prefs", prefs)
-        chrome_options.set_capability('goog:loggingPrefs', {
-            'browser': 'ALL',
-            'performance': 'ALL',
-        })
-
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        
-        if self.headless:
-            chrome_options.add_argument("--headless=new")
-            chrome_options.add_argument("--window-size=1920,1080")
-            chrome_options.add_argument("--disable-gpu") 
-            chrome_options.add_experimental_option('excludeSwitches', ['enable-logging'])
-            chrome_options.add_argument('--log-level=3')
-
-        try:
-            configured_driver_path = settings.chrome_driver_path
-
-            if configured_driver_path and Path(configured_driver_path).exists():
-                logger.info(f"Usando ChromeDriver configurado em: {configured_driver_path}")
-                service = ChromeService(executable_path=configured_driver_path)
-                self.driver = webdriver.Chrome(service=service, options=chrome_options)
-            elif Path("/usr/local/bin/chromedriver").exists():
-                logger.info("Usando ChromeDriver padrão do container: /usr/local/bin/chromedriver")
-                service = ChromeService(executable_path="/usr/local/bin/chromedriver")
-                self.driver = webdriver.Chrome(service=service, options=chrome_options)
-            else:
-                logger.info("ChromeDriver não encontrado em caminho fixo. Usando Selenium Manager automático.")
-                self.driver = webdriver.Chrome(options=chrome_options)
-
-            # Configurar download via CDP (essencial para headless e mais confiável em geral)
-            self.driver.execute_cdp_cmd("Page.setDownloadBehavior", {
-                "behavior": "allow",
-                "downloadPath": download_dir
-            })
-            logger.info(f"Download configurado via CDP para: {download_dir}")
-
-            # Habilitar domínio Network do CDP para capturar eventos de rede nos performance logs
-            try:
-                self.driver.execute_cdp_cmd("Network.enable", {})
-                logger.debug("CDP Network domain habilitado.")
-            except Exception as cdp_err:
-                logger.debug(f"Não foi possível habilitar CDP Network domain: {cdp_err}")
-
-            logger.info("Navegador iniciado com sucesso.")
-            return self.driver
-        
-        except Exception as e:
-            logger.error(f"Não foi possível iniciar o Chrome Driver: {e}", exc_info=True)
-            return None
-
-    def take_screenshot(self, name: str = "debug") -> str:
-        """Captura screenshot para diagnóstico. Retorna o caminho do arquivo."""
-        if not self.driver:
-            logger.warning("Driver não disponível para capturar screenshot.")
-            return None
-        try:
-            screenshots_dir = settings.BASE_DIR / "logs" / "screenshots"
-            screenshots_dir.mkdir(parents=True, exist_ok=True)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filepath = screenshots_dir / f"{name}_{timestamp}.png"
-            self.driver.save_screenshot(str(filepath))
-            logger.info(f"📸 Screenshot salva: {filepath}")
-            return str(filepath)
-        except Exception as e:
-            logger.error(f"Falha ao capturar screenshot: {e}")
-            return None
-
-    def get_browser_console_logs(self) -> list:
-        """Returns and clears browser console log entries (one-time read)."""
-        if not self.driver:
-            return []
-        try:
-            return self.driver.get_log('browser')
-        except Exception as e:
-            logger.debug(f"Logs do console do browser indisponíveis: {e}")
-            return []
-
-    def get_performance_logs(self) -> list:
-        """Returns and clears CDP performance log entries (one-time read)."""
-        if not self.driver:
-            return []
-        try:
-            return self.driver.get_log('performance')
-        except Exception as e:
-            logger.debug(f"Logs de performance indisponíveis: {e}")
-            return []
-
-    def log_browser_diagnostics(self, context: str = "") -> None:
-        """Logs browser console errors/warnings and relevant CDP network events."""
-        prefix = f"[{context}] " if context else ""
-
-        browser_logs = self.get_browser_console_logs()
-        if browser_logs:
-            errors = [e for e in browser_logs if e.get('level') in ('SEVERE', 'WARNING')]
-            if errors:
-                for entry in errors:
-                    logger.warning(f"{prefix}Console browser [{entry['level']}]: {entry.get('message', '')[:300]}")
-            else:
-                logger.debug(f"{prefix}Console browser: {len(browser_logs)} entradas, nenhum erro.")
-        else:
-            logger.debug(f"{prefix}Console browser: vazio.")
-
-        perf_logs = self.get_performance_logs()
-        dl_events = []
-        for entry in perf_logs:
-            try:
-                msg = json.loads(entry.get('message', '{}'))
-                method = msg.get('message', {}).get('method', '')
-                if any(k in method for k in ['Download', 'Page.download', 'Network.responseReceived']):
-                    params = msg.get('message', {}).get('params', {})
-                    dl_events.append(f"{method}: {str(params)[:200]}")
-            except Exception:
-                continue
-        if dl_events:
-            for ev in dl_events:
-                logger.info(f"{prefix}Evento CDP: {ev}")
-        else:
-            logger.debug(f"{prefix}Nenhum evento de download/resposta nos performance logs.")
-
-    def close_browser(self):
-        if self.driver:
-            logger.info("Fechando o navegador.")
-            self.driver.quit()
-            self.driver = None
\ No newline at end of file
+import json
+import logging
+from pathlib import Path
+from datetime import datetime
+from typing import Optional
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service as ChromeService
+from selenium.webdriver.chrome.options import Options as ChromeOptions
+from config import settings
+from src.automation.chrome_cache import shared_chrome_cache
+from src.automation.launch_profiles import apply_launch_profile
+from src.automation.resource_blocking import ResourceBlockingProfile
+
+logger = logging.getLogger(__name__)
+
+class BrowserHandler:
+    def __init__(self, headless: bool = False, download_dir: Optional[Path] = None,
+                 resource_blocking: Optional[ResourceBlockingProfile] = None,
+                 launch_profile: Optional[str] = None):
+        self.headless = headless
+        # Cada slot do worker passa o próprio pending; sem isso, dois Chromes
+        # baixariam para o mesmo diretório e um job pegaria o ZIP do outro.
+        self.download_dir = Path(download_dir) if download_dir else settings.PENDING_DIR
+        self.driver: webdriver.Chrome = None
+        # None = perfil das settings (browser_block_resources); o benchmark
+        # passa um perfil explícito para comparar com e sem bloqueio.
+        self.resource_blocking = resource_blocking if resource_blocking is not None else ResourceBlockingProfile.from_settings()
+        # Cópia exclusiva do cache em disco compartilhado do nó (ver
+        # ChromeCacheManager); devolvida no close_browser.
+        self.cache_dir: Optional[Path] = None
+        self.launch_profile = launch_profile or settings.browser_launch_profile
+
+    def start_browser(self) -> webdriver.Chrome:
+        logger.info(f"Iniciando o navegador em modo {'headless' if self.headless else 'com interface'} (perfil {self.launch_profile}).")
+        
+        chrome_options = ChromeOptions()
+        
+        download_dir = str(self.download_dir)
+        prefs = {
+            "download.default_directory": download_dir,
+            "download.prompt_for_download": False,
+            "download.directory_upgrade": True,
+            "safebrowsing.enabled": True,
+        }
+        prefs.update(self.resource_blocking.chrome_prefs())
+        chrome_options.add_experimental_option("prefs", prefs)
+        chrome_options.set_capability('goog:loggingPrefs', {
+            'browser': 'ALL',
+            'performance': 'ALL',
+        })
+
+        chrome_options.add_argument("--no-sandbox")
+        chrome_options.add_argument("--disable-dev-shm-usage")
+        apply_launch_profile(chrome_options, self.launch_profile)
+        
+        cache = shared_chrome_cache()
+        if cache:
+            self.cache_dir = cache.checkout()
+            chrome_options.add_argument(f"--disk-cache-dir={self.cache_dir}")
+            chrome_options.add_argument(f"--disk-cache-size={cache.chrome_cache_size}")
+
+        if self.headless:
+            chrome_options.add_argument("--headless=new")
+            chrome_options.add_argument("--window-size=1920,1080")
+            chrome_options.add_argument("--disable-gpu") 
+            chrome_options.add_experimental_option('excludeSwitches', ['enable-logging'])
+            chrome_options.add_argument('--log-level=3')
+
+        try:
+            configured_driver_path = settings.chrome_driver_path
+
+            if configured_driver_path and Path(configured_driver_path).exists():
+                logger.info(f"Usando ChromeDriver configurado em: {configured_driver_path}")
+                service = ChromeService(executable_path=configured_driver_path)
+                self.driver = webdriver.Chrome(service=service, options=chrome_options)
+            elif Path("/usr/local/bin/chromedriver").exists():
+                logger.info("Usando ChromeDriver padrão do container: /usr/local/bin/chromedriver")
+                service = ChromeService(executable_path="/usr/local/bin/chromedriver")
+                self.driver = webdriver.Chrome(service=service, options=chrome_options)
+            else:
+                logger.info("ChromeDriver não encontrado em caminho fixo. Usando Selenium Manager automático.")
+                self.driver = webdriver.Chrome(options=chrome_options)
+
+            # Configurar download via CDP (essencial para headless e mais confiável em geral)
+            self.driver.execute_cdp_cmd("Page.setDownloadBehavior", {
+                "behavior": "allow",
+                "downloadPath": download_dir
+            })
+            logger.info(f"Download configurado via CDP para: {download_dir}")
+
+            # Habilitar domínio Network do CDP para capturar eventos de rede nos performance logs
+            try:
+                self.driver.execute_cdp_cmd("Network.enable", {})
+                logger.debug("CDP Network domain habilitado.")
+            except Exception as cdp_err:
+                logger.debug(f"Não foi possível habilitar CDP Network domain: {cdp_err}")
+
+            if self.resource_blocking.enabled:
+                try:
+                    self.resource_blocking.apply(self.driver)
+                    logger.info(f"🚫 Bloqueio de recursos do GMS ativo: {self.resource_blocking.describe()}")
+                except Exception as cdp_err:
+                    # Sem o bloqueio a página só carrega mais; não derruba o job.
+                    logger.warning(f"🚫 Não foi possível aplicar o bloqueio de recursos via CDP: {cdp_err}")
+
+            logger.info("Navegador iniciado com sucesso.")
+            return self.driver
+        
+        except Exception as e:
+            logger.error(f"Não foi possível iniciar o Chrome Driver: {e}", exc_info=True)
+            self._release_cache(publish=False)
+            return None
+
+    def set_download_dir(self, download_dir: Path) -> None:
+        """Aponta os downloads do Chrome já aberto para outro diretório
+        (navegador reaproveitado por outro slot, ver BrowserPool)."""
+        self.download_dir = Path(download_dir)
+        self.driver.execute_cdp_cmd("Page.setDownloadBehavior", {
+            "behavior": "allow",
+            "downloadPath": str(self.download_dir)
+        })
+        logger.info(f"Download configurado via CDP para: {self.download_dir}")
+
+    def take_screenshot(self, name: str = "debug") -> str:
+        """Captura screenshot para diagnóstico. Retorna o caminho do arquivo."""
+        if not self.driver:
+            logger.warning("Driver não disponível para capturar screenshot.")
+            return None
+        try:
+            screenshots_dir = settings.BASE_DIR / "logs" / "screenshots"
+            screenshots_dir.mkdir(parents=True, exist_ok=True)
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filepath = screenshots_dir / f"{name}_{timestamp}.png"
+            self.driver.save_screenshot(str(filepath))
+            logger.info(f"📸 Screenshot salva: {filepath}")
+            return str(filepath)
+        except Exception as e:
+            logger.error(f"Falha ao capturar screenshot: {e}")
+            return None
+
+    def get_browser_console_logs(self) -> list:
+        """Returns and clears browser console log entries (one-time read)."""
+        if not self.driver:
+            return []
+        try:
+            return self.driver.get_log('browser')
+        except Exception as e:
+            logger.debug(f"Logs do console do browser indisponíveis: {e}")
+            return []
+
+    def get_performance_logs(self) -> list:
+        """Returns and clears CDP performance log entries (one-time read)."""
+        if not self.driver:
+            return []
+        try:
+            return self.driver.get_log('performance')
+        except Exception as e:
+            logger.debug(f"Logs de performance indisponíveis: {e}")
+            return []
+
+    def log_browser_diagnostics(self, context: str = "") -> None:
+        """Logs browser console errors/warnings and relevant CDP network events."""
+        prefix = f"[{context}] " if context else ""
+
+        browser_logs = self.get_browser_console_logs()
+        if browser_logs:
+            errors = [e for e in browser_logs if e.get('level') in ('SEVERE', 'WARNING')]
+            if errors:
+                for entry in errors:
+                    logger.warning(f"{prefix}Console browser [{entry['level']}]: {entry.get('message', '')[:300]}")
+            else:
+                logger.debug(f"{prefix}Console browser: {len(browser_logs)} entradas, nenhum erro.")
+        else:
+            logger.debug(f"{prefix}Console browser: vazio.")
+
+        perf_logs = self.get_performance_logs()
+        dl_events = []
+        for entry in perf_logs:
+            try:
+                msg = json.loads(entry.get('message', '{}'))
+                method = msg.get('message', {}).get('method', '')
+                if any(k in method for k in ['Download', 'Page.download', 'Network.responseReceived']):
+                    params = msg.get('message', {}).get('params', {})
+                    dl_events.append(f"{method}: {str(params)[:200]}")
+            except Exception:
+                continue
+        if dl_events:
+            for ev in dl_events:
+                logger.info(f"{prefix}Evento CDP: {ev}")
+        else:
+            logger.debug(f"{prefix}Nenhum evento de download/resposta nos performance logs.")
+
+    def _release_cache(self, publish: bool) -> None:
+        cache = shared_chrome_cache()
+        if cache and self.cache_dir:
+            cache.release(self.cache_dir, publish)
+        self.cache_dir = None
+
+    def close_browser(self):
+        if self.driver:
+            logger.info("Fechando o navegador.")
+            try:
+                self.driver.quit()
+            except Exception:
+                # Chrome que não fechou limpo pode deixar o índice do cache
+                # pela metade: não vira template.
+                self._release_cache(publish=False)
+                raise
+            finally:
+                self.driver = None
+            self._release_cache(publish=True)
\ No newline at end of file
@@ -0,0 +1,260 @@
+# src/automation/browser_pool.py
+import atexit
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from config import settings
+from src.automation.browser_handler import BrowserHandler
+from src.automation.gms_session import open_export_screen, wait_rate_limit
+from src.automation.page_objects.base_page import BasePage
+from src.automation.page_objects.export_page import ExportPage
+from src.core.credential_pool import shared_credential_pool
+from src.utils.circuit_breaker import shared_circuit_breaker
+from src.utils.rate_limiter import ACTION_REFRESH
+
+logger = logging.getLogger(__name__)
+
+# Cadência da varredura que fecha navegadores ociosos demais ou velhos.
+_REAP_SECONDS = 30.0
+
+# Quanto esperar o iframe da tela de exportação no health check.
+_HEALTH_TIMEOUT_SECONDS = 10
+
+PoolKey = Tuple[str, str, bool]
+
+
+class PooledBrowser:
+    """Chrome logado no GMS, parado na tela de exportação."""
+
+    def __init__(self, handler: BrowserHandler, login_url: str, user: str, password: str, headless: bool, selectors: Dict):
+        self.handler = handler
+        self.login_url = login_url
+        self.user = user
+        self.password = password
+        self.headless = headless
+        self.selectors = selectors
+        self.host = urlparse(login_url).hostname
+        self.created_at = time.monotonic()
+        self.idle_since = self.created_at
+        self.jobs = 0
+
+    @property
+    def key(self) -> PoolKey:
+        return (self.login_url, self.user, self.headless)
+
+
+class BrowserPool:
+    """Navegadores logados que sobrevivem entre jobs, por (host, usuário).
+
+    Todo job abria um Chrome (até 3 tentativas), logava, navegava pelo
+    sidebar e fechava tudo no finally — dezenas de segundos antes do
+    primeiro clique útil, o que num job pequeno é a maior parte do tempo.
+    Aqui o job devolve o navegador ao terminar bem (checkin) e o próximo job
+    da mesma conta o pega já na tela de exportação (checkout), depois de um
+    health check (refresh + iframe da tela de exportação presente; sessão
+    expirada volta para o login e reprova).
+
+    No checkin o estado é limpo (alerta, janelas extras, frame padrão,
+    diretório de download) e a página recarregada. Navegador com
+    max_age_seconds ou max_jobs é reciclado: fechado e substituído em
+    segundo plano por um novo, já logado. Ociosos por idle_seconds são
+    fechados. No máximo size navegadores ociosos no total.
+    """
+
+    def __init__(self, size: int, max_jobs: int, max_age_seconds: float, idle_seconds: float):
+        self.size = size
+        self.max_jobs = max_jobs
+        self.max_age_seconds = max_age_seconds
+        self.idle_seconds = idle_seconds
+        self.download_dir = settings.PENDING_DIR / "browser-pool"
+        self._idle: List[PooledBrowser] = []
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._reaper = threading.Thread(target=self._reap_loop, name="browser-pool-reaper", daemon=True)
+        self._reaper.start()
+
+    def checkout(self, login_url: str, user: str, headless: bool, download_dir: Path) -> Optional[PooledBrowser]:
+        """Navegador ocioso e saudável da conta, já baixando em download_dir;
+        None se não há (o job abre o próprio e o adota)."""
+        key = (login_url, user, headless)
+        while True:
+            with self._lock:
+                candidates = [b for b in self._idle if b.key == key]
+                if not candidates:
+                    return None
+                browser = max(candidates, key=lambda b: b.idle_since)
+                self._idle.remove(browser)
+            if self._healthy(browser):
+                try:
+                    browser.handler.set_download_dir(download_dir)
+                except Exception as e:
+                    logger.warning(f"♻️ Navegador do pool sem CDP de download ({e}); descartado.")
+                    self._quit(browser)
+                    continue
+                browser.jobs += 1
+                logger.info(f"♻️ Navegador do pool reaproveitado ({user}@{browser.host}, job {browser.jobs})")
+                return browser
+            self._quit(browser)
+
+    def adopt(self, handler: BrowserHandler, login_url: str, user: str, password: str, headless: bool, selectors: Dict) -> PooledBrowser:
+        """Registra o navegador que o job acabou de abrir e logar."""
+        browser = PooledBrowser(handler, login_url, user, password, headless, selectors)
+        browser.jobs = 1
+        return browser
+
+    def checkin(self, browser: PooledBrowser, reusable: bool) -> None:
+        """Devolve o navegador ao fim do job; reusable=False (job falhou ou
+        foi interrompido no meio da tela) fecha."""
+        if not reusable or self._closed.is_set():
+            self._quit(browser)
+            return
+        if self._expired(browser):
+            logger.info(f"♻️ Reciclando navegador do pool ({browser.user}@{browser.host}, {browser.jobs} job(s))")
+            self._quit(browser)
+            self._prewarm(browser)
+            return
+        try:
+            self._reset(browser)
+        except Exception as e:
+            logger.warning(f"♻️ Falha ao limpar o navegador para o pool ({e}); fechando.")
+            self._quit(browser)
+            return
+        browser.idle_since = time.monotonic()
+        evicted = None
+        with self._lock:
+            if len(self._idle) >= self.size:
+                evicted = min(self._idle, key=lambda b: b.idle_since)
+                self._idle.remove(evicted)
+            self._idle.append(browser)
+        if evicted is not None:
+            self._quit(evicted)
+
+    def close(self) -> None:
+        self._closed.set()
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for browser in idle:
+            self._quit(browser)
+
+    def _expired(self, browser: PooledBrowser) -> bool:
+        age = time.monotonic() - browser.created_at
+        return (self.max_jobs and browser.jobs >= self.max_jobs) or (self.max_age_seconds and age >= self.max_age_seconds)
+
+    def _healthy(self, browser: PooledBrowser) -> bool:
+        driver = browser.handler.driver
+        try:
+            driver.switch_to.default_content()
+            wait_rate_limit(browser.host, ACTION_REFRESH)
+            driver.refresh()
+            frame = browser.selectors.get('export_page', {}).get('legado_frame')
+            return bool(frame) and BasePage(driver).is_element_present(frame, timeout=_HEALTH_TIMEOUT_SECONDS)
+        except Exception as e:
+            logger.info(f"♻️ Navegador do pool reprovado no health check: {e}")
+            return False
+
+    def _reset(self, browser: PooledBrowser) -> None:
+        driver = browser.handler.driver
+        try:
+            driver.switch_to.alert.accept()
+        except Exception:
+            pass
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        driver.switch_to.default_content()
+        ExportPage.clear_download_dir(browser.handler.download_dir)
+        driver.refresh()
+
+    def _quit(self, browser: PooledBrowser) -> None:
+        try:
+            browser.handler.close_browser()
+        except Exception as e:
+            logger.debug(f"Falha ao fechar navegador do pool: {e}")
+
+    def _prewarm(self, spec: PooledBrowser) -> None:
+        """Abre e loga um substituto para o navegador reciclado.
+
+        O login segue as mesmas regras de um job: lease da conta (concorrência,
+        quarentena, logins por hora) e circuit breaker do host. Sem conta livre
+        ou com o circuito aberto, não pré-aquece — o próximo job abre o seu.
+        """
+        def _warm():
+            credentials = shared_credential_pool()
+            lease = None
+            if credentials is not None and spec.user in credentials.accounts:
+                lease = credentials.try_acquire(spec.user, job_id="browser-pool-prewarm")
+                if lease is None:
+                    logger.info(f"♻️ Pré-aquecimento dispensado: conta {spec.user} sem vaga no pool de contas")
+                    return
+            try:
+                breaker = shared_circuit_breaker()
+                wait = breaker.admit(spec.host) if breaker else None
+                if wait is not None:
+                    logger.info(f"♻️ Pré-aquecimento dispensado: circuito do GMS {spec.host} aberto ({wait:.0f}s)")
+                    return
+                self.download_dir.mkdir(parents=True, exist_ok=True)
+                handler = BrowserHandler(headless=spec.headless, download_dir=self.download_dir)
+                try:
+                    if not handler.start_browser():
+                        raise ConnectionError("Driver do navegador não foi inicializado.")
+                    open_export_screen(
+                        handler.driver, spec.selectors, spec.login_url, spec.user, spec.password,
+                        lease=lease,
+                        breaker=breaker,
+                    )
+                except Exception as e:
+                    logger.warning(f"♻️ Não foi possível pré-aquecer navegador ({spec.user}@{spec.host}): {e}")
+                    handler.close_browser()
+                    return
+            finally:
+                if lease is not None:
+                    lease.release()
+            browser = PooledBrowser(handler, spec.login_url, spec.user, spec.password, spec.headless, spec.selectors)
+            logger.info(f"♻️ Navegador pré-aquecido no pool ({spec.user}@{spec.host})")
+            self.checkin(browser, reusable=True)
+
+        threading.Thread(target=_warm, name="browser-pool-prewarm", daemon=True).start()
+
+    def _reap_loop(self) -> None:
+        while not self._closed.wait(_REAP_SECONDS):
+            now = time.monotonic()
+            with self._lock:
+                stale = [
+                    b for b in self._idle
+                    if now - b.idle_since >= self.idle_seconds
+                    or (self.max_age_seconds and now - b.created_at >= self.max_age_seconds)
+                ]
+                for browser in stale:
+                    self._idle.remove(browser)
+            for browser in stale:
+                logger.info(f"♻️ Fechando navegador ocioso do pool ({browser.user}@{browser.host})")
+                self._quit(browser)
+
+
+_shared_pool: Optional[BrowserPool] = None
+_shared_pool_lock = threading.Lock()
+
+
+def shared_browser_pool() -> Optional[BrowserPool]:
+    """Pool do processo; None com browser_pool_size 0 ou jobs em processo
+    filho (o navegador morre com o filho)."""
+    global _shared_pool
+    if not settings.browser_pool_size or settings.job_isolation != "thread":
+        return None
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = BrowserPool(
+                settings.browser_pool_size,
+                settings.browser_pool_max_jobs,
+                settings.browser_pool_max_age_seconds,
+                settings.browser_pool_idle_seconds,
+            )
+            # Sem isso os Chromes ociosos ficam órfãos quando o worker sai.
+            atexit.register(_shared_pool.close)
+        return _shared_pool
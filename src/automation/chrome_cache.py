@@ -0,0 +1,265 @@
+# src/automation/chrome_cache.py
+import logging
+import os
+import shutil
+import socket
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Optional
+
+from config import settings
+from src.utils.sqlite_store import connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chrome_cache_template (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    generation INTEGER NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    published_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chrome_cache_slots (
+    slot TEXT PRIMARY KEY,
+    node TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    copying_generation INTEGER,
+    started_at REAL NOT NULL
+);
+"""
+
+# Slot sem dono por mais que isso (worker morto em outro container, onde o
+# pid não diz nada) é apagado.
+_STALE_SLOT_SECONDS = 24 * 3600.0
+
+# Diretório em slots/ sem linha no SQLite só é apagado depois disso: um
+# checkout concorrente cria a linha e o diretório fora da varredura.
+_ORPHAN_GRACE_SECONDS = 3600.0
+
+
+def _dir_size(path: Path) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                continue
+    return total
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # os.kill(pid, 0) encerra o processo no Windows; lá só vale a idade.
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class ChromeCacheManager:
+    """Cache em disco do Chrome reaproveitado pelos jobs do nó.
+
+    Todo Chrome subia com perfil descartável, então os bundles do SPA do GMS,
+    os assets do legadoFrame e os scripts do Kendo UI eram baixados de novo a
+    cada job. Dois Chromes no mesmo --disk-cache-dir corrompem o índice; por
+    isso há um template somente leitura (template-<geração>/) e cada
+    navegador recebe uma cópia própria em slots/<id>/ (checkout).
+
+    No release, com o navegador já fechado, a cópia vira a nova geração do
+    template se o atual tem mais de refresh_seconds (ou não existe); senão é
+    apagada. A troca de geração e o registro de quem está copiando ficam no
+    SQLite (BEGIN IMMEDIATE), então uma geração só é apagada quando ninguém
+    a copia. Quota: o Chrome limita a própria cópia (--disk-cache-size) e
+    template acima de max_bytes é descartado; slots órfãos (processo morto)
+    e gerações velhas são removidos a cada release.
+    """
+
+    def __init__(self, base_dir: Path, max_bytes: int, refresh_seconds: float):
+        self.base_dir = Path(base_dir)
+        self.slots_dir = self.base_dir / "slots"
+        self.slots_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.refresh_seconds = refresh_seconds
+        self._node = socket.gethostname()
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(self.base_dir / "chrome_cache.sqlite3")
+        self._conn.executescript(_SCHEMA)
+        self._evict()
+
+    @property
+    def chrome_cache_size(self) -> int:
+        # O resto da quota fica para o Code Cache (JS compilado), que o Chrome
+        # grava no mesmo diretório mas não conta no --disk-cache-size.
+        return self.max_bytes * 3 // 4
+
+    def _template_dir(self, generation: int) -> Path:
+        return self.base_dir / f"template-{generation}"
+
+    def _generations(self) -> Dict[int, Path]:
+        generations = {}
+        for entry in self.base_dir.glob("template-*"):
+            suffix = entry.name.split("-", 1)[1]
+            if suffix.isdigit():
+                generations[int(suffix)] = entry
+        return generations
+
+    def _transaction(self, body):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = body()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return result
+
+    def checkout(self) -> Path:
+        """Diretório de cache exclusivo para um Chrome novo, já com a cópia
+        do template (vazio se ainda não há template)."""
+        slot = uuid.uuid4().hex
+        path = self.slots_dir / slot
+
+        def register():
+            row = self._conn.execute("SELECT generation FROM chrome_cache_template WHERE id = 1").fetchone()
+            generation = row["generation"] if row else None
+            self._conn.execute(
+                "INSERT INTO chrome_cache_slots (slot, node, pid, copying_generation, started_at) VALUES (?, ?, ?, ?, ?)",
+                (slot, self._node, os.getpid(), generation, time.time()),
+            )
+            return generation
+
+        generation = self._transaction(register)
+        if generation is None:
+            path.mkdir(parents=True, exist_ok=True)
+            return path
+        try:
+            shutil.copytree(self._template_dir(generation), path)
+            logger.debug(f"💾 Cache do Chrome copiado do template {generation} para {path}")
+        except OSError as e:
+            # Cópia parcial pode ter índice inconsistente: melhor cache frio.
+            logger.warning(f"💾 Falha ao copiar o cache do Chrome ({e}); navegador começa sem cache.")
+            shutil.rmtree(path, ignore_errors=True)
+            path.mkdir(parents=True, exist_ok=True)
+        finally:
+            with self._lock:
+                self._conn.execute("UPDATE chrome_cache_slots SET copying_generation = NULL WHERE slot = ?", (slot,))
+        return path
+
+    def release(self, path: Path, publish: bool) -> None:
+        """Devolve o diretório depois que o Chrome fechou. publish=False
+        (navegador não encerrou limpo) só apaga a cópia."""
+        path = Path(path)
+        size = _dir_size(path) if publish else 0
+        now = time.time()
+
+        def finish():
+            self._conn.execute("DELETE FROM chrome_cache_slots WHERE slot = ?", (path.name,))
+            if not publish or not size or size > self.max_bytes:
+                return None
+            row = self._conn.execute(
+                "SELECT generation, published_at FROM chrome_cache_template WHERE id = 1"
+            ).fetchone()
+            if row is not None and now - row["published_at"] < self.refresh_seconds:
+                return None
+            # Maior que qualquer diretório existente (template descartado por
+            # quota ainda pode estar no disco); rename dentro da transação:
+            # ninguém lê a geração nova antes de o diretório existir.
+            generation = max([row["generation"] if row else 0, *self._generations()]) + 1
+            os.replace(path, self._template_dir(generation))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chrome_cache_template (id, generation, size_bytes, published_at) VALUES (1, ?, ?, ?)",
+                (generation, size, now),
+            )
+            return generation
+
+        try:
+            published = self._transaction(finish)
+        except OSError as e:
+            logger.warning(f"💾 Não foi possível publicar o cache do Chrome: {e}")
+            published = None
+        if published is not None:
+            logger.info(f"💾 Cache do Chrome publicado como template {published} ({size / 1024 / 1024:.1f} MB)")
+        else:
+            shutil.rmtree(path, ignore_errors=True)
+        self._evict()
+
+    def _evict(self) -> None:
+        """Remove gerações sem uso, template acima da quota e slots órfãos."""
+        now = time.time()
+
+        def collect():
+            template = self._conn.execute(
+                "SELECT generation, size_bytes FROM chrome_cache_template WHERE id = 1"
+            ).fetchone()
+            if template is not None and template["size_bytes"] > self.max_bytes:
+                logger.info("💾 Template do cache do Chrome acima da quota; descartado.")
+                self._conn.execute("DELETE FROM chrome_cache_template WHERE id = 1")
+                template = None
+            stale = [
+                row["slot"] for row in self._conn.execute("SELECT slot, node, pid, started_at FROM chrome_cache_slots")
+                if now - row["started_at"] >= _STALE_SLOT_SECONDS
+                or (row["node"] == self._node and not _pid_alive(row["pid"]))
+            ]
+            for slot in stale:
+                self._conn.execute("DELETE FROM chrome_cache_slots WHERE slot = ?", (slot,))
+            slots = {row["slot"] for row in self._conn.execute("SELECT slot FROM chrome_cache_slots")}
+            in_use = {
+                row["copying_generation"]
+                for row in self._conn.execute(
+                    "SELECT copying_generation FROM chrome_cache_slots WHERE copying_generation IS NOT NULL"
+                )
+            }
+            # Só gerações anteriores ao template atual (ou a todas as que
+            # existem agora): uma publicação depois desta leitura cria uma
+            # geração maior, que não pode ser apagada.
+            generations = self._generations()
+            if template is not None:
+                limit = template["generation"]
+            else:
+                limit = max(generations, default=0) + 1
+            unused = [path for generation, path in generations.items() if generation < limit and generation not in in_use]
+            return stale, slots, unused
+
+        stale, slots, unused = self._transaction(collect)
+        for slot in stale:
+            shutil.rmtree(self.slots_dir / slot, ignore_errors=True)
+        for entry in unused:
+            shutil.rmtree(entry, ignore_errors=True)
+        for entry in self.slots_dir.iterdir():
+            try:
+                orphan = entry.name not in slots and now - entry.stat().st_mtime >= _ORPHAN_GRACE_SECONDS
+            except OSError:
+                continue
+            if orphan:
+                shutil.rmtree(entry, ignore_errors=True)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_shared_cache: Optional[ChromeCacheManager] = None
+_shared_cache_lock = threading.Lock()
+
+
+def shared_chrome_cache() -> Optional[ChromeCacheManager]:
+    """Cache do processo; None com chrome_cache_max_mb 0."""
+    global _shared_cache
+    if not settings.chrome_cache_max_mb:
+        return None
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = ChromeCacheManager(
+                Path(settings.chrome_cache_dir) if settings.chrome_cache_dir else settings.DATA_DIR / "chrome-cache",
+                settings.chrome_cache_max_mb * 1024 * 1024,
+                settings.chrome_cache_refresh_seconds,
+            )
+        return _shared_cache
@@ -0,0 +1,168 @@
+# src/automation/gms_session.py
+import json
+import logging
+import time
+from typing import Callable, Dict, Optional
+from urllib.parse import urlparse
+
+from selenium.webdriver.remote.webdriver import WebDriver
+
+from src.automation.page_objects.home_page import HomePage
+from src.automation.page_objects.login_page import LoginPage
+from src.core.credential_pool import CredentialLease
+from src.utils.circuit_breaker import CircuitBreaker
+from src.utils.exceptions import LoginError
+from src.utils.rate_limiter import ACTION_LOGIN, shared_rate_limiter
+from src.utils.session_store import shared_session_store
+
+logger = logging.getLogger(__name__)
+
+
+def wait_rate_limit(host: str, action: str) -> None:
+    """Espera a vez da ação no limite do host (sessões sem job dono, que não
+    têm cancelamento para observar — ver BotRunner._throttle)."""
+    limiter = shared_rate_limiter()
+    if limiter is None:
+        return
+    wait = limiter.reserve(host, action)
+    if wait > 0:
+        logger.info(f"🚦 Limite de '{action}' do GMS ({host}): aguardando {wait:.1f}s")
+        time.sleep(wait)
+
+
+def open_export_screen(
+    driver: WebDriver,
+    selectors: Dict,
+    login_url: str,
+    user: str,
+    password: str,
+    lease: Optional[CredentialLease] = None,
+    breaker: Optional[CircuitBreaker] = None,
+    throttle: Optional[Callable[[str, str], None]] = None,
+    interrupted: Optional[Callable[[], bool]] = None,
+    on_status: Optional[Callable[[str, int], None]] = None,
+) -> None:
+    """Login no GMS e navegação até a tela de exportação num Chrome já aberto.
+
+    Roteiro único do BotRunner, da sessão compartilhada do ExportPipeline e
+    do navegador pré-aquecido do BrowserPool: sessão salva, resultado da
+    página de login no circuit breaker do host, limite de login (throttle;
+    padrão: wait_rate_limit, sem cancelamento) e login pelo formulário
+    contado e julgado na conta do lease (quarentena por falha de login).
+    interrupted() True na falha (job cancelado) não conta contra o host.
+    """
+    host = urlparse(login_url).hostname
+    if throttle is None:
+        throttle = lambda action, stage: wait_rate_limit(host, action)
+    if on_status is None:
+        on_status = lambda message, progress: logger.info(message)
+
+    def record_host_failure():
+        if breaker is not None and not (interrupted is not None and interrupted()):
+            breaker.record_failure(host)
+
+    verification_selector = selectors.get('home_page', {}).get('sidebar_tax')
+    if not verification_selector:
+        raise ValueError("Seletor de verificação pós-login ('sidebar_tax') não encontrado em selectors.yaml")
+
+    # Sessão salva de um login anterior da conta (ver SessionStore): se
+    # ainda vale, a página abre logada e o formulário é pulado.
+    restored = inject_saved_session(driver, login_url, user)
+    login_page = LoginPage(driver, selectors.get('login_page', {}))
+    try:
+        logged_in = login_page.navigate_to_login_page(login_url, verification_selector if restored else None)
+    except Exception:
+        record_host_failure()
+        raise
+    # Formulário de login na tela: o host respondeu (fecha o circuito,
+    # mesmo que a credencial falhe em seguida).
+    if breaker is not None:
+        breaker.record_success(host)
+
+    if logged_in:
+        on_status(f"Sessão salva do GMS reaproveitada (login dispensado) ({user}@{host}).", 30)
+    else:
+        if restored:
+            discard_saved_session(login_url, user)
+        throttle(ACTION_LOGIN, "login")
+        if lease is not None:
+            lease.login_attempted()
+        try:
+            login_page.execute_login(user, password, verification_selector)
+        except LoginError:
+            if lease is not None:
+                lease.login_failed()
+            raise
+        except Exception:
+            record_host_failure()
+            raise
+        if lease is not None:
+            lease.login_succeeded()
+        save_session(driver, login_url, user)
+        on_status("Login realizado com sucesso!", 30)
+
+    on_status("Navegando na página inicial...", 40)
+    HomePage(driver, selectors.get('home_page', {})).navigate_sidebar_export()
+
+
+def _session_key(login_url: str):
+    return urlparse(login_url).hostname
+
+
+def inject_saved_session(driver: WebDriver, login_url: str, user: str) -> bool:
+    """Põe no Chrome recém-aberto, antes de qualquer navegação, a sessão
+    salva da conta (ver SessionStore). False se não há o que injetar."""
+    store = shared_session_store()
+    if store is None:
+        return False
+    state = store.load(_session_key(login_url), user)
+    if not state:
+        return False
+    try:
+        cookies = []
+        for cookie in state.get("cookies", []):
+            # get_cookies() do Selenium usa expiry; o CDP, expires.
+            param = {k: v for k, v in cookie.items() if k != "expiry"}
+            if "expiry" in cookie:
+                param["expires"] = cookie["expiry"]
+            cookies.append(param)
+        driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+        if state.get("local_storage"):
+            # localStorage só existe dentro da origem: o script roda em cada
+            # documento novo e só preenche o que a página ainda não tem.
+            source = (
+                "(function(){var o=%s,s=%s;if(location.origin!==o)return;"
+                "for(var k in s){if(localStorage.getItem(k)===null)localStorage.setItem(k,s[k]);}})();"
+                % (json.dumps(state["origin"]), json.dumps(state["local_storage"]))
+            )
+            driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": source})
+    except Exception as e:
+        logger.warning(f"🍪 Não foi possível injetar a sessão salva do GMS: {e}")
+        return False
+    logger.info(f"🍪 Sessão salva do GMS injetada ({user}@{_session_key(login_url)})")
+    return True
+
+
+def save_session(driver: WebDriver, login_url: str, user: str) -> None:
+    """Guarda cookies e localStorage depois de um login bem-sucedido."""
+    store = shared_session_store()
+    if store is None:
+        return
+    try:
+        state = {
+            "cookies": driver.get_cookies(),
+            "origin": driver.execute_script("return window.location.origin;"),
+            "local_storage": json.loads(
+                driver.execute_script("return JSON.stringify(Object.assign({}, window.localStorage));") or "{}"
+            ),
+        }
+        store.save(_session_key(login_url), user, state)
+    except Exception as e:
+        # Sem sessão salva o próximo Chrome só loga de novo.
+        logger.warning(f"🍪 Não foi possível salvar a sessão do GMS: {e}")
+
+
+def discard_saved_session(login_url: str, user: str) -> None:
+    store = shared_session_store()
+    if store is not None:
+        store.discard(_session_key(login_url), user)
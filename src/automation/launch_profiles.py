@@ -0,0 +1,59 @@
+# src/automation/launch_profiles.py
+import logging
+from typing import List
+
+from selenium.webdriver.chrome.options import Options as ChromeOptions
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DEFAULT = "default"
+PROFILE_LEAN = "lean"
+
+# Chrome com poucos processos e sem serviços em segundo plano. Cada job só
+# navega no GMS, então o que o perfil corta não é usado pela automação.
+_LEAN_ARGUMENTS = [
+    # Um renderer por site e no máximo dois no total; o legadoFrame deixa de
+    # ganhar processo próprio (site isolation desligado — só o GMS é aberto).
+    "--renderer-process-limit=2",
+    "--process-per-site",
+    "--disable-site-isolation-trials",
+    # Tráfego e processos em segundo plano (atualização de componentes,
+    # listas do Safe Browsing, sync, métricas, apps padrão).
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--safebrowsing-disable-auto-update",
+    "--disable-client-side-phishing-detection",
+    "--disable-sync",
+    "--metrics-recording-only",
+    "--disable-default-apps",
+    "--disable-extensions",
+    "--disable-breakpad",
+    "--no-first-run",
+    "--mute-audio",
+    "--disable-features=Translate,OptimizationHints,MediaRouter,BackForwardCache,"
+    "AutofillServerCommunication,InterestFeedContentSuggestions,CalculateNativeWinOcclusion",
+]
+
+
+def launch_profile_names() -> List[str]:
+    return [PROFILE_DEFAULT, PROFILE_LEAN]
+
+
+def apply_launch_profile(chrome_options: ChromeOptions, profile: str) -> None:
+    """Acrescenta ao ChromeOptions os argumentos do perfil de inicialização.
+
+    default mantém o Chrome como sempre foi; lean limita os renderers, corta
+    features e rede em segundo plano e limita o heap do V8 a
+    browser_js_heap_mb. Meça com `python main.py --benchmark-memory`.
+    """
+    if profile == PROFILE_DEFAULT:
+        return
+    if profile != PROFILE_LEAN:
+        logger.warning(f"Perfil de inicialização '{profile}' desconhecido; usando '{PROFILE_DEFAULT}'.")
+        return
+    for argument in _LEAN_ARGUMENTS:
+        chrome_options.add_argument(argument)
+    if settings.browser_js_heap_mb:
+        chrome_options.add_argument(f"--js-flags=--max-old-space-size={settings.browser_js_heap_mb}")
@@ -0,0 +1,184 @@
+# src/automation/memory_benchmark.py
+import logging
+import os
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from config import settings
+from src.automation.browser_handler import BrowserHandler
+from src.automation.resource_blocking import ResourceBlockingProfile
+from src.utils.process_utils import process_tree_pids
+
+logger = logging.getLogger(__name__)
+
+_SAMPLE_SECONDS = 0.5
+
+# Refresh periódico, como o polling da tabela de exports.
+_REFRESH_SECONDS = 5.0
+
+# Fração do limite do container reservada aos Chromes na sugestão de slots;
+# o resto fica para o worker Python, o SQLite e os picos de download.
+_CHROME_MEMORY_SHARE = 0.8
+
+# Página de teste local com o formato das telas do GMS: SPA que monta uma
+# tabela grande por JS e um iframe (o legadoFrame) com outra tabela.
+_TEST_PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>benchmark</title></head>
+<body>
+<div id="app"></div>
+<iframe id="legadoFrame" src="/frame" width="100%" height="400"></iframe>
+<script>
+var rows = [];
+for (var i = 0; i < 3000; i++) {
+  rows.push('<tr><td>' + i + '</td><td>Exportação ' + i + '</td><td>' +
+            new Date(Date.now() - i * 60000).toISOString() + '</td><td>Concluído</td></tr>');
+}
+document.getElementById('app').innerHTML = '<table>' + rows.join('') + '</table>';
+window.cache = [];
+for (var j = 0; j < 200; j++) { window.cache.push(new Array(5000).fill(j)); }
+</script>
+</body></html>
+"""
+
+_TEST_FRAME = """<!doctype html>
+<html><body><table>%s</table></body></html>
+""" % "".join(f"<tr><td>{i}</td><td>NF-e {i:08d}</td><td>XML</td></tr>" for i in range(2000))
+
+
+class _TestPageHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = (_TEST_FRAME if self.path.startswith("/frame") else _TEST_PAGE).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _memory_kb(pid: int) -> Tuple[int, int]:
+    """(RSS, PSS) do processo em kB. PSS divide as páginas compartilhadas
+    entre os processos do Chrome; somar RSS conta o binário várias vezes."""
+    rss = pss = 0
+    try:
+        for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines():
+            if line.startswith("Rss:"):
+                rss = int(line.split()[1])
+            elif line.startswith("Pss:"):
+                pss = int(line.split()[1])
+        return rss, pss
+    except (OSError, ValueError):
+        pass
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                rss = int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return rss, rss
+
+
+def _tree_memory_mb(root: int) -> Dict:
+    rss = pss = 0
+    tree = process_tree_pids(root)
+    for pid in tree:
+        pid_rss, pid_pss = _memory_kb(pid)
+        rss += pid_rss
+        pss += pid_pss
+    return {"rss_mb": rss / 1024, "pss_mb": pss / 1024, "processes": len(tree)}
+
+
+def _container_memory_limit_mb() -> Optional[float]:
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            value = Path(path).read_text().strip()
+        except OSError:
+            continue
+        # cgroup v1 sem limite reporta um número gigante.
+        if value.isdigit() and int(value) < 1 << 60:
+            return int(value) / 1024 / 1024
+    return None
+
+
+def _measure_profile(profile: str, url: str, seconds: float, headless: bool) -> Dict:
+    download_dir = settings.PENDING_DIR / "benchmark"
+    download_dir.mkdir(parents=True, exist_ok=True)
+    # Sem bloqueio de recursos: a página de teste é local e o que se compara
+    # aqui é só o perfil de inicialização.
+    handler = BrowserHandler(
+        headless=headless, download_dir=download_dir,
+        resource_blocking=ResourceBlockingProfile(), launch_profile=profile,
+    )
+    if not handler.start_browser():
+        raise ConnectionError("Driver do navegador não foi inicializado.")
+    try:
+        root = handler.driver.service.process.pid
+        handler.driver.get(url)
+        samples = []
+        started = last_refresh = time.monotonic()
+        # Pelo menos uma amostra, mesmo com seconds menor que o intervalo.
+        while True:
+            if time.monotonic() - last_refresh >= _REFRESH_SECONDS:
+                handler.driver.refresh()
+                last_refresh = time.monotonic()
+            samples.append(_tree_memory_mb(root))
+            if time.monotonic() - started >= seconds:
+                break
+            time.sleep(_SAMPLE_SECONDS)
+    finally:
+        handler.close_browser()
+
+    # Regime = mediana da segunda metade, depois do pico de carga inicial.
+    steady = samples[len(samples) // 2:] or samples
+    return {
+        "peak_rss_mb": round(max(s["rss_mb"] for s in samples), 1),
+        "peak_pss_mb": round(max(s["pss_mb"] for s in samples), 1),
+        "steady_rss_mb": round(statistics.median(s["rss_mb"] for s in steady), 1),
+        "steady_pss_mb": round(statistics.median(s["pss_mb"] for s in steady), 1),
+        "max_processes": max(s["processes"] for s in samples),
+        "samples": len(samples),
+    }
+
+
+def run_memory_benchmark(profiles: List[str], seconds: float = 30.0, headless: bool = True) -> Dict:
+    """RSS e PSS da árvore de processos (chromedriver + Chrome + renderers)
+    de um job, por perfil de inicialização, contra uma página de teste local
+    com refresh periódico como o polling de exports.
+
+    Pico = maior amostra; regime = mediana da segunda metade. Com limite de
+    memória do container (cgroup), sugere worker_slots pelo pico de PSS —
+    a soma de PSS de vários Chromes aproxima o uso real; a de RSS superestima.
+    Só Linux (/proc).
+    """
+    if not Path("/proc/self/stat").exists():
+        raise RuntimeError("Benchmark de memória precisa de /proc (Linux/container).")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _TestPageHandler)
+    threading.Thread(target=server.serve_forever, name="memory-benchmark-http", daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    limit_mb = _container_memory_limit_mb()
+    results = {}
+    try:
+        for profile in profiles:
+            logger.info(f"🧠 Benchmark de memória do perfil '{profile}' ({seconds:.0f}s)")
+            result = _measure_profile(profile, url, seconds, headless)
+            if limit_mb:
+                result["suggested_worker_slots"] = max(1, int(limit_mb * _CHROME_MEMORY_SHARE // result["peak_pss_mb"]))
+            results[profile] = result
+    finally:
+        server.shutdown()
+        server.server_close()
+    return {
+        "seconds": seconds,
+        "headless": headless,
+        "js_heap_mb": settings.browser_js_heap_mb,
+        "container_memory_limit_mb": round(limit_mb) if limit_mb else None,
+        "cpu_count": os.cpu_count(),
+        "profiles": results,
+    }
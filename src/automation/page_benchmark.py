@@ -0,0 +1,156 @@
+# src/automation/page_benchmark.py
+import json
+import logging
+import statistics
+import time
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+from selenium.webdriver.support.ui import WebDriverWait
+
+from config import settings
+from src.automation.browser_handler import BrowserHandler
+from src.automation.gms_session import open_export_screen, wait_rate_limit
+from src.automation.resource_blocking import ResourceBlockingProfile
+from src.utils.rate_limiter import ACTION_REFRESH
+
+logger = logging.getLogger(__name__)
+
+_READY_TIMEOUT_SECONDS = 60
+
+# O SPA do GMS continua buscando dados depois do load; espera um pouco antes
+# de somar os bytes (fora do tempo medido).
+_SETTLE_SECONDS = 2.0
+
+_NAVIGATION_LOAD_JS = (
+    "var n = performance.getEntriesByType('navigation')[0];"
+    "return n ? n.loadEventEnd - n.startTime : null;"
+)
+
+
+def _network_totals(perf_logs: List[Dict]) -> Dict:
+    """Requisições, bytes recebidos (encodedDataLength, o que veio pela rede)
+    e requisições barradas pelo bloqueio, a partir dos performance logs."""
+    totals = {"requests": 0, "bytes": 0, "blocked": 0}
+    for entry in perf_logs:
+        try:
+            message = json.loads(entry.get('message', '{}')).get('message', {})
+        except ValueError:
+            continue
+        method = message.get('method')
+        params = message.get('params', {})
+        if method == "Network.requestWillBeSent":
+            totals["requests"] += 1
+        elif method == "Network.loadingFinished":
+            totals["bytes"] += int(params.get('encodedDataLength') or 0)
+        elif method == "Network.loadingFailed" and params.get('blockedReason'):
+            totals["blocked"] += 1
+    return totals
+
+
+def _measure(handler: BrowserHandler, action: Callable[[], None]) -> Dict:
+    driver = handler.driver
+    handler.get_performance_logs()  # descarta os eventos anteriores
+    started = time.monotonic()
+    action()
+    WebDriverWait(driver, _READY_TIMEOUT_SECONDS).until(
+        lambda d: d.execute_script("return document.readyState") == "complete"
+    )
+    wall_ms = (time.monotonic() - started) * 1000
+    load_ms = driver.execute_script(_NAVIGATION_LOAD_JS)
+    time.sleep(_SETTLE_SECONDS)
+    sample = {"wall_ms": round(wall_ms), "load_ms": round(load_ms) if load_ms else None}
+    sample.update(_network_totals(handler.get_performance_logs()))
+    return sample
+
+
+def _median(samples: List[Dict]) -> Optional[Dict]:
+    if not samples:
+        return None
+    summary = {}
+    for field in ("wall_ms", "load_ms", "requests", "bytes", "blocked"):
+        values = [s[field] for s in samples if s.get(field) is not None]
+        summary[field] = round(statistics.median(values)) if values else None
+    summary["samples"] = len(samples)
+    return summary
+
+
+def _start(profile: ResourceBlockingProfile, headless: bool) -> BrowserHandler:
+    download_dir = settings.PENDING_DIR / "benchmark"
+    download_dir.mkdir(parents=True, exist_ok=True)
+    handler = BrowserHandler(headless=headless, download_dir=download_dir, resource_blocking=profile)
+    if not handler.start_browser():
+        raise ConnectionError("Driver do navegador não foi inicializado.")
+    return handler
+
+
+def _savings(without: Optional[Dict], with_: Optional[Dict]) -> Dict:
+    savings = {}
+    if not without or not with_:
+        return savings
+    for field in ("wall_ms", "load_ms", "bytes"):
+        if without.get(field) and with_.get(field) is not None:
+            savings[f"{field}_pct"] = round(100 * (without[field] - with_[field]) / without[field], 1)
+    return savings
+
+
+def run_resource_benchmark(params: Dict, selectors: Dict, runs: int = 3) -> Dict:
+    """Tempo de carga e bytes transferidos das páginas do GMS sem e com o
+    perfil de bloqueio (ResourceBlockingProfile das settings, mesmo com
+    browser_block_resources desligado).
+
+    Fase "login": a página de login num Chrome novo a cada rodada (cache
+    frio, como um job que abre o próprio navegador). Fase "export_refresh":
+    com credenciais, um login por perfil e `runs` driver.refresh() na tela de
+    exportação (o custo do polling da tabela), respeitando o limite de
+    refreshes do host.
+    """
+    login_url = params.get('gms_login_url')
+    if not login_url:
+        raise ValueError("Parâmetro obrigatório 'gms_login_url' não fornecido.")
+    headless = params.get('headless', settings.headless)
+    user = params.get('gms_user') or settings.gms_username
+    password = params.get('gms_password') or settings.gms_password
+    host = urlparse(login_url).hostname
+
+    profiles = {
+        "sem_bloqueio": ResourceBlockingProfile(),
+        "com_bloqueio": ResourceBlockingProfile.from_settings(force=True),
+    }
+    phases: Dict[str, Dict] = {"login": {}, "export_refresh": {}}
+    for name, profile in profiles.items():
+        logger.info(f"⏱️ Benchmark '{name}' ({profile.describe()}): {runs} rodada(s) em {host}")
+        samples = []
+        for _ in range(runs):
+            handler = _start(profile, headless)
+            try:
+                samples.append(_measure(handler, lambda: handler.driver.get(login_url)))
+            finally:
+                handler.close_browser()
+        phases["login"][name] = _median(samples)
+
+        if not (user and password):
+            continue
+        handler = _start(profile, headless)
+        try:
+            open_export_screen(handler.driver, selectors, login_url, user, password)
+            samples = []
+            for _ in range(runs):
+                wait_rate_limit(host, ACTION_REFRESH)
+                samples.append(_measure(handler, handler.driver.refresh))
+            phases["export_refresh"][name] = _median(samples)
+        finally:
+            handler.close_browser()
+
+    if not (user and password):
+        logger.warning("⏱️ Sem credenciais do GMS: fase export_refresh do benchmark pulada.")
+        del phases["export_refresh"]
+    for phase in phases.values():
+        phase["economia"] = _savings(phase.get("sem_bloqueio"), phase.get("com_bloqueio"))
+    return {
+        "host": host,
+        "runs": runs,
+        "profile": profiles["com_bloqueio"].describe(),
+        "blocked_urls": profiles["com_bloqueio"].blocked_urls(),
+        "phases": phases,
+    }
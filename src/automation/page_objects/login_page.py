@@ -1,42 +1,58 @@
-import logging
-from urllib.parse import urlparse
-from selenium.webdriver.remote.webdriver import WebDriver
-from .base_page import BasePage
-from src.utils.exceptions import LoginError
-from selenium.common.exceptions import TimeoutException
-
-logger = logging.getLogger(__name__)
-
-class LoginPage(BasePage):
-    def __init__(self, driver: WebDriver, selectors: dict):
-        super().__init__(driver)
-        self.selectors = selectors
-
-    def navigate_to_login_page(self, login_url):
-        try:
-            domain = urlparse(login_url).netloc
-            logger.info(f"Navegando para a página de login em: {domain}")
-        except Exception:
-            logger.info("Navegando para a página de login...")
-        self.driver.get(login_url)
-
-    def execute_login(self, username, password, verification_selector: str):
-        try:
-            logger.info("Preenchendo credenciais de login.")
-            self.send_keys(self.selectors['username_input'], username)
-            self.send_keys(self.selectors['password_input'], password)
-            self.click(self.selectors['login_button'])
-
-            logger.info("Verificando se o login foi bem-sucedido...")
-            self.wait_for_element(verification_selector)
-            logger.info("Verificação pós-login bem-sucedida. Dashboard carregado.")
-
-        except TimeoutException:
-            logger.error("Falha na verificação pós-login. O elemento esperado não apareceu. Verifique as credenciais ou a estabilidade do site.")
-            raise LoginError("O login falhou. A página principal não foi carregada após a tentativa de login.")
-        except KeyError as e:
-            logger.error(f"Seletor não encontrado no dicionário para a página de login: {e}")
-            raise
-        except Exception as e:
-            logger.error(f"Ocorreu um erro durante a execução do login: {e}")
+import logging
+from typing import Optional
+from urllib.parse import urlparse
+from selenium.webdriver.remote.webdriver import WebDriver
+from selenium.webdriver.support import expected_conditions as EC
+from .base_page import BasePage
+from src.utils.exceptions import GmsUnavailableError, LoginError
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+logger = logging.getLogger(__name__)
+
+class LoginPage(BasePage):
+    def __init__(self, driver: WebDriver, selectors: dict):
+        super().__init__(driver)
+        self.selectors = selectors
+
+    def navigate_to_login_page(self, login_url, logged_in_selector: Optional[str] = None) -> bool:
+        """Abre a página de login. Com logged_in_selector (sessão restaurada),
+        aceita a página já logada no lugar do formulário e retorna True."""
+        try:
+            domain = urlparse(login_url).netloc
+            logger.info(f"Navegando para a página de login em: {domain}")
+        except Exception:
+            logger.info("Navegando para a página de login...")
+        # Página que não abre ou não mostra o formulário é o GMS fora do ar,
+        # não credencial errada: GmsUnavailableError (conta no circuit breaker
+        # do host e, por ser ConnectionError, volta pela fila de retry), não
+        # LoginError.
+        targets = [self.selectors['username_input']] + ([logged_in_selector] if logged_in_selector else [])
+        try:
+            self.driver.get(login_url)
+            self.wait.until(EC.any_of(
+                *(EC.presence_of_element_located((self._get_by(target), target)) for target in targets)
+            ))
+        except WebDriverException as e:
+            raise GmsUnavailableError(f"A página de login do GMS não carregou: {e}")
+        return bool(logged_in_selector) and bool(self._find_elements(logged_in_selector))
+
+    def execute_login(self, username, password, verification_selector: str):
+        try:
+            logger.info("Preenchendo credenciais de login.")
+            self.send_keys(self.selectors['username_input'], username)
+            self.send_keys(self.selectors['password_input'], password)
+            self.click(self.selectors['login_button'])
+
+            logger.info("Verificando se o login foi bem-sucedido...")
+            self.wait_for_element(verification_selector)
+            logger.info("Verificação pós-login bem-sucedida. Dashboard carregado.")
+
+        except TimeoutException:
+            logger.error("Falha na verificação pós-login. O elemento esperado não apareceu. Verifique as credenciais ou a estabilidade do site.")
+            raise LoginError("O login falhou. A página principal não foi carregada após a tentativa de login.")
+        except KeyError as e:
+            logger.error(f"Seletor não encontrado no dicionário para a página de login: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Ocorreu um erro durante a execução do login: {e}")
             raise
\ No newline at end of file
@@ -0,0 +1,89 @@
+# src/automation/resource_blocking.py
+import logging
+from typing import Dict, Iterable, List
+
+from selenium.webdriver.remote.webdriver import WebDriver
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Network.setBlockedURLs só recebe padrões de URL (curinga "*"); bloquear por
+# tipo de recurso pelo CDP exigiria o domínio Fetch pausando cada requisição,
+# o que o execute_cdp_cmd do Selenium não consegue responder. Os tipos viram
+# padrões pelas extensões que o GMS serve.
+RESOURCE_TYPE_PATTERNS: Dict[str, List[str]] = {
+    "Image": ["*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.svg*", "*.webp*", "*.ico*", "*.bmp*"],
+    "Font": ["*.woff*", "*.ttf*", "*.otf*", "*.eot*"],
+    "Media": ["*.mp4*", "*.webm*", "*.ogg*", "*.mp3*", "*.wav*"],
+    "Stylesheet": ["*.css*"],
+}
+
+
+class ResourceBlockingProfile:
+    """O que o Chrome deixa de baixar nas páginas do GMS.
+
+    O SPA do GMS carrega imagens, fontes, scripts de analytics e CSS a cada
+    login e a cada driver.refresh() do polling da tabela de exports, e nada
+    disso é usado pela automação. O perfil bloqueia padrões de URL e tipos de
+    recurso via CDP (Network.setBlockedURLs) e, opcionalmente, desliga as
+    imagens pela preferência de conteúdo do Chrome.
+
+    Stylesheet fica fora do padrão: sem CSS elementos escondidos do GMS
+    aparecem e os waits de visibilidade/clicável mudam de comportamento.
+    """
+
+    def __init__(self, url_patterns: Iterable[str] = (), resource_types: Iterable[str] = (), disable_images: bool = False):
+        self.url_patterns = [p for p in url_patterns if p]
+        self.resource_types = []
+        for resource_type in resource_types:
+            if resource_type in RESOURCE_TYPE_PATTERNS:
+                self.resource_types.append(resource_type)
+            else:
+                logger.warning(
+                    f"🚫 Tipo de recurso '{resource_type}' desconhecido no bloqueio; "
+                    f"válidos: {', '.join(RESOURCE_TYPE_PATTERNS)}"
+                )
+        self.disable_images = disable_images
+
+    @classmethod
+    def from_settings(cls, force: bool = False) -> "ResourceBlockingProfile":
+        """Perfil configurado; vazio com browser_block_resources desligado
+        (force=True ignora a chave, para o benchmark comparar)."""
+        if not settings.browser_block_resources and not force:
+            return cls()
+        return cls(
+            settings.browser_blocked_url_patterns,
+            settings.browser_blocked_resource_types,
+            settings.browser_disable_images,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.blocked_urls()) or self.disable_images
+
+    def blocked_urls(self) -> List[str]:
+        patterns = list(self.url_patterns)
+        for resource_type in self.resource_types:
+            patterns.extend(RESOURCE_TYPE_PATTERNS[resource_type])
+        return list(dict.fromkeys(patterns))
+
+    def chrome_prefs(self) -> Dict:
+        # 2 = bloquear; vale também para imagens sem extensão na URL.
+        return {"profile.managed_default_content_settings.images": 2} if self.disable_images else {}
+
+    def apply(self, driver: WebDriver) -> None:
+        """Instala o bloqueio no Chrome já aberto (Network habilitado)."""
+        patterns = self.blocked_urls()
+        if patterns:
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+
+    def describe(self) -> str:
+        parts = []
+        if self.resource_types:
+            parts.append(f"tipos {', '.join(self.resource_types)}")
+        if self.url_patterns:
+            parts.append(f"{len(self.url_patterns)} padrão(ões) de URL")
+        if self.disable_images:
+            parts.append("imagens desligadas")
+        return "; ".join(parts) or "nenhum bloqueio"
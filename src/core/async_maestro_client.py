@@ -0,0 +1,82 @@
+# src/core/async_maestro_client.py
+import asyncio
+import gzip
+import time
+from typing import Dict, Optional
+
+import httpx
+
+from src.core.maestro_client import _CONNECT_TIMEOUT, MaestroClientBase
+
+
+class AsyncMaestroClient(MaestroClientBase):
+    """Versão assíncrona do MaestroClient, para o núcleo asyncio do worker.
+
+    Mesmo contrato (timeouts por endpoint, gzip com fallback, retry com
+    jitter só em GET, latency_snapshot), sobre um httpx.AsyncClient com pool
+    keep-alive. Todas as chamadas rodam no event loop do worker; só o
+    latency_snapshot pode ser lido de outra thread.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str = "",
+        pool_size: int = 10,
+        gzip_min_bytes: int = 64 * 1024,
+        get_retries: int = 2,
+        retry_backoff: float = 0.5,
+        timeouts: Optional[Dict[str, float]] = None,
+    ):
+        super().__init__(base_url, api_key, gzip_min_bytes, get_retries, retry_backoff, timeouts)
+        self.client = httpx.AsyncClient(
+            headers=self._headers(),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+
+    def _timeout(self, name: str) -> httpx.Timeout:
+        return httpx.Timeout(self._read_timeout(name), connect=_CONNECT_TIMEOUT)
+
+    async def _send(self, method: str, endpoint: str, name: str, **kwargs) -> httpx.Response:
+        start = time.monotonic()
+        try:
+            response = await self.client.request(method, self.url(endpoint), timeout=self._timeout(name), **kwargs)
+        except httpx.HTTPError:
+            self._record(name, time.monotonic() - start, error=True)
+            raise
+        self._record(name, time.monotonic() - start, error=response.status_code >= 400)
+        return response
+
+    async def get(self, endpoint: str, name: str) -> httpx.Response:
+        """GET com retry (rede, timeout, 502/503/504) e jitter entre tentativas."""
+        attempt = 0
+        while True:
+            try:
+                response = await self._send("GET", endpoint, name)
+                if not self._should_retry(response.status_code, attempt):
+                    return response
+            except httpx.TransportError:
+                if attempt >= self.get_retries:
+                    raise
+            await asyncio.sleep(self._retry_delay(attempt))
+            attempt += 1
+
+    async def post(self, endpoint: str, name: str, payload: Optional[Dict] = None) -> httpx.Response:
+        """POST sem retry (não idempotente do ponto de vista do maestro)."""
+        if payload is None:
+            return await self._send("POST", endpoint, name)
+
+        body = self._encode_payload(payload)
+        if self._should_gzip(body):
+            response = await self._send(
+                "POST", endpoint, name,
+                content=gzip.compress(body),
+                headers={"Content-Encoding": "gzip"},
+            )
+            if not self._gzip_rejected(name, response.status_code, response.text):
+                return response
+
+        return await self._send("POST", endpoint, name, content=body)
+
+    async def close(self) -> None:
+        await self.client.aclose()
@@ -0,0 +1,637 @@
+# src/core/async_worker.py
+import asyncio
+import logging
+import signal
+import threading
+import time
+from functools import partial
+from typing import Callable, Dict, List, Optional, Set
+
+import aio_pika
+import httpx
+from aio_pika.abc import AbstractIncomingMessage
+
+from config import settings
+from src.core.async_maestro_client import AsyncMaestroClient
+from src.core.capacity import CapacityServer
+from src.core.job_cost import SIZE_LARGE, SIZE_SMALL
+from src.core.job_lifecycle import (
+    JobDelivery,
+    JobLifecycle,
+    Settlement,
+    outbox_resolved,
+    read_cancellation,
+    read_terminal_status,
+)
+from src.core.job_messages import cancel_routing_key, parse_cancel_message
+from src.core.job_process import JobProcessSupervisor
+from src.core.job_scheduler import size_class_queue
+from src.utils.log_shipper import AsyncLogShipper
+from src.utils.outbox import AsyncOutboxDispatcher, OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+# Mesmos valores do núcleo pika (worker.py): a cadência do polling de
+# cancelamento é também o heartbeat do job para o retry worker do maestro.
+# Com a exchange de controle ativa, vale settings.cancellation_heartbeat_seconds.
+_CANCELLATION_POLL_INTERVAL = 15.0
+_LOG_FLUSH_TIMEOUT = 30.0
+
+_DISPATCH_INTERVAL = 2.0
+_SUSPEND_TIMEOUT = 60.0
+
+_CONNECT_RETRIES = 5
+_CONNECT_RETRY_DELAY = 5.0
+
+# Erros de ack/nack com canal/conexão já fechados: o job já foi reportado ao
+# maestro e a reentrega cai no idempotency check.
+_ACK_ERRORS = (
+    aio_pika.exceptions.AMQPError,
+    aio_pika.exceptions.ChannelInvalidStateError,
+    ConnectionError,
+)
+
+
+def _run_in_thread(loop: asyncio.AbstractEventLoop, fn: Callable, name: str) -> asyncio.Future:
+    """Roda fn numa thread daemon e devolve um future do event loop.
+
+    WHY não loop.run_in_executor: as threads do ThreadPoolExecutor são
+    joinadas na saída do interpretador, então um SIGTERM esperaria o export
+    de 1h+ do GMS terminar. No núcleo pika os slots são threads daemon e o
+    processo sai na hora (a mensagem sem ack volta pra fila); aqui vale o
+    mesmo.
+    """
+    future = loop.create_future()
+
+    def _set(setter, value):
+        if not future.done():
+            setter(value)
+
+    def _target():
+        try:
+            result = fn()
+        except BaseException as e:
+            setter, value = future.set_exception, e
+        else:
+            setter, value = future.set_result, result
+        try:
+            loop.call_soon_threadsafe(_set, setter, value)
+        except RuntimeError:
+            # Loop já encerrado (worker saiu no meio do job): ninguém espera.
+            pass
+
+    threading.Thread(target=_target, name=name, daemon=True).start()
+    return future
+
+
+class AsyncRabbitMQWorker:
+    """Núcleo asyncio do worker (WORKER_CORE=asyncio).
+
+    Uma conexão aio-pika (heartbeat tratado pela própria lib, sem bombear
+    process_data_events) e um event loop onde rodam o consumo, os acks, o
+    polling de cancelamento de cada job, o envio de logs e os callbacks do
+    maestro. Só o trabalho bloqueante — BotRunner/Selenium ou o
+    JobProcessSupervisor — sai do loop, uma thread por job.
+
+    Contrato com o maestro e com a fila idêntico ao RabbitMQWorker
+    (worker.py): os dois chamam o mesmo JobLifecycle e só aplicam o
+    Settlement de cada mensagem com aio-pika.
+    """
+
+    def __init__(self):
+        self.queue_name = settings.rabbitmq_queue
+        self.maestro_url = settings.maestro_api_url
+        self.worker_slots = settings.worker_slots
+
+        self.maestro = AsyncMaestroClient(
+            self.maestro_url,
+            api_key=settings.maestro_worker_api_key,
+            pool_size=settings.worker_slots * 2 + 2,
+            gzip_min_bytes=settings.maestro_gzip_min_bytes,
+        )
+        self.connection: Optional[aio_pika.abc.AbstractRobustConnection] = None
+        self.channel: Optional[aio_pika.abc.AbstractChannel] = None
+        self._free_slots: Optional["asyncio.Queue[int]"] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._jobs: Set[asyncio.Task] = set()
+        self._stop_event: Optional[asyncio.Event] = None
+        # Ver RabbitMQWorker.__init__ (drain).
+        self._draining = False
+        self._consumers: List = []
+
+        # Ver RabbitMQWorker.__init__ (JobLifecycle). A fila de slots só
+        # existe dentro do run(); antes disso o worker não tem slot livre.
+        self.lifecycle = JobLifecycle(
+            self.queue_name,
+            self.worker_slots,
+            report_log=self.report_log,
+            free_slots=lambda: self._free_slots.qsize() if self._free_slots is not None else 0,
+            draining=lambda: self._draining,
+            borrow_slot=self._borrow_slot,
+            return_slot=self._return_slot,
+        )
+        self.outbox = self.lifecycle.outbox
+        self.capacity = self.lifecycle.capacity
+        self.cost_scheduling = self.lifecycle.cost_scheduling
+        self.scheduler = self.lifecycle.scheduler
+        self.retry_policy = self.lifecycle.retry_policy
+        self.window_policy = self.lifecycle.window_policy
+        self._suspend_event = self.lifecycle.suspend_event
+        self._class_queues: Dict[str, aio_pika.abc.AbstractQueue] = {}
+        self._dispatch_wakeup: Optional[asyncio.Event] = None
+
+        # Mesmo outbox em disco do núcleo pika, despachado por uma task do loop.
+        self.outbox_dispatcher = AsyncOutboxDispatcher(self.outbox, self._deliver_outbox_event)
+        self._bulk_logs_enabled = True
+
+        self.capacity_server = (
+            CapacityServer(self.capacity, settings.capacity_http_host, settings.capacity_http_port)
+            if settings.capacity_http_port else None
+        )
+
+        self.log_shipper = AsyncLogShipper(
+            send_batch=self._enqueue_logs,
+            max_queue=settings.log_shipper_max_queue,
+            batch_size=settings.log_shipper_batch_size,
+        )
+
+        self._control_exchange: Optional[aio_pika.abc.AbstractExchange] = None
+        self._control_queue: Optional[aio_pika.abc.AbstractQueue] = None
+        self._cancel_events: Dict[str, threading.Event] = {}
+
+    async def connect(self) -> aio_pika.abc.AbstractQueue:
+        for attempt in range(_CONNECT_RETRIES):
+            try:
+                logger.info(f"Conectando ao RabbitMQ em {settings.rabbitmq_host}:{settings.rabbitmq_port}...")
+                self.connection = await aio_pika.connect_robust(
+                    host=settings.rabbitmq_host,
+                    port=settings.rabbitmq_port,
+                    login=settings.rabbitmq_user,
+                    password=settings.rabbitmq_password,
+                    heartbeat=600,
+                )
+                self.channel = await self.connection.channel()
+                await self.channel.set_qos(prefetch_count=self.worker_slots)
+                queue = await self.channel.declare_queue(
+                    self.queue_name,
+                    durable=True,
+                    arguments={"x-dead-letter-exchange": "maestro.dlx"},
+                )
+                for delay in self.retry_policy.delays():
+                    await self.channel.declare_queue(
+                        self.retry_policy.retry_queue(delay),
+                        durable=True,
+                        arguments=self.retry_policy.queue_arguments(delay),
+                    )
+                for delay in self.window_policy.delays():
+                    await self.channel.declare_queue(
+                        self.window_policy.delay_queue(delay),
+                        durable=True,
+                        arguments=self.window_policy.queue_arguments(delay),
+                    )
+                await self._setup_control_queue()
+                if self.cost_scheduling:
+                    # Canal do aio-pika já vem com publisher confirms: o publish
+                    # do roteador só retorna depois da confirmação do broker.
+                    for size_class in (SIZE_SMALL, SIZE_LARGE):
+                        self._class_queues[size_class] = await self.channel.declare_queue(
+                            size_class_queue(self.queue_name, size_class),
+                            durable=True,
+                            arguments={"x-dead-letter-exchange": "maestro.dlx"},
+                        )
+                logger.info(f"✅ Conectado ao RabbitMQ. Aguardando mensagens na fila '{self.queue_name}'...")
+                return queue
+            except Exception as e:
+                logger.error(f"Falha ao conectar (tentativa {attempt + 1}/{_CONNECT_RETRIES}): {e}")
+                if attempt < _CONNECT_RETRIES - 1:
+                    logger.info(f"Aguardando {_CONNECT_RETRY_DELAY:.0f}s antes de tentar novamente...")
+                    await asyncio.sleep(_CONNECT_RETRY_DELAY)
+                else:
+                    raise
+
+    async def _setup_control_queue(self) -> None:
+        """Ver RabbitMQWorker._setup_control_queue."""
+        self._control_exchange = None
+        self._control_queue = None
+        if not settings.rabbitmq_control_exchange:
+            return
+        try:
+            exchange = await self.channel.declare_exchange(
+                settings.rabbitmq_control_exchange,
+                aio_pika.ExchangeType.TOPIC,
+                durable=True,
+            )
+            queue = await self.channel.declare_queue(exclusive=True, auto_delete=True)
+            await queue.consume(self._on_control_message, no_ack=True)
+            self._control_exchange, self._control_queue = exchange, queue
+            logger.info(f"📡 Cancelamento por push ativo (exchange '{settings.rabbitmq_control_exchange}')")
+        except Exception as e:
+            logger.warning(f"⚠️ Não foi possível assinar a exchange de controle: {e}. Usando só polling.")
+
+    async def _on_control_message(self, message: AbstractIncomingMessage) -> None:
+        job_id = parse_cancel_message(message.routing_key, message.body)
+        if job_id is None:
+            logger.debug(f"Mensagem de controle ignorada (routing key {message.routing_key})")
+            return
+        if job_id not in self._cancel_events:
+            logger.debug(f"Cancelamento para job {job_id}, que não roda neste worker")
+            return
+        self._trigger_cancel(job_id, "push")
+
+    def _trigger_cancel(self, job_id: str, source: str) -> None:
+        cancel_event = self._cancel_events.get(job_id)
+        if cancel_event is None or cancel_event.is_set():
+            return
+        logger.info(f"🛑 Cancelamento detectado para job {job_id} (via {source})")
+        cancel_event.set()
+        self.lifecycle.notify_cancel(job_id)
+
+    async def _bind_cancel(self, job_id: str, bind: bool) -> None:
+        if self._control_queue is None:
+            return
+        try:
+            if bind:
+                await self._control_queue.bind(self._control_exchange, cancel_routing_key(job_id))
+            else:
+                await self._control_queue.unbind(self._control_exchange, cancel_routing_key(job_id))
+        except Exception as e:
+            logger.warning(f"⚠️ Falha ao {'assinar' if bind else 'remover'} cancelamento do job {job_id}: {e}")
+
+    def _cancellation_poll_interval(self) -> float:
+        if self._control_queue is not None:
+            return settings.cancellation_heartbeat_seconds
+        return _CANCELLATION_POLL_INTERVAL
+
+    async def _safe_ack(self, message: AbstractIncomingMessage, requeue: Optional[bool] = None) -> None:
+        """Ack (requeue None) ou nack tolerante a canal/conexão fechados."""
+        try:
+            if requeue is None:
+                await message.ack()
+            else:
+                await message.nack(requeue=requeue)
+        except _ACK_ERRORS as e:
+            logger.warning(
+                f"⚠️ Canal RabbitMQ fechado antes do {'ack' if requeue is None else 'nack'} — "
+                f"job já foi reportado ao maestro; reentrega cairá no idempotency check. {e}"
+            )
+
+    async def _republish(self, message: AbstractIncomingMessage, routing_key: str, headers: Dict, what: str) -> None:
+        """Ver RabbitMQWorker._republish."""
+        copy = aio_pika.Message(
+            message.body,
+            headers={**(message.headers or {}), **headers},
+            content_type=message.content_type,
+            message_id=message.message_id,
+            delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+        )
+        try:
+            await self.channel.default_exchange.publish(copy, routing_key=routing_key)
+        except Exception as e:
+            logger.error(f"❌ Falha ao publicar em '{routing_key}' ({what}): {e}. Devolvendo à fila.")
+            await self._safe_ack(message, requeue=True)
+            return
+        await self._safe_ack(message)
+
+    async def check_job_terminal(self, job_id: str) -> Optional[Dict]:
+        """Ver RabbitMQWorker.check_job_terminal."""
+        try:
+            response = await self.maestro.get(f"/api/v1/worker/jobs/{job_id}/status", name="status")
+        except httpx.HTTPError as e:
+            logger.warning(f"check_job_terminal: erro de rede consultando status do job {job_id}: {e}")
+            return None
+        return read_terminal_status(job_id, response)
+
+    async def check_cancellation(self, job_id: str) -> bool:
+        """Ver RabbitMQWorker.check_cancellation (também é o heartbeat do job)."""
+        response = await self.maestro.get(f"/api/v1/worker/jobs/{job_id}/cancellation", name="cancellation")
+        return read_cancellation(job_id, response)
+
+    def report_log(self, job_id: str, level: str, message: str) -> bool:
+        """Thread-safe: chamado tanto do loop quanto da thread do BotRunner."""
+        logger.debug(f"📝 Enfileirando log [{level}]: {message}")
+        return self.log_shipper.submit(job_id, level, message)
+
+    async def _enqueue_logs(self, job_id: str, entries: List[Dict]) -> bool:
+        return self.lifecycle.enqueue_logs(job_id, entries)
+
+    async def _deliver_logs(self, event: OutboxEvent) -> bool:
+        if self._bulk_logs_enabled:
+            response = await self.maestro.post(f"/api/v1/worker/jobs/{event.job_id}/logs", name="logs", payload=event.payload)
+            if response.status_code not in (404, 405):
+                return outbox_resolved(event, response)
+            self._bulk_logs_enabled = False
+            logger.warning("⚠️ Endpoint bulk de logs indisponível no maestro. Usando envio linha a linha.")
+
+        for entry in event.payload["logs"]:
+            response = await self.maestro.post(
+                f"/api/v1/worker/jobs/{event.job_id}/log",
+                name="log",
+                payload={"level": entry["level"], "message": entry["message"]},
+            )
+            if not outbox_resolved(event, response):
+                return False
+        return True
+
+    async def _deliver_outbox_event(self, event: OutboxEvent) -> bool:
+        """Ver RabbitMQWorker._deliver_outbox_event."""
+        if event.kind == "logs":
+            return await self._deliver_logs(event)
+        endpoint = f"/api/v1/worker/jobs/{event.job_id}/{event.kind}"
+        response = await self.maestro.post(endpoint, name=event.kind, payload=event.payload)
+        return outbox_resolved(event, response)
+
+    async def _watch_cancellation(self, job_id: str, cancel_event: threading.Event) -> None:
+        """Coroutine equivalente ao CancellationWatcher: poll até cancelar ou
+        até a task ser cancelada no fim do job."""
+        interval = self._cancellation_poll_interval()
+        logger.info(f"👀 Monitorando cancelamento do job {job_id} (intervalo: {interval}s)")
+        while not cancel_event.is_set():
+            try:
+                if await self.check_cancellation(job_id):
+                    self._trigger_cancel(job_id, "poll")
+                    return
+            except Exception as e:
+                logger.warning(f"⚠️ Falha ao verificar cancelamento do job {job_id}: {e}")
+            await asyncio.sleep(interval)
+
+    def _borrow_slot(self) -> Optional[int]:
+        """Ver RabbitMQWorker._borrow_slot. Chamado da thread do job: a fila
+        de slots é do event loop, então a retirada é agendada nele."""
+        if not self.cost_scheduling:
+            return None
+        return asyncio.run_coroutine_threadsafe(self._take_free_slot(), self._loop).result()
+
+    async def _take_free_slot(self) -> Optional[int]:
+        try:
+            return self._free_slots.get_nowait()
+        except asyncio.QueueEmpty:
+            return None
+
+    def _return_slot(self, slot_id: int) -> None:
+        self._loop.call_soon_threadsafe(self._release_slot, slot_id)
+
+    def _release_slot(self, slot_id: int) -> None:
+        self._free_slots.put_nowait(slot_id)
+        if self._dispatch_wakeup is not None:
+            self._dispatch_wakeup.set()
+
+    async def _on_message(self, message: AbstractIncomingMessage) -> None:
+        # Com prefetch == worker_slots o broker não entrega além dos slots;
+        # a task só espera o slot na janela entre o ack e o finally do job
+        # anterior — sem travar o loop.
+        self._spawn(self._run_slot(message))
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.get_running_loop().create_task(coro)
+        self._jobs.add(task)
+        task.add_done_callback(self._jobs.discard)
+
+    async def _run_slot(self, message: AbstractIncomingMessage) -> None:
+        slot_id = await self._free_slots.get()
+        await self._run_in_slot(slot_id, message)
+
+    async def _run_in_slot(self, slot_id: int, message: AbstractIncomingMessage) -> None:
+        try:
+            await self.process_message(message, slot_id=slot_id)
+        finally:
+            self.capacity.job_finished(slot_id)
+            self._release_slot(slot_id)
+
+    async def _on_route_message(self, message: AbstractIncomingMessage) -> None:
+        """Ver RabbitMQWorker._on_route_message."""
+        route = self.lifecycle.route(message.body, message.headers)
+        routed = aio_pika.Message(
+            message.body,
+            headers=route.headers,
+            content_type=message.content_type,
+            message_id=message.message_id,
+            delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+        )
+        try:
+            await self.channel.default_exchange.publish(
+                routed,
+                routing_key=route.queue,
+                mandatory=True,
+            )
+        except Exception as e:
+            logger.error(f"❌ Falha ao rotear job {route.job_id} para a fila '{route.size_class}': {e}. Devolvendo à fila.")
+            await self._safe_ack(message, requeue=True)
+            return
+
+        await self._safe_ack(message)
+        logger.info(f"🧭 Job {route.job_id} roteado para '{route.size_class}' (estimativa {route.estimated / 60:.0f}min)")
+        self._dispatch_wakeup.set()
+
+    async def _next_class_message(self, slot_id: int) -> Optional[AbstractIncomingMessage]:
+        for size_class, _ in self.lifecycle.class_queues(slot_id):
+            message = await self._class_queues[size_class].get(no_ack=False, fail=False)
+            if message is not None:
+                self.lifecycle.dispatched(size_class)
+                return message
+        return None
+
+    async def _dispatch(self) -> None:
+        """Ver RabbitMQWorker._dispatch."""
+        if self._draining:
+            return
+        free: List[int] = []
+        while not self._free_slots.empty():
+            free.append(self._free_slots.get_nowait())
+        if not free:
+            return
+
+        used = set()
+        try:
+            large = await self.channel.declare_queue(self.lifecycle.large_queue, passive=True)
+            self.scheduler.observe_large_backlog(large.declaration_result.message_count)
+
+            for slot_id in sorted(free):
+                message = await self._next_class_message(slot_id)
+                if message is None:
+                    continue
+                used.add(slot_id)
+                self._spawn(self._run_in_slot(slot_id, message))
+        except Exception as e:
+            logger.warning(f"⚠️ Falha ao despachar jobs das filas de classe: {e}")
+        finally:
+            for slot_id in free:
+                if slot_id not in used:
+                    self._free_slots.put_nowait(slot_id)
+
+    async def _dispatch_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._dispatch_wakeup.wait(), timeout=_DISPATCH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._dispatch_wakeup.clear()
+            await self._dispatch()
+
+    async def process_message(self, message: AbstractIncomingMessage, slot_id: int = 0) -> None:
+        """Ver RabbitMQWorker.process_message."""
+        job = JobDelivery(message.body, message.headers, slot_id)
+        try:
+            settlement = self.lifecycle.screen(job)
+            if settlement is None:
+                settlement = self.lifecycle.admit(job, await self.check_job_terminal(job.job_id))
+            if settlement is None:
+                self.lifecycle.start(job)
+                settlement = self.lifecycle.conclude(job, await self._execute_watched(job))
+        except Exception as e:
+            settlement = self.lifecycle.failed(job, e)
+        await self._settle(message, job, settlement)
+
+    async def _execute_watched(self, job: JobDelivery) -> Dict:
+        """JobLifecycle.execute numa thread fora do loop, com o polling de
+        cancelamento (também heartbeat) numa task e o push assinado."""
+        loop = asyncio.get_running_loop()
+        cancel_event = threading.Event()
+        self._cancel_events[job.job_id] = cancel_event
+        await self._bind_cancel(job.job_id, True)
+        watcher = loop.create_task(self._watch_cancellation(job.job_id, cancel_event))
+        try:
+            return await _run_in_thread(
+                loop,
+                partial(self.lifecycle.execute, job, cancel_event),
+                name=f"slot-{job.slot_id}",
+            )
+        finally:
+            watcher.cancel()
+            self._cancel_events.pop(job.job_id, None)
+            await self._bind_cancel(job.job_id, False)
+
+    async def _settle(self, message: AbstractIncomingMessage, job: JobDelivery, settlement: Settlement) -> None:
+        """Ver RabbitMQWorker._settle."""
+        if settlement.finish is not None:
+            try:
+                await self.log_shipper.flush_async(job.job_id, timeout=_LOG_FLUSH_TIMEOUT)
+                self.lifecycle.finish(job, *settlement.finish)
+            except Exception as e:
+                logger.critical(f"❌ FALHA CRÍTICA ao registrar a finalização do job {job.job_id}: {e}", exc_info=True)
+                await self._safe_ack(message, requeue=False)
+                return
+        if settlement.republish_to:
+            await self._republish(message, settlement.republish_to, settlement.headers, settlement.what)
+        else:
+            await self._safe_ack(message, requeue=settlement.requeue)
+
+    def _request_stop(self, signum: int) -> None:
+        if self._draining:
+            logger.info(f"Recebido sinal {signum}. Encerrando...")
+            JobProcessSupervisor.kill_all()
+            self._stop_event.set()
+            return
+        logger.info(
+            f"Recebido sinal {signum}. Drenando: sem novos jobs, até "
+            f"{settings.shutdown_grace_seconds}s para os em andamento (novo sinal encerra na hora)..."
+        )
+        self._draining = True
+        asyncio.get_running_loop().create_task(self._drain(), name="drain")
+
+    def _slots_idle(self) -> bool:
+        return self._free_slots.qsize() >= self.worker_slots
+
+    async def _wait_slots_idle(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while not self._slots_idle():
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(1.0)
+        return True
+
+    async def _drain(self) -> None:
+        """Ver RabbitMQWorker._drain."""
+        for queue, tag in self._consumers:
+            try:
+                await queue.cancel(tag)
+            except Exception as e:
+                logger.warning(f"⚠️ Falha ao cancelar consumidor {tag}: {e}")
+        self._consumers.clear()
+
+        if not await self._wait_slots_idle(settings.shutdown_grace_seconds):
+            logger.warning("⏸️ Prazo de drain esgotado. Suspendendo jobs em espera longa para retomada em outro worker...")
+            self._suspend_event.set()
+            if not await self._wait_slots_idle(_SUSPEND_TIMEOUT):
+                logger.warning("⚠️ Jobs ainda em andamento após a suspensão. Encerrando; as mensagens sem ack voltam para a fila.")
+                JobProcessSupervisor.kill_all()
+        logger.info("✅ Drain concluído.")
+        self._stop_event.set()
+
+    async def _refresh_capacity(self) -> None:
+        """Ver RabbitMQWorker._refresh_capacity."""
+        for name, cost_key, delayed in self.lifecycle.observed_queues():
+            try:
+                declared = await self.channel.declare_queue(name, passive=True)
+            except Exception as e:
+                logger.debug(f"Falha ao ler profundidade da fila '{name}': {e}")
+                return
+            self.capacity.observe_queue(name, declared.declaration_result.message_count, cost_key=cost_key, delayed=delayed)
+
+    async def _capacity_loop(self) -> None:
+        while True:
+            await self._refresh_capacity()
+            await asyncio.sleep(settings.capacity_refresh_seconds)
+
+    async def run(self) -> None:
+        logger.info("=" * 60)
+        logger.info("🤖 Bot XML GMS Worker (núcleo asyncio)")
+        logger.info("=" * 60)
+        logger.info(f"Worker ID: {settings.worker_id}")
+        logger.info(f"RabbitMQ: {settings.rabbitmq_host}:{settings.rabbitmq_port}")
+        logger.info(f"Fila: {self.queue_name}")
+        logger.info(f"Slots: {self.worker_slots} (isolamento: {settings.job_isolation})")
+        logger.info(f"Maestro API: {self.maestro_url}")
+        logger.info("=" * 60)
+
+        loop = asyncio.get_running_loop()
+        self._loop = loop
+        self._stop_event = asyncio.Event()
+        self._free_slots = asyncio.Queue()
+        for slot_id in range(self.worker_slots):
+            self._free_slots.put_nowait(slot_id)
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, self._request_stop, signum)
+
+        try:
+            self.outbox_dispatcher.start()
+            self.log_shipper.start()
+            if self.capacity_server is not None:
+                self.capacity_server.start()
+            queue = await self.connect()
+            if self.capacity_server is not None:
+                self._spawn(self._capacity_loop())
+            if self.cost_scheduling:
+                self._dispatch_wakeup = asyncio.Event()
+                self._consumers.append((queue, await queue.consume(self._on_route_message, no_ack=False)))
+                self._spawn(self._dispatch_loop())
+                logger.info(
+                    f"🧭 Agendamento por custo: small até {settings.small_job_max_seconds}s, "
+                    f"{self.scheduler.reserved_small_slots} slot(s) reservado(s) para small"
+                )
+            else:
+                self._consumers.append((queue, await queue.consume(self._on_message, no_ack=False)))
+            logger.info("🎯 Worker pronto. Aguardando tarefas...")
+            await self._stop_event.wait()
+        finally:
+            # Mesma semântica do núcleo pika: jobs em andamento não são
+            # esperados; sem ack, as mensagens voltam pra fila.
+            if self.connection is not None and not self.connection.is_closed:
+                logger.info("Fechando conexão com RabbitMQ...")
+                await self.connection.close()
+            if self.capacity_server is not None:
+                self.capacity_server.stop()
+            await self.log_shipper.stop_async()
+            await self.outbox_dispatcher.stop_async()
+            self.lifecycle.close()
+            logger.info(f"Latência dos callbacks do maestro: {self.maestro.latency_snapshot()}")
+            await self.maestro.close()
+            logger.info("Worker encerrado.")
+
+
+def run_async_worker() -> int:
+    try:
+        asyncio.run(AsyncRabbitMQWorker().run())
+        return 0
+    except Exception as e:
+        logger.critical(f"Falha ao iniciar worker: {e}", exc_info=True)
+        return 1
@@ -1,306 +1,497 @@
-# src/core/bot_runner.py
-import logging
-import os
-import threading
-from datetime import datetime, timezone
-from typing import Dict, Optional, Callable
-from src.automation.browser_handler import BrowserHandler
-from src.utils import data_handler
-from src.utils.logger_config import set_task_id
-from config import settings as config_settings
-from src.automation.page_objects.login_page import LoginPage
-from src.automation.page_objects.home_page import HomePage
-from src.automation.page_objects.export_page import ExportPage
-from src.utils import file_handler
-from src.utils.exceptions import AutomationException, JobCanceledException, NoInvoicesFoundException
-
-logger = logging.getLogger(__name__)
-
-class BotRunner:
-    def __init__(
-        self,
-        params: dict,
-        job_id: str = None,
-        log_callback: Callable = None,
-        cancel_event: Optional[threading.Event] = None,
-    ):
-        self.headless = params.get('headless', config_settings.headless)
-        self.stores_to_process = params.get('stores', [])
-        self.document_type = params.get('document_type')
-        self.emitter = params.get('emitter')
-        self.operation_type = params.get('operation_type')
-        self.file_type = params.get('file_type')
-        self.invoice_situation = params.get('invoice_situation')
-        self.start_date = params.get('start_date')
-        self.end_date = params.get('end_date')
-        self.gms_user = params.get('gms_user')
-        self.gms_password = params.get('gms_password')
-        
-        self.job_id = job_id
-        self.log_callback = log_callback
-        # Default pra Event() nunca setado deixa o resto do código simétrico:
-        # cancel_event.wait(N) se comporta como sleep(N) quando o evento nunca
-        # é sinalizado.
-        self.cancel_event = cancel_event if cancel_event is not None else threading.Event()
-        
-        if not self.gms_user:
-            self.gms_user = os.getenv('GMS_USER') or config_settings.gms_username
-        if not self.gms_password:
-            self.gms_password = os.getenv('GMS_PASSWORD') or config_settings.gms_password
-            
-        self.gms_login_url = params.get('gms_login_url')
-        self.browser_handler = None
-        self.selectors = None
-        
-        self.status = "idle"
-        self.progress = 0
-        self.current_message = ""
-        
-        if not self.gms_user or not self.gms_password:
-            raise ValueError("Credenciais GMS_USER e GMS_PASSWORD não foram encontradas nem nos parâmetros da API nem nas variáveis de ambiente.")
-        
-        if not self.gms_login_url:
-            raise ValueError("Parâmetro obrigatório 'gms_login_url' não fornecido.")
-        
-        if not config_settings.SELECTORS_FILE.exists():
-            raise FileNotFoundError(f"Arquivo de seletores não encontrado: {config_settings.SELECTORS_FILE}")
-        
-        if not self.stores_to_process:
-            raise ValueError("Parâmetro obrigatório 'stores' não fornecido ou vazio.")
-        
-        logger.info(f"🤖 BotRunner inicializado com sucesso - Job ID: {job_id}")
-        
-    def _update_status(self, message: str, progress: int = None):
-        self.current_message = message
-        if progress is not None:
-            self.progress = progress
-        
-        logger.info(message)
-        
-        if self.log_callback and self.job_id:
-            try:
-                self.log_callback(self.job_id, "INFO", message)
-            except Exception as e:
-                logger.warning(f"Falha ao enviar log para o Maestro via callback: {e}")
-
-    def setup(self):
-        self._update_status("Preparando ambiente para a execução...", 5)
-        
-        if self.job_id:
-            set_task_id(self.job_id)
-        
-        logger.debug(f"Setup iniciado para job_id: {self.job_id}")
-        logger.debug(f"Lojas a processar: {self.stores_to_process}")
-        
-        if not self.stores_to_process:
-            logger.warning("Nenhuma loja fornecida nos parâmetros para processar.")
-            return False
-        
-        logger.debug(f"Carregando seletores de: {config_settings.SELECTORS_FILE}")
-        self.selectors = data_handler.load_yaml_file(config_settings.SELECTORS_FILE)
-        if not self.selectors:
-            logger.error("Falha ao carregar seletores. A automação não pode continuar.")
-            return False
-        
-        logger.debug(f"✅ Seletores carregados com sucesso. Total: {len(self.selectors)} seções")
-        return True
-    
-    def run(self) -> Dict:
-        logger.info("🚀 --- INICIANDO AUTOMAÇÃO BOT-XML-GMS --- 🚀")
-        start_time = datetime.now()
-        
-        result = {
-            "status": "pending",
-            "started_at": start_time.isoformat(),
-            "completed_at": None,
-            "duration_seconds": None,
-            "summary": None,
-            "error": None
-        }
-        
-        if not self.setup():
-            logger.info("🏁 --- AUTOMAÇÃO FINALIZADA DEVIDO A FALHA NO SETUP --- 🏁")
-            result.update({
-                "status": "failed",
-                "error": "Falha no setup da automação",
-                "completed_at": datetime.now().isoformat()
-            })
-            return result
-
-        self.browser_handler = BrowserHandler(headless=self.headless)
-        summary = None
-        
-        try:
-            self._update_status("Iniciando o navegador...", 10)
-            logger.debug(f"Configuração de headless: {self.headless}")
-            
-            MAX_BROWSER_RETRIES = 3
-            driver = None
-            
-            for attempt in range(1, MAX_BROWSER_RETRIES + 1):
-                try:
-                    logger.info(f"Tentativa {attempt}/{MAX_BROWSER_RETRIES} de inicializar o navegador...")
-                    driver = self.browser_handler.start_browser()
-                    
-                    if not driver:
-                        raise ConnectionError("Driver do navegador não foi inicializado.")
-                    
-                    logger.debug("✅ Driver do navegador iniciado com sucesso")
-                    break
-                    
-                except Exception as browser_error:
-                    logger.warning(f"⚠️ Falha na tentativa {attempt}/{MAX_BROWSER_RETRIES} de iniciar o navegador: {browser_error}")
-                    
-                    try:
-                        if self.browser_handler and self.browser_handler.driver:
-                            self.browser_handler.close_browser()
-                    except Exception as e:
-                        logger.debug(f"Falha ao fechar navegador durante retry: {e}")
-                    
-                    if attempt < MAX_BROWSER_RETRIES:
-                        import time
-                        wait_time = attempt * 2
-                        logger.info(f"Aguardando {wait_time}s antes de tentar novamente...")
-                        time.sleep(wait_time)
-                    else:
-                        logger.error(f"❌ Todas as {MAX_BROWSER_RETRIES} tentativas de iniciar o navegador falharam")
-                        raise ConnectionError(f"Não foi possível inicializar o navegador após {MAX_BROWSER_RETRIES} tentativas")
-            
-            if not driver:
-                raise ConnectionError("Driver do navegador não foi inicializado após todas as tentativas.")
-
-            self._update_status("Iniciando processo de login...", 20)
-            logger.debug(f"Tentando login na URL: {self.gms_login_url.split('/')[2]}")
-            login_page = LoginPage(driver, self.selectors.get('login_page', {}))
-            login_page.navigate_to_login_page(self.gms_login_url)
-            
-            home_page_selectors = self.selectors.get('home_page', {})
-            verification_selector = home_page_selectors.get('sidebar_tax')
-            if not verification_selector:
-                raise ValueError("Seletor de verificação pós-login ('sidebar_tax') não encontrado em selectors.yaml")
-            
-            logger.debug(f"Executando login com usuário: {self.gms_user}")
-            login_page.execute_login(self.gms_user, self.gms_password, verification_selector)
-            logger.debug("✅ Login executado com sucesso")
-
-            self._update_status("Login realizado com sucesso!", 30)
-
-            self._update_status("Navegando na página inicial...", 40)
-            home_page = HomePage(driver, self.selectors.get('home_page', {}))
-            logger.debug(f"Navegando para página de exportação")
-            home_page.navigate_sidebar_export()
-
-            self._update_status("Iniciando processo de exportação...", 50)
-            logger.debug(f"Parâmetros de exportação: doc_type={self.document_type}, emitter={self.emitter}, op={self.operation_type}")
-            logger.debug(f"Período: {self.start_date} até {self.end_date}")
-            logger.debug(f"Lojas: {self.stores_to_process}")
-            export_page = ExportPage(driver, self.selectors.get('export_page', {}), cancel_event=self.cancel_event)
-            export_page.export_data(self.document_type, self.emitter, self.operation_type, self.file_type, self.invoice_situation, self.start_date, self.end_date, self.stores_to_process)
-            logger.debug("✅ Dados de exportação enviados para GMS")
-            
-            self._update_status("Aguardando a conclusão da exportação no sistema GMS...", 60)
-            logger.debug("Aguardando conclusão da exportação...")
-            export_page.wait_for_export_completion()
-            logger.debug("✅ Exportação concluída no GMS")
-            
-            self._update_status("Realizando o download dos arquivos exportados...", 70)
-            logger.debug("Iniciando download dos arquivos...")
-            export_page.download_exports()
-            logger.debug("✅ Download dos arquivos concluído")
-
-            self._update_status("Processando arquivos baixados (descompactando e organizando)...", 80)
-            logger.debug("Processando arquivos baixados...")
-            
-            # Log do estado do diretório pending antes do processamento
-            pending_files = list(config_settings.PENDING_DIR.glob('*'))
-            logger.info(f"Arquivos no diretório pending antes do processamento: {[f.name for f in pending_files]}")
-            
-            summary = file_handler.process_downloaded_files(self.document_type, self.start_date, self.end_date)
-            logger.debug(f"✅ Resumo do processamento: {summary}")
-            self._update_status("Processamento de arquivos concluído.", 100)
-            
-            end_time = datetime.now()
-            duration = (end_time - start_time).total_seconds()
-            logger.debug(f"Tempo total de execução: {duration:.2f}s")
-            
-            result.update({
-                "status": "completed",
-                "completed_at": end_time.isoformat(),
-                "duration_seconds": duration,
-                "summary": summary
-            })
-            
-            logger.info(f"✅ Automação concluída com sucesso em {duration:.2f}s")
-
-        except NoInvoicesFoundException as e:
-            logger.debug(f"NoInvoicesFoundException capturada: {type(e).__name__}")
-            logger.warning(f"Processo encerrado conforme esperado: {e}")
-            end_time = datetime.now()
-            duration = (end_time - start_time).total_seconds()
-
-            result.update({
-                "status": "completed_no_invoices",
-                "completed_at": end_time.isoformat(),
-                "duration_seconds": duration,
-                "summary": {"status": "concluido_sem_notas", "message": str(e)}
-            })
-
-        except JobCanceledException as e:
-            logger.warning(f"🛑 Cancelamento detectado pelo bot na etapa '{e.stage}'. Encerrando com graça.")
-            end_time = datetime.now()
-            duration = (end_time - start_time).total_seconds()
-
-            # Cleanup explícito: se o cancel chegou antes de
-            # file_handler.process_downloaded_files (cujo finally limpa o pending),
-            # o pending pode ter ZIPs ou diretórios meio-baixados. Removemos aqui
-            # pra não contaminar a próxima execução. Tolerante a erros — pending
-            # é efêmero.
-            try:
-                file_handler.cleanup_pending_directory()
-            except Exception as cleanup_err:
-                logger.warning(f"Limpeza pós-cancelamento do pending falhou (tolerado): {cleanup_err}")
-
-            result.update({
-                "status": "canceled",
-                "completed_at": end_time.isoformat(),
-                "duration_seconds": duration,
-                "canceled_at": datetime.now(timezone.utc).isoformat(),
-                "stage": e.stage,
-            })
-
-        except AutomationException as e:
-            logger.debug(f"AutomationException capturada: {type(e).__name__}")
-            logger.error(f"ERRO DE PROCESSO: {e}", exc_info=True)
-            if self.browser_handler:
-                self.browser_handler.take_screenshot("automation_error")
-            end_time = datetime.now()
-            duration = (end_time - start_time).total_seconds()
-            
-            result.update({
-                "status": "failed",
-                "completed_at": end_time.isoformat(),
-                "duration_seconds": duration,
-                "error": str(e)
-            })
-            
-        except Exception as e:
-            logger.debug(f"Exception genérica capturada: {type(e).__name__}")
-            logger.critical("ERRO INESPERADO: Ocorreu uma falha crítica na orquestração.", exc_info=True)
-            if self.browser_handler:
-                self.browser_handler.take_screenshot("critical_error")
-            end_time = datetime.now()
-            duration = (end_time - start_time).total_seconds()
-            
-            result.update({
-                "status": "failed",
-                "completed_at": end_time.isoformat(),
-                "duration_seconds": duration,
-                "error": str(e)
-            })
-            
-        finally:
-            if self.browser_handler:
-                self.browser_handler.close_browser()
-            logger.info("🏁 --- AUTOMAÇÃO FINALIZADA --- 🏁")
-        
-        return result
+# src/core/bot_runner.py
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional, Callable
+from urllib.parse import urlparse
+from src.automation.browser_handler import BrowserHandler
+from src.utils import data_handler
+from src.utils.logger_config import set_task_id
+from config import settings as config_settings
+from src.automation.page_objects.export_page import ExportPage
+from src.utils import file_handler
+from src.utils.rate_limiter import ACTION_EXPORT, shared_rate_limiter
+from src.utils.circuit_breaker import shared_circuit_breaker
+from src.core.credential_pool import shared_credential_pool
+from src.automation.browser_pool import shared_browser_pool
+from src.automation.gms_session import open_export_screen
+from src.core.job_messages import is_transient_failure
+from src.core.export_pipeline import STATE_DOWNLOADING, STATE_PARKED, ExportTicket, shared_export_pipelines
+from src.utils.exceptions import AutomationException, JobCanceledException, JobSuspendedException, NoInvoicesFoundException
+
+logger = logging.getLogger(__name__)
+
+class BotRunner:
+    def __init__(
+        self,
+        params: dict,
+        job_id: str = None,
+        log_callback: Callable = None,
+        cancel_event: Optional[threading.Event] = None,
+        pending_dir: Optional[Path] = None,
+        suspend_event: Optional[threading.Event] = None,
+    ):
+        self.headless = params.get('headless', config_settings.headless)
+        self.stores_to_process = params.get('stores', [])
+        self.document_type = params.get('document_type')
+        self.emitter = params.get('emitter')
+        self.operation_type = params.get('operation_type')
+        self.file_type = params.get('file_type')
+        self.invoice_situation = params.get('invoice_situation')
+        self.start_date = params.get('start_date')
+        self.end_date = params.get('end_date')
+        self.gms_user = params.get('gms_user')
+        self.gms_password = params.get('gms_password')
+        # Shard de um job dividido: grava direto na pasta do job pai.
+        self.destination_dir = params.get('destination_dir')
+        # Checkpoint de um worker que foi encerrado no meio da espera do
+        # export: com ele o job segue a exportação já pedida ao GMS.
+        self.resume_checkpoint = params.get('resume_checkpoint') or None
+        
+        self.job_id = job_id
+        self.log_callback = log_callback
+        # Default pra Event() nunca setado deixa o resto do código simétrico:
+        # cancel_event.wait(N) se comporta como sleep(N) quando o evento nunca
+        # é sinalizado.
+        self.cancel_event = cancel_event if cancel_event is not None else threading.Event()
+        self.suspend_event = suspend_event if suspend_event is not None else threading.Event()
+        # Workspace de download/extração do job. O worker passa o pending do
+        # slot; execução avulsa (main.py) cai no PENDING_DIR global.
+        self.pending_dir = Path(pending_dir) if pending_dir else config_settings.PENDING_DIR
+        
+        # Sem conta nos parâmetros, ela vem do pool (GMS_ACCOUNTS) na hora de
+        # rodar, pela carga de cada conta; sem pool, do GMS_USER/GMS_PASSWORD.
+        self.credential_pool = None if self.gms_user else shared_credential_pool()
+        self.credential_lease = None
+        if self.credential_pool is None:
+            if not self.gms_user:
+                self.gms_user = os.getenv('GMS_USER') or config_settings.gms_username
+            if not self.gms_password:
+                self.gms_password = os.getenv('GMS_PASSWORD') or config_settings.gms_password
+            
+        self.gms_login_url = params.get('gms_login_url')
+        # Logins, exports e refreshes no ritmo que o GMS aguenta, somando
+        # todos os slots/workers (ver TokenBucketLimiter).
+        self.rate_limiter = shared_rate_limiter()
+        self.gms_host = urlparse(self.gms_login_url).hostname if self.gms_login_url else None
+        # Falhas de conexão/página de login abrem o circuito do host e os
+        # próximos jobs nem abrem o Chrome (ver CircuitBreaker).
+        self.circuit_breaker = shared_circuit_breaker()
+        # Com EXPORT_PIPELINING, login/export/espera/download vão para a
+        # sessão compartilhada da conta em vez de um Chrome por job.
+        self.export_pipelines = shared_export_pipelines()
+        # Chrome logado que sobrevive entre jobs da mesma conta (ver BrowserPool).
+        self.browser_pool = shared_browser_pool()
+        self.pooled_browser = None
+        self.browser_handler = None
+        self.selectors = None
+        
+        self.status = "idle"
+        self.progress = 0
+        self.current_message = ""
+        
+        if self.credential_pool is None and (not self.gms_user or not self.gms_password):
+            raise ValueError("Credenciais GMS_USER e GMS_PASSWORD não foram encontradas nem nos parâmetros da API nem nas variáveis de ambiente.")
+        
+        if not self.gms_login_url:
+            raise ValueError("Parâmetro obrigatório 'gms_login_url' não fornecido.")
+        
+        if not config_settings.SELECTORS_FILE.exists():
+            raise FileNotFoundError(f"Arquivo de seletores não encontrado: {config_settings.SELECTORS_FILE}")
+        
+        if not self.stores_to_process:
+            raise ValueError("Parâmetro obrigatório 'stores' não fornecido ou vazio.")
+        
+        logger.info(f"🤖 BotRunner inicializado com sucesso - Job ID: {job_id}")
+        
+    def _update_status(self, message: str, progress: int = None):
+        self.current_message = message
+        if progress is not None:
+            self.progress = progress
+        
+        logger.info(message)
+        
+        if self.log_callback and self.job_id:
+            try:
+                self.log_callback(self.job_id, "INFO", message)
+            except Exception as e:
+                logger.warning(f"Falha ao enviar log para o Maestro via callback: {e}")
+
+    def setup(self):
+        self._update_status("Preparando ambiente para a execução...", 5)
+        
+        if self.job_id:
+            set_task_id(self.job_id)
+        
+        logger.debug(f"Setup iniciado para job_id: {self.job_id}")
+        logger.debug(f"Lojas a processar: {self.stores_to_process}")
+        
+        if not self.stores_to_process:
+            logger.warning("Nenhuma loja fornecida nos parâmetros para processar.")
+            return False
+        
+        logger.debug(f"Carregando seletores de: {config_settings.SELECTORS_FILE}")
+        self.selectors = data_handler.load_yaml_file(config_settings.SELECTORS_FILE)
+        if not self.selectors:
+            logger.error("Falha ao carregar seletores. A automação não pode continuar.")
+            return False
+        
+        logger.debug(f"✅ Seletores carregados com sucesso. Total: {len(self.selectors)} seções")
+        return True
+    
+    def _acquire_account(self):
+        # Retomada: o export já pedido ao GMS só aparece na conta que o pediu.
+        preferred = (self.resume_checkpoint or {}).get("gms_user")
+        self._update_status("Reservando conta GMS...", 8)
+        lease = self.credential_pool.acquire(
+            self.job_id,
+            preferred=preferred,
+            interrupted=lambda: self.cancel_event.is_set() or self.suspend_event.is_set(),
+        )
+        if lease is None:
+            if self.cancel_event.is_set():
+                raise JobCanceledException("aguardando_conta_gms")
+            raise JobSuspendedException("aguardando_conta_gms", self.resume_checkpoint)
+        self.credential_lease = lease
+        self.gms_user = lease.user
+        self.gms_password = lease.password
+
+    def _throttle(self, action: str, stage: str):
+        """Espera a vez da ação no limite do host do GMS (cancelável)."""
+        if self.rate_limiter is None:
+            return
+        wait = self.rate_limiter.reserve(self.gms_host, action)
+        if wait <= 0:
+            return
+        logger.info(f"🚦 Limite de '{action}' do GMS ({self.gms_host}): aguardando {wait:.1f}s")
+        deadline = time.monotonic() + wait
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if self.cancel_event.wait(min(remaining, 1.0)):
+                raise JobCanceledException(stage)
+
+    def _checkout_pooled_browser(self):
+        """Chrome já logado na tela de exportação, do pool; None se não há."""
+        if self.browser_pool is None:
+            return None
+        pooled = self.browser_pool.checkout(self.gms_login_url, self.gms_user, self.headless, self.pending_dir)
+        if pooled is None:
+            return None
+        self.pooled_browser = pooled
+        self.browser_handler = pooled.handler
+        # O health check do checkout recarregou a tela do GMS: se este job é a
+        # sonda do circuito meio-aberto, é a resposta dela (sem login aqui).
+        if self.circuit_breaker:
+            self.circuit_breaker.record_success(self.gms_host)
+        self._update_status("Navegador já logado no GMS reaproveitado.", 40)
+        return pooled.handler.driver
+
+    def _export_in_own_browser(self):
+        """Navegador do job (do pool ou aberto agora): export, espera e download."""
+        driver = self._checkout_pooled_browser() or self._launch_and_login()
+        self._export_with(driver)
+
+    def _launch_and_login(self):
+        """Abre o Chrome, loga e navega até a tela de exportação."""
+        self._update_status("Iniciando o navegador...", 10)
+        logger.debug(f"Configuração de headless: {self.headless}")
+        
+        MAX_BROWSER_RETRIES = 3
+        driver = None
+        
+        for attempt in range(1, MAX_BROWSER_RETRIES + 1):
+            try:
+                logger.info(f"Tentativa {attempt}/{MAX_BROWSER_RETRIES} de inicializar o navegador...")
+                driver = self.browser_handler.start_browser()
+                
+                if not driver:
+                    raise ConnectionError("Driver do navegador não foi inicializado.")
+                
+                logger.debug("✅ Driver do navegador iniciado com sucesso")
+                break
+                
+            except Exception as browser_error:
+                logger.warning(f"⚠️ Falha na tentativa {attempt}/{MAX_BROWSER_RETRIES} de iniciar o navegador: {browser_error}")
+                
+                try:
+                    if self.browser_handler and self.browser_handler.driver:
+                        self.browser_handler.close_browser()
+                except Exception as e:
+                    logger.debug(f"Falha ao fechar navegador durante retry: {e}")
+                
+                if attempt < MAX_BROWSER_RETRIES:
+                    import time
+                    wait_time = attempt * 2
+                    logger.info(f"Aguardando {wait_time}s antes de tentar novamente...")
+                    time.sleep(wait_time)
+                else:
+                    logger.error(f"❌ Todas as {MAX_BROWSER_RETRIES} tentativas de iniciar o navegador falharam")
+                    raise ConnectionError(f"Não foi possível inicializar o navegador após {MAX_BROWSER_RETRIES} tentativas")
+        
+        if not driver:
+            raise ConnectionError("Driver do navegador não foi inicializado após todas as tentativas.")
+
+        self._update_status("Iniciando processo de login...", 20)
+        logger.debug(f"Tentando login na URL: {self.gms_login_url.split('/')[2]}")
+        open_export_screen(
+            driver, self.selectors, self.gms_login_url, self.gms_user, self.gms_password,
+            lease=self.credential_lease,
+            breaker=self.circuit_breaker,
+            throttle=self._throttle,
+            interrupted=self.cancel_event.is_set,
+            on_status=self._update_status,
+        )
+        if self.browser_pool is not None:
+            self.pooled_browser = self.browser_pool.adopt(
+                self.browser_handler, self.gms_login_url, self.gms_user, self.gms_password, self.headless, self.selectors
+            )
+        return driver
+
+    def _export_with(self, driver):
+        self._update_status("Iniciando processo de exportação...", 50)
+        logger.debug(f"Parâmetros de exportação: doc_type={self.document_type}, emitter={self.emitter}, op={self.operation_type}")
+        logger.debug(f"Período: {self.start_date} até {self.end_date}")
+        logger.debug(f"Lojas: {self.stores_to_process}")
+        export_page = ExportPage(
+            driver,
+            self.selectors.get('export_page', {}),
+            cancel_event=self.cancel_event,
+            pending_dir=self.pending_dir,
+            suspend_event=self.suspend_event,
+            throttle=self._throttle,
+        )
+        resumed = bool(
+            self.resume_checkpoint
+            and self.resume_checkpoint.get("export_row")
+            and export_page.resume_export(self.resume_checkpoint["export_row"])
+        )
+        if resumed:
+            self._update_status("Retomando exportação já solicitada ao GMS por outro worker...", 55)
+        else:
+            self._throttle(ACTION_EXPORT, "export_data")
+            export_page.export_data(self.document_type, self.emitter, self.operation_type, self.file_type, self.invoice_situation, self.start_date, self.end_date, self.stores_to_process)
+            logger.debug("✅ Dados de exportação enviados para GMS")
+        
+        self._update_status("Aguardando a conclusão da exportação no sistema GMS...", 60)
+        logger.debug("Aguardando conclusão da exportação...")
+        export_page.wait_for_export_completion()
+        logger.debug("✅ Exportação concluída no GMS")
+        
+        self._update_status("Realizando o download dos arquivos exportados...", 70)
+        logger.debug("Iniciando download dos arquivos...")
+        export_page.download_exports()
+        logger.debug("✅ Download dos arquivos concluído")
+
+    def _export_via_pipeline(self):
+        """Export pela sessão compartilhada da conta (ver ExportPipeline):
+        o slot espera aqui enquanto a sessão intercala os exports dos jobs."""
+        ticket = ExportTicket(
+            self.job_id,
+            {
+                'document_type': self.document_type,
+                'emitter': self.emitter,
+                'operation_type': self.operation_type,
+                'file_type': self.file_type,
+                'invoice_situation': self.invoice_situation,
+                'start_date': self.start_date,
+                'end_date': self.end_date,
+                'stores': self.stores_to_process,
+            },
+            pending_dir=self.pending_dir,
+            cancel_event=self.cancel_event,
+            suspend_event=self.suspend_event,
+            resume_row=(self.resume_checkpoint or {}).get("export_row"),
+            lease=self.credential_lease,
+        )
+        self._update_status("Enviando a exportação pela sessão compartilhada do GMS...", 20)
+        self.export_pipelines.submit(
+            self.gms_login_url, self.gms_user, self.gms_password, self.selectors, self.headless, ticket
+        )
+
+        def _on_state(state: str):
+            if state == STATE_PARKED:
+                self._update_status("Aguardando a conclusão da exportação no sistema GMS...", 60)
+            elif state == STATE_DOWNLOADING:
+                self._update_status("Realizando o download dos arquivos exportados...", 70)
+
+        # Login da sessão (e o resultado dele na conta) fica com o pipeline:
+        # um login só para todos os tickets que a abriram.
+        ticket.wait(on_state=_on_state)
+
+    def run(self) -> Dict:
+        logger.info("🚀 --- INICIANDO AUTOMAÇÃO BOT-XML-GMS --- 🚀")
+        start_time = datetime.now()
+        
+        result = {
+            "status": "pending",
+            "started_at": start_time.isoformat(),
+            "completed_at": None,
+            "duration_seconds": None,
+            "summary": None,
+            "error": None
+        }
+        
+        if not self.setup():
+            logger.info("🏁 --- AUTOMAÇÃO FINALIZADA DEVIDO A FALHA NO SETUP --- 🏁")
+            result.update({
+                "status": "failed",
+                "error": "Falha no setup da automação",
+                "completed_at": datetime.now().isoformat()
+            })
+            return result
+
+        self.browser_handler = BrowserHandler(headless=self.headless, download_dir=self.pending_dir)
+        summary = None
+        
+        try:
+            if self.credential_pool is not None:
+                self._acquire_account()
+
+            if self.export_pipelines is not None:
+                self._export_via_pipeline()
+            else:
+                self._export_in_own_browser()
+
+            self._update_status("Processando arquivos baixados (descompactando e organizando)...", 80)
+            logger.debug("Processando arquivos baixados...")
+            
+            # Log do estado do diretório pending antes do processamento
+            pending_files = list(self.pending_dir.glob('*'))
+            logger.info(f"Arquivos no diretório pending antes do processamento: {[f.name for f in pending_files]}")
+            
+            summary = file_handler.process_downloaded_files(
+                self.document_type,
+                self.start_date,
+                self.end_date,
+                pending_dir=self.pending_dir,
+                destination_dir=self.destination_dir,
+            )
+            logger.debug(f"✅ Resumo do processamento: {summary}")
+            self._update_status("Processamento de arquivos concluído.", 100)
+            
+            end_time = datetime.now()
+            duration = (end_time - start_time).total_seconds()
+            logger.debug(f"Tempo total de execução: {duration:.2f}s")
+            
+            result.update({
+                "status": "completed",
+                "completed_at": end_time.isoformat(),
+                "duration_seconds": duration,
+                "summary": summary
+            })
+            
+            logger.info(f"✅ Automação concluída com sucesso em {duration:.2f}s")
+
+        except NoInvoicesFoundException as e:
+            logger.debug(f"NoInvoicesFoundException capturada: {type(e).__name__}")
+            logger.warning(f"Processo encerrado conforme esperado: {e}")
+            end_time = datetime.now()
+            duration = (end_time - start_time).total_seconds()
+
+            result.update({
+                "status": "completed_no_invoices",
+                "completed_at": end_time.isoformat(),
+                "duration_seconds": duration,
+                "summary": {"status": "concluido_sem_notas", "message": str(e)}
+            })
+
+        except JobCanceledException as e:
+            logger.warning(f"🛑 Cancelamento detectado pelo bot na etapa '{e.stage}'. Encerrando com graça.")
+            end_time = datetime.now()
+            duration = (end_time - start_time).total_seconds()
+
+            # Cleanup explícito: se o cancel chegou antes de
+            # file_handler.process_downloaded_files (cujo finally limpa o pending),
+            # o pending pode ter ZIPs ou diretórios meio-baixados. Removemos aqui
+            # pra não contaminar a próxima execução. Tolerante a erros — pending
+            # é efêmero.
+            try:
+                file_handler.cleanup_pending_directory(self.pending_dir)
+            except Exception as cleanup_err:
+                logger.warning(f"Limpeza pós-cancelamento do pending falhou (tolerado): {cleanup_err}")
+
+            result.update({
+                "status": "canceled",
+                "completed_at": end_time.isoformat(),
+                "duration_seconds": duration,
+                "canceled_at": datetime.now(timezone.utc).isoformat(),
+                "stage": e.stage,
+            })
+
+        except JobSuspendedException as e:
+            logger.warning(f"⏸️ Worker encerrando: job suspenso na etapa '{e.stage}' para retomada.")
+            end_time = datetime.now()
+
+            try:
+                file_handler.cleanup_pending_directory(self.pending_dir)
+            except Exception as cleanup_err:
+                logger.warning(f"Limpeza pós-suspensão do pending falhou (tolerado): {cleanup_err}")
+
+            result.update({
+                "status": "suspended",
+                "completed_at": end_time.isoformat(),
+                "duration_seconds": (end_time - start_time).total_seconds(),
+                "stage": e.stage,
+                "checkpoint": (
+                    dict(e.checkpoint, gms_user=self.credential_lease.user)
+                    if e.checkpoint and self.credential_lease else e.checkpoint
+                ),
+            })
+
+        except AutomationException as e:
+            logger.debug(f"AutomationException capturada: {type(e).__name__}")
+            logger.error(f"ERRO DE PROCESSO: {e}", exc_info=True)
+            if self.browser_handler:
+                self.browser_handler.take_screenshot("automation_error")
+            end_time = datetime.now()
+            duration = (end_time - start_time).total_seconds()
+            
+            result.update({
+                "status": "failed",
+                "completed_at": end_time.isoformat(),
+                "duration_seconds": duration,
+                "error": str(e),
+                "error_type": type(e).__name__,
+                # Worker reenvia pela fila de espera do retry (GMS fora do ar,
+                # Chrome que não subiu, timeout) em vez de finalizar.
+                "transient": is_transient_failure(e),
+            })
+            
+        except Exception as e:
+            logger.debug(f"Exception genérica capturada: {type(e).__name__}")
+            logger.critical("ERRO INESPERADO: Ocorreu uma falha crítica na orquestração.", exc_info=True)
+            if self.browser_handler:
+                self.browser_handler.take_screenshot("critical_error")
+            end_time = datetime.now()
+            duration = (end_time - start_time).total_seconds()
+            
+            result.update({
+                "status": "failed",
+                "completed_at": end_time.isoformat(),
+                "duration_seconds": duration,
+                "error": str(e),
+                "error_type": type(e).__name__,
+                "transient": is_transient_failure(e),
+            })
+            
+        finally:
+            # Conta devolvida antes do checkin: navegador reciclado é
+            # pré-aquecido com um lease próprio da mesma conta.
+            if self.credential_lease:
+                self.credential_lease.release()
+            if self.pooled_browser is not None:
+                # Só volta ao pool quem terminou com a tela num estado conhecido.
+                self.browser_pool.checkin(
+                    self.pooled_browser,
+                    reusable=result["status"] in ("completed", "completed_no_invoices"),
+                )
+            elif self.browser_handler:
+                self.browser_handler.close_browser()
+            logger.info("🏁 --- AUTOMAÇÃO FINALIZADA --- 🏁")
+        
+        return result
@@ -0,0 +1,210 @@
+# src/core/capacity.py
+import json
+import logging
+import statistics
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from src.core.job_cost import SIZE_LARGE, SIZE_SMALL, JobCostEstimator
+from src.core.job_scheduler import HEADER_JOB_COST, size_class_queue
+
+logger = logging.getLogger(__name__)
+
+# Estimativas recentes guardadas por fila para precificar as mensagens que
+# ainda estão nela (o worker não enxerga o conteúdo sem consumir).
+_COST_SAMPLES = 50
+
+
+def observed_queues(base_queue: str, cost_scheduling: bool, delay_queues: Iterable[str]) -> List[Tuple[str, str, bool]]:
+    """(fila, fila cujas estimativas precificam as mensagens, é espera?)."""
+    queues = [(base_queue, base_queue, False)]
+    if cost_scheduling:
+        queues += [(size_class_queue(base_queue, c), size_class_queue(base_queue, c), False) for c in (SIZE_SMALL, SIZE_LARGE)]
+    # Retry e adiamento voltam para a fila principal: mesmo preço dela.
+    queues += [(name, base_queue, True) for name in delay_queues]
+    return queues
+
+
+class CapacityTracker:
+    """Demanda do worker em segundos de trabalho estimados, para autoscaling.
+
+    Profundidade de fila trata um job de 1 dia igual a um de 1 mês; aqui
+    cada coisa é convertida em segundos pelo JobCostEstimator:
+
+    - jobs em andamento: estimativa do job menos o tempo já decorrido;
+    - backlog: mensagens de cada fila × média das estimativas recentes dos
+      jobs vistos nela (o roteador estima todos no modo cost; no fifo, os
+      jobs iniciados por este worker). Sem amostra, vale a estimativa de um
+      job de 1 loja/1 dia;
+    - filas de retry e de adiamento entram à parte (delayed): é trabalho
+      que volta, mas só depois do TTL.
+
+    As profundidades vêm de passive declares feitos pela conexão do worker
+    (observe_queue); snapshot() só lê o que já foi coletado e pode ser
+    chamado de qualquer thread.
+    """
+
+    def __init__(
+        self,
+        worker_id: str,
+        worker_slots: int,
+        estimator: JobCostEstimator,
+        free_slots: Callable[[], int],
+        draining: Callable[[], bool],
+    ):
+        self.worker_id = worker_id
+        self.worker_slots = worker_slots
+        self.estimator = estimator
+        self._free_slots = free_slots
+        self._draining = draining
+        self._default_cost = estimator.estimate_seconds({})
+        self._lock = threading.Lock()
+        self._in_flight: Dict[int, Dict] = {}
+        self._costs: Dict[str, Deque[float]] = {}
+        self._queues: Dict[str, Dict] = {}
+        self._queues_updated_at: Optional[datetime] = None
+
+    def estimate(self, params: Dict, headers: Optional[Dict] = None) -> float:
+        """Estimativa gravada pelo roteador ou, sem ela, calculada agora."""
+        try:
+            return float((headers or {})[HEADER_JOB_COST])
+        except (KeyError, TypeError, ValueError):
+            return self.estimator.estimate_seconds(params)
+
+    def job_started(self, slot_id: int, job_id: str, estimated_seconds: float) -> None:
+        with self._lock:
+            self._in_flight[slot_id] = {
+                "job_id": job_id,
+                "estimated_seconds": estimated_seconds,
+                "started": time.monotonic(),
+            }
+
+    def job_finished(self, slot_id: int) -> None:
+        with self._lock:
+            self._in_flight.pop(slot_id, None)
+
+    def observe_cost(self, queue: str, estimated_seconds: float) -> None:
+        with self._lock:
+            self._costs.setdefault(queue, deque(maxlen=_COST_SAMPLES)).append(estimated_seconds)
+
+    def observe_queue(self, queue: str, message_count: int, cost_key: Optional[str] = None, delayed: bool = False) -> None:
+        with self._lock:
+            self._queues[queue] = {
+                "messages": max(message_count, 0),
+                "cost_key": cost_key or queue,
+                "delayed": delayed,
+            }
+            self._queues_updated_at = datetime.now()
+
+    def _mean_cost(self, key: str) -> float:
+        samples = self._costs.get(key)
+        return statistics.fmean(samples) if samples else self._default_cost
+
+    def snapshot(self) -> Dict:
+        now = time.monotonic()
+        with self._lock:
+            in_flight = []
+            for slot_id, job in sorted(self._in_flight.items()):
+                elapsed = now - job["started"]
+                in_flight.append({
+                    "slot_id": slot_id,
+                    "job_id": job["job_id"],
+                    "elapsed_seconds": round(elapsed),
+                    "estimated_seconds": round(job["estimated_seconds"]),
+                    # Estourou a estimativa: o slot continua ocupado, mas
+                    # não há como saber por quanto tempo.
+                    "remaining_seconds": round(max(job["estimated_seconds"] - elapsed, 0.0)),
+                })
+
+            queues = {}
+            for name, observed in self._queues.items():
+                queues[name] = {
+                    "messages": observed["messages"],
+                    "estimated_seconds": round(observed["messages"] * self._mean_cost(observed["cost_key"])),
+                    "delayed": observed["delayed"],
+                }
+            updated_at = self._queues_updated_at
+
+        ready = [q for q in queues.values() if not q["delayed"]]
+        delayed = [q for q in queues.values() if q["delayed"]]
+        in_flight_remaining = sum(job["remaining_seconds"] for job in in_flight)
+        backlog_seconds = sum(q["estimated_seconds"] for q in ready)
+        return {
+            "worker_id": self.worker_id,
+            "timestamp": datetime.now().isoformat(),
+            "draining": self._draining(),
+            "slots_total": self.worker_slots,
+            "slots_free": self._free_slots(),
+            "in_flight": in_flight,
+            "in_flight_remaining_seconds": in_flight_remaining,
+            "backlog_messages": sum(q["messages"] for q in ready),
+            "backlog_seconds": backlog_seconds,
+            "delayed_messages": sum(q["messages"] for q in delayed),
+            "delayed_seconds": sum(q["estimated_seconds"] for q in delayed),
+            # Sinal principal para o autoscaler: trabalho pronto para rodar
+            # (fila + o que falta dos jobs em andamento), em segundos.
+            "work_seconds": in_flight_remaining + backlog_seconds,
+            "queues": queues,
+            "queues_updated_at": updated_at.isoformat() if updated_at else None,
+        }
+
+
+class CapacityServer:
+    """GET /capacity (JSON do CapacityTracker) e GET /healthz numa thread própria.
+
+    stdlib pura: o worker não tem framework HTTP e o endpoint é só leitura
+    de um snapshot em memória. Porta ocupada não derruba o worker — só
+    fica sem o sinal de capacidade.
+    """
+
+    def __init__(self, tracker: CapacityTracker, host: str, port: int):
+        self.tracker = tracker
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        tracker = self.tracker
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?", 1)[0].rstrip("/")
+                if path == "/capacity":
+                    self._reply(200, tracker.snapshot())
+                elif path == "/healthz":
+                    self._reply(200, {"status": "ok"})
+                else:
+                    self._reply(404, {"error": "not found"})
+
+            def _reply(self, status: int, payload: Dict) -> None:
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(f"capacity {self.address_string()} {format % args}")
+
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), _Handler)
+        except OSError as e:
+            logger.error(f"❌ Endpoint de capacidade indisponível em {self.host}:{self.port}: {e}")
+            return
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="capacity-http", daemon=True)
+        self._thread.start()
+        logger.info(f"📈 Endpoint de capacidade em http://{self.host}:{self.port}/capacity")
+
+    def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
@@ -0,0 +1,239 @@
+# src/core/coalescer.py
+import logging
+import threading
+import time
+from datetime import date, datetime
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from src.core.job_messages import parse_gms_date
+
+logger = logging.getLogger(__name__)
+
+# Filtros do export no GMS que precisam ser idênticos para dois jobs
+# compartilharem o mesmo arquivo. Lojas e período podem ser subconjunto.
+COALESCE_FILTERS = (
+    'document_type', 'emitter', 'operation_type', 'file_type',
+    'invoice_situation', 'gms_login_url', 'gms_user',
+)
+
+# Só estes resultados do líder servem para os seguidores; falha/cancelamento
+# do líder faz o seguidor rodar o próprio export.
+_SHAREABLE_STATUSES = ("completed", "completed_no_invoices")
+
+# Cadência com que o seguidor confere o próprio cancel_event enquanto espera.
+_FOLLOW_POLL_SECONDS = 1.0
+
+LogCallback = Callable[[str, str, str], object]
+
+
+def coalesce_key(bot_params: Dict) -> Tuple:
+    return tuple(bot_params.get(name) for name in COALESCE_FILTERS)
+
+
+class _Export:
+    """Um export do GMS em andamento (ou recém-concluído) e quem o lidera."""
+
+    def __init__(self, job_id: str, bot_params: Dict, key: Tuple, start: date, end: date):
+        self.job_id = job_id
+        self.key = key
+        self.stores: FrozenSet[str] = frozenset(str(s) for s in bot_params.get('stores') or [])
+        self.start = start
+        self.end = end
+        self.done = threading.Event()
+        self.result: Optional[Dict] = None
+        self.finished_at: Optional[float] = None
+        self.destination: Optional[str] = None
+        self.followers = 0
+
+    def covers(self, key: Tuple, stores: FrozenSet[str], start: date, end: date) -> bool:
+        return key == self.key and stores <= self.stores and self.start <= start and end <= self.end
+
+    def identical(self, stores: FrozenSet[str], start: date, end: date) -> bool:
+        return stores == self.stores and start == self.start and end == self.end
+
+
+class ExportCoalescer:
+    """Junta jobs cujo export é igual ou está contido no de outro job.
+
+    O primeiro job de um conjunto de filtros vira líder e roda o export; os
+    que chegam depois com os mesmos filtros e lojas/período contidos no do
+    líder viram seguidores: esperam o líder (sem abrir navegador) e
+    finalizam apontando para a mesma saída em PROCESSED_DIR. Cada job_id
+    continua tendo o próprio finish.
+
+    Além dos exports em andamento, o resultado de um líder concluído fica
+    disponível por reuse_seconds — cobre a rajada de pedidos repetidos com
+    WORKER_SLOTS=1, em que os jobs nunca estão em execução ao mesmo tempo.
+    Períodos que incluem o dia de hoje não são reaproveitados depois de
+    concluídos: o GMS ainda está recebendo notas desse dia. Concluído cuja
+    pasta de destino foi reescrita por outro export deste worker também sai
+    da lista.
+
+    Vale para um processo de worker; jobs em outros workers não se enxergam.
+    """
+
+    def __init__(self, reuse_seconds: float = 0.0):
+        self.reuse_seconds = reuse_seconds
+        self._lock = threading.Lock()
+        self._exports: List[_Export] = []
+
+    def run(
+        self,
+        job_id: str,
+        bot_params: Dict,
+        execute: Callable[[], Dict],
+        cancel_event: Optional[threading.Event] = None,
+        log_callback: Optional[LogCallback] = None,
+        suspend_event: Optional[threading.Event] = None,
+    ) -> Dict:
+        """Roda execute() como líder ou devolve o resultado de um líder.
+
+        Bloqueia a thread que chama (slot do worker). Exceções de execute()
+        propagam; os seguidores desse líder passam a rodar o próprio export.
+        """
+        try:
+            key = coalesce_key(bot_params)
+            start = parse_gms_date(bot_params.get('start_date')).date()
+            end = parse_gms_date(bot_params.get('end_date')).date()
+        except (TypeError, ValueError):
+            # Período inválido: o bot reporta o erro; não há o que juntar.
+            return execute()
+        stores = frozenset(str(s) for s in bot_params.get('stores') or [])
+
+        while True:
+            export, leader = self._claim(job_id, bot_params, key, stores, start, end)
+            if leader:
+                return self._lead(export, execute)
+
+            result = self._follow(export, job_id, stores, start, end, cancel_event, log_callback, suspend_event)
+            if result is not None:
+                return result
+            # Líder falhou ou foi cancelado: volta a disputar (outro seguidor
+            # pode já ter assumido como líder).
+            if log_callback:
+                log_callback(job_id, "WARNING", f"Export compartilhado do job {export.job_id} não concluiu. Executando export próprio.")
+
+    def _claim(self, job_id, bot_params, key, stores, start, end) -> Tuple[_Export, bool]:
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            for export in self._exports:
+                if export.covers(key, stores, start, end) and self._joinable(export):
+                    export.followers += 1
+                    return export, False
+            export = _Export(job_id, bot_params, key, start, end)
+            self._exports.append(export)
+            return export, True
+
+    def _joinable(self, export: _Export) -> bool:
+        if not export.done.is_set():
+            return True
+        if export.result is None or export.result.get("status") not in _SHAREABLE_STATUSES:
+            return False
+        return export.end < date.today()
+
+    def _prune(self, now: float) -> None:
+        self._exports = [
+            export for export in self._exports
+            if not export.done.is_set()
+            or (export.finished_at is not None and now - export.finished_at < self.reuse_seconds and self._joinable(export))
+        ]
+
+    def _lead(self, export: _Export, execute: Callable[[], Dict]) -> Dict:
+        result = None
+        try:
+            result = execute()
+            return result
+        finally:
+            with self._lock:
+                export.result = result
+                export.finished_at = time.monotonic()
+                export.done.set()
+                export.destination = ((result or {}).get("summary") or {}).get("destination")
+                if export.destination:
+                    # A pasta em processed/ é por tipo e período, não por
+                    # lojas: este export acabou de reescrevê-la, então os
+                    # concluídos que apontavam para ela não valem mais.
+                    self._exports = [
+                        other for other in self._exports
+                        if other is export or not other.done.is_set() or other.destination != export.destination
+                    ]
+            if export.followers:
+                logger.info(f"🔗 Export do job {export.job_id} compartilhado com {export.followers} job(s)")
+
+    def _follow(
+        self,
+        export: _Export,
+        job_id: str,
+        stores: FrozenSet[str],
+        start: date,
+        end: date,
+        cancel_event: Optional[threading.Event],
+        log_callback: Optional[LogCallback],
+        suspend_event: Optional[threading.Event] = None,
+    ) -> Optional[Dict]:
+        started = datetime.now()
+        identical = export.identical(stores, start, end)
+        logger.info(f"🔗 Job {job_id} aproveita o export do job {export.job_id} ({'idêntico' if identical else 'contido'})")
+        if log_callback:
+            if export.done.is_set():
+                log_callback(job_id, "INFO", f"Reaproveitando o export recém-concluído do job {export.job_id} (mesmos filtros).")
+            else:
+                log_callback(job_id, "INFO", f"Export equivalente já em andamento (job {export.job_id}). Aguardando o resultado compartilhado...")
+
+        while not export.done.wait(_FOLLOW_POLL_SECONDS):
+            if suspend_event is not None and suspend_event.is_set():
+                with self._lock:
+                    export.followers -= 1
+                return self._suspended(started, export)
+            if cancel_event is not None and cancel_event.is_set():
+                with self._lock:
+                    export.followers -= 1
+                finished = datetime.now()
+                return {
+                    "status": "canceled",
+                    "started_at": started.isoformat(),
+                    "completed_at": finished.isoformat(),
+                    "duration_seconds": (finished - started).total_seconds(),
+                    "stage": "aguardando_export_compartilhado",
+                    "coalesced_with": export.job_id,
+                }
+
+        leader_result = export.result
+        if leader_result is not None and leader_result.get("status") == "suspended":
+            # Worker em drain: o seguidor volta pra fila junto com o líder
+            # em vez de assumir um export novo.
+            with self._lock:
+                export.followers -= 1
+            return self._suspended(started, export)
+        if leader_result is None or leader_result.get("status") not in _SHAREABLE_STATUSES:
+            with self._lock:
+                export.followers -= 1
+            return None
+
+        finished = datetime.now()
+        summary = leader_result.get("summary") or {}
+        return {
+            "status": leader_result["status"],
+            "started_at": started.isoformat(),
+            "completed_at": finished.isoformat(),
+            "duration_seconds": (finished - started).total_seconds(),
+            "summary": summary,
+            "error": None,
+            "coalesced_with": export.job_id,
+            "coalesced_subset": not identical,
+            "destination": summary.get("destination"),
+        }
+
+    @staticmethod
+    def _suspended(started: datetime, export: _Export) -> Dict:
+        finished = datetime.now()
+        return {
+            "status": "suspended",
+            "started_at": started.isoformat(),
+            "completed_at": finished.isoformat(),
+            "duration_seconds": (finished - started).total_seconds(),
+            "stage": "aguardando_export_compartilhado",
+            "checkpoint": None,
+            "coalesced_with": export.job_id,
+        }
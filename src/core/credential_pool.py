@@ -0,0 +1,334 @@
+# src/core/credential_pool.py
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from config import settings
+from src.utils.exceptions import CredentialUnavailableError
+from src.utils.sqlite_store import connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS gms_account_leases (
+    lease_id TEXT PRIMARY KEY,
+    account TEXT NOT NULL,
+    job_id TEXT,
+    holder TEXT,
+    acquired_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_gms_account_leases_account ON gms_account_leases (account, expires_at);
+CREATE TABLE IF NOT EXISTS gms_account_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_gms_account_events_account ON gms_account_events (account, at);
+"""
+
+# Lease vence se não for renovado: processo morto (kill da árvore, OOM)
+# devolve a conta sozinho. A renovação roda a cada 1/3 do prazo.
+_LEASE_SECONDS = 300.0
+
+# Cadência com que um job sem conta livre tenta de novo.
+_ACQUIRE_POLL_SECONDS = 5.0
+
+# Histórico de logins guardado (rate limit e falhas olham a última hora).
+_EVENTS_MAX_AGE_SECONDS = 24 * 3600
+
+EVENT_LOGIN = "login"
+EVENT_LOGIN_OK = "login_ok"
+EVENT_LOGIN_FAILED = "login_failed"
+
+
+class GmsAccount(NamedTuple):
+    user: str
+    password: str
+    # O GMS processa um export por vez por conta: acima disso os jobs só
+    # fazem fila dentro do GMS.
+    max_concurrent: int = 1
+    max_logins_per_hour: int = 0
+
+
+def parse_accounts(raw: List[Dict]) -> List[GmsAccount]:
+    accounts = []
+    for entry in raw or []:
+        user = entry.get("user") or entry.get("gms_user")
+        password = entry.get("password") or entry.get("gms_password")
+        if not user or not password:
+            raise ValueError("Cada conta de GMS_ACCOUNTS precisa de 'user' e 'password'")
+        accounts.append(GmsAccount(
+            user=str(user),
+            password=str(password),
+            max_concurrent=max(int(entry.get("max_concurrent", 1)), 1),
+            max_logins_per_hour=max(int(entry.get("max_logins_per_hour", 0)), 0),
+        ))
+    return accounts
+
+
+class CredentialLease:
+    """Conta GMS reservada para um job; renova o lease até release()."""
+
+    def __init__(self, pool: "CredentialPool", lease_id: str, account: GmsAccount):
+        self.pool = pool
+        self.lease_id = lease_id
+        self.account = account
+        self._released = threading.Event()
+        self._renewer = threading.Thread(target=self._renew_loop, name=f"gms-lease-{account.user}", daemon=True)
+        self._renewer.start()
+
+    @property
+    def user(self) -> str:
+        return self.account.user
+
+    @property
+    def password(self) -> str:
+        return self.account.password
+
+    def _renew_loop(self) -> None:
+        while not self._released.wait(_LEASE_SECONDS / 3):
+            try:
+                self.pool._renew(self.lease_id)
+            except Exception as e:
+                logger.warning(f"⚠️ Falha ao renovar o uso da conta GMS {self.user}: {e}")
+
+    def login_attempted(self) -> None:
+        self.pool.record_login(self.user)
+
+    def login_succeeded(self) -> None:
+        self.pool._record(self.user, EVENT_LOGIN_OK)
+
+    def login_failed(self) -> None:
+        self.pool._record(self.user, EVENT_LOGIN_FAILED)
+
+    def release(self) -> None:
+        if self._released.is_set():
+            return
+        self._released.set()
+        self.pool._release(self.lease_id)
+
+
+class CredentialPool:
+    """Distribui as contas do GMS entre os jobs de todos os workers do host.
+
+    O GMS serializa os exports de uma mesma conta: com uma conta só, mais
+    workers não dão mais vazão de export. Cada job pega a conta com menos
+    exports em andamento (leases), desempatando por falhas de login
+    recentes e pela que está parada há mais tempo. Ficam de fora:
+
+    - contas no limite de max_concurrent;
+    - contas com max_failures falhas de login seguidas, até passar
+      failure_cooldown_seconds da última (senha trocada/bloqueio não vira
+      rajada de logins errados);
+    - contas que já fizeram max_logins_per_hour logins na última hora.
+
+    O estado fica em SQLite (WAL) num arquivo que os workers do host (e os
+    processos filhos do JOB_ISOLATION=process) compartilham; a escolha e a
+    reserva são uma transação só (BEGIN IMMEDIATE), sem corrida entre
+    processos. Sem conta livre, o job espera até wait_seconds; depois disso
+    divide a conta menos carregada acima do limite — o export fica na fila
+    do GMS, mas o job não falha por isso.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        accounts: List[GmsAccount],
+        wait_seconds: float = 600.0,
+        failure_cooldown_seconds: float = 900.0,
+        max_failures: int = 3,
+    ):
+        if not accounts:
+            raise ValueError("Pool de contas GMS vazio")
+        self.path = Path(path)
+        self.accounts = {account.user: account for account in accounts}
+        self.wait_seconds = wait_seconds
+        self.failure_cooldown_seconds = failure_cooldown_seconds
+        self.max_failures = max_failures
+        self.holder = f"{socket.gethostname()}:{os.getpid()}"
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(self.path)
+        self._conn.executescript(_SCHEMA)
+
+    def acquire(
+        self,
+        job_id: Optional[str],
+        preferred: Optional[str] = None,
+        interrupted: Optional[Callable[[], bool]] = None,
+    ) -> Optional[CredentialLease]:
+        """Reserva uma conta para o job; None se interrupted() ficou True
+        durante a espera. Levanta CredentialUnavailableError se todas as
+        contas estão em quarentena por falha de login ou no limite de logins
+        por hora.
+
+        preferred (conta de um checkpoint) é esperada pelo prazo todo antes
+        de aceitar outra: o export já pedido ao GMS só aparece para ela.
+        """
+        deadline = time.monotonic() + self.wait_seconds
+        waiting_logged = False
+        while True:
+            over_limit = time.monotonic() >= deadline
+            lease = self._try_acquire(job_id, preferred if not over_limit else None, over_limit)
+            if lease is not None:
+                return lease
+            if over_limit:
+                raise CredentialUnavailableError("Nenhuma conta GMS disponível: todas em quarentena por falha de login ou no limite de logins por hora")
+            if not waiting_logged:
+                logger.info(f"⏳ Todas as contas GMS ocupadas. Aguardando uma conta livre (até {self.wait_seconds:.0f}s)...")
+                waiting_logged = True
+            stop_at = time.monotonic() + _ACQUIRE_POLL_SECONDS
+            while time.monotonic() < stop_at:
+                if interrupted is not None and interrupted():
+                    return None
+                time.sleep(0.5)
+
+    def try_acquire(self, user: str, job_id: Optional[str] = None) -> Optional[CredentialLease]:
+        """Reserva user agora, sem esperar; None se a conta não é do pool, está
+        no limite de concorrência, em quarentena ou no limite de logins."""
+        if user not in self.accounts:
+            return None
+        return self._try_acquire(job_id, user, over_limit=False)
+
+    def _try_acquire(self, job_id: Optional[str], preferred: Optional[str], over_limit: bool) -> Optional[CredentialLease]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM gms_account_leases WHERE expires_at < ?", (now,))
+                candidates = []
+                for state in self._states(now):
+                    account = self.accounts[state["user"]]
+                    if preferred and state["user"] != preferred and preferred in self.accounts:
+                        continue
+                    if state["cooling_down"] or state["rate_limited"]:
+                        continue
+                    if state["in_flight"] >= account.max_concurrent and not over_limit:
+                        continue
+                    candidates.append(state)
+                if not candidates:
+                    self._conn.execute("COMMIT")
+                    return None
+                chosen = min(
+                    candidates,
+                    key=lambda s: (s["in_flight"] / self.accounts[s["user"]].max_concurrent, s["recent_failures"], s["last_acquired_at"]),
+                )
+                lease_id = str(uuid.uuid4())
+                self._conn.execute(
+                    """
+                    INSERT INTO gms_account_leases (lease_id, account, job_id, holder, acquired_at, expires_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    (lease_id, chosen["user"], job_id, self.holder, now, now + _LEASE_SECONDS),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if over_limit and chosen["in_flight"] >= self.accounts[chosen["user"]].max_concurrent:
+            logger.warning(f"⚠️ Conta GMS {chosen['user']} compartilhada acima do limite: nenhuma conta livre no prazo de espera")
+        logger.info(f"🔑 Conta GMS {chosen['user']} reservada para o job {job_id} ({chosen['in_flight']} export(s) em andamento nela)")
+        return CredentialLease(self, lease_id, self.accounts[chosen["user"]])
+
+    def _states(self, now: float) -> List[Dict]:
+        """Carga e saúde de cada conta (dentro da transação de _try_acquire)."""
+        hour_ago = now - 3600
+        states = []
+        for user, account in self.accounts.items():
+            in_flight, last_acquired = self._conn.execute(
+                "SELECT COUNT(*), MAX(acquired_at) FROM gms_account_leases WHERE account = ?", (user,)
+            ).fetchone()
+            logins = self._conn.execute(
+                "SELECT COUNT(*) FROM gms_account_events WHERE account = ? AND kind = ? AND at >= ?",
+                (user, EVENT_LOGIN, hour_ago),
+            ).fetchone()[0]
+            recent_failures = self._conn.execute(
+                "SELECT COUNT(*) FROM gms_account_events WHERE account = ? AND kind = ? AND at >= ?",
+                (user, EVENT_LOGIN_FAILED, hour_ago),
+            ).fetchone()[0]
+            # Falhas seguidas: as posteriores ao último login bem-sucedido.
+            last_ok = self._conn.execute(
+                "SELECT MAX(at) FROM gms_account_events WHERE account = ? AND kind = ?",
+                (user, EVENT_LOGIN_OK),
+            ).fetchone()[0] or 0.0
+            streak, last_failure = self._conn.execute(
+                "SELECT COUNT(*), MAX(at) FROM gms_account_events WHERE account = ? AND kind = ? AND at > ?",
+                (user, EVENT_LOGIN_FAILED, last_ok),
+            ).fetchone()
+            states.append({
+                "user": user,
+                "in_flight": in_flight,
+                "last_acquired_at": last_acquired or 0.0,
+                "recent_failures": recent_failures,
+                "cooling_down": bool(
+                    self.max_failures
+                    and streak >= self.max_failures
+                    and last_failure is not None
+                    and now - last_failure < self.failure_cooldown_seconds
+                ),
+                "rate_limited": bool(account.max_logins_per_hour and logins >= account.max_logins_per_hour),
+            })
+        return states
+
+    def stats(self) -> List[Dict]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM gms_account_leases WHERE expires_at < ?", (now,))
+            return self._states(now)
+
+    def _renew(self, lease_id: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE gms_account_leases SET expires_at = ? WHERE lease_id = ?",
+                (time.time() + _LEASE_SECONDS, lease_id),
+            )
+
+    def _release(self, lease_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM gms_account_leases WHERE lease_id = ?", (lease_id,))
+
+    def record_login(self, user: str) -> None:
+        """Login pelo formulário prestes a acontecer (conta o max_logins_per_hour).
+
+        Não é registrado no acquire: o job pode pegar um navegador do pool já
+        logado ou reaproveitar a sessão salva, e aí não há login no GMS.
+        """
+        if user in self.accounts:
+            self._record(user, EVENT_LOGIN)
+
+    def _record(self, user: str, kind: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT INTO gms_account_events (account, kind, at) VALUES (?, ?, ?)", (user, kind, now))
+            self._conn.execute("DELETE FROM gms_account_events WHERE at < ?", (now - _EVENTS_MAX_AGE_SECONDS,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_shared_pool: Optional[CredentialPool] = None
+_shared_pool_lock = threading.Lock()
+
+
+def shared_credential_pool() -> Optional[CredentialPool]:
+    """Pool do processo a partir de settings.gms_accounts; None sem contas."""
+    global _shared_pool
+    if not settings.gms_accounts:
+        return None
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = CredentialPool(
+                Path(settings.gms_account_pool_path) if settings.gms_account_pool_path else settings.DATA_DIR / "gms_accounts.sqlite3",
+                parse_accounts(settings.gms_accounts),
+                wait_seconds=settings.gms_account_wait_seconds,
+                failure_cooldown_seconds=settings.gms_account_failure_cooldown_seconds,
+                max_failures=settings.gms_account_max_login_failures,
+            )
+        return _shared_pool
@@ -0,0 +1,491 @@
+# src/core/export_pipeline.py
+import itertools
+import logging
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from config import settings
+from src.automation.browser_handler import BrowserHandler
+from src.automation.gms_session import open_export_screen, wait_rate_limit
+from src.automation.page_objects.export_page import ExportPage
+from src.core.credential_pool import CredentialLease
+from src.utils.circuit_breaker import shared_circuit_breaker
+from src.utils.exceptions import GmsUnavailableError, JobCanceledException, JobSuspendedException, NoInvoicesFoundException
+from src.utils.rate_limiter import ACTION_EXPORT
+
+logger = logging.getLogger(__name__)
+
+# Mesmo ritmo e limite do wait_for_export_completion de um job sozinho.
+_POLL_SECONDS = 30.0
+_EXPORT_TIMEOUT_SECONDS = 180 * 60
+
+# Depois de enviar um export, quantas leituras da tabela esperar a linha
+# nova aparecer (a assinatura dela é o que identifica o job na tabela).
+_NEW_ROW_ATTEMPTS = 5
+
+# Falhas seguidas da sessão (Chrome/tabela) antes de desistir dos exports
+# estacionados; abaixo disso a sessão é reaberta e eles são relocalizados.
+_MAX_SESSION_FAILURES = 3
+
+# Leituras seguidas sem a linha do export nas primeiras linhas da tabela
+# (empurrada por outros exports da conta ou apagada) antes de desistir:
+# ~5min no ritmo de _POLL_SECONDS.
+_MISSING_ROW_POLLS = 10
+
+STATE_QUEUED = "queued"
+STATE_SUBMITTING = "submitting"
+STATE_PARKED = "parked"
+STATE_DOWNLOADING = "downloading"
+STATE_DONE = "done"
+
+_pipeline_ids = itertools.count()
+
+
+class ExportTicket:
+    """Um export de job na fila de uma sessão compartilhada do GMS.
+
+    O slot do job fica em wait(); a thread da sessão envia o export, estaciona
+    o ticket enquanto o GMS processa e, ao concluir, baixa os arquivos no
+    pending_dir do job. Cancelamento e drain são vistos no wait() (o slot
+    larga o ticket e a sessão o descarta na volta seguinte).
+    """
+
+    def __init__(
+        self,
+        job_id: str,
+        export_args: Dict,
+        pending_dir: Path,
+        cancel_event: threading.Event,
+        suspend_event: threading.Event,
+        resume_row: Optional[List[str]] = None,
+        lease: Optional[CredentialLease] = None,
+    ):
+        self.job_id = job_id
+        self.export_args = export_args
+        self.pending_dir = Path(pending_dir)
+        self.cancel_event = cancel_event
+        self.suspend_event = suspend_event
+        self.resume_row = resume_row
+        self.lease = lease
+        self.signature: Optional[Tuple[str, ...]] = None
+        self.parked_at: Optional[float] = None
+        self.missing_polls = 0
+        self.state = STATE_QUEUED
+        self.abandoned = False
+        self.error: Optional[BaseException] = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def claim(self, state: str) -> bool:
+        """Passa o ticket para state, se o slot ainda não o largou."""
+        with self._lock:
+            if self.abandoned or self._done.is_set():
+                return False
+            self.state = state
+            return True
+
+    def park(self, signature: Tuple[str, ...]) -> None:
+        with self._lock:
+            self.signature = signature
+            self.parked_at = self.parked_at or time.monotonic()
+            self.state = STATE_PARKED
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self.error = error
+            self.state = STATE_DONE
+            self._done.set()
+
+    def checkpoint(self) -> Optional[Dict]:
+        if self.signature is None:
+            return None
+        return {"stage": "wait_for_export_completion", "export_row": list(self.signature)}
+
+    def wait(self, on_state: Optional[Callable[[str], None]] = None) -> None:
+        """Bloqueia até os arquivos estarem no pending_dir; levanta o erro do
+        export, JobCanceledException ou JobSuspendedException."""
+        seen = None
+        while not self._done.wait(1.0):
+            with self._lock:
+                state = self.state
+                if self.cancel_event.is_set():
+                    self.abandoned = True
+                    raise JobCanceledException("wait_for_export_completion" if state == STATE_PARKED else "export_pipeline")
+                # Só larga o ticket para o drain fora do GMS (na fila ou
+                # estacionado); envio e download terminam antes.
+                if self.suspend_event.is_set() and state in (STATE_QUEUED, STATE_PARKED):
+                    self.abandoned = True
+                    raise JobSuspendedException(
+                        "wait_for_export_completion" if state == STATE_PARKED else "export_pipeline",
+                        self.checkpoint() or (
+                            {"stage": "wait_for_export_completion", "export_row": self.resume_row}
+                            if self.resume_row else None
+                        ),
+                    )
+            if state != seen and on_state:
+                on_state(state)
+            seen = state
+        if self.error is not None:
+            raise self.error
+
+
+class ExportPipeline:
+    """Sessão do GMS (um Chrome, um login) que intercala os exports de vários jobs.
+
+    A maior parte do tempo de um job é o wait_for_export_completion: 30s de
+    sleep, refresh e leitura de uma linha, por até 180min, com o Chrome e o
+    slot parados. Aqui jobs da mesma conta e host entregam o export a uma
+    thread dona da sessão, que envia o de A, estaciona A e já envia o de B e C
+    pelo mesmo navegador; a cada 30s uma única leitura da tabela acompanha
+    todos e o que virar "Concluído" é baixado para o pending do job. O GMS
+    processa vários exports em paralelo com um login só.
+
+    A linha de cada export na tabela é achada pela assinatura (as colunas
+    menos o status), como na retomada por checkpoint: exports novos empurram
+    os antigos para baixo. Sem tickets por idle_seconds, a sessão fecha.
+    """
+
+    def __init__(
+        self,
+        login_url: str,
+        user: str,
+        password: str,
+        selectors: Dict,
+        headless: bool,
+        max_in_flight: int,
+        idle_seconds: float,
+        on_close: Callable[["ExportPipeline"], None],
+    ):
+        self.login_url = login_url
+        self.user = user
+        self.password = password
+        self.selectors = selectors
+        self.headless = headless
+        self.max_in_flight = max_in_flight
+        self.idle_seconds = idle_seconds
+        self.host = urlparse(login_url).hostname
+        self.name = f"export-pipeline-{next(_pipeline_ids)}"
+        self.download_dir = settings.PENDING_DIR / self.name
+        self._on_close = on_close
+        self._tickets: List[ExportTicket] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closing = False
+        self._browser: Optional[BrowserHandler] = None
+        self._export_page: Optional[ExportPage] = None
+        self._session_failures = 0
+        self._next_poll = 0.0
+        self._last_used = time.monotonic()
+        self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+        self._thread.start()
+
+    def offer(self, ticket: ExportTicket) -> bool:
+        """Aceita o ticket; False se a sessão já está fechando."""
+        with self._lock:
+            if self._closing:
+                return False
+            self._tickets.append(ticket)
+        self._wakeup.set()
+        return True
+
+    def _live_tickets(self) -> List[ExportTicket]:
+        with self._lock:
+            self._tickets = [t for t in self._tickets if not (t.abandoned or t.state == STATE_DONE)]
+            return list(self._tickets)
+
+    def _loop(self) -> None:
+        idle_since = time.monotonic()
+        try:
+            while True:
+                tickets = self._live_tickets()
+                if not tickets:
+                    if time.monotonic() - idle_since >= self.idle_seconds:
+                        with self._lock:
+                            if not self._tickets:
+                                self._closing = True
+                                break
+                        continue
+                    self._wakeup.wait(1.0)
+                    self._wakeup.clear()
+                    continue
+                idle_since = time.monotonic()
+                self._step(tickets)
+                self._wakeup.wait(min(max(self._next_poll - time.monotonic(), 0.2), 1.0))
+                self._wakeup.clear()
+        finally:
+            self._close_session()
+            self._on_close(self)
+            logger.info(f"📦 Sessão compartilhada do GMS ({self.user}@{self.host}) encerrada")
+
+    def _step(self, tickets: List[ExportTicket]) -> None:
+        try:
+            self._ensure_session(tickets)
+        except Exception as e:
+            # Sem login (GMS fora, credencial, Chrome) não há como seguir:
+            # todos falham na hora, como falhariam sozinhos.
+            logger.error(f"❌ Não foi possível abrir a sessão compartilhada do GMS: {e}")
+            self._close_session()
+            for ticket in tickets:
+                ticket.finish(e)
+            return
+
+        try:
+            answered = False
+            parked = [t for t in tickets if t.state == STATE_PARKED]
+            for ticket in tickets:
+                if ticket.state == STATE_QUEUED and len(parked) < self.max_in_flight:
+                    if self._submit(ticket):
+                        parked.append(ticket)
+                        answered = True
+            if parked and time.monotonic() >= self._next_poll:
+                self._poll(parked)
+                self._next_poll = time.monotonic() + _POLL_SECONDS
+                answered = True
+            if answered:
+                self._record_host_success()
+            self._session_failures = 0
+            self._last_used = time.monotonic()
+        except Exception as e:
+            # Erro de tabela/Chrome: a sessão é reaberta na próxima volta e
+            # os estacionados são relocalizados pela assinatura, até o limite.
+            self._session_failures += 1
+            logger.error(f"❌ Falha na sessão compartilhada do GMS ({self._session_failures}/{_MAX_SESSION_FAILURES}): {e}")
+            self._close_session()
+            if self._session_failures >= _MAX_SESSION_FAILURES:
+                for ticket in self._live_tickets():
+                    ticket.finish(e)
+                self._session_failures = 0
+
+    def _ensure_session(self, tickets: List[ExportTicket]) -> None:
+        # Sessão ociosa pode ter expirado no GMS: confere antes de enviar.
+        if self._export_page is not None and time.monotonic() - self._last_used > _POLL_SECONDS:
+            try:
+                self._export_page.refresh_export_table("export_pipeline")
+            except Exception as e:
+                logger.warning(f"Sessão compartilhada do GMS expirada ({e}). Reabrindo...")
+                self._close_session()
+            else:
+                self._record_host_success()
+        if self._export_page is None:
+            self._open_session(tickets)
+
+    def _record_host_success(self) -> None:
+        # Sessão já aberta não passa pelo login: um job sonda do circuito
+        # meio-aberto atendido por ela tem a resposta do GMS aqui. Falhas
+        # fecham a sessão e a reabertura (open_export_screen) as registra.
+        breaker = shared_circuit_breaker()
+        if breaker is not None:
+            breaker.record_success(self.host)
+
+    def _open_session(self, tickets: List[ExportTicket]) -> None:
+        # Os jobs já passaram pelo admit() do worker (um deles pode ser a
+        # sonda): aqui só não se abre o Chrome com o circuito aberto.
+        breaker = shared_circuit_breaker()
+        wait = breaker.blocked_for(self.host) if breaker else None
+        if wait is not None:
+            raise GmsUnavailableError(f"Circuito do GMS {self.host} aberto; nova tentativa em {wait:.0f}s")
+        logger.info(f"📦 Abrindo sessão compartilhada do GMS ({self.user}@{self.host})")
+        self.download_dir.mkdir(parents=True, exist_ok=True)
+        browser = BrowserHandler(headless=self.headless, download_dir=self.download_dir)
+        self._browser = browser
+        driver = browser.start_browser()
+        if not driver:
+            raise ConnectionError("Driver do navegador não foi inicializado.")
+
+        # O login conta no lease de um dos jobs (todos são da mesma conta):
+        # falha de credencial põe a conta em cooldown como no caminho solo.
+        lease = next((t.lease for t in tickets if t.lease is not None), None)
+        open_export_screen(
+            driver, self.selectors, self.login_url, self.user, self.password,
+            lease=lease,
+            breaker=breaker,
+        )
+
+        self._export_page = ExportPage(
+            driver,
+            self.selectors.get('export_page', {}),
+            pending_dir=self.download_dir,
+            throttle=lambda action, stage: wait_rate_limit(self.host, action),
+        )
+        # Sessão nova: a próxima volta já lê a tabela (exports estacionados
+        # numa sessão anterior são relocalizados pela assinatura).
+        self._next_poll = 0.0
+        self._last_used = time.monotonic()
+
+    def _close_session(self) -> None:
+        self._export_page = None
+        if self._browser is not None:
+            try:
+                self._browser.close_browser()
+            except Exception as e:
+                logger.debug(f"Falha ao fechar o navegador da sessão compartilhada: {e}")
+            self._browser = None
+
+    def _known_signatures(self) -> set:
+        with self._lock:
+            return {t.signature for t in self._tickets if t.signature is not None}
+
+    def _submit(self, ticket: ExportTicket) -> bool:
+        if not ticket.claim(STATE_SUBMITTING):
+            return False
+        try:
+            return self._submit_claimed(ticket)
+        except Exception as e:
+            # Popup meio preenchido ou tabela ilegível: a sessão é refeita e o
+            # job falha como falharia sozinho.
+            ticket.finish(e)
+            raise
+
+    def _submit_claimed(self, ticket: ExportTicket) -> bool:
+        page = self._export_page
+        if ticket.resume_row:
+            statuses = page.export_statuses()
+            if tuple(ticket.resume_row) in statuses:
+                logger.info(f"♻️ Job {ticket.job_id}: retomando a exportação existente na sessão compartilhada")
+                ticket.park(tuple(ticket.resume_row))
+                return True
+            logger.warning(f"Job {ticket.job_id}: exportação do checkpoint não encontrada na tabela do GMS.")
+
+        known = self._known_signatures()
+        wait_rate_limit(self.host, ACTION_EXPORT)
+        args = ticket.export_args
+        try:
+            page.export_data(
+                args['document_type'], args['emitter'], args['operation_type'], args['file_type'],
+                args['invoice_situation'], args['start_date'], args['end_date'], args['stores'],
+            )
+        except NoInvoicesFoundException as e:
+            ticket.finish(e)
+            # Fecha o popup para o próximo export.
+            page.refresh_export_table("export_data")
+            return False
+
+        for _attempt in range(_NEW_ROW_ATTEMPTS):
+            signature = page.newest_export_signature()
+            if signature is not None and tuple(signature) not in known:
+                ticket.park(tuple(signature))
+                logger.info(f"📦 Job {ticket.job_id}: export enviado e estacionado na sessão compartilhada")
+                return True
+            time.sleep(2)
+            page.refresh_export_table("export_data")
+        ticket.finish(RuntimeError("A exportação enviada não apareceu na tabela do GMS."))
+        return False
+
+    def _poll(self, parked: List[ExportTicket]) -> None:
+        page = self._export_page
+        page.refresh_export_table()
+        statuses = page.export_statuses()
+        refreshed = True
+        for ticket in parked:
+            if ticket.abandoned:
+                continue
+            # Antes da checagem de visibilidade: linha que sumiu da tabela
+            # também precisa estourar o prazo, senão o wait() do slot não sai.
+            if time.monotonic() - ticket.parked_at > _EXPORT_TIMEOUT_SECONDS:
+                ticket.finish(TimeoutError(f"A exportação não foi concluída no tempo limite de {_EXPORT_TIMEOUT_SECONDS // 60} minutos."))
+                continue
+            if ticket.signature not in statuses:
+                ticket.missing_polls += 1
+                if ticket.missing_polls >= _MISSING_ROW_POLLS:
+                    logger.error(f"❌ Job {ticket.job_id}: exportação sumiu da tabela do GMS por {ticket.missing_polls} leituras.")
+                    ticket.finish(TimeoutError(
+                        f"A exportação não aparece nas primeiras linhas da tabela do GMS "
+                        f"há {ticket.missing_polls} leituras."
+                    ))
+                else:
+                    logger.info(f"Job {ticket.job_id}: exportação ainda não visível na tabela. Aguardando...")
+                continue
+            ticket.missing_polls = 0
+            status = statuses[ticket.signature][1]
+            if "com Erro" in status:
+                logger.error(f"❌ Job {ticket.job_id}: a exportação retornou o status 'Com erro'.")
+                ticket.finish(Exception("A exportação retornou o status 'Com erro'."))
+            elif "Concluído" in status:
+                if not refreshed:
+                    # O download anterior deixou a linha dele marcada.
+                    page.refresh_export_table()
+                    statuses = page.export_statuses()
+                    if ticket.signature not in statuses:
+                        continue
+                self._download(ticket, statuses[ticket.signature][0])
+                refreshed = False
+            else:
+                logger.info(f"⏳ Job {ticket.job_id}: exportação '{status}'")
+
+    def _download(self, ticket: ExportTicket, index: int) -> None:
+        if not ticket.claim(STATE_DOWNLOADING):
+            return
+        logger.info(f"✅ Job {ticket.job_id}: exportação concluída, baixando...")
+        page = self._export_page
+        page.follow_export(index, list(ticket.signature))
+        try:
+            page.download_exports()
+            ticket.pending_dir.mkdir(parents=True, exist_ok=True)
+            ExportPage.clear_download_dir(ticket.pending_dir)
+            for path in list(self.download_dir.glob('*')):
+                shutil.move(str(path), str(ticket.pending_dir / path.name))
+        except Exception as e:
+            ticket.finish(e)
+            raise
+        ticket.finish()
+
+
+class ExportPipelines:
+    """Sessões compartilhadas por (host, conta, headless) do processo."""
+
+    def __init__(self, max_in_flight: int, idle_seconds: float):
+        self.max_in_flight = max_in_flight
+        self.idle_seconds = idle_seconds
+        self._pipelines: Dict[Tuple, ExportPipeline] = {}
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        login_url: str,
+        user: str,
+        password: str,
+        selectors: Dict,
+        headless: bool,
+        ticket: ExportTicket,
+    ) -> ExportTicket:
+        key = (login_url, user, headless)
+        with self._lock:
+            pipeline = self._pipelines.get(key)
+            if pipeline is None or not pipeline.offer(ticket):
+                pipeline = ExportPipeline(
+                    login_url, user, password, selectors, headless,
+                    self.max_in_flight, self.idle_seconds,
+                    on_close=lambda closed, key=key: self._forget(key, closed),
+                )
+                self._pipelines[key] = pipeline
+                pipeline.offer(ticket)
+        return ticket
+
+    def _forget(self, key: Tuple, pipeline: ExportPipeline) -> None:
+        with self._lock:
+            if self._pipelines.get(key) is pipeline:
+                del self._pipelines[key]
+        shutil.rmtree(pipeline.download_dir, ignore_errors=True)
+
+
+_shared_pipelines: Optional[ExportPipelines] = None
+_shared_pipelines_lock = threading.Lock()
+
+
+def shared_export_pipelines() -> Optional[ExportPipelines]:
+    """Sessões do processo; None com o pipeline desligado ou jobs em processo
+    filho (cada filho tem um job só, não há o que intercalar)."""
+    global _shared_pipelines
+    if not settings.export_pipelining or settings.job_isolation != "thread":
+        return None
+    with _shared_pipelines_lock:
+        if _shared_pipelines is None:
+            _shared_pipelines = ExportPipelines(
+                settings.export_pipeline_max_in_flight,
+                settings.export_pipeline_idle_seconds,
+            )
+        return _shared_pipelines
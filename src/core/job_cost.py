@@ -0,0 +1,79 @@
+# src/core/job_cost.py
+import logging
+import statistics
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from src.core.job_messages import job_features
+from src.utils.job_journal import JobJournal
+
+logger = logging.getLogger(__name__)
+
+# Sem histórico suficiente: custo fixo (login + fila de export do GMS) mais
+# um valor por loja×dia. Ordem de grandeza observada em produção; o
+# histórico do diário substitui assim que houver amostras.
+_DEFAULT_BASE_SECONDS = 300.0
+_DEFAULT_SECONDS_PER_STORE_DAY = 6.0
+_MIN_HISTORY_SAMPLES = 5
+_HISTORY_CACHE_SECONDS = 300.0
+
+SIZE_SMALL = "small"
+SIZE_LARGE = "large"
+
+
+class JobCostEstimator:
+    """Estima a duração de um job a partir de parameters + histórico local.
+
+    Modelo linear simples: base + segundos_por_loja_dia × lojas × dias. A
+    taxa por loja×dia vem da mediana dos jobs concluídos do mesmo
+    document_type no JobJournal (mediana, não média: um export que travou
+    3h no GMS não deve inflar a estimativa de todo mundo).
+    """
+
+    def __init__(self, journal: Optional[JobJournal] = None, small_job_max_seconds: float = 1800.0):
+        self.journal = journal
+        self.small_job_max_seconds = small_job_max_seconds
+        self._rates: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def _rate_for(self, document_type: Optional[str]) -> float:
+        if self.journal is None or not document_type:
+            return _DEFAULT_SECONDS_PER_STORE_DAY
+
+        with self._lock:
+            cached = self._rates.get(document_type)
+            if cached is not None and time.monotonic() - cached[1] < _HISTORY_CACHE_SECONDS:
+                return cached[0]
+
+        try:
+            history = self.journal.history(document_type)
+        except Exception as e:
+            logger.debug(f"Histórico indisponível para estimar custo ({document_type}): {e}")
+            history = []
+
+        rate = self._rate_from_history(history)
+        with self._lock:
+            self._rates[document_type] = (rate, time.monotonic())
+        return rate
+
+    @staticmethod
+    def _rate_from_history(history: List[Dict]) -> float:
+        samples = []
+        for entry in history:
+            units = (entry.get("store_count") or 0) * (entry.get("day_count") or 0)
+            duration = entry.get("duration_seconds")
+            if units <= 0 or duration is None:
+                continue
+            samples.append(max(duration - _DEFAULT_BASE_SECONDS, 0.0) / units)
+        if len(samples) < _MIN_HISTORY_SAMPLES:
+            return _DEFAULT_SECONDS_PER_STORE_DAY
+        return statistics.median(samples)
+
+    def estimate_seconds(self, params: Dict) -> float:
+        features = job_features(params)
+        units = max(features["store_count"], 1) * features["day_count"]
+        return _DEFAULT_BASE_SECONDS + self._rate_for(features["document_type"]) * units
+
+    def size_class(self, estimated_seconds: float) -> str:
+        return SIZE_SMALL if estimated_seconds <= self.small_job_max_seconds else SIZE_LARGE
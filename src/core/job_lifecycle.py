@@ -0,0 +1,630 @@
+# src/core/job_lifecycle.py
+import json
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from config import settings
+from src.core.bot_runner import BotRunner
+from src.core.capacity import CapacityTracker, observed_queues
+from src.core.coalescer import ExportCoalescer
+from src.core.job_cost import SIZE_LARGE, SIZE_SMALL, JobCostEstimator
+from src.core.job_messages import (
+    HEADER_CHECKPOINT,
+    build_bot_params,
+    decode_message,
+    encode_checkpoint,
+    is_transient_failure,
+    job_features,
+    job_outcome,
+    read_checkpoint,
+    validate_job_message,
+)
+from src.core.job_process import JobProcessSupervisor
+from src.core.job_retry import HEADER_RETRY_ATTEMPT, RetryDecision, RetryPolicy
+from src.core.job_scheduler import (
+    HEADER_JOB_COST,
+    HEADER_ROUTED_AT,
+    HEADER_SIZE_CLASS,
+    SizeClassScheduler,
+    size_class_queue,
+)
+from src.core.job_splitter import ShardedJob, plan_shards
+from src.core.job_window import HEADER_NOT_BEFORE, ExecutionWindowPolicy
+from src.utils.circuit_breaker import host_of, shared_circuit_breaker
+from src.utils.job_journal import JobJournal
+from src.utils.outbox import MaestroOutbox, OutboxEvent, is_permanent_rejection
+
+logger = logging.getLogger(__name__)
+
+
+class Settlement(NamedTuple):
+    """Destino da mensagem do job no broker, aplicado pelo núcleo.
+
+    requeue segue o _safe_ack dos núcleos: None ackeia, True/False fazem
+    nack (False manda para a maestro.dlx). Com republish_to, a cópia da
+    mensagem com headers vai para essa fila e a original é ackeada; se a
+    publicação falhar, a original volta à fila. finish é o (status,
+    resultado) a reportar ao maestro antes — depois do flush dos logs do job.
+    """
+    requeue: Optional[bool] = None
+    republish_to: Optional[str] = None
+    headers: Optional[Dict] = None
+    what: str = ""
+    finish: Optional[Tuple[str, Dict]] = None
+
+
+class Route(NamedTuple):
+    """Fila de classe e headers de custo de um job (JOB_SCHEDULING=cost)."""
+    job_id: Optional[str]
+    queue: str
+    headers: Dict
+    size_class: str
+    estimated: float
+
+
+class JobDelivery:
+    """Uma mensagem de job entre os passos do JobLifecycle."""
+
+    def __init__(self, body, headers: Optional[Dict], slot_id: int = 0):
+        self.body = body
+        self.headers = headers
+        self.slot_id = slot_id
+        self.job_id: Optional[str] = None
+        self.params: Dict = {}
+        self.bot_params: Dict = {}
+
+
+def read_terminal_status(job_id: str, response) -> Optional[Dict]:
+    """Resposta do GET .../status: o dict se o job é terminal, senão None.
+
+    404 (job sumiu do maestro) e 5xx também viram None: o job segue pelo
+    caminho normal — pior caso reprocessa, melhor que travar.
+    """
+    if response.status_code == 200:
+        data = response.json()
+        return data if data.get("terminal") else None
+    if response.status_code != 404:
+        logger.warning(f"check_job_terminal: status HTTP {response.status_code} para job {job_id}: {response.text}")
+    return None
+
+
+def read_cancellation(job_id: str, response) -> bool:
+    """Resposta do GET .../cancellation (também é o heartbeat do job).
+
+    404 não derruba o job em execução; 400 e 5xx levantam para o watcher
+    tratar como transitório e tentar no próximo ciclo.
+    """
+    if response.status_code == 200:
+        return bool(response.json().get("cancellation_requested", False))
+    if response.status_code == 404:
+        logger.warning(f"check_cancellation: job {job_id} retornou 404 (job não encontrado)")
+        return False
+    response.raise_for_status()
+    return False
+
+
+def outbox_resolved(event: OutboxEvent, response) -> bool:
+    """Evento do outbox entregue ou recusado de vez (sai do outbox)."""
+    if response.status_code in [200, 201, 204]:
+        return True
+    if is_permanent_rejection(response.status_code):
+        logger.warning(
+            f"⚠️ Maestro recusou {event.kind} do job {event.job_id} "
+            f"(HTTP {response.status_code}: {response.text}). Descartando do outbox."
+        )
+        return True
+    return False
+
+
+class JobLifecycle:
+    """Ciclo de vida de um job, comum aos dois núcleos do worker.
+
+    O RabbitMQWorker (pika, worker.py) e o AsyncRabbitMQWorker (aio-pika,
+    src/core/async_worker.py) só diferem no transporte: ack, nack e publish
+    no broker, HTTP com o maestro e onde o job roda (thread do slot ou
+    thread fora do loop). Validação, short-circuits de redelivery, adiamento
+    por janela e por circuito, start, suspensão, retry, finish, roteamento
+    por custo e execução (coalescer e shards) ficam aqui. O núcleo chama,
+    em ordem:
+
+        screen → check_job_terminal (HTTP do núcleo) → admit → start →
+        execute (fora da thread da conexão/do loop) → conclude
+
+    e failed() para exceções de qualquer passo. O primeiro Settlement
+    devolvido encerra a mensagem. Nenhum passo faz I/O de rede: outbox e
+    diário são SQLite local; só execute() bloqueia.
+    """
+
+    def __init__(
+        self,
+        queue_name: str,
+        worker_slots: int,
+        report_log: Callable[[str, str, str], bool],
+        free_slots: Callable[[], int],
+        draining: Callable[[], bool],
+        borrow_slot: Callable[[], Optional[int]],
+        return_slot: Callable[[int], None],
+    ):
+        self.queue_name = queue_name
+        self.report_log = report_log
+        self.draining = draining
+        self.borrow_slot = borrow_slot
+        self.return_slot = return_slot
+        # Drain: pede aos jobs em espera longa que devolvam o trabalho com
+        # checkpoint (ver JobSuspendedException).
+        self.suspend_event = threading.Event()
+
+        # start/logs/finish vão primeiro pro outbox em disco e são entregues
+        # ao maestro pelo despachante do núcleo, com retry e em ordem por job:
+        # o ack não depende do maestro estar no ar, e o que ficar pendente num
+        # crash é reenviado no próximo start.
+        self.outbox = MaestroOutbox(settings.DATA_DIR / "outbox.sqlite3")
+
+        # Diário local de jobs finalizados: idempotency check sem rede.
+        self.journal = JobJournal(
+            settings.DATA_DIR / "job_journal.sqlite3",
+            max_entries=settings.job_journal_max_entries,
+            max_age_days=settings.job_journal_max_age_days,
+        )
+
+        # JOB_SCHEDULING=cost: a fila principal vira entrada de um roteador
+        # que estima o custo do job e o republica em <fila>.small/.large; os
+        # slots puxam dessas filas seguindo o SizeClassScheduler.
+        self.cost_scheduling = settings.job_scheduling == "cost"
+        self.cost_estimator = JobCostEstimator(self.journal, settings.small_job_max_seconds)
+        self.scheduler = SizeClassScheduler(
+            worker_slots,
+            settings.reserved_small_slots,
+            settings.large_job_max_wait_seconds,
+        )
+
+        # Falha transitória não volta direto pra cabeça da fila: dorme numa
+        # fila de espera com TTL e volta depois (ver RetryPolicy).
+        self.retry_policy = RetryPolicy(
+            queue_name,
+            settings.job_retry_max_attempts,
+            settings.retry_base_delay_seconds,
+            settings.retry_max_delay_seconds,
+        )
+
+        # Exports pesados (ou com janela própria) esperam a janela fora do
+        # pico em filas com TTL, como o retry (ver ExecutionWindowPolicy).
+        self.window_policy = ExecutionWindowPolicy(
+            queue_name,
+            settings.offpeak_window,
+            settings.defer_jobs_larger_than_seconds,
+        )
+
+        # GMS fora do ar: circuito por host compartilhado com o BotRunner, que
+        # registra as falhas de conexão/login (ver CircuitBreaker).
+        self.circuit_breaker = shared_circuit_breaker()
+
+        # Jobs iguais/contidos em outro export em andamento esperam o líder
+        # e reaproveitam a saída dele (ver ExportCoalescer).
+        self.coalescer = ExportCoalescer(settings.coalesce_reuse_seconds) if settings.export_coalescing else None
+
+        # Sinal de autoscaling em segundos de trabalho (GET /capacity). As
+        # profundidades das filas vêm do núcleo (observed_queues); o servidor
+        # HTTP só lê o snapshot.
+        self.capacity = CapacityTracker(
+            settings.worker_id,
+            worker_slots,
+            self.cost_estimator,
+            free_slots=free_slots,
+            draining=draining,
+        )
+
+    # -- mensagem até o start --------------------------------------------
+
+    def screen(self, job: JobDelivery) -> Optional[Settlement]:
+        """Decodifica e valida a mensagem e descarta/adia o que não precisa
+        do maestro. Levanta JSONDecodeError/ValueError (ver failed)."""
+        if self.draining():
+            # Entregue entre o sinal e o cancelamento do consumo: fica pra
+            # outro worker.
+            logger.info("⏸️ Worker em drain: devolvendo mensagem à fila sem processar.")
+            return Settlement(requeue=True)
+
+        message = decode_message(job.body)
+        job.job_id = message.get("job_id")
+        logger.info(f"📨 Mensagem recebida: {job.job_id}")
+        logger.info(f"Payload: {json.dumps(message, indent=2)}")
+        job.params = message.get("parameters", {})
+        validate_job_message(message)
+
+        # Diário local primeiro: redelivery de job que este worker já
+        # concluiu com sucesso é descartada sem nenhuma ida à rede. Falha
+        # ou cancelamento no diário segue para o check no maestro, que
+        # pode ter reenfileirado o job com o mesmo id.
+        known = self.journal.lookup_succeeded(job.job_id)
+        if known is not None:
+            logger.warning(
+                f"♻️ Job {job.job_id} já finalizado neste worker "
+                f"(status={known['status']}, completed_at={known['completed_at']}). "
+                f"Descartando redelivery sem reprocessar."
+            )
+            return Settlement()
+
+        # Finish ainda no outbox (maestro fora do ar): o job já terminou
+        # aqui e o maestro só não sabe ainda — reprocessar seria refazer
+        # o export inteiro.
+        if self.outbox.pending(job.job_id, kind="finish"):
+            logger.warning(f"♻️ Job {job.job_id} tem finish pendente no outbox. Descartando redelivery sem reprocessar.")
+            return Settlement()
+
+        # Fora da janela de execução (job pesado em horário de pico ou
+        # com execution_window própria): espera no broker e volta sozinho.
+        # Antes do check no maestro — cada salto entre as filas de espera
+        # passa por aqui.
+        not_before = self.window_policy.not_before(job.params, job.headers, self.capacity.estimate(job.params, job.headers))
+        if not_before is not None:
+            return self.defer(job, not_before)
+        return None
+
+    def admit(self, job: JobDelivery, terminal: Optional[Dict]) -> Optional[Settlement]:
+        """Depois do check_job_terminal do núcleo: redelivery de job já
+        terminal no maestro e circuito do GMS aberto."""
+        # Idempotency: se o job já está em estado terminal no maestro, esta
+        # mensagem é redelivery de um ack que falhou — ackeia e descarta sem
+        # reprocessar. Sem isso, o reprocessamento de jobs grandes (8k+ XMLs)
+        # entra em loop quando o canal RabbitMQ é fechado por consumer_timeout.
+        if terminal is not None:
+            logger.warning(
+                f"♻️ Job {job.job_id} já está em estado terminal no maestro "
+                f"(status={terminal.get('status')}, completed_at={terminal.get('completed_at')}). "
+                f"Descartando redelivery sem reprocessar."
+            )
+            return Settlement()
+
+        # GMS fora do ar (circuito aberto para o host): adia na hora, sem
+        # abrir o Chrome nem gastar tentativa do retry. Depois do check no
+        # maestro — quem passa aqui com o circuito meio-aberto é a sonda e
+        # precisa chegar ao login.
+        gms_host = host_of(job.params.get('gms_login_url'))
+        retry_in = self.circuit_breaker.admit(gms_host) if self.circuit_breaker else None
+        if retry_in is not None:
+            return self.defer(
+                job,
+                datetime.now() + timedelta(seconds=retry_in),
+                reason=f"o GMS {gms_host} voltar (circuito aberto)",
+            )
+        return None
+
+    def defer(self, job: JobDelivery, not_before: datetime, reason: str = "a janela de execução") -> Settlement:
+        """Fila de espera do degrau que cabe no que falta até not_before.
+        Sem start: pro maestro o job segue na fila."""
+        delay = self.window_policy.delay_step((not_before - datetime.now()).total_seconds())
+        logger.info(
+            f"🌙 Job {job.job_id} adiado para {reason} ({not_before:%d/%m/%Y %H:%M:%S}). "
+            f"Próxima checagem em {delay}s."
+        )
+        return Settlement(
+            republish_to=self.window_policy.delay_queue(delay),
+            headers={HEADER_NOT_BEFORE: int(not_before.timestamp())},
+            what="adiar job",
+        )
+
+    def start(self, job: JobDelivery) -> None:
+        """Start no outbox, parâmetros do bot e slot ocupado na capacidade."""
+        logger.info(f"📤 Reportando início do job {job.job_id}")
+        self.outbox.enqueue(job.job_id, "start")
+        self.report_log(job.job_id, "INFO", f"Job {job.job_id} iniciado. Preparando execução...")
+
+        job.bot_params = build_bot_params(job.params, settings.headless)
+        checkpoint = read_checkpoint(job.headers)
+        if checkpoint:
+            job.bot_params['resume_checkpoint'] = checkpoint
+            self.report_log(job.job_id, "INFO", f"Retomando job suspenso por outro worker (etapa: {checkpoint.get('stage')})")
+
+        estimated = self.capacity.estimate(job.params, job.headers)
+        self.capacity.job_started(job.slot_id, job.job_id, estimated)
+        if not self.cost_scheduling:
+            # No fifo não há roteador: o preço do backlog vem dos jobs
+            # que este worker tira da fila.
+            self.capacity.observe_cost(self.queue_name, estimated)
+
+        self.report_log(job.job_id, "INFO", f"Processando {len(job.bot_params['stores'])} loja(s)")
+        self.report_log(job.job_id, "INFO", f"Período: {job.bot_params['start_date']} a {job.bot_params['end_date']}")
+        self.report_log(job.job_id, "INFO", f"Tipo de documento: {job.bot_params['document_type']}")
+
+        logger.info(f"🚀 Iniciando execução do job {job.job_id} (slot {job.slot_id})")
+        self.report_log(job.job_id, "INFO", "Iniciando execução da automação...")
+
+    def notify_cancel(self, job_id: str) -> None:
+        self.report_log(
+            job_id,
+            "WARNING",
+            "Cancelamento solicitado pelo usuário. Encerrando após operação atual."
+        )
+
+    # -- execução (thread do slot) ----------------------------------------
+
+    def execute(self, job: JobDelivery, cancel_event: threading.Event) -> Dict:
+        """Roda o job, bloqueando: pelo ExportCoalescer (quando ligado) e,
+        se passar dos limites de shard, dividido em exports menores.
+
+        Nunca roda na thread da conexão pika nem no event loop — o export
+        do GMS leva até ~1h. Retorna o dict do BotRunner ou re-levanta o
+        que o bot levantou.
+        """
+        execute = partial(self._run_job, job.bot_params, job.job_id, cancel_event, job.slot_id)
+        if self.coalescer is None:
+            return execute()
+        return self.coalescer.run(
+            job.job_id,
+            job.bot_params,
+            execute,
+            cancel_event=cancel_event,
+            log_callback=self.report_log,
+            suspend_event=self.suspend_event,
+        )
+
+    def _run_job(self, bot_params: Dict, job_id: str, cancel_event: threading.Event, slot_id: int) -> Dict:
+        shards = plan_shards(bot_params, settings.job_shard_max_days, settings.job_shard_max_stores)
+        if len(shards) == 1:
+            return self._run_bot(bot_params, job_id, cancel_event, settings.slot_pending_dir(slot_id))
+
+        def _run_shard(shard_params: Dict, shard_slot: int, log_callback) -> Dict:
+            return self._run_bot(shard_params, job_id, cancel_event, settings.slot_pending_dir(shard_slot), log_callback)
+
+        return ShardedJob(
+            job_id,
+            bot_params,
+            shards,
+            run_shard=_run_shard,
+            slot_id=slot_id,
+            borrow_slot=self.borrow_slot,
+            return_slot=self.return_slot,
+            cancel_event=cancel_event,
+            log_callback=self.report_log,
+            suspend_event=self.suspend_event,
+            checkpoint=bot_params.get('resume_checkpoint'),
+        ).run()
+
+    def _run_bot(
+        self,
+        bot_params: Dict,
+        job_id: str,
+        cancel_event: threading.Event,
+        pending_dir: Path,
+        log_callback=None,
+    ) -> Dict:
+        """BotRunner na thread que chama, ou num processo filho supervisionado
+        com JOB_ISOLATION=process (ver JobProcessSupervisor).
+
+        cancel_event é repassado pro BotRunner pra que os loops longos de
+        polling do Selenium possam abortar quando o cancelamento chegar.
+        pending_dir é o workspace isolado do slot. log_callback substitui
+        report_log (shards prefixam as linhas).
+        """
+        log_callback = log_callback or self.report_log
+        if settings.job_isolation == "process":
+            supervisor = JobProcessSupervisor(
+                max_rss_mb=settings.job_max_rss_mb,
+                max_wall_seconds=settings.job_max_wall_seconds,
+            )
+            return supervisor.run(
+                bot_params,
+                job_id,
+                log_callback=log_callback,
+                cancel_event=cancel_event,
+                pending_dir=pending_dir,
+                suspend_event=self.suspend_event,
+            )
+
+        bot_runner = BotRunner(
+            bot_params,
+            job_id=job_id,
+            log_callback=log_callback,
+            cancel_event=cancel_event,
+            pending_dir=pending_dir,
+            suspend_event=self.suspend_event,
+        )
+        return bot_runner.run()
+
+    # -- resultado ----------------------------------------------------------
+
+    def conclude(self, job: JobDelivery, result: Dict) -> Settlement:
+        """Resultado do bot: suspensão, retry ou finish."""
+        result['job_id'] = job.job_id
+
+        if result.get("status") == "suspended":
+            return self._suspend(job, result)
+
+        # O BotRunner captura as próprias exceções: falha transitória (GMS
+        # fora do ar, Chrome que não subiu, timeout do export) chega aqui
+        # como resultado e segue o mesmo retry das exceções do worker.
+        retry_exhausted = False
+        if result.get("status") == "failed" and result.get("transient"):
+            retry = self.retry_policy.next_retry(job.headers)
+            if retry is not None:
+                return self._retry(job.job_id, retry, result.get("error_type") or "Erro", result.get("error"))
+            retry_exhausted = True
+
+        outcome = job_outcome(job.job_id, result)
+        self.report_log(job.job_id, outcome.log_level, outcome.log_message)
+        if outcome.finish_status == "failed":
+            logger.error(outcome.worker_message)
+        else:
+            logger.info(outcome.worker_message)
+
+        if retry_exhausted:
+            logger.error(
+                f"❌ Falha transitória ({result.get('error_type')}) esgotou o orçamento de "
+                f"{self.retry_policy.max_attempts} tentativa(s). Mensagem enviada para a DLX."
+            )
+            return Settlement(requeue=False, finish=(outcome.finish_status, result))
+        logger.info(f"✅ Mensagem processada: {job.job_id}")
+        return Settlement(finish=(outcome.finish_status, result))
+
+    def failed(self, job: JobDelivery, error: Exception) -> Settlement:
+        """Exceção em qualquer passo do job (ou do próprio worker)."""
+        if isinstance(error, json.JSONDecodeError):
+            logger.error(f"❌ Erro ao decodificar JSON: {error}")
+            logger.error(f"Body recebido: {job.body}")
+            return Settlement(requeue=False)
+
+        if isinstance(error, ValueError):
+            logger.error(f"❌ Erro de validação: {error}")
+            if not job.job_id:
+                return Settlement(requeue=False)
+            self.report_log(job.job_id, "ERROR", f"Erro de validação: {str(error)}")
+            return Settlement(requeue=False, finish=("failed", {"error": str(error), "error_type": "ValidationError"}))
+
+        logger.error(f"❌ Erro ao processar mensagem: {error}", exc_info=error)
+
+        # Falhas transitórias (rede, browser, timeout) ganham nova tentativa
+        # após a espera da RetryPolicy, sem finish: pro maestro o job
+        # continua em andamento. Falhas permanentes (config inválida,
+        # seletor não encontrado, credenciais) e orçamento esgotado são
+        # finalizados como failed e vão pra maestro.dlx (requeue=False).
+        is_transient = is_transient_failure(error)
+        retry = self.retry_policy.next_retry(job.headers) if is_transient else None
+        if retry is not None:
+            return self._retry(job.job_id, retry, type(error).__name__, error)
+
+        if is_transient:
+            logger.error(
+                f"❌ Falha transitória ({type(error).__name__}) esgotou o orçamento de "
+                f"{self.retry_policy.max_attempts} tentativa(s). Mensagem enviada para a DLX."
+            )
+        else:
+            logger.error(f"❌ Falha permanente detectada ({type(error).__name__}). Mensagem descartada.")
+        if not job.job_id:
+            return Settlement(requeue=False)
+        self.report_log(job.job_id, "ERROR", f"Erro inesperado: {str(error)}")
+        return Settlement(requeue=False, finish=("failed", {"error": str(error), "error_type": type(error).__name__}))
+
+    def _retry(self, job_id: Optional[str], retry: RetryDecision, error_type: str, error) -> Settlement:
+        logger.warning(
+            f"⚠️ Falha transitória detectada ({error_type}). Nova tentativa "
+            f"{retry.attempt}/{self.retry_policy.max_attempts} em {retry.delay_seconds}s."
+        )
+        if job_id:
+            self.report_log(
+                job_id,
+                "WARNING",
+                f"Falha transitória ({error_type}: {error}). Nova tentativa "
+                f"{retry.attempt}/{self.retry_policy.max_attempts} em {retry.delay_seconds}s.",
+            )
+        return Settlement(
+            republish_to=retry.queue,
+            headers={HEADER_RETRY_ATTEMPT: retry.attempt},
+            what="agendar nova tentativa",
+        )
+
+    def _suspend(self, job: JobDelivery, result: Dict) -> Settlement:
+        """Job suspenso no drain: volta para a fila principal com o
+        checkpoint no header (ou como está, se não há checkpoint). Sem
+        finish: pro maestro o job segue em andamento.
+        """
+        checkpoint = result.get("checkpoint")
+        self.report_log(
+            job.job_id,
+            "WARNING",
+            f"Worker encerrando: job suspenso na etapa '{result.get('stage')}' e devolvido à fila"
+            f"{' com checkpoint para retomada' if checkpoint else ''}.",
+        )
+        logger.warning(f"⏸️ Job {job.job_id} suspenso (etapa {result.get('stage')}); devolvido à fila.")
+        if not checkpoint:
+            return Settlement(requeue=True)
+        return Settlement(
+            republish_to=self.queue_name,
+            headers={HEADER_CHECKPOINT: encode_checkpoint(checkpoint)},
+            what="republicar job suspenso",
+        )
+
+    def finish(self, job: JobDelivery, status: str, result: Dict) -> None:
+        """Finish no outbox e job no diário local. O núcleo chama depois do
+        flush dos logs do job: o maestro fecha o job no /finish e a UI
+        mostraria o histórico incompleto. A ordem de entrega vem do outbox.
+        """
+        logger.info(f"🏁 Reportando finalização do job {job.job_id} com status: {status}")
+        self.outbox.enqueue(job.job_id, "finish", {"status": status, "result": result})
+        self._record_terminal(job, status, result)
+
+    def _record_terminal(self, job: JobDelivery, status: str, result: Dict) -> None:
+        """Grava o job no diário local. Falha aqui só custa um check HTTP
+        numa eventual redelivery — nunca impede o ack.
+
+        Job coalescido vai sem duração: o tempo de espera pelo líder não é
+        custo de export e puxaria a estimativa do JobCostEstimator pra baixo.
+        """
+        try:
+            self.journal.record(
+                job.job_id,
+                status,
+                completed_at=result.get("completed_at"),
+                duration_seconds=None if result.get("coalesced_with") else result.get("duration_seconds"),
+                features=job_features(job.params),
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Falha ao gravar job {job.job_id} no diário local: {e}")
+
+    def enqueue_logs(self, job_id: str, entries: List[Dict]) -> bool:
+        """send_batch do LogShipper: o lote vai para o outbox, nunca direto
+        ao maestro — só o outbox garante logs antes do finish."""
+        try:
+            self.outbox.enqueue(job_id, "logs", {"logs": entries})
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"❌ Falha ao gravar logs do job {job_id} no outbox: {e}")
+            return False
+
+    # -- roteamento e despacho por custo -----------------------------------
+
+    def route(self, body, headers: Optional[Dict]) -> Route:
+        """Estima o custo do job e escolhe a fila de classe. Mensagem
+        ilegível vai pra small: a validação do screen a descarta em segundos."""
+        job_id = None
+        try:
+            message = decode_message(body)
+            job_id = message.get("job_id")
+            estimated = self.cost_estimator.estimate_seconds(message.get("parameters") or {})
+            size_class = self.cost_estimator.size_class(estimated)
+        except Exception:
+            estimated, size_class = 0.0, SIZE_SMALL
+        else:
+            self.capacity.observe_cost(self.queue_name, estimated)
+            self.capacity.observe_cost(size_class_queue(self.queue_name, size_class), estimated)
+        return Route(
+            job_id,
+            size_class_queue(self.queue_name, size_class),
+            {
+                **(headers or {}),
+                HEADER_JOB_COST: int(estimated),
+                HEADER_SIZE_CLASS: size_class,
+                HEADER_ROUTED_AT: int(time.time()),
+            },
+            size_class,
+            estimated,
+        )
+
+    @property
+    def large_queue(self) -> str:
+        return size_class_queue(self.queue_name, SIZE_LARGE)
+
+    def class_queues(self, slot_id: int) -> List[Tuple[str, str]]:
+        """(classe, fila) na ordem em que o slot deve puxar. Slots reservados
+        (ids menores) ficam com o small; os gerais com o large."""
+        return [(size_class, size_class_queue(self.queue_name, size_class)) for size_class in self.scheduler.queue_order(slot_id)]
+
+    def dispatched(self, size_class: str) -> None:
+        if size_class == SIZE_LARGE:
+            self.scheduler.large_dispatched()
+
+    def observed_queues(self) -> List[Tuple[str, str, bool]]:
+        """Filas cuja profundidade alimenta o CapacityTracker."""
+        delay_queues = [self.retry_policy.retry_queue(delay) for delay in self.retry_policy.delays()]
+        delay_queues += [self.window_policy.delay_queue(delay) for delay in self.window_policy.delays()]
+        return observed_queues(self.queue_name, self.cost_scheduling, delay_queues)
+
+    def close(self) -> None:
+        self.outbox.close()
+        self.journal.close()
@@ -0,0 +1,158 @@
+# src/core/job_messages.py
+import json
+from datetime import datetime
+from typing import Dict, NamedTuple, Optional, Union
+
+from src.utils.exceptions import ConfigurationError, ElementNotFoundError, LoginError
+
+# Regras de mensagem/resultado compartilhadas pelos dois núcleos do worker
+# (pika em worker.py e asyncio em src/core/async_worker.py): o que muda entre
+# eles é só o transporte, não o contrato com o maestro.
+
+REQUIRED_PARAMETERS = ('stores', 'document_type', 'start_date', 'end_date', 'gms_login_url')
+
+# Falhas que parecem transitórias pelo tipo mas são permanentes pelo conteúdo
+# (config inválida, seletor não encontrado, credenciais).
+_PERMANENT_EXCEPTIONS = (ConfigurationError, ElementNotFoundError, LoginError)
+
+
+class JobOutcome(NamedTuple):
+    """Como um resultado do BotRunner é reportado ao maestro."""
+    finish_status: str
+    log_level: str
+    log_message: str
+    worker_message: str
+
+
+def decode_message(body: Union[bytes, str]) -> Dict:
+    """json.loads do corpo da mensagem (propaga JSONDecodeError)."""
+    return json.loads(body)
+
+
+def validate_job_message(message: Dict) -> None:
+    """Levanta ValueError se faltar job_id ou algum parâmetro obrigatório."""
+    if not message.get("job_id"):
+        raise ValueError("Campo obrigatório 'job_id' não encontrado na mensagem")
+
+    params = message.get("parameters", {})
+    missing_fields = [field for field in REQUIRED_PARAMETERS if not params.get(field)]
+    if missing_fields:
+        raise ValueError(f"Campos obrigatórios faltando em 'parameters': {', '.join(missing_fields)}")
+
+
+def build_bot_params(params: Dict, default_headless: bool) -> Dict:
+    return {
+        'headless': params.get('headless', default_headless),
+        'stores': params.get('stores', []),
+        'document_type': params.get('document_type'),
+        'emitter': params.get('emitter', 'Qualquer'),
+        'operation_type': params.get('operation_type', 'Qualquer'),
+        'file_type': params.get('file_type', 'XML'),
+        'invoice_situation': params.get('invoice_situation', 'Qualquer'),
+        'start_date': params.get('start_date'),
+        'end_date': params.get('end_date'),
+        'gms_user': params.get('gms_user'),
+        'gms_password': params.get('gms_password'),
+        'gms_login_url': params.get('gms_login_url')
+    }
+
+
+def parse_gms_date(value: str) -> datetime:
+    """Datas dos parâmetros vêm no formato do GMS (dd/mm/aaaa)."""
+    return datetime.strptime(value, "%d/%m/%Y")
+
+
+def job_features(params: Dict) -> Dict:
+    """Tamanho do job: lojas, dias (inclusivo) e tipo de documento.
+
+    Data inválida conta como 1 dia — a validação de formato é do bot.
+    """
+    try:
+        day_count = (parse_gms_date(params.get('end_date')) - parse_gms_date(params.get('start_date'))).days + 1
+    except (TypeError, ValueError):
+        day_count = 1
+    return {
+        "document_type": params.get('document_type'),
+        "store_count": len(params.get('stores') or []),
+        "day_count": max(day_count, 1),
+    }
+
+
+def job_outcome(job_id: str, result: Dict) -> JobOutcome:
+    status = result.get("status")
+
+    if status == "completed":
+        return JobOutcome("completed", "INFO", "Automação concluída com sucesso!",
+                          f"✅ Job {job_id} concluído com sucesso")
+
+    if status == "completed_no_invoices":
+        return JobOutcome("completed_no_invoices", "INFO",
+                          "Automação concluída, porém nenhuma nota fiscal foi encontrada",
+                          f"✅ Job {job_id} concluído sem notas fiscais")
+
+    if status == "canceled":
+        stage = result.get("stage", "desconhecida")
+        return JobOutcome("canceled", "WARNING", f"Job cancelado pelo usuário (etapa: {stage}).",
+                          f"🛑 Job {job_id} cancelado pelo usuário (etapa: {stage})")
+
+    error_msg = result.get("error", "Falha desconhecida na execução")
+    return JobOutcome("failed", "ERROR", f"Automação falhou: {error_msg}", f"❌ Job {job_id} falhou")
+
+
+def is_transient_failure(error: BaseException) -> bool:
+    """Falhas transitórias (rede, browser, timeout) voltam pra fila (requeue=True);
+    permanentes são descartadas (requeue=False).
+    """
+    return isinstance(error, (ConnectionError, TimeoutError)) and not isinstance(error, _PERMANENT_EXCEPTIONS)
+
+
+# Exchange de controle (topic): o maestro publica com routing key
+# "cancel.<job_id>" e cada worker só faz bind das chaves dos jobs que está
+# executando.
+CANCEL_ROUTING_PREFIX = "cancel."
+
+
+def cancel_routing_key(job_id: str) -> str:
+    return f"{CANCEL_ROUTING_PREFIX}{job_id}"
+
+
+def parse_cancel_message(routing_key: str, body: Union[bytes, str]) -> Optional[str]:
+    """job_id de uma mensagem de cancelamento, ou None se não for uma.
+
+    A routing key manda; o corpo (JSON com job_id) só é usado se a chave
+    vier sem o job — publicação via fanout, por exemplo.
+    """
+    if routing_key and routing_key.startswith(CANCEL_ROUTING_PREFIX):
+        job_id = routing_key[len(CANCEL_ROUTING_PREFIX):]
+        if job_id:
+            return job_id
+    try:
+        data = json.loads(body)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(data, dict) or data.get("action", "cancel") != "cancel":
+        return None
+    return data.get("job_id") or None
+
+
+# Checkpoint de um job suspenso no drain de um worker (JSON no header da
+# mensagem republicada): quem pegar a mensagem retoma dali.
+HEADER_CHECKPOINT = "x-checkpoint"
+
+
+def encode_checkpoint(checkpoint: Dict) -> str:
+    return json.dumps(checkpoint, ensure_ascii=False)
+
+
+def read_checkpoint(headers: Optional[Dict]) -> Optional[Dict]:
+    """Checkpoint do header, ou None se ausente/ilegível (job roda do zero)."""
+    raw = (headers or {}).get(HEADER_CHECKPOINT)
+    if not raw:
+        return None
+    if isinstance(raw, bytes):
+        raw = raw.decode("utf-8", "replace")
+    try:
+        checkpoint = json.loads(raw)
+    except (TypeError, ValueError):
+        return None
+    return checkpoint if isinstance(checkpoint, dict) else None
@@ -0,0 +1,268 @@
+# src/core/job_process.py
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from config import settings
+from src.utils.process_utils import kill_process_tree, process_tree_rss_bytes
+
+logger = logging.getLogger(__name__)
+
+# Linhas do stdout do filho que começam com este prefixo são mensagens do
+# protocolo (log/result); o resto é repassado pro logger como saída crua.
+IPC_PREFIX = "@@BOT_IPC@@ "
+IPC_CANCEL_COMMAND = "cancel"
+IPC_SUSPEND_COMMAND = "suspend"
+
+# Depois do "cancel" no stdin o filho tem esse tempo pra sair sozinho
+# (o BotRunner fecha o browser e reporta 'canceled') antes do SIGKILL.
+_CANCEL_GRACE_SECONDS = 60.0
+
+
+def encode_ipc_message(message: Dict) -> str:
+    return IPC_PREFIX + json.dumps(message, ensure_ascii=False)
+
+
+class JobProcessSupervisor:
+    """Executa um job em processo filho (main.py --ipc) e vigia o filho.
+
+    O filho roda o mesmo BotRunner de sempre; logs e resultado voltam pelo
+    stdout como linhas IPC e o cancelamento vai pelo stdin. O supervisor
+    aplica limite de RSS (árvore inteira: python + chromedriver + Chromes)
+    e de tempo de parede, e ao final mata a árvore do job — Chrome vazado
+    ou WebDriver travado morrem junto com o processo, não ficam no worker.
+    """
+
+    # Grupos de processo dos jobs vivos, para o worker matar no fim do drain
+    # (o filho roda em sessão própria e não morre junto com o worker).
+    _live_pids: set = set()
+    _live_lock = threading.Lock()
+
+    @classmethod
+    def kill_all(cls) -> int:
+        with cls._live_lock:
+            pids = list(cls._live_pids)
+        for pid in pids:
+            kill_process_tree(pid)
+        return len(pids)
+
+    def __init__(
+        self,
+        max_rss_mb: int = 0,
+        max_wall_seconds: int = 0,
+        poll_interval: float = 2.0,
+    ):
+        self.max_rss_bytes = max_rss_mb * 1024 * 1024 if max_rss_mb else 0
+        self.max_wall_seconds = max_wall_seconds
+        self.poll_interval = poll_interval
+
+    def _build_command(self, params_file: Path, job_id: str, pending_dir: Path) -> list:
+        return [
+            sys.executable,
+            str(settings.BASE_DIR / "main.py"),
+            "--params-file", str(params_file),
+            "--job-id", job_id,
+            "--pending-dir", str(pending_dir),
+            "--ipc",
+        ]
+
+    def _write_params_file(self, bot_params: Dict, pending_dir: Path) -> Path:
+        # WHY 0600 e fora do pending: o arquivo carrega gms_password e o
+        # pending é limpo pelo próprio bot. Fica no tmpfs ao lado do pending
+        # do slot e é removido assim que o job termina.
+        params_file = pending_dir.parent / f".{pending_dir.name}-params.json"
+        fd = os.open(str(params_file), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(bot_params, f, ensure_ascii=False)
+        return params_file
+
+    def _read_stdout(self, proc: subprocess.Popen, job_id: str, log_callback: Optional[Callable], holder: Dict) -> None:
+        for raw_line in proc.stdout:
+            line = raw_line.rstrip("\n")
+            if not line.startswith(IPC_PREFIX):
+                if line.strip():
+                    logger.info(f"[job {job_id}] {line}")
+                continue
+            try:
+                message = json.loads(line[len(IPC_PREFIX):])
+            except json.JSONDecodeError as e:
+                logger.warning(f"Mensagem IPC inválida do job {job_id}: {e}")
+                continue
+
+            if message.get("type") == "log":
+                if log_callback is not None:
+                    try:
+                        log_callback(job_id, message.get("level", "INFO"), message.get("message", ""))
+                    except Exception as e:
+                        logger.warning(f"Falha ao repassar log do processo filho: {e}")
+            elif message.get("type") == "result":
+                holder["result"] = message.get("result") or {}
+
+    def _failed_result(self, started_at: datetime, error: str, error_type: str, transient: bool = False) -> Dict:
+        completed_at = datetime.now()
+        return {
+            "status": "failed",
+            "started_at": started_at.isoformat(),
+            "completed_at": completed_at.isoformat(),
+            "duration_seconds": (completed_at - started_at).total_seconds(),
+            "summary": None,
+            "error": error,
+            "error_type": error_type,
+            "transient": transient,
+        }
+
+    def run(
+        self,
+        bot_params: Dict,
+        job_id: str,
+        log_callback: Optional[Callable] = None,
+        cancel_event: Optional[threading.Event] = None,
+        pending_dir: Optional[Path] = None,
+        suspend_event: Optional[threading.Event] = None,
+    ) -> Dict:
+        """Roda o job no filho e bloqueia até ele terminar (ou ser morto).
+
+        Retorna o mesmo dict de BotRunner.run(). Estouro de limite ou saída
+        sem resultado viram status 'failed' com error_type próprio.
+        """
+        cancel_event = cancel_event if cancel_event is not None else threading.Event()
+        pending_dir = Path(pending_dir) if pending_dir else settings.PENDING_DIR
+        started_at = datetime.now()
+        params_file = self._write_params_file(bot_params, pending_dir)
+        holder: Dict = {}
+        failure: Optional[Dict] = None
+        proc: Optional[subprocess.Popen] = None
+
+        try:
+            proc = subprocess.Popen(
+                self._build_command(params_file, job_id, pending_dir),
+                cwd=str(settings.BASE_DIR),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                text=True,
+                encoding="utf-8",
+                bufsize=1,
+                # Sessão própria: o pgid do job agrupa chromedriver e Chromes,
+                # e kill_process_tree alcança até os órfãos.
+                start_new_session=True,
+            )
+            logger.info(f"🧩 Job {job_id} iniciado no processo filho PID {proc.pid}")
+            with self._live_lock:
+                self._live_pids.add(proc.pid)
+
+            reader = threading.Thread(
+                target=self._read_stdout,
+                args=(proc, job_id, log_callback, holder),
+                name=f"job-ipc-{job_id}",
+                daemon=True,
+            )
+            reader.start()
+
+            cancel_sent_at: Optional[float] = None
+            suspend_sent = False
+            peak_rss = 0
+            start = time.monotonic()
+
+            while proc.poll() is None:
+                if cancel_event.is_set() and cancel_sent_at is None:
+                    cancel_sent_at = time.monotonic()
+                    try:
+                        proc.stdin.write(IPC_CANCEL_COMMAND + "\n")
+                        proc.stdin.flush()
+                    except (BrokenPipeError, OSError) as e:
+                        logger.debug(f"Não foi possível enviar cancel ao filho: {e}")
+
+                if suspend_event is not None and suspend_event.is_set() and not suspend_sent:
+                    # Sem prazo próprio: o filho suspende no próximo ponto de
+                    # espera; quem limita é o prazo de drain do worker.
+                    suspend_sent = True
+                    try:
+                        proc.stdin.write(IPC_SUSPEND_COMMAND + "\n")
+                        proc.stdin.flush()
+                    except (BrokenPipeError, OSError) as e:
+                        logger.debug(f"Não foi possível enviar suspend ao filho: {e}")
+
+                if cancel_sent_at is not None and time.monotonic() - cancel_sent_at > _CANCEL_GRACE_SECONDS:
+                    logger.warning(f"🛑 Job {job_id} não encerrou {_CANCEL_GRACE_SECONDS:.0f}s após o cancelamento. Matando processo.")
+                    kill_process_tree(proc.pid)
+                    completed_at = datetime.now()
+                    failure = {
+                        "status": "canceled",
+                        "started_at": started_at.isoformat(),
+                        "completed_at": completed_at.isoformat(),
+                        "duration_seconds": (completed_at - started_at).total_seconds(),
+                        "stage": "processo_encerrado",
+                    }
+                    break
+
+                elapsed = time.monotonic() - start
+                if self.max_wall_seconds and elapsed > self.max_wall_seconds:
+                    logger.error(f"⏱️ Job {job_id} excedeu o limite de {self.max_wall_seconds}s. Matando processo.")
+                    kill_process_tree(proc.pid)
+                    failure = self._failed_result(
+                        started_at,
+                        f"Job excedeu o tempo limite de {self.max_wall_seconds} segundos",
+                        "WallClockLimitExceeded",
+                    )
+                    break
+
+                rss = process_tree_rss_bytes(proc.pid)
+                peak_rss = max(peak_rss, rss)
+                if self.max_rss_bytes and rss > self.max_rss_bytes:
+                    logger.error(
+                        f"🧠 Job {job_id} usando {rss // 1024 // 1024}MB "
+                        f"(limite {self.max_rss_bytes // 1024 // 1024}MB). Matando processo."
+                    )
+                    kill_process_tree(proc.pid)
+                    failure = self._failed_result(
+                        started_at,
+                        f"Job excedeu o limite de memória de {self.max_rss_bytes // 1024 // 1024}MB",
+                        "MemoryLimitExceeded",
+                    )
+                    break
+
+                # wait no cancel_event reage ao cancelamento sem esperar o ciclo;
+                # depois do cancel enviado, vira sleep simples até o filho sair.
+                if cancel_sent_at is None:
+                    cancel_event.wait(timeout=self.poll_interval)
+                else:
+                    time.sleep(self.poll_interval)
+
+            proc.wait()
+            reader.join(timeout=5)
+            logger.info(
+                f"🧩 Processo do job {job_id} encerrado (exit={proc.returncode}, "
+                f"pico RSS={peak_rss // 1024 // 1024}MB)"
+            )
+        finally:
+            # Limpeza incondicional: o que sobrou do grupo (Chrome que o
+            # driver.quit() não fechou) morre aqui, com ou sem erro.
+            if proc is not None:
+                kill_process_tree(proc.pid)
+                with self._live_lock:
+                    self._live_pids.discard(proc.pid)
+            try:
+                params_file.unlink()
+            except FileNotFoundError:
+                pass
+
+        if failure is not None:
+            return failure
+        if "result" in holder:
+            return holder["result"]
+        return self._failed_result(
+            started_at,
+            f"Processo do job terminou sem resultado (exit code {proc.returncode})",
+            "ChildProcessError",
+            # Filho morto sem resultado (OOM killer, Chrome derrubando o
+            # processo) vale nova tentativa; estouro dos limites acima não:
+            # o mesmo job estouraria de novo.
+            transient=True,
+        )
@@ -0,0 +1,70 @@
+# src/core/job_retry.py
+from typing import Dict, List, NamedTuple, Optional
+
+# Tentativas já feitas pelo job (0 na mensagem original). Gravado pelo
+# worker em cada republicação; x-death do broker não serve porque conta
+# por fila e é reiniciado quando o roteador republica.
+HEADER_RETRY_ATTEMPT = "x-retry-attempt"
+
+# Cada nível de espera dobra duas vezes (30s, 2min, 8min, 32min...).
+_BACKOFF_FACTOR = 4
+
+
+def retry_attempt(headers: Optional[Dict]) -> int:
+    try:
+        return max(int((headers or {}).get(HEADER_RETRY_ATTEMPT, 0)), 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class RetryDecision(NamedTuple):
+    attempt: int
+    delay_seconds: int
+    queue: str
+
+
+class RetryPolicy:
+    """Backoff das falhas transitórias por filas de espera com TTL.
+
+    Cada nível de espera é uma fila durável <fila>.retry.<N>s, sem
+    consumidor, com x-message-ttl = N segundos e dead-letter de volta para
+    a fila principal pela exchange default: a mensagem "dorme" no broker,
+    sem ocupar slot nem abrir navegador, e reaparece no fim do TTL. O TTL
+    é fixo por fila (todas as mensagens de uma fila expiram na ordem de
+    chegada), por isso um nível por atraso.
+
+    Esgotado o orçamento (max_attempts), o worker rejeita sem requeue e a
+    fila principal manda o job para a maestro.dlx.
+    """
+
+    def __init__(self, base_queue: str, max_attempts: int, base_delay_seconds: int, max_delay_seconds: int):
+        self.base_queue = base_queue
+        self.max_attempts = max_attempts
+        self.base_delay_seconds = base_delay_seconds
+        self.max_delay_seconds = max(max_delay_seconds, base_delay_seconds)
+
+    def delay_for(self, attempt: int) -> int:
+        """Espera antes da tentativa de número attempt (1 = primeiro retry)."""
+        return min(self.base_delay_seconds * _BACKOFF_FACTOR ** max(attempt - 1, 0), self.max_delay_seconds)
+
+    def retry_queue(self, delay_seconds: int) -> str:
+        return f"{self.base_queue}.retry.{delay_seconds}s"
+
+    def queue_arguments(self, delay_seconds: int) -> Dict:
+        return {
+            "x-message-ttl": delay_seconds * 1000,
+            "x-dead-letter-exchange": "",
+            "x-dead-letter-routing-key": self.base_queue,
+        }
+
+    def delays(self) -> List[int]:
+        """Atrasos distintos usados pelo orçamento (uma fila para cada)."""
+        return sorted({self.delay_for(attempt) for attempt in range(1, self.max_attempts + 1)})
+
+    def next_retry(self, headers: Optional[Dict]) -> Optional[RetryDecision]:
+        """Próxima tentativa do job, ou None se o orçamento acabou."""
+        attempt = retry_attempt(headers) + 1
+        if attempt > self.max_attempts:
+            return None
+        delay = self.delay_for(attempt)
+        return RetryDecision(attempt, delay, self.retry_queue(delay))
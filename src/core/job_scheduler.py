@@ -0,0 +1,70 @@
+# src/core/job_scheduler.py
+import threading
+import time
+from typing import List, Optional
+
+from src.core.job_cost import SIZE_LARGE, SIZE_SMALL
+
+# Headers gravados pelo roteador na mensagem republicada na fila da classe.
+HEADER_JOB_COST = "x-job-cost-seconds"
+HEADER_SIZE_CLASS = "x-size-class"
+HEADER_ROUTED_AT = "x-routed-at"
+
+
+def size_class_queue(base_queue: str, size_class: str) -> str:
+    return f"{base_queue}.{size_class}"
+
+
+class SizeClassScheduler:
+    """Decide de qual fila de classe (small/large) cada slot livre puxa.
+
+    - Slots reservados (ids 0..reserved_small_slots-1) só pegam jobs
+      pequenos: um job de 1 loja/1 dia nunca espera atrás de exports de
+      horas.
+    - Slots gerais preferem small, mas se há backlog de large esperando há
+      mais de large_max_wait_seconds desde o último large despachado, o
+      próximo slot geral pega um large (aging — sem starvation).
+
+    Sem estado de rede: quem chama informa o backlog da fila large
+    (observe_large_backlog) e avisa quando despacha um large.
+    """
+
+    def __init__(self, worker_slots: int, reserved_small_slots: int, large_max_wait_seconds: float):
+        # Com 1 slot não há o que reservar: sobra só o aging.
+        self.reserved_small_slots = min(reserved_small_slots, max(worker_slots - 1, 0))
+        self.large_max_wait_seconds = large_max_wait_seconds
+        self._large_waiting_since: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def is_reserved(self, slot_id: int) -> bool:
+        return slot_id < self.reserved_small_slots
+
+    def observe_large_backlog(self, message_count: int, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if message_count <= 0:
+                self._large_waiting_since = None
+            elif self._large_waiting_since is None:
+                self._large_waiting_since = now
+
+    def large_dispatched(self, now: Optional[float] = None) -> None:
+        # Reinicia o relógio: o próximo large da fila espera um novo período.
+        with self._lock:
+            if self._large_waiting_since is not None:
+                self._large_waiting_since = time.monotonic() if now is None else now
+
+    def large_overdue(self, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return (
+                self._large_waiting_since is not None
+                and now - self._large_waiting_since >= self.large_max_wait_seconds
+            )
+
+    def queue_order(self, slot_id: int, now: Optional[float] = None) -> List[str]:
+        """Classes a tentar, em ordem, para o slot."""
+        if self.is_reserved(slot_id):
+            return [SIZE_SMALL]
+        if self.large_overdue(now):
+            return [SIZE_LARGE, SIZE_SMALL]
+        return [SIZE_SMALL, SIZE_LARGE]
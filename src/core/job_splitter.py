@@ -0,0 +1,339 @@
+# src/core/job_splitter.py
+import logging
+import shutil
+import threading
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from src.core.job_messages import parse_gms_date
+from src.utils import file_handler
+
+logger = logging.getLogger(__name__)
+
+_GMS_DATE_FORMAT = "%d/%m/%Y"
+
+# Só estes status de shard contam como sucesso do job pai.
+_SUCCESS_STATUSES = ("completed", "completed_no_invoices")
+
+LogCallback = Callable[[str, str, str], object]
+# run_shard(shard_params, slot_id, log_callback) -> resultado do BotRunner
+RunShard = Callable[[Dict, int, LogCallback], Dict]
+
+
+def _balanced_size(total: int, limit: int) -> int:
+    if limit <= 0 or total <= limit:
+        return max(total, 1)
+    parts = -(-total // limit)
+    return -(-total // parts)
+
+
+def plan_shards(bot_params: Dict, max_days: int, max_stores: int) -> List[Dict]:
+    """Divide o job em shards de até max_days dias × max_stores lojas.
+
+    0 desliga o corte naquela dimensão. Job que cabe num shard só (ou com
+    período ilegível — o bot reporta o erro) volta como lista de um item,
+    com os próprios parâmetros.
+    """
+    stores = list(bot_params.get('stores') or [])
+    try:
+        start = parse_gms_date(bot_params.get('start_date'))
+        end = parse_gms_date(bot_params.get('end_date'))
+    except (TypeError, ValueError):
+        return [bot_params]
+    if end < start:
+        return [bot_params]
+
+    # Pedaços equilibrados (31 dias com máximo 15 → 11+11+9, não 15+15+1):
+    # o job termina quando termina o shard mais lento.
+    total_days = (end - start).days + 1
+    days_per_shard = _balanced_size(total_days, max_days)
+    day_ranges = []
+    cursor = start
+    while cursor <= end:
+        chunk_end = min(cursor + timedelta(days=days_per_shard - 1), end)
+        day_ranges.append((cursor, chunk_end))
+        cursor = chunk_end + timedelta(days=1)
+
+    group_size = _balanced_size(len(stores), max_stores)
+    store_groups = [stores[i:i + group_size] for i in range(0, len(stores), group_size)] or [stores]
+
+    if len(day_ranges) * len(store_groups) <= 1:
+        return [bot_params]
+
+    return [
+        {
+            **bot_params,
+            'start_date': chunk_start.strftime(_GMS_DATE_FORMAT),
+            'end_date': chunk_end.strftime(_GMS_DATE_FORMAT),
+            'stores': group,
+        }
+        for chunk_start, chunk_end in day_ranges
+        for group in store_groups
+    ]
+
+
+def merge_summaries(summaries: List[Dict], destination: Path) -> Dict:
+    """Resumo único do job pai a partir dos resumos dos shards."""
+    merged = {
+        "total_xml_files_analyzed": 0,
+        "valid_invoices_found": 0,
+        "document_types": {"nfe_model_55": 0, "nfce_model_65": 0},
+        "operation_nature": {"exit_notes": 0, "entry_notes": 0},
+        "period_of_documents": [],
+        "stores_found": [],
+        "destination": str(destination),
+    }
+    dates = set()
+    stores: Dict[str, str] = {}
+    for summary in summaries:
+        if not summary:
+            continue
+        merged["total_xml_files_analyzed"] += summary.get("total_xml_files_analyzed", 0)
+        merged["valid_invoices_found"] += summary.get("valid_invoices_found", 0)
+        for section in ("document_types", "operation_nature"):
+            for name, count in (summary.get(section) or {}).items():
+                merged[section][name] = merged[section].get(name, 0) + count
+        dates.update(summary.get("period_of_documents") or [])
+        for store in summary.get("stores_found") or []:
+            stores.setdefault(store.get("cnpj"), store.get("name"))
+    merged["period_of_documents"] = sorted(dates)
+    merged["stores_found"] = [{"cnpj": cnpj, "name": name} for cnpj, name in stores.items()]
+    return merged
+
+
+def _shard_key(shard: Dict):
+    return (shard['start_date'], shard['end_date'], tuple(str(s) for s in shard['stores']))
+
+
+def _shard_label(shard: Dict) -> str:
+    period = shard['start_date'] if shard['start_date'] == shard['end_date'] else f"{shard['start_date']} a {shard['end_date']}"
+    return f"{period}, {len(shard['stores'])} loja(s)"
+
+
+class ShardedJob:
+    """Executa os shards de um job e junta tudo num resultado só.
+
+    Os shards rodam no slot do job pai e, em paralelo, em slots ociosos
+    emprestados pelo worker (borrow_slot devolve None quando não há ou
+    quando o worker não empresta). Cada shard baixa no pending do slot em
+    que roda e copia para a pasta do job pai em processed/, que é limpa uma
+    vez antes do primeiro shard.
+
+    Falha de um shard para a distribuição dos seguintes (os que estão
+    rodando terminam) e o job pai falha; cancelamento idem. Exceção de um
+    shard é re-levantada depois que todos terminam, para o worker aplicar a
+    mesma política de requeue de um job comum.
+
+    No drain do worker (suspend_event) o job pai volta suspenso com os
+    shards concluídos no checkpoint; na retomada eles são pulados e a pasta
+    de destino não é limpa.
+    """
+
+    def __init__(
+        self,
+        job_id: str,
+        bot_params: Dict,
+        shards: List[Dict],
+        run_shard: RunShard,
+        slot_id: int,
+        borrow_slot: Optional[Callable[[], Optional[int]]] = None,
+        return_slot: Optional[Callable[[int], None]] = None,
+        cancel_event: Optional[threading.Event] = None,
+        log_callback: Optional[LogCallback] = None,
+        suspend_event: Optional[threading.Event] = None,
+        checkpoint: Optional[Dict] = None,
+    ):
+        self.job_id = job_id
+        self.bot_params = bot_params
+        self.shards = shards
+        self.run_shard = run_shard
+        self.slot_id = slot_id
+        self.borrow_slot = borrow_slot
+        self.return_slot = return_slot
+        self.cancel_event = cancel_event if cancel_event is not None else threading.Event()
+        self.suspend_event = suspend_event if suspend_event is not None else threading.Event()
+        self.log_callback = log_callback
+        self.destination = file_handler.processed_destination(
+            bot_params['document_type'], bot_params['start_date'], bot_params['end_date']
+        )
+
+        self._lock = threading.Lock()
+        self._pending = deque(enumerate(shards))
+        self._results: List[Optional[Dict]] = [None] * len(shards)
+        self._error: Optional[BaseException] = None
+        self._halted = False
+        self._done = 0
+
+        # Retomada: shards que outro worker já concluiu (mesmo corte) entram
+        # como resultado pronto.
+        self._resumed = 0
+        if checkpoint and checkpoint.get("stage") == "shards":
+            done = {_shard_key(entry): entry for entry in checkpoint.get("shards_done") or []}
+            for index, shard in enumerate(shards):
+                entry = done.get(_shard_key(shard))
+                if entry is not None:
+                    self._results[index] = {"status": entry.get("status"), "summary": entry.get("summary"), "resumed": True}
+                    self._resumed += 1
+            self._pending = deque((i, s) for i, s in enumerate(shards) if self._results[i] is None)
+            self._done = self._resumed
+
+    def _log(self, level: str, message: str) -> None:
+        if self.log_callback:
+            self.log_callback(self.job_id, level, message)
+
+    def _shard_logger(self, index: int) -> LogCallback:
+        prefix = f"[shard {index + 1}/{len(self.shards)}] "
+
+        def _log(job_id: str, level: str, message: str):
+            if self.log_callback:
+                return self.log_callback(job_id, level, prefix + message)
+            return True
+        return _log
+
+    def _next_shard(self):
+        with self._lock:
+            if self._halted or self.cancel_event.is_set() or self.suspend_event.is_set() or not self._pending:
+                return None
+            return self._pending.popleft()
+
+    def _run_lane(self, slot_id: int) -> None:
+        while True:
+            item = self._next_shard()
+            if item is None:
+                return
+            index, shard = item
+            try:
+                result = self.run_shard(
+                    {**shard, 'destination_dir': str(self.destination)},
+                    slot_id,
+                    self._shard_logger(index),
+                )
+            except BaseException as e:
+                with self._lock:
+                    self._error = self._error or e
+                    self._halted = True
+                    self._results[index] = {"status": "failed", "error": str(e), "error_type": type(e).__name__}
+                self._log("ERROR", f"Shard {index + 1}/{len(self.shards)} ({_shard_label(shard)}) falhou: {e}")
+                return
+
+            status = result.get("status")
+            with self._lock:
+                self._results[index] = result
+                self._done += 1
+                done = self._done
+                if status not in _SUCCESS_STATUSES:
+                    self._halted = True
+            level = "INFO" if status in _SUCCESS_STATUSES else "WARNING"
+            self._log(level, f"Shard {index + 1}/{len(self.shards)} ({_shard_label(shard)}): {status}. Progresso: {done}/{len(self.shards)}")
+
+    def run(self) -> Dict:
+        started = datetime.now()
+        if self._resumed:
+            self._log("INFO", f"Retomando job dividido: {self._resumed}/{len(self.shards)} shard(s) já concluído(s) por outro worker")
+        elif self.destination.exists() and self.destination.is_dir():
+            logger.warning(f"O diretório de destino '{self.destination}' já existe. Removendo-o...")
+            shutil.rmtree(self.destination)
+        self.destination.mkdir(parents=True, exist_ok=True)
+
+        self._log("INFO", f"Job dividido em {len(self.shards)} shard(s) (destino: {self.destination})")
+        logger.info(f"🧩 Job {self.job_id} dividido em {len(self.shards)} shard(s)")
+
+        borrowed: List[int] = []
+        while self.borrow_slot is not None and len(borrowed) + 1 < len(self._pending):
+            slot_id = self.borrow_slot()
+            if slot_id is None:
+                break
+            borrowed.append(slot_id)
+        if borrowed:
+            logger.info(f"🧩 Job {self.job_id}: {len(borrowed)} slot(s) ocioso(s) emprestado(s) para shards")
+
+        lanes = [
+            threading.Thread(target=self._run_lane, args=(slot_id,), name=f"slot-{slot_id}-shard", daemon=True)
+            for slot_id in borrowed
+        ]
+        try:
+            for lane in lanes:
+                lane.start()
+            self._run_lane(self.slot_id)
+            for lane in lanes:
+                lane.join()
+        finally:
+            for slot_id in borrowed:
+                if self.return_slot is not None:
+                    self.return_slot(slot_id)
+
+        if self._error is not None:
+            raise self._error
+        return self._aggregate(started)
+
+    def _aggregate(self, started: datetime) -> Dict:
+        finished = datetime.now()
+        results = [r for r in self._results if r is not None]
+        statuses = [r.get("status") for r in results]
+        shards_report = [
+            {
+                "start_date": shard['start_date'],
+                "end_date": shard['end_date'],
+                "stores": len(shard['stores']),
+                "status": result.get("status") if result else "not_started",
+                "duration_seconds": result.get("duration_seconds") if result else None,
+            }
+            for shard, result in zip(self.shards, self._results)
+        ]
+        summary = merge_summaries(
+            [r.get("summary") for r in results if r.get("status") == "completed"],
+            self.destination,
+        )
+        summary["shards"] = shards_report
+
+        result = {
+            "started_at": started.isoformat(),
+            "completed_at": finished.isoformat(),
+            "duration_seconds": (finished - started).total_seconds(),
+            "summary": summary,
+            "error": None,
+        }
+        failed = next((r for r in results if r.get("status") == "failed"), None)
+        canceled = next((r for r in results if r.get("status") == "canceled"), None)
+        suspended = any(r.get("status") == "suspended" for r in results)
+        if failed is not None:
+            index = self._results.index(failed)
+            result.update({
+                "status": "failed",
+                "error": f"Shard {index + 1}/{len(self.shards)} ({_shard_label(self.shards[index])}): {failed.get('error')}",
+                "error_type": failed.get("error_type"),
+                "transient": bool(failed.get("transient")),
+            })
+        elif canceled is None and (suspended or (self.suspend_event.is_set() and len(results) < len(self.shards))):
+            result.update({
+                "status": "suspended",
+                "stage": "shards",
+                "checkpoint": {
+                    "stage": "shards",
+                    "shards_done": [
+                        {
+                            "start_date": shard['start_date'],
+                            "end_date": shard['end_date'],
+                            "stores": [str(s) for s in shard['stores']],
+                            "status": shard_result.get("status"),
+                            "summary": shard_result.get("summary"),
+                        }
+                        for shard, shard_result in zip(self.shards, self._results)
+                        if shard_result is not None and shard_result.get("status") in _SUCCESS_STATUSES
+                    ],
+                },
+            })
+        elif canceled is not None or self.cancel_event.is_set() or len(results) < len(self.shards):
+            result.update({
+                "status": "canceled",
+                "stage": (canceled or {}).get("stage", "entre_shards"),
+                "canceled_at": datetime.now(timezone.utc).isoformat(),
+            })
+        elif "completed" in statuses:
+            result["status"] = "completed"
+        else:
+            result["status"] = "completed_no_invoices"
+            summary.update({"status": "concluido_sem_notas", "message": "Nenhuma nota fiscal encontrada em nenhum shard"})
+        return result
@@ -0,0 +1,130 @@
+# src/core/job_window.py
+import re
+from datetime import datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+# Momento (epoch, segundos) a partir do qual um job adiado pode rodar.
+# Gravado na primeira vez que o job é adiado; enquanto não chega, o job
+# salta entre as filas de espera. Chegado, roda mesmo que a janela já tenha
+# fechado — a decisão de adiar é tomada uma vez só.
+HEADER_NOT_BEFORE = "x-not-before"
+
+# Degraus das filas de espera <fila>.defer.<N>s. Um job a 7h da janela faz
+# 7 saltos de 1h e termina nos degraus menores; cada salto é um get + publish.
+_DEFER_STEPS = (60, 300, 900, 3600)
+
+_WINDOW_PATTERN = re.compile(r"^\s*(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})\s*$")
+
+Window = Tuple[time, time]
+
+
+def parse_window(value: str) -> Window:
+    """"HH:MM-HH:MM" (hora local) → (início, fim). Fim menor que o início
+    atravessa a meia-noite ("22:00-06:00")."""
+    match = _WINDOW_PATTERN.match(value or "")
+    if not match:
+        raise ValueError(f"Janela de execução inválida: '{value}' (esperado HH:MM-HH:MM)")
+    start_h, start_m, end_h, end_m = (int(g) for g in match.groups())
+    try:
+        return time(start_h, start_m), time(end_h, end_m)
+    except ValueError:
+        raise ValueError(f"Janela de execução inválida: '{value}' (esperado HH:MM-HH:MM)")
+
+
+def in_window(window: Window, moment: datetime) -> bool:
+    start, end = window
+    now = moment.time()
+    if start <= end:
+        return start <= now < end
+    return now >= start or now < end
+
+
+def next_opening(window: Window, moment: datetime) -> datetime:
+    """moment se já está dentro da janela; senão, a próxima abertura."""
+    if in_window(window, moment):
+        return moment
+    opening = datetime.combine(moment.date(), window[0])
+    if opening <= moment:
+        opening += timedelta(days=1)
+    return opening
+
+
+class ExecutionWindowPolicy:
+    """Decide se um job roda agora ou espera a janela fora do pico do GMS.
+
+    Export pesado no horário comercial disputa o GMS com o tráfego do dia e
+    deixa a espera do export (wait_for_export_completion) de todo mundo mais
+    lenta. Um job é adiado quando:
+
+    - traz parameters.execution_window ("HH:MM-HH:MM") e está fora dela; ou
+    - a estimativa de custo passa do limite (parameters
+      .defer_if_larger_than_seconds ou o padrão do worker) e há janela
+      fora do pico configurada.
+
+    Jobs pequenos e sem janela rodam na hora. A espera é no broker, em
+    filas com TTL que devolvem a mensagem à fila principal (como o retry),
+    sem ocupar slot.
+    """
+
+    def __init__(self, base_queue: str, offpeak_window: str = "", defer_larger_than_seconds: int = 0):
+        self.base_queue = base_queue
+        self.offpeak_window = parse_window(offpeak_window) if offpeak_window else None
+        self.defer_larger_than_seconds = defer_larger_than_seconds
+
+    def window_for(self, params: Dict, estimated_seconds: float) -> Optional[Window]:
+        explicit = params.get('execution_window')
+        if explicit:
+            return parse_window(explicit)
+        try:
+            threshold = float(params.get('defer_if_larger_than_seconds', self.defer_larger_than_seconds) or 0)
+        except (TypeError, ValueError):
+            raise ValueError(f"defer_if_larger_than_seconds inválido: {params.get('defer_if_larger_than_seconds')!r}")
+        if self.offpeak_window is not None and threshold > 0 and estimated_seconds > threshold:
+            return self.offpeak_window
+        return None
+
+    def not_before(
+        self,
+        params: Dict,
+        headers: Optional[Dict],
+        estimated_seconds: float,
+        now: Optional[datetime] = None,
+    ) -> Optional[datetime]:
+        """Até quando o job deve esperar, ou None para rodar agora.
+
+        Levanta ValueError se a janela do job for inválida.
+        """
+        now = now or datetime.now()
+        released = (headers or {}).get(HEADER_NOT_BEFORE)
+        if released is not None:
+            try:
+                until = datetime.fromtimestamp(float(released))
+            except (TypeError, ValueError, OverflowError, OSError):
+                return None
+            return until if until > now else None
+
+        window = self.window_for(params, estimated_seconds)
+        if window is None:
+            return None
+        opening = next_opening(window, now)
+        return opening if opening > now else None
+
+    @staticmethod
+    def delay_step(remaining_seconds: float) -> int:
+        """Maior degrau que não passa do que falta (mínimo: o menor)."""
+        fitting = [step for step in _DEFER_STEPS if step <= remaining_seconds]
+        return fitting[-1] if fitting else _DEFER_STEPS[0]
+
+    def delay_queue(self, delay_seconds: int) -> str:
+        return f"{self.base_queue}.defer.{delay_seconds}s"
+
+    def queue_arguments(self, delay_seconds: int) -> Dict:
+        return {
+            "x-message-ttl": delay_seconds * 1000,
+            "x-dead-letter-exchange": "",
+            "x-dead-letter-routing-key": self.base_queue,
+        }
+
+    @staticmethod
+    def delays() -> List[int]:
+        return list(_DEFER_STEPS)
@@ -0,0 +1,293 @@
+# src/core/local_daemon.py
+import json
+import logging
+import shutil
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from config import settings
+from src.core.bot_runner import BotRunner
+from src.core.job_messages import build_bot_params, job_outcome, validate_job_message
+from src.core.local_queue import LocalJobQueue
+
+logger = logging.getLogger(__name__)
+
+# Cadência com que slots ociosos olham a fila e o inbox é varrido.
+_POLL_SECONDS = 1.0
+
+# No encerramento, quanto os jobs têm para chegar num ponto de suspensão
+# (espera do export no GMS) antes de serem cancelados e devolvidos à fila.
+_STOP_SUSPEND_SECONDS = 30.0
+
+
+def job_message(payload: Dict) -> Dict:
+    """Normaliza o que foi submetido no formato da mensagem do RabbitMQ.
+
+    Aceita a mensagem do maestro ({"job_id", "parameters"}) ou só os
+    parâmetros (o mesmo JSON do --params-file). Sem job_id, gera um.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("O job deve ser um objeto JSON")
+    if "parameters" in payload:
+        message = {"job_id": payload.get("job_id"), "parameters": payload.get("parameters") or {}}
+    else:
+        message = {"job_id": payload.get("job_id"), "parameters": {k: v for k, v in payload.items() if k != "job_id"}}
+    message["job_id"] = str(message["job_id"] or uuid.uuid4())
+    validate_job_message(message)
+    return message
+
+
+class LocalDaemon:
+    """Modo nó único do main.py: fila SQLite local no lugar de RabbitMQ + maestro.
+
+    Jobs chegam pela API HTTP local (POST /jobs) ou como arquivos .json no
+    diretório inbox, e rodam no mesmo BotRunner do worker, um por slot
+    (thread + pending isolado). Status, logs e resultado ficam na fila e são
+    consultados pela mesma API. Sem broker nem callbacks HTTP, o custo por
+    job é um INSERT e um UPDATE no SQLite.
+    """
+
+    def __init__(
+        self,
+        queue: LocalJobQueue,
+        slots: int,
+        host: str,
+        port: int,
+        inbox_dir: Optional[Path] = None,
+    ):
+        self.queue = queue
+        self.slots = slots
+        self.host = host
+        self.port = port
+        self.inbox_dir = Path(inbox_dir) if inbox_dir else None
+        self._stop_event = threading.Event()
+        self._suspend_event = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._running: Dict[str, threading.Event] = {}
+        self._user_canceled: Set[str] = set()
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def submit(self, payload: Dict) -> Tuple[str, bool]:
+        """(job_id, criado). Levanta ValueError se o job for inválido."""
+        message = job_message(payload)
+        created = self.queue.submit(message["job_id"], message["parameters"])
+        if created:
+            logger.info(f"📥 Job {message['job_id']} enfileirado")
+        return message["job_id"], created
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        status = self.queue.request_cancel(job_id)
+        with self._lock:
+            cancel_event = self._running.get(job_id)
+            if cancel_event is not None:
+                self._user_canceled.add(job_id)
+                cancel_event.set()
+        if status is not None:
+            logger.info(f"🛑 Cancelamento solicitado para o job {job_id} (status: {status})")
+        return status
+
+    def run(self) -> None:
+        recovered = self.queue.requeue_running()
+        if recovered:
+            logger.warning(f"♻️ {recovered} job(s) interrompido(s) na última execução devolvido(s) à fila")
+
+        self._start_http()
+        for slot_id in range(self.slots):
+            self._start_thread(self._slot_loop, f"slot-{slot_id}", slot_id)
+        if self.inbox_dir is not None:
+            for name in ("accepted", "rejected"):
+                (self.inbox_dir / name).mkdir(parents=True, exist_ok=True)
+            self._start_thread(self._inbox_loop, "inbox")
+            logger.info(f"📂 Inbox de jobs: {self.inbox_dir}")
+
+        logger.info(f"🎯 Daemon local pronto ({self.slots} slot(s)). Fila: {self.queue.path}")
+        try:
+            while not self._stop_event.wait(_POLL_SECONDS):
+                pass
+        finally:
+            self._shutdown()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def _start_thread(self, target, name: str, *args) -> None:
+        thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+        self._threads.append(thread)
+        thread.start()
+
+    def _shutdown(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        with self._lock:
+            running = bool(self._running)
+        if running:
+            # Mesma ideia do drain do worker: quem está esperando o export
+            # volta para a fila com checkpoint; o resto é cancelado e volta
+            # do zero no próximo start.
+            logger.warning("⏸️ Encerrando: suspendendo jobs em andamento...")
+            self._suspend_event.set()
+            deadline = time.monotonic() + _STOP_SUSPEND_SECONDS
+            for thread in self._threads:
+                if thread.name.startswith("slot-"):
+                    thread.join(max(deadline - time.monotonic(), 0.0))
+            with self._lock:
+                for cancel_event in self._running.values():
+                    cancel_event.set()
+        for thread in self._threads:
+            thread.join()
+        logger.info("Daemon local encerrado.")
+
+    def _slot_loop(self, slot_id: int) -> None:
+        while not self._stop_event.is_set():
+            job = self.queue.claim()
+            if job is None:
+                self._stop_event.wait(_POLL_SECONDS)
+                continue
+            self._run_job(job, slot_id)
+
+    def _log(self, job_id: str, level: str, message: str) -> None:
+        self.queue.append_log(job_id, level, message)
+
+    def _run_job(self, job: Dict, slot_id: int) -> None:
+        job_id = job["job_id"]
+        cancel_event = threading.Event()
+        with self._lock:
+            self._running[job_id] = cancel_event
+
+        bot_params = build_bot_params(job["parameters"], settings.headless)
+        if job.get("checkpoint"):
+            bot_params['resume_checkpoint'] = job["checkpoint"]
+            self._log(job_id, "INFO", f"Retomando job suspenso (etapa: {job['checkpoint'].get('stage')})")
+        logger.info(f"🚀 Iniciando execução do job {job_id} (slot {slot_id})")
+        self._log(job_id, "INFO", f"Processando {len(bot_params['stores'])} loja(s) de {bot_params['start_date']} a {bot_params['end_date']}")
+
+        try:
+            result = BotRunner(
+                params=bot_params,
+                job_id=job_id,
+                log_callback=self._log,
+                cancel_event=cancel_event,
+                pending_dir=settings.slot_pending_dir(slot_id),
+                suspend_event=self._suspend_event,
+            ).run()
+        except Exception as e:
+            logger.error(f"❌ Erro ao executar o job {job_id}: {e}", exc_info=True)
+            result = {"status": "failed", "error": str(e), "error_type": type(e).__name__}
+        finally:
+            with self._lock:
+                self._running.pop(job_id, None)
+                user_canceled = job_id in self._user_canceled
+                self._user_canceled.discard(job_id)
+        result['job_id'] = job_id
+
+        if result.get("status") == "suspended" or (
+            self._stop_event.is_set() and result.get("status") == "canceled" and not user_canceled
+        ):
+            self.queue.requeue(job_id, result.get("checkpoint"))
+            self._log(job_id, "WARNING", "Daemon encerrando: job devolvido à fila.")
+            logger.warning(f"⏸️ Job {job_id} devolvido à fila")
+            return
+
+        outcome = job_outcome(job_id, result)
+        self._log(job_id, outcome.log_level, outcome.log_message)
+        self.queue.finish(job_id, outcome.finish_status, result)
+        if outcome.finish_status == "failed":
+            logger.error(outcome.worker_message)
+        else:
+            logger.info(outcome.worker_message)
+
+    def _inbox_loop(self) -> None:
+        while not self._stop_event.wait(_POLL_SECONDS):
+            for path in sorted(self.inbox_dir.glob("*.json")):
+                self._accept_file(path)
+
+    def _accept_file(self, path: Path) -> None:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            job_id, created = self.submit(payload)
+        except (OSError, ValueError) as e:
+            # JSONDecodeError também é ValueError.
+            logger.error(f"❌ Arquivo de job inválido {path.name}: {e}")
+            target = self.inbox_dir / "rejected" / path.name
+        else:
+            if not created:
+                logger.warning(f"♻️ Job {job_id} do arquivo {path.name} já existe na fila. Ignorado.")
+            target = self.inbox_dir / "accepted" / path.name
+        try:
+            shutil.move(str(path), str(target))
+        except OSError as e:
+            logger.error(f"❌ Falha ao mover {path.name} do inbox: {e}")
+
+    def _start_http(self) -> None:
+        if not self.port:
+            return
+        daemon = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                parts = [p for p in url.path.split("/") if p]
+                query = parse_qs(url.query)
+                if parts == ["jobs"]:
+                    status = (query.get("status") or [None])[0]
+                    self._reply(200, {"jobs": daemon.queue.list(status=status), "counts": daemon.queue.counts()})
+                elif len(parts) == 2 and parts[0] == "jobs":
+                    job = daemon.queue.get(parts[1])
+                    if job is None:
+                        self._reply(404, {"error": "job não encontrado"})
+                    else:
+                        self._reply(200, job)
+                elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "logs":
+                    try:
+                        after = int((query.get("after") or ["0"])[0])
+                    except ValueError:
+                        after = 0
+                    self._reply(200, {"logs": daemon.queue.logs(parts[1], after_id=after)})
+                elif parts == ["healthz"]:
+                    self._reply(200, {"status": "ok"})
+                else:
+                    self._reply(404, {"error": "not found"})
+
+            def do_POST(self):
+                parts = [p for p in urlparse(self.path).path.split("/") if p]
+                if parts == ["jobs"]:
+                    try:
+                        length = int(self.headers.get("Content-Length") or 0)
+                        job_id, created = daemon.submit(json.loads(self.rfile.read(length) or b"{}"))
+                    except ValueError as e:
+                        self._reply(400, {"error": str(e)})
+                        return
+                    status = 201 if created else 409
+                    self._reply(status, {"job_id": job_id, "status": (daemon.queue.get(job_id) or {}).get("status")})
+                elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "cancel":
+                    status = daemon.cancel(parts[1])
+                    if status is None:
+                        self._reply(404, {"error": "job não encontrado"})
+                    else:
+                        self._reply(202, {"job_id": parts[1], "status": status})
+                else:
+                    self._reply(404, {"error": "not found"})
+
+            def _reply(self, status: int, payload: Dict) -> None:
+                body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(f"api {self.address_string()} {format % args}")
+
+        self._server = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self._server.daemon_threads = True
+        self._start_thread(self._server.serve_forever, "local-api")
+        logger.info(f"🌐 API local em http://{self.host}:{self.port}/jobs")
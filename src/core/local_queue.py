@@ -0,0 +1,182 @@
+# src/core/local_queue.py
+import json
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src.utils.sqlite_store import connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS local_jobs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL UNIQUE,
+    parameters TEXT NOT NULL,
+    status TEXT NOT NULL,
+    submitted_at TEXT NOT NULL,
+    started_at TEXT,
+    completed_at TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    checkpoint TEXT,
+    result TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_local_jobs_status ON local_jobs (status, seq);
+CREATE TABLE IF NOT EXISTS local_job_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    level TEXT NOT NULL,
+    message TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_local_job_logs_job ON local_job_logs (job_id, id);
+"""
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+
+# Parâmetros devolvidos pela API/listagem sem o valor.
+_MASKED_PARAMETERS = ("gms_password",)
+
+
+class LocalJobQueue:
+    """Fila de jobs em SQLite para o modo daemon do main.py (sem broker).
+
+    Faz o papel do RabbitMQ + maestro num nó só: guarda os jobs em ordem de
+    chegada, entrega cada um a um slot (claim) e guarda status, resultado e
+    logs. Jobs em "running" quando o processo caiu voltam para a fila no
+    próximo start (requeue_running) — mesma semântica da mensagem sem ack.
+    Conexão única, serializada por lock, em WAL (ver connect_sqlite).
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(self.path)
+        self._conn.executescript(_SCHEMA)
+
+    def submit(self, job_id: str, parameters: Dict) -> bool:
+        """Enfileira o job. False se o job_id já existe (não duplica)."""
+        with self._lock:
+            cursor = self._conn.execute(
+                """
+                INSERT OR IGNORE INTO local_jobs (job_id, parameters, status, submitted_at)
+                VALUES (?, ?, ?, ?)
+                """,
+                (job_id, json.dumps(parameters, ensure_ascii=False), STATUS_QUEUED, datetime.now().isoformat()),
+            )
+        return cursor.rowcount == 1
+
+    def claim(self) -> Optional[Dict]:
+        """Próximo job da fila, já marcado como running, ou None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM local_jobs WHERE status = ? ORDER BY seq LIMIT 1",
+                (STATUS_QUEUED,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE local_jobs SET status = ?, started_at = ? WHERE seq = ?",
+                (STATUS_RUNNING, datetime.now().isoformat(), row["seq"]),
+            )
+        return self._decode(row, masked=False)
+
+    def finish(self, job_id: str, status: str, result: Dict) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE local_jobs SET status = ?, completed_at = ?, result = ?, checkpoint = NULL WHERE job_id = ?",
+                (status, datetime.now().isoformat(), json.dumps(result, ensure_ascii=False, default=str), job_id),
+            )
+
+    def requeue(self, job_id: str, checkpoint: Optional[Dict] = None) -> None:
+        """Devolve um job interrompido pelo encerramento do daemon à fila."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE local_jobs SET status = ?, started_at = NULL, checkpoint = ? WHERE job_id = ?",
+                (STATUS_QUEUED, json.dumps(checkpoint) if checkpoint else None, job_id),
+            )
+
+    def requeue_running(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE local_jobs SET status = ?, started_at = NULL WHERE status = ?",
+                (STATUS_QUEUED, STATUS_RUNNING),
+            ).rowcount
+
+    def request_cancel(self, job_id: str) -> Optional[str]:
+        """Marca o cancelamento; job ainda na fila é cancelado na hora.
+
+        Devolve o status do job depois da marcação, ou None se não existe.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT status FROM local_jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            if row["status"] == STATUS_QUEUED:
+                self._conn.execute(
+                    "UPDATE local_jobs SET status = 'canceled', completed_at = ?, cancel_requested = 1 WHERE job_id = ?",
+                    (datetime.now().isoformat(), job_id),
+                )
+                return "canceled"
+            if row["status"] == STATUS_RUNNING:
+                self._conn.execute("UPDATE local_jobs SET cancel_requested = 1 WHERE job_id = ?", (job_id,))
+            return row["status"]
+
+    def append_log(self, job_id: str, level: str, message: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO local_job_logs (job_id, created_at, level, message) VALUES (?, ?, ?, ?)",
+                (job_id, datetime.now().isoformat(), level, message),
+            )
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM local_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._decode(row) if row is not None else None
+
+    def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        with self._lock:
+            if status:
+                rows = self._conn.execute(
+                    "SELECT * FROM local_jobs WHERE status = ? ORDER BY seq DESC LIMIT ?", (status, limit)
+                ).fetchall()
+            else:
+                rows = self._conn.execute("SELECT * FROM local_jobs ORDER BY seq DESC LIMIT ?", (limit,)).fetchall()
+        return [self._decode(row) for row in rows]
+
+    def logs(self, job_id: str, after_id: int = 0, limit: int = 500) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT id, created_at, level, message FROM local_job_logs
+                WHERE job_id = ? AND id > ? ORDER BY id LIMIT ?
+                """,
+                (job_id, after_id, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS n FROM local_jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    @staticmethod
+    def _decode(row, masked: bool = True) -> Dict:
+        job = dict(row)
+        job.pop("seq", None)
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        job["parameters"] = json.loads(job["parameters"])
+        if masked:
+            for name in _MASKED_PARAMETERS:
+                if job["parameters"].get(name):
+                    job["parameters"][name] = "***"
+        for name in ("checkpoint", "result"):
+            job[name] = json.loads(job[name]) if job[name] else None
+        return job
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,216 @@
+# src/core/maestro_client.py
+import gzip
+import json
+import logging
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Timeout de leitura por endpoint (segundos). O connect é curto e fixo: se o
+# maestro não aceita conexão em 5s, esperar mais não ajuda.
+DEFAULT_TIMEOUTS: Dict[str, float] = {
+    "start": 10.0,
+    "log": 5.0,
+    "logs": 10.0,
+    "finish": 30.0,
+    "status": 10.0,
+    "cancellation": 10.0,
+}
+_CONNECT_TIMEOUT = 5.0
+_DEFAULT_READ_TIMEOUT = 10.0
+
+# Respostas de GET que valem retry: o maestro (ou o proxy na frente) está
+# reiniciando/sobrecarregado, não é erro do pedido.
+_RETRYABLE_STATUS = frozenset({502, 503, 504})
+
+# 400 só conta como recusa do gzip se a resposta falar da compressão: um
+# payload inválido também volta 400 e não pode desligar o gzip nem repetir
+# o POST.
+_GZIP_REFUSAL_HINTS = ("gzip", "content-encoding", "compress")
+
+
+class MaestroClientBase:
+    """Parte comum aos clientes síncrono (requests) e assíncrono (httpx):
+    headers, timeouts por endpoint, decisão de gzip, backoff e estatísticas.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str = "",
+        gzip_min_bytes: int = 64 * 1024,
+        get_retries: int = 2,
+        retry_backoff: float = 0.5,
+        timeouts: Optional[Dict[str, float]] = None,
+    ):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.gzip_min_bytes = gzip_min_bytes
+        self.get_retries = get_retries
+        self.retry_backoff = retry_backoff
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def _headers(self) -> Dict[str, str]:
+        # WHY: middleware do maestro tem bypass-se-vazio. Quando MAESTRO_WORKER_API_KEY
+        # não está populada, o worker não envia o header e o maestro aceita.
+        # Quando populada, mandamos em todos os callbacks (start/log/finish/cancellation)
+        # — coerência total, não dá pra metade autenticar e metade não.
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["X-Worker-API-Key"] = self.api_key
+        return headers
+
+    def url(self, endpoint: str) -> str:
+        return f"{self.base_url}/{endpoint.lstrip('/')}"
+
+    def _read_timeout(self, name: str) -> float:
+        return self.timeouts.get(name, _DEFAULT_READ_TIMEOUT)
+
+    def _record(self, name: str, elapsed: float, error: bool) -> None:
+        with self._stats_lock:
+            stats = self._stats.setdefault(name, {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+            elapsed_ms = elapsed * 1000
+            stats["count"] += 1
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+            if error:
+                stats["errors"] += 1
+
+    def latency_snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Contagem, erros, média e máximo (ms) por endpoint desde o start."""
+        with self._stats_lock:
+            return {
+                name: {
+                    "count": int(s["count"]),
+                    "errors": int(s["errors"]),
+                    "avg_ms": round(s["total_ms"] / s["count"], 1) if s["count"] else 0.0,
+                    "max_ms": round(s["max_ms"], 1),
+                }
+                for name, s in self._stats.items()
+            }
+
+    def _should_retry(self, status_code: int, attempt: int) -> bool:
+        return status_code in _RETRYABLE_STATUS and attempt < self.get_retries
+
+    def _retry_delay(self, attempt: int) -> float:
+        # Full jitter: vários slots batendo no mesmo maestro que acabou de
+        # voltar não devem sincronizar as tentativas.
+        return random.uniform(0, self.retry_backoff * (2 ** attempt))
+
+    def _encode_payload(self, payload: Dict) -> bytes:
+        return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+    def _should_gzip(self, body: bytes) -> bool:
+        return bool(self.gzip_min_bytes) and len(body) >= self.gzip_min_bytes
+
+    def _gzip_rejected(self, name: str, status_code: int, body: str = "") -> bool:
+        """True (e desliga o gzip) se o maestro recusou o corpo comprimido:
+        415, ou 400 cujo corpo menciona a codificação."""
+        if status_code == 400:
+            text = (body or "").lower()
+            if not any(hint in text for hint in _GZIP_REFUSAL_HINTS):
+                return False
+        elif status_code != 415:
+            return False
+        logger.warning(
+            f"⚠️ Maestro recusou corpo gzip em {name} (HTTP {status_code}). "
+            f"Reenviando sem compressão e desativando gzip."
+        )
+        self.gzip_min_bytes = 0
+        return True
+
+
+class MaestroClient(MaestroClientBase):
+    """Cliente HTTP do worker para os callbacks do maestro.
+
+    Uma única requests.Session com pool de conexões keep-alive é compartilhada
+    por todos os slots, pelo LogShipper e pelos CancellationWatchers — sem
+    handshake TCP/TLS novo a cada log ou poll de cancelamento.
+
+    Além do pool:
+    - timeout por endpoint (DEFAULT_TIMEOUTS, sobrescrevível);
+    - corpo em gzip quando o JSON passa de gzip_min_bytes (resultados com
+      milhares de XMLs); se o maestro recusar (415, ou 400 citando a
+      codificação), reenvia sem gzip e
+      desliga a compressão para o resto da vida do cliente;
+    - retry com backoff exponencial + jitter só para GET (idempotente);
+    - latência acumulada por endpoint (latency_snapshot).
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str = "",
+        pool_size: int = 10,
+        gzip_min_bytes: int = 64 * 1024,
+        get_retries: int = 2,
+        retry_backoff: float = 0.5,
+        timeouts: Optional[Dict[str, float]] = None,
+    ):
+        super().__init__(base_url, api_key, gzip_min_bytes, get_retries, retry_backoff, timeouts)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(self._headers())
+
+    def _timeout(self, name: str):
+        return (_CONNECT_TIMEOUT, self._read_timeout(name))
+
+    def _send(self, method: str, endpoint: str, name: str, **kwargs) -> requests.Response:
+        start = time.monotonic()
+        try:
+            response = self.session.request(method, self.url(endpoint), timeout=self._timeout(name), **kwargs)
+        except requests.exceptions.RequestException:
+            self._record(name, time.monotonic() - start, error=True)
+            raise
+        self._record(name, time.monotonic() - start, error=response.status_code >= 400)
+        return response
+
+    def get(self, endpoint: str, name: str) -> requests.Response:
+        """GET com retry (rede, timeout, 502/503/504) e jitter entre tentativas.
+
+        Esgotadas as tentativas, propaga a última exceção ou devolve a última
+        resposta — quem chama decide o que é erro.
+        """
+        attempt = 0
+        while True:
+            try:
+                response = self._send("GET", endpoint, name)
+                if not self._should_retry(response.status_code, attempt):
+                    return response
+            except requests.exceptions.RequestException:
+                if attempt >= self.get_retries:
+                    raise
+            time.sleep(self._retry_delay(attempt))
+            attempt += 1
+
+    def post(self, endpoint: str, name: str, payload: Optional[Dict] = None) -> requests.Response:
+        """POST sem retry (não idempotente do ponto de vista do maestro)."""
+        if payload is None:
+            return self._send("POST", endpoint, name)
+
+        body = self._encode_payload(payload)
+        if self._should_gzip(body):
+            response = self._send(
+                "POST", endpoint, name,
+                data=gzip.compress(body),
+                headers={"Content-Encoding": "gzip"},
+            )
+            if not self._gzip_rejected(name, response.status_code, response.text):
+                return response
+
+        return self._send("POST", endpoint, name, data=body)
+
+    def close(self) -> None:
+        self.session.close()
@@ -13,6 +13,10 @@ class CancellationWatcher:
     2. Servir de heartbeat — cada GET atualiza last_heartbeat_at no maestro,
        impedindo que o retry worker considere o job órfão (janela de 5min).
 
+    Com o cancelamento por push (exchange de controle no RabbitMQ), quem
+    recebe a mensagem chama trigger() e o bot é sinalizado na hora; o poll
+    continua, mais espaçado, só como heartbeat e rede de segurança.
+
     Uso recomendado como context manager:
 
         with CancellationWatcher(check_fn, job_id, on_cancel=...) as watcher:
@@ -33,6 +37,27 @@ class CancellationWatcher:
         self.cancel_event = threading.Event()
         self._stop_event = threading.Event()
         self._thread: Optional[threading.Thread] = None
+        self._fire_lock = threading.Lock()
+
+    def trigger(self, source: str = "poll") -> bool:
+        """Sinaliza o cancelamento (uma vez só). Retorna False se já estava
+        cancelado. Thread-safe: pode vir do poll ou do consumidor AMQP.
+        """
+        with self._fire_lock:
+            if self.cancel_event.is_set():
+                return False
+            logger.warning(f"🛑 Cancelamento solicitado para job {self.job_id} (via {source})")
+            if self.on_cancel is not None:
+                try:
+                    self.on_cancel()
+                except Exception as cb_err:
+                    logger.warning(
+                        f"CancellationWatcher: callback on_cancel falhou: {cb_err}"
+                    )
+            self.cancel_event.set()
+        # Acorda o poll: não há mais o que vigiar depois do cancelamento.
+        self._stop_event.set()
+        return True
 
     def _run(self) -> None:
         logger.info(
@@ -41,15 +66,7 @@ class CancellationWatcher:
         while not self._stop_event.is_set():
             try:
                 if self.check_fn(self.job_id):
-                    logger.warning(f"🛑 Cancelamento solicitado para job {self.job_id}")
-                    if self.on_cancel is not None:
-                        try:
-                            self.on_cancel()
-                        except Exception as cb_err:
-                            logger.warning(
-                                f"CancellationWatcher: callback on_cancel falhou: {cb_err}"
-                            )
-                    self.cancel_event.set()
+                    self.trigger("poll")
                     return
             except Exception as poll_err:
                 # WHY warning, não error: blip de rede ou restart do maestro não
@@ -0,0 +1,182 @@
+# src/utils/circuit_breaker.py
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from config import settings
+from src.utils.sqlite_store import connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS gms_circuits (
+    host TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    failures INTEGER NOT NULL DEFAULT 0,
+    opened_at REAL,
+    probe_at REAL
+);
+"""
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+# Sonda que não reportou nada nesse prazo (worker morreu, job cancelado antes
+# do login) libera outra.
+_PROBE_TIMEOUT_SECONDS = 600.0
+
+
+def host_of(url: Optional[str]) -> Optional[str]:
+    return urlparse(url).hostname if url else None
+
+
+class CircuitBreaker:
+    """Circuit breaker por host do GMS, compartilhado entre slots e workers.
+
+    Com o GMS fora do ar, cada job abria o Chrome (até 3 tentativas), esperava
+    a página de login e os timeouts de 30s antes de falhar — e todos os jobs
+    da fila repetiam isso. Aqui falhas de conexão/página de login do host
+    (record_failure) abrem o circuito depois de failure_threshold seguidas;
+    aberto, admit() recusa o job na hora (sem navegador) e diz quando tentar
+    de novo. Passado open_seconds, um único job entra como sonda (half-open):
+    sucesso fecha o circuito, falha reabre.
+
+    Falha de credencial (LoginError) não conta: é da conta, não do host.
+    Estado em SQLite (WAL) compartilhado, como o TokenBucketLimiter: a sonda
+    é uma só entre todos os workers que usam o mesmo arquivo.
+    """
+
+    def __init__(self, path: Path, failure_threshold: int = 5, open_seconds: float = 120.0):
+        self.path = Path(path)
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(self.path)
+        self._conn.executescript(_SCHEMA)
+
+    def _update(self, host: str, transition) -> Optional[float]:
+        """Lê a linha do host e aplica transition(row) numa transação
+        BEGIN IMMEDIATE: dois workers não viram sonda ao mesmo tempo."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT state, failures, opened_at, probe_at FROM gms_circuits WHERE host = ?", (host,)
+                ).fetchone()
+                result = transition(row)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return result
+
+    def _save(self, host: str, state: str, failures: int, opened_at: Optional[float], probe_at: Optional[float]) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO gms_circuits (host, state, failures, opened_at, probe_at) VALUES (?, ?, ?, ?, ?)",
+            (host, state, failures, opened_at, probe_at),
+        )
+
+    def admit(self, host: Optional[str]) -> Optional[float]:
+        """None se o job pode rodar (circuito fechado ou é a sonda); senão,
+        segundos até valer a pena tentar de novo."""
+        if not host:
+            return None
+        now = time.time()
+
+        def transition(row):
+            if row is None or row["state"] == STATE_CLOSED:
+                return None
+            if row["state"] == STATE_OPEN:
+                reopen_at = (row["opened_at"] or now) + self.open_seconds
+                if now < reopen_at:
+                    return reopen_at - now
+                logger.info(f"🔌 Circuito do GMS {host} meio-aberto: este job é a sonda")
+            else:
+                probe_deadline = (row["probe_at"] or now) + _PROBE_TIMEOUT_SECONDS
+                if now < probe_deadline:
+                    return min(self.open_seconds, probe_deadline - now)
+                logger.info(f"🔌 Sonda anterior do GMS {host} sem resposta: este job é a nova sonda")
+            self._save(host, STATE_HALF_OPEN, row["failures"], row["opened_at"], now)
+            return None
+
+        return self._update(host, transition)
+
+    def blocked_for(self, host: Optional[str]) -> Optional[float]:
+        """Como admit(), mas só lê: segundos restantes com o circuito aberto,
+        None fechado, meio-aberto ou já na hora da sonda. Para quem trabalha
+        em nome de jobs que já passaram por admit() (a sessão compartilhada
+        do pipeline) e não pode virar sonda nem barrar a sonda deles."""
+        if not host:
+            return None
+        row = self.state(host)
+        if row["state"] != STATE_OPEN:
+            return None
+        reopen_at = (row["opened_at"] or 0.0) + self.open_seconds
+        remaining = reopen_at - time.time()
+        return remaining if remaining > 0 else None
+
+    def record_failure(self, host: Optional[str]) -> None:
+        """Falha de conexão/página de login do host (não de credencial)."""
+        if not host:
+            return
+        now = time.time()
+
+        def transition(row):
+            failures = (row["failures"] if row is not None else 0) + 1
+            state = row["state"] if row is not None else STATE_CLOSED
+            if state == STATE_HALF_OPEN:
+                logger.warning(f"🔌 Sonda do GMS {host} falhou: circuito aberto por mais {self.open_seconds:.0f}s")
+                self._save(host, STATE_OPEN, failures, now, None)
+            elif state == STATE_CLOSED and failures >= self.failure_threshold:
+                logger.error(
+                    f"🔌 Circuito do GMS {host} aberto após {failures} falha(s) seguida(s) de conexão/página de login. "
+                    f"Jobs para este host adiados por {self.open_seconds:.0f}s."
+                )
+                self._save(host, STATE_OPEN, failures, now, None)
+            else:
+                self._save(host, state, failures, row["opened_at"] if row is not None else None, row["probe_at"] if row is not None else None)
+
+        self._update(host, transition)
+
+    def record_success(self, host: Optional[str]) -> None:
+        if not host:
+            return
+
+        def transition(row):
+            if row is not None and row["state"] != STATE_CLOSED:
+                logger.info(f"🔌 GMS {host} respondeu: circuito fechado")
+            self._save(host, STATE_CLOSED, 0, None, None)
+
+        self._update(host, transition)
+
+    def state(self, host: str) -> Dict:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM gms_circuits WHERE host = ?", (host,)).fetchone()
+        return dict(row) if row is not None else {"host": host, "state": STATE_CLOSED, "failures": 0}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_shared_breaker: Optional[CircuitBreaker] = None
+_shared_breaker_lock = threading.Lock()
+
+
+def shared_circuit_breaker() -> Optional[CircuitBreaker]:
+    """Breaker do processo a partir de settings; None com o limite em 0."""
+    global _shared_breaker
+    if not settings.gms_circuit_failure_threshold:
+        return None
+    with _shared_breaker_lock:
+        if _shared_breaker is None:
+            _shared_breaker = CircuitBreaker(
+                Path(settings.gms_circuit_path) if settings.gms_circuit_path else settings.DATA_DIR / "gms_circuits.sqlite3",
+                failure_threshold=settings.gms_circuit_failure_threshold,
+                open_seconds=settings.gms_circuit_open_seconds,
+            )
+        return _shared_breaker
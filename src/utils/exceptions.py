@@ -1,41 +1,78 @@
-# src/utils/exceptions.py
-
-class AutomationException(Exception):
-    """Classe base para exceções customizadas da automação."""
-    pass
-
-class LoginError(AutomationException):
-    """Lançada quando ocorre um erro durante o processo de login."""
-    pass
-
-class NavigationError(AutomationException):
-    """Lançada quando ocorre um erro ao navegar entre páginas ou elementos."""
-    pass
-
-class DataExportError(AutomationException):
-    """Lançada quando a exportação de dados falha por um motivo esperado."""
-    pass
-
-class ElementNotFoundError(AutomationException):
-    """Lançada quando um elemento crucial não é encontrado na página."""
-    pass
-
-class ConfigurationError(AutomationException):
-    """Lançada quando há erro ao carregar configurações (selectors, env, etc)."""
-    pass
-
-class NoInvoicesFoundException(AutomationException):
-    """Exceção levantada quando nenhuma nota fiscal é encontrada para os filtros de exportação."""
-    pass
-
-class JobCanceledException(Exception):
-    """Levantada quando o maestro sinaliza cancelamento do job em execução.
-
-    Não herda de AutomationException porque cancelamento não é erro de automação —
-    é sinal de controle e o BotRunner trata com handler dedicado (não fica como
-    'failed' no resto do pipeline).
-    """
-
-    def __init__(self, stage: str):
-        self.stage = stage
-        super().__init__(f"Job cancelado pelo usuário durante a etapa: {stage}")
\ No newline at end of file
+# src/utils/exceptions.py
+from typing import Dict, Optional
+
+
+class AutomationException(Exception):
+    """Classe base para exceções customizadas da automação."""
+    pass
+
+
+class LoginError(AutomationException):
+    """Lançada quando ocorre um erro durante o processo de login."""
+    pass
+
+
+class NavigationError(AutomationException):
+    """Lançada quando ocorre um erro ao navegar entre páginas ou elementos."""
+    pass
+
+
+class GmsUnavailableError(NavigationError, ConnectionError):
+    """Lançada quando a página de login do GMS não carrega (host fora do ar).
+
+    Também é ConnectionError: is_transient_failure() a trata como falha
+    transitória e o job volta pela fila de retry.
+    """
+    pass
+
+
+class DataExportError(AutomationException):
+    """Lançada quando a exportação de dados falha por um motivo esperado."""
+    pass
+
+
+class ElementNotFoundError(AutomationException):
+    """Lançada quando um elemento crucial não é encontrado na página."""
+    pass
+
+
+class ConfigurationError(AutomationException):
+    """Lançada quando há erro ao carregar configurações (selectors, env, etc)."""
+    pass
+
+
+class CredentialUnavailableError(AutomationException):
+    """Lançada quando nenhuma conta do pool GMS pode ser usada (quarentena por falha de login ou limite de logins)."""
+    pass
+
+
+class NoInvoicesFoundException(AutomationException):
+    """Exceção levantada quando nenhuma nota fiscal é encontrada para os filtros de exportação."""
+    pass
+
+
+class JobCanceledException(Exception):
+    """Levantada quando o maestro sinaliza cancelamento do job em execução.
+
+    Não herda de AutomationException porque cancelamento não é erro de automação —
+    é sinal de controle e o BotRunner trata com handler dedicado (não fica como
+    'failed' no resto do pipeline).
+    """
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        super().__init__(f"Job cancelado pelo usuário durante a etapa: {stage}")
+
+
+class JobSuspendedException(Exception):
+    """Levantada quando o worker está encerrando (drain) e o job, numa espera
+    longa, devolve o trabalho para ser retomado por outro worker.
+
+    checkpoint é o estado mínimo para a retomada (etapa e linha do export no
+    GMS); None quando ainda não há o que aproveitar.
+    """
+
+    def __init__(self, stage: str, checkpoint: Optional[Dict] = None):
+        self.stage = stage
+        self.checkpoint = checkpoint
+        super().__init__(f"Job suspenso para retomada durante a etapa: {stage}")
@@ -0,0 +1,135 @@
+# src/utils/job_journal.py
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src.utils.sqlite_store import connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS job_journal (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    completed_at TEXT,
+    recorded_at REAL NOT NULL,
+    duration_seconds REAL,
+    document_type TEXT,
+    store_count INTEGER,
+    day_count INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_job_journal_recorded ON job_journal (recorded_at);
+CREATE INDEX IF NOT EXISTS idx_job_journal_type ON job_journal (document_type, recorded_at);
+"""
+
+# Só estes status encerram o job de vez: falha e cancelamento podem voltar
+# à fila com o mesmo job_id (retry manual no maestro) e precisam passar pelo
+# check no maestro.
+SUCCESS_STATUSES = ("completed", "completed_no_invoices")
+
+# Poda a cada N gravações: barato o bastante para não pesar no fim do job e
+# frequente o bastante para o arquivo não crescer sem limite.
+_PRUNE_EVERY = 100
+
+
+class JobJournal:
+    """Diário local dos jobs que este worker levou a estado terminal.
+
+    Fonte primária do idempotency check: redelivery de job que já concluiu
+    com sucesso aqui é ackeada sem ir ao maestro (lookup por chave primária
+    no SQLite, microssegundos). O check HTTP no maestro fica para ids
+    desconhecidos e para os que falharam ou foram cancelados.
+
+    Limitado por quantidade (max_entries) e idade (max_age_days). Guarda
+    também duração e tamanho do job (lojas, dias, tipo), usados como
+    histórico para estimar custo. Seguro para vários slots: conexão única,
+    serializada por lock, em WAL.
+    """
+
+    def __init__(self, path: Path, max_entries: int = 20000, max_age_days: int = 30):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_days * 24 * 3600
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(self.path)
+        self._conn.executescript(_SCHEMA)
+        self._writes = 0
+        self.prune()
+
+    def record(
+        self,
+        job_id: str,
+        status: str,
+        completed_at: Optional[str] = None,
+        duration_seconds: Optional[float] = None,
+        features: Optional[Dict] = None,
+    ) -> None:
+        features = features or {}
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO job_journal
+                    (job_id, status, completed_at, recorded_at, duration_seconds, document_type, store_count, day_count)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    job_id, status, completed_at, time.time(), duration_seconds,
+                    features.get("document_type"), features.get("store_count"), features.get("day_count"),
+                ),
+            )
+            self._writes += 1
+            should_prune = self._writes % _PRUNE_EVERY == 0
+        if should_prune:
+            self.prune()
+
+    def lookup(self, job_id: str) -> Optional[Dict]:
+        """Entrada do job (status, completed_at...) ou None se desconhecido/expirado."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM job_journal WHERE job_id = ? AND recorded_at >= ?",
+                (job_id, time.time() - self.max_age_seconds),
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def lookup_succeeded(self, job_id: str) -> Optional[Dict]:
+        """Entrada do job só se ele concluiu com sucesso neste worker."""
+        known = self.lookup(job_id)
+        return known if known is not None and known["status"] in SUCCESS_STATUSES else None
+
+    def history(self, document_type: str, limit: int = 200) -> List[Dict]:
+        """Jobs concluídos mais recentes do tipo, para estimativa de custo."""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT duration_seconds, store_count, day_count FROM job_journal
+                WHERE document_type = ? AND duration_seconds IS NOT NULL
+                  AND status IN (?, ?)
+                ORDER BY recorded_at DESC LIMIT ?
+                """,
+                (document_type, *SUCCESS_STATUSES, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def prune(self) -> int:
+        with self._lock:
+            removed = self._conn.execute(
+                "DELETE FROM job_journal WHERE recorded_at < ?",
+                (time.time() - self.max_age_seconds,),
+            ).rowcount
+            removed += self._conn.execute(
+                """
+                DELETE FROM job_journal WHERE job_id IN (
+                    SELECT job_id FROM job_journal ORDER BY recorded_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            ).rowcount
+        if removed:
+            logger.debug(f"Diário de jobs: {removed} entrada(s) antiga(s) removida(s)")
+        return removed
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,322 @@
+# src/utils/log_shipper.py
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Níveis que nunca são descartados silenciosamente: quem chama espera
+# (backpressure) em vez de perder a linha.
+HIGH_PRIORITY_LEVELS = frozenset({"WARNING", "ERROR", "CRITICAL"})
+
+# Tentativas de entregar um lote antes de descartá-lo. O lote fica parado
+# na frente da fila enquanto isso: linhas do mesmo job não se reordenam.
+_SEND_ATTEMPTS = 3
+
+
+class LogShipper:
+    """Fila limitada de logs para o maestro, drenada por uma thread própria.
+
+    Tira o HTTP do caminho do bot: BotRunner._update_status e report_log só
+    enfileiram. A thread de envio agrupa as linhas por job e entrega em lote
+    (send_batch — no worker, gravação no outbox, que cuida da ordem e do
+    fallback para o maestro). Lote recusado é tentado de novo
+    _SEND_ATTEMPTS vezes, a cada flush_interval, e então descartado.
+
+    Regras quando a fila enche:
+    - INFO/DEBUG: descarta a linha de baixa prioridade mais antiga.
+    - WARNING+: descarta a mais antiga de baixa prioridade; se só houver alta
+      prioridade na fila, bloqueia quem chamou até block_timeout (backpressure)
+      e, esgotado o prazo, descarta a linha mais antiga.
+
+    flush(job_id) bloqueia até tudo que foi enfileirado para o job ter sido
+    enviado (ou descartado) — chamado antes do finish do job.
+    """
+
+    def __init__(
+        self,
+        send_batch: Callable[[str, List[Dict]], bool],
+        max_queue: int = 1000,
+        batch_size: int = 50,
+        flush_interval: float = 1.0,
+        block_timeout: float = 2.0,
+    ):
+        self.send_batch = send_batch
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.block_timeout = block_timeout
+
+        self._queue: Deque[Dict] = deque()
+        self._cond = threading.Condition()
+        # Linhas aceitas e ainda não resolvidas (enviadas ou descartadas), por job.
+        self._pending: Dict[str, int] = {}
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.dropped = 0
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="log-shipper", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Para a thread depois de drenar o que der dentro de timeout."""
+        self.flush(timeout=timeout)
+        self._stop_event.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+
+    def submit(self, job_id: str, level: str, message: str) -> bool:
+        """Enfileira uma linha. Retorna False se ela mesma foi descartada."""
+        level = (level or "INFO").upper()
+        high = level in HIGH_PRIORITY_LEVELS
+        entry = {
+            "job_id": job_id,
+            "level": level,
+            "message": message,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        }
+
+        with self._cond:
+            if len(self._queue) >= self.max_queue and not self._drop_oldest_low_priority():
+                if not high:
+                    self._count_dropped(1)
+                    return False
+                if self._can_block():
+                    self._cond.wait_for(lambda: len(self._queue) < self.max_queue, timeout=self.block_timeout)
+                if len(self._queue) >= self.max_queue:
+                    oldest = self._queue.popleft()
+                    self._resolve(oldest["job_id"], 1)
+                    self._count_dropped(1)
+
+            self._queue.append(entry)
+            self._pending[job_id] = self._pending.get(job_id, 0) + 1
+            self._cond.notify_all()
+        self._wake()
+        return True
+
+    def _can_block(self) -> bool:
+        return True
+
+    def _wake(self) -> None:
+        """Acorda o consumidor da fila (a thread já acorda pelo notify)."""
+
+    def flush(self, job_id: Optional[str] = None, timeout: float = 30.0) -> bool:
+        """Espera as linhas do job (ou de todos, se None) saírem da fila.
+
+        Retorna False se o timeout estourou com linhas ainda pendentes.
+        """
+        def _done() -> bool:
+            if job_id is None:
+                return not self._pending
+            return self._pending.get(job_id, 0) == 0
+
+        with self._cond:
+            self._cond.notify_all()
+            if self._thread is None or not self._thread.is_alive():
+                return _done()
+            ok = self._cond.wait_for(_done, timeout=timeout)
+        if not ok:
+            logger.warning(f"⚠️ Flush de logs do job {job_id or '*'} excedeu {timeout}s; seguindo sem esperar.")
+        return ok
+
+    def _drop_oldest_low_priority(self) -> bool:
+        for index, queued in enumerate(self._queue):
+            if queued["level"] not in HIGH_PRIORITY_LEVELS:
+                del self._queue[index]
+                self._resolve(queued["job_id"], 1)
+                self._count_dropped(1)
+                return True
+        return False
+
+    def _count_dropped(self, count: int) -> None:
+        self.dropped += count
+        # Log esparso pra não gerar mais ruído justamente quando há pressão.
+        if self.dropped == count or self.dropped % 100 < count:
+            logger.warning(f"⚠️ Fila de logs cheia: {self.dropped} linha(s) descartada(s) até agora.")
+
+    def _resolve(self, job_id: str, count: int) -> None:
+        remaining = self._pending.get(job_id, 0) - count
+        if remaining > 0:
+            self._pending[job_id] = remaining
+        else:
+            self._pending.pop(job_id, None)
+
+    def _take_batch_nowait(self) -> Optional[List[Dict]]:
+        with self._cond:
+            if not self._queue:
+                return None
+            batch = self._take_batch()
+            self._cond.notify_all()
+            return batch
+
+    def _resolve_batch(self, batch: List[Dict]) -> None:
+        with self._cond:
+            self._resolve(batch[0]["job_id"], len(batch))
+            self._cond.notify_all()
+
+    @staticmethod
+    def _bulk_lines(batch: List[Dict]) -> List[Dict]:
+        return [{k: e[k] for k in ("level", "message", "timestamp")} for e in batch]
+
+    def _give_up(self, batch: List[Dict]) -> None:
+        logger.error(
+            f"❌ Lote de {len(batch)} log(s) do job {batch[0]['job_id']} não entregue após "
+            f"{_SEND_ATTEMPTS} tentativa(s); descartado."
+        )
+        with self._cond:
+            self._count_dropped(len(batch))
+
+    def _take_batch(self) -> List[Dict]:
+        # Lote de um único job, na ordem de chegada: o endpoint bulk é por job.
+        first = self._queue.popleft()
+        batch = [first]
+        while self._queue and len(batch) < self.batch_size and self._queue[0]["job_id"] == first["job_id"]:
+            batch.append(self._queue.popleft())
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._queue or self._stop_event.is_set(),
+                    timeout=self.flush_interval,
+                )
+                if not self._queue:
+                    if self._stop_event.is_set():
+                        return
+                    continue
+                batch = self._take_batch()
+                # Liberou espaço: acorda quem está em backpressure.
+                self._cond.notify_all()
+
+            try:
+                self._send(batch)
+            except Exception as e:
+                logger.warning(f"Falha inesperada enviando lote de logs: {e}")
+            finally:
+                self._resolve_batch(batch)
+
+    def _send(self, batch: List[Dict]) -> None:
+        job_id = batch[0]["job_id"]
+        for attempt in range(_SEND_ATTEMPTS):
+            if attempt:
+                # _stop_event não encurta a espera: stop() já drenou o que
+                # pôde no flush e o lote ainda merece as tentativas.
+                time.sleep(self.flush_interval)
+            if self.send_batch(job_id, self._bulk_lines(batch)):
+                return
+        self._give_up(batch)
+
+
+class AsyncLogShipper(LogShipper):
+    """LogShipper drenado por uma coroutine no event loop do núcleo asyncio.
+
+    A fila, as regras de descarte e a contagem por job são as mesmas; muda
+    só o consumidor. send_batch é coroutine. submit continua
+    thread-safe (o BotRunner loga da thread do executor) e, quando chamado
+    do próprio event loop, nunca bloqueia em backpressure — travar o loop
+    pararia heartbeats e acks de todos os slots.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def start(self) -> None:
+        """Cria a task de envio; precisa ser chamado de dentro do event loop."""
+        if self._task is not None and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = self._loop.create_task(self._run_async(), name="log-shipper")
+
+    async def stop_async(self, timeout: float = 10.0) -> None:
+        await self.flush_async(timeout=timeout)
+        self._stopping = True
+        self._wake()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, timeout=timeout)
+            except asyncio.TimeoutError:
+                self._task.cancel()
+
+    async def flush_async(self, job_id: Optional[str] = None, timeout: float = 30.0) -> bool:
+        """Equivalente assíncrono de flush(); cede o loop enquanto espera."""
+        def _done() -> bool:
+            with self._cond:
+                if job_id is None:
+                    return not self._pending
+                return self._pending.get(job_id, 0) == 0
+
+        deadline = time.monotonic() + timeout
+        while not _done():
+            if self._task is None or self._task.done():
+                return _done()
+            if time.monotonic() >= deadline:
+                logger.warning(f"⚠️ Flush de logs do job {job_id or '*'} excedeu {timeout}s; seguindo sem esperar.")
+                return False
+            self._wake()
+            await asyncio.sleep(0.05)
+        return True
+
+    def _can_block(self) -> bool:
+        return not self._on_loop_thread()
+
+    def _on_loop_thread(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def _wake(self) -> None:
+        if self._loop is None or self._wakeup is None or self._loop.is_closed():
+            return
+        if self._on_loop_thread():
+            self._wakeup.set()
+        else:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run_async(self) -> None:
+        while True:
+            # clear antes de olhar a fila: um submit entre as duas coisas
+            # deixa o evento setado e a próxima espera volta na hora.
+            self._wakeup.clear()
+            batch = self._take_batch_nowait()
+            if batch is None:
+                if self._stopping:
+                    return
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await self._send_async(batch)
+            except Exception as e:
+                logger.warning(f"Falha inesperada enviando lote de logs: {e}")
+            finally:
+                self._resolve_batch(batch)
+
+    async def _send_async(self, batch: List[Dict]) -> None:
+        job_id = batch[0]["job_id"]
+        for attempt in range(_SEND_ATTEMPTS):
+            if attempt:
+                await asyncio.sleep(self.flush_interval)
+            if await self.send_batch(job_id, self._bulk_lines(batch)):
+                return
+        self._give_up(batch)
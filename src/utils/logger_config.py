@@ -1,69 +1,69 @@
-# src/utils/logger_config.py
-import logging
-import logging.handlers
-from config import settings
-from datetime import datetime
-import os
-from threading import local
-
-_thread_locals = local()
-
-class TaskIdFilter(logging.Filter):
-    def filter(self, record):
-        record.task_id = getattr(_thread_locals, 'task_id', 'main_process')
-        return True
-
-def set_task_id(task_id):
-    _thread_locals.task_id = task_id
-
-def setup_logger():
-    log_level = os.getenv('LOG_LEVEL', 'INFO').upper()
-    log_format = logging.Formatter(
-        "%(asctime)s - %(levelname)s - [task_id=%(task_id)s] - [%(filename)s:%(lineno)d] - %(message)s"
-    )
-
-    root_logger = logging.getLogger()
-    root_logger.setLevel(log_level)
-
-    if root_logger.hasHandlers():
-        root_logger.handlers.clear()
-
-    # O filtro deve ser adicionado aos handlers, não ao logger.
-    # Quando registros de loggers filhos propagam para o root, os filtros do root logger
-    # não são chamados — apenas os filtros dos handlers são executados.
-    task_id_filter = TaskIdFilter()
-
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(log_level)
-    console_handler.addFilter(task_id_filter)
-    console_handler.setFormatter(log_format)
-    root_logger.addHandler(console_handler)
-
-    log_env = os.getenv('LOG_ENV', '').strip().lower()
-    if log_env == 'development':
-        try:
-            log_dir = settings.LOGS_DIR
-            log_dir.mkdir(parents=True, exist_ok=True)
-
-            log_filename = log_dir / "bot_dev.log"
-
-            file_handler = logging.handlers.RotatingFileHandler(
-                log_filename,
-                maxBytes=int(os.getenv('LOG_MAX_BYTES', '10485760')),  # 10MB padrão
-                backupCount=int(os.getenv('LOG_BACKUP_COUNT', '5')),
-                encoding='utf-8'
-            )
-            file_handler.setLevel(log_level)
-            file_handler.addFilter(task_id_filter)
-            file_handler.setFormatter(log_format)
-            root_logger.addHandler(file_handler)
-
-            root_logger.info("✅ LOG_ENV=development - Logs também salvos em: bot_dev.log")
-        except Exception as e:
-            root_logger.warning(f"⚠️  Falha ao configurar file handler: {e}")
-
-    logging.getLogger("selenium").setLevel(logging.WARNING)
-    logging.getLogger("urllib3").setLevel(logging.WARNING)
-    logging.getLogger("pika").setLevel(logging.WARNING)
-    
+# src/utils/logger_config.py
+import logging
+import logging.handlers
+from config import settings
+from datetime import datetime
+import os
+from threading import local
+
+_thread_locals = local()
+
+class TaskIdFilter(logging.Filter):
+    def filter(self, record):
+        record.task_id = getattr(_thread_locals, 'task_id', 'main_process')
+        return True
+
+def set_task_id(task_id):
+    _thread_locals.task_id = task_id
+
+def setup_logger():
+    log_level = os.getenv('LOG_LEVEL', 'INFO').upper()
+    log_format = logging.Formatter(
+        "%(asctime)s - %(levelname)s - [task_id=%(task_id)s] - [%(filename)s:%(lineno)d] - %(message)s"
+    )
+
+    root_logger = logging.getLogger()
+    root_logger.setLevel(log_level)
+
+    if root_logger.hasHandlers():
+        root_logger.handlers.clear()
+
+    # O filtro deve ser adicionado aos handlers, não ao logger.
+    # Quando registros de loggers filhos propagam para o root, os filtros do root logger
+    # não são chamados — apenas os filtros dos handlers são executados.
+    task_id_filter = TaskIdFilter()
+
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(log_level)
+    console_handler.addFilter(task_id_filter)
+    console_handler.setFormatter(log_format)
+    root_logger.addHandler(console_handler)
+
+    log_env = os.getenv('LOG_ENV', '').strip().lower()
+    if log_env == 'development':
+        try:
+            log_dir = settings.LOGS_DIR
+            log_dir.mkdir(parents=True, exist_ok=True)
+
+            log_filename = log_dir / "bot_dev.log"
+
+            file_handler = logging.handlers.RotatingFileHandler(
+                log_filename,
+                maxBytes=int(os.getenv('LOG_MAX_BYTES', '10485760')),  # 10MB padrão
+                backupCount=int(os.getenv('LOG_BACKUP_COUNT', '5')),
+                encoding='utf-8'
+            )
+            file_handler.setLevel(log_level)
+            file_handler.addFilter(task_id_filter)
+            file_handler.setFormatter(log_format)
+            root_logger.addHandler(file_handler)
+
+            root_logger.info("✅ LOG_ENV=development - Logs também salvos em: bot_dev.log")
+        except Exception as e:
+            root_logger.warning(f"⚠️  Falha ao configurar file handler: {e}")
+
+    logging.getLogger("selenium").setLevel(logging.WARNING)
+    logging.getLogger("urllib3").setLevel(logging.WARNING)
+    logging.getLogger("pika").setLevel(logging.WARNING)
+    
     root_logger.info(f"✅ Logger configurado com sucesso. Level: {log_level}")
\ No newline at end of file
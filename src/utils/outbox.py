@@ -0,0 +1,323 @@
+# src/utils/outbox.py
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from src.utils.sqlite_store import connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    last_error TEXT,
+    claimed_by TEXT,
+    claimed_until REAL
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_job ON outbox (job_id, id);
+"""
+
+# Colunas acrescentadas depois da primeira versão (outbox.sqlite3 antigo).
+_MIGRATIONS = {
+    "claimed_by": "ALTER TABLE outbox ADD COLUMN claimed_by TEXT",
+    "claimed_until": "ALTER TABLE outbox ADD COLUMN claimed_until REAL",
+}
+
+# Quanto tempo a cabeça de um job fica reservada para o worker que a pegou.
+# Cobre o POST com folga; worker que morreu no meio libera a cabeça para as
+# outras réplicas quando vence.
+_CLAIM_SECONDS = 120.0
+
+
+class OutboxEvent(NamedTuple):
+    id: int
+    job_id: str
+    kind: str
+    payload: Optional[Dict]
+    attempts: int
+    created_at: float
+
+
+class MaestroOutbox:
+    """Outbox em SQLite para os callbacks do maestro (start, logs, finish).
+
+    O worker grava o evento e segue; a entrega acontece depois, com retry,
+    na ordem de gravação dentro de cada job (só a cabeça da fila do job é
+    elegível — o finish nunca passa na frente dos logs nem do start). O que
+    ficar pendente quando o processo cai é reenviado no próximo start.
+
+    Entrega é at-least-once: um evento pode chegar duas vezes se o worker
+    morrer entre o POST e o delete.
+
+    Réplicas do worker montam o mesmo DATA_DIR: due() reserva as cabeças
+    (claimed_by/claimed_until, em BEGIN IMMEDIATE) para um só despachante
+    entregar cada evento, e o próximo evento do job só fica elegível depois
+    que a cabeça é apagada — a ordem por job vale entre réplicas.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_age_seconds: float = 7 * 24 * 3600,
+        base_backoff: float = 2.0,
+        max_backoff: float = 300.0,
+    ):
+        self.path = Path(path)
+        self.max_age_seconds = max_age_seconds
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(self.path)
+        self._conn.executescript(_SCHEMA)
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(outbox)")}
+        for column, ddl in _MIGRATIONS.items():
+            if column not in columns:
+                self._conn.execute(ddl)
+        self.owner = uuid.uuid4().hex
+        # Acorda o despachante quando chega evento novo.
+        self.wakeup = threading.Event()
+
+    def enqueue(self, job_id: str, kind: str, payload: Optional[Dict] = None) -> int:
+        now = time.time()
+        body = json.dumps(payload, ensure_ascii=False) if payload is not None else None
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO outbox (job_id, kind, payload, next_attempt_at, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, kind, body, now, now),
+            )
+        self.wakeup.set()
+        return cursor.lastrowid
+
+    def due(self, limit: int = 50) -> List[OutboxEvent]:
+        """Cabeça da fila de cada job cujo próximo envio já venceu, reservada
+        para este outbox (não reservada por outra réplica, ou reserva vencida)."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    """
+                    SELECT id, job_id, kind, payload, attempts, created_at FROM outbox
+                    WHERE id IN (SELECT MIN(id) FROM outbox GROUP BY job_id)
+                      AND next_attempt_at <= ?
+                      AND (claimed_until IS NULL OR claimed_until <= ? OR claimed_by = ?)
+                    ORDER BY id LIMIT ?
+                    """,
+                    (now, now, self.owner, limit),
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE outbox SET claimed_by = ?, claimed_until = ? WHERE id = ?",
+                    [(self.owner, now + _CLAIM_SECONDS, row["id"]) for row in rows],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [
+            OutboxEvent(
+                row["id"], row["job_id"], row["kind"],
+                json.loads(row["payload"]) if row["payload"] is not None else None,
+                row["attempts"], row["created_at"],
+            )
+            for row in rows
+        ]
+
+    def delivered(self, event_id: int) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM outbox WHERE id = ?", (event_id,))
+
+    def failed(self, event: OutboxEvent, error: str = "") -> None:
+        """Reagenda com backoff exponencial + jitter, ou descarta se velho demais."""
+        if time.time() - event.created_at > self.max_age_seconds:
+            logger.error(
+                f"❌ Evento {event.kind} do job {event.job_id} descartado do outbox após "
+                f"{event.attempts + 1} tentativa(s): {error}"
+            )
+            self.delivered(event.id)
+            return
+        delay = min(self.max_backoff, self.base_backoff * (2 ** min(event.attempts, 16)))
+        delay = random.uniform(delay / 2, delay)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET attempts = attempts + 1, next_attempt_at = ?, last_error = ?, "
+                "claimed_by = NULL, claimed_until = NULL WHERE id = ?",
+                (time.time() + delay, error[:500], event.id),
+            )
+
+    def pending(self, job_id: Optional[str] = None, kind: Optional[str] = None) -> int:
+        query = "SELECT COUNT(*) FROM outbox WHERE 1 = 1"
+        params: list = []
+        if job_id is not None:
+            query += " AND job_id = ?"
+            params.append(job_id)
+        if kind is not None:
+            query += " AND kind = ?"
+            params.append(kind)
+        with self._lock:
+            return self._conn.execute(query, params).fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class OutboxDispatcher:
+    """Thread que entrega os eventos do outbox.
+
+    deliver(event) retorna True quando o evento está resolvido (entregue, ou
+    recusado de forma definitiva pelo maestro) e False para tentar de novo.
+    """
+
+    def __init__(
+        self,
+        outbox: MaestroOutbox,
+        deliver: Callable[[OutboxEvent], bool],
+        idle_interval: float = 1.0,
+    ):
+        self.outbox = outbox
+        self.deliver = deliver
+        self.idle_interval = idle_interval
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        pending = self.outbox.pending()
+        if pending:
+            logger.info(f"📮 {pending} evento(s) pendente(s) no outbox serão reenviados ao maestro")
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="outbox-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Tenta esvaziar o outbox dentro de timeout e para a thread.
+
+        O que sobrar fica no disco e sai no próximo start.
+        """
+        deadline = time.monotonic() + timeout
+        while self.outbox.pending() and time.monotonic() < deadline and self._thread is not None and self._thread.is_alive():
+            self.outbox.wakeup.set()
+            time.sleep(0.1)
+        self._stop_event.set()
+        self.outbox.wakeup.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=max(0.0, deadline - time.monotonic()) + 1.0)
+        remaining = self.outbox.pending()
+        if remaining:
+            logger.warning(f"⚠️ {remaining} evento(s) ficaram no outbox; serão reenviados no próximo start.")
+
+    def run_once(self) -> int:
+        """Uma rodada de entregas. Retorna quantos eventos foram resolvidos."""
+        resolved = 0
+        for event in self.outbox.due():
+            if self._stop_event.is_set():
+                break
+            try:
+                ok, error = self.deliver(event), ""
+            except Exception as e:
+                ok, error = False, str(e)
+            resolved += self._settle(event, ok, error)
+        return resolved
+
+    def _settle(self, event: OutboxEvent, ok: bool, error: str) -> int:
+        if ok:
+            self.outbox.delivered(event.id)
+            return 1
+        error = error or "entrega recusada/indisponível"
+        logger.warning(
+            f"⚠️ Falha ao entregar {event.kind} do job {event.job_id} ao maestro "
+            f"(tentativa {event.attempts + 1}); ficará no outbox. {error}"
+        )
+        self.outbox.failed(event, error)
+        return 0
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            self.outbox.wakeup.clear()
+            try:
+                resolved = self.run_once()
+            except Exception as e:
+                logger.error(f"❌ Erro inesperado no despachante do outbox: {e}", exc_info=True)
+                resolved = 0
+            if not resolved:
+                self.outbox.wakeup.wait(timeout=self.idle_interval)
+
+
+class AsyncOutboxDispatcher(OutboxDispatcher):
+    """OutboxDispatcher como task do event loop (núcleo asyncio).
+
+    deliver é uma coroutine. O SQLite é local e rápido, então as operações
+    do outbox rodam direto no loop; só a espera ociosa vai pra uma thread.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        pending = self.outbox.pending()
+        if pending:
+            logger.info(f"📮 {pending} evento(s) pendente(s) no outbox serão reenviados ao maestro")
+        self._stop_event.clear()
+        self._task = asyncio.get_running_loop().create_task(self._run_async(), name="outbox-dispatcher")
+
+    async def stop_async(self, timeout: float = 10.0) -> None:
+        deadline = time.monotonic() + timeout
+        while self.outbox.pending() and time.monotonic() < deadline and self._task is not None and not self._task.done():
+            self.outbox.wakeup.set()
+            await asyncio.sleep(0.1)
+        self._stop_event.set()
+        self.outbox.wakeup.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, timeout=max(0.0, deadline - time.monotonic()) + 1.0)
+            except asyncio.TimeoutError:
+                self._task.cancel()
+        remaining = self.outbox.pending()
+        if remaining:
+            logger.warning(f"⚠️ {remaining} evento(s) ficaram no outbox; serão reenviados no próximo start.")
+
+    async def run_once_async(self) -> int:
+        resolved = 0
+        for event in self.outbox.due():
+            if self._stop_event.is_set():
+                break
+            try:
+                ok, error = await self.deliver(event), ""
+            except Exception as e:
+                ok, error = False, str(e)
+            resolved += self._settle(event, ok, error)
+        return resolved
+
+    async def _run_async(self) -> None:
+        while not self._stop_event.is_set():
+            self.outbox.wakeup.clear()
+            try:
+                resolved = await self.run_once_async()
+            except Exception as e:
+                logger.error(f"❌ Erro inesperado no despachante do outbox: {e}", exc_info=True)
+                resolved = 0
+            if not resolved:
+                await asyncio.to_thread(self.outbox.wakeup.wait, self.idle_interval)
+
+
+def is_permanent_rejection(status_code: int) -> bool:
+    """4xx que não adianta repetir (job inexistente, payload inválido,
+    já finalizado). 408/429 são transitórios e voltam pro retry.
+    """
+    return 400 <= status_code < 500 and status_code not in (408, 429)
@@ -0,0 +1,99 @@
+# src/utils/process_utils.py
+import logging
+import os
+import signal
+from pathlib import Path
+from typing import Dict, List, Set
+
+logger = logging.getLogger(__name__)
+
+_PROC = Path("/proc")
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _read_stat(pid: int) -> Dict[str, int]:
+    """Lê ppid e pgrp de /proc/<pid>/stat.
+
+    O campo comm (2º) pode conter espaços e parênteses, então o parse começa
+    depois do último ')'.
+    """
+    raw = (_PROC / str(pid) / "stat").read_text()
+    fields = raw[raw.rfind(")") + 2:].split()
+    return {"ppid": int(fields[1]), "pgrp": int(fields[2])}
+
+
+def _all_pids() -> List[int]:
+    return [int(p.name) for p in _PROC.iterdir() if p.name.isdigit()]
+
+
+def process_tree_pids(root_pid: int) -> List[int]:
+    """Retorna root_pid + descendentes (por ppid) + membros do process group.
+
+    WHY os dois critérios: quando o processo intermediário (chromedriver)
+    morre, os Chromes órfãos são re-parentados pro init e somem da árvore
+    por ppid — mas continuam no process group do job (start_new_session).
+    """
+    children: Dict[int, List[int]] = {}
+    group: Set[int] = set()
+    for pid in _all_pids():
+        try:
+            stat = _read_stat(pid)
+        except (FileNotFoundError, ProcessLookupError, PermissionError, ValueError, IndexError):
+            continue
+        children.setdefault(stat["ppid"], []).append(pid)
+        if stat["pgrp"] == root_pid:
+            group.add(pid)
+
+    tree: Set[int] = set()
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        if pid in tree:
+            continue
+        tree.add(pid)
+        stack.extend(children.get(pid, []))
+
+    if not (_PROC / str(root_pid)).exists():
+        tree.discard(root_pid)
+    return sorted(tree | group)
+
+
+def process_rss_bytes(pid: int) -> int:
+    """RSS de um processo via /proc/<pid>/statm (0 se já morreu)."""
+    try:
+        resident_pages = int((_PROC / str(pid) / "statm").read_text().split()[1])
+    except (FileNotFoundError, ProcessLookupError, PermissionError, ValueError, IndexError):
+        return 0
+    return resident_pages * _PAGE_SIZE
+
+
+def process_tree_rss_bytes(root_pid: int) -> int:
+    """Soma do RSS de root_pid e de toda a árvore (ver process_tree_pids).
+
+    Páginas compartilhadas entre Chromes entram mais de uma vez — o valor é
+    um teto, que é o que interessa pra limite de memória.
+    """
+    return sum(process_rss_bytes(pid) for pid in process_tree_pids(root_pid))
+
+
+def kill_process_tree(root_pid: int, sig: int = signal.SIGKILL) -> int:
+    """Envia sig para a árvore inteira de root_pid. Retorna quantos processos
+    receberam o sinal. Tolerante a processos que morrem no meio do caminho.
+    """
+    pids = process_tree_pids(root_pid)
+    killed = 0
+    try:
+        os.killpg(root_pid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+    for pid in pids:
+        if pid == os.getpid():
+            continue
+        try:
+            os.kill(pid, sig)
+            killed += 1
+        except (ProcessLookupError, PermissionError):
+            continue
+    if killed:
+        logger.debug(f"Sinal {sig} enviado para {killed} processo(s) da árvore de {root_pid}")
+    return killed
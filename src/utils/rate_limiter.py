@@ -0,0 +1,128 @@
+# src/utils/rate_limiter.py
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from config import settings
+from src.utils.sqlite_store import connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS token_buckets (
+    bucket TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+# Chave de gms_rate_limits que vale para qualquer host sem entrada própria.
+DEFAULT_HOST = "*"
+
+ACTION_LOGIN = "login"
+ACTION_EXPORT = "export"
+ACTION_REFRESH = "refresh"
+
+
+def parse_limit(value: Any) -> Optional[Tuple[float, float]]:
+    """(tokens por segundo, rajada) de uma entrada de gms_rate_limits.
+
+    Número = operações por minuto com rajada 1 (espaçamento uniforme);
+    {"per_minute": N, "burst": M} libera até M seguidas. 0 desliga.
+    """
+    if isinstance(value, dict):
+        per_minute = float(value.get("per_minute", 0) or 0)
+        burst = float(value.get("burst", 1) or 1)
+    else:
+        per_minute = float(value or 0)
+        burst = 1.0
+    if per_minute <= 0:
+        return None
+    return per_minute / 60.0, max(burst, 1.0)
+
+
+class TokenBucketLimiter:
+    """Token bucket por (host do GMS, ação) compartilhado entre slots e workers.
+
+    Cada worker logando e exportando na velocidade em que as mensagens
+    chegam faz o GMS estrangular a rajada — o login estoura o wait do
+    sidebar_tax e vira LoginError. Aqui logins, envios de export e refreshes
+    da tabela passam por um balde por host com a taxa sustentável do GMS.
+
+    O estado é uma linha por balde num SQLite (WAL) compartilhado: quem
+    aponta para o mesmo arquivo divide o limite (slots, processos filhos e
+    workers com o mesmo volume). reserve() é uma transação curta
+    (BEGIN IMMEDIATE) que já desconta o token e devolve quanto esperar — o
+    token pode ficar negativo, o que enfileira os pedidos em ordem sem que
+    ninguém segure lock enquanto dorme. A espera é de quem chama, que sabe
+    como ser cancelado.
+    """
+
+    def __init__(self, path: Path, limits: Dict[str, Dict[str, Any]]):
+        self.path = Path(path)
+        self.limits = {
+            host: {action: parse_limit(value) for action, value in (actions or {}).items()}
+            for host, actions in (limits or {}).items()
+        }
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(self.path)
+        self._conn.executescript(_SCHEMA)
+
+    def limit_for(self, host: Optional[str], action: str) -> Optional[Tuple[float, float]]:
+        for key in (host, DEFAULT_HOST):
+            if key in self.limits and action in self.limits[key]:
+                return self.limits[key][action]
+        return None
+
+    def reserve(self, host: Optional[str], action: str) -> float:
+        """Desconta um token e devolve os segundos até ele valer (0 = já)."""
+        limit = self.limit_for(host, action)
+        if limit is None:
+            return 0.0
+        rate, burst = limit
+        bucket = f"{host or DEFAULT_HOST}:{action}"
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT tokens, updated_at FROM token_buckets WHERE bucket = ?", (bucket,)
+                ).fetchone()
+                if row is None:
+                    tokens = burst
+                else:
+                    tokens = min(burst, row["tokens"] + max(now - row["updated_at"], 0.0) * rate)
+                tokens -= 1.0
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO token_buckets (bucket, tokens, updated_at) VALUES (?, ?, ?)",
+                    (bucket, tokens, now),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return 0.0 if tokens >= 0 else -tokens / rate
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_shared_limiter: Optional[TokenBucketLimiter] = None
+_shared_limiter_lock = threading.Lock()
+
+
+def shared_rate_limiter() -> Optional[TokenBucketLimiter]:
+    """Limiter do processo a partir de settings.gms_rate_limits; None sem limites."""
+    global _shared_limiter
+    if not settings.gms_rate_limits:
+        return None
+    with _shared_limiter_lock:
+        if _shared_limiter is None:
+            _shared_limiter = TokenBucketLimiter(
+                Path(settings.gms_rate_limit_path) if settings.gms_rate_limit_path else settings.DATA_DIR / "gms_rate_limits.sqlite3",
+                settings.gms_rate_limits,
+            )
+        return _shared_limiter
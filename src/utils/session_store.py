@@ -0,0 +1,97 @@
+# src/utils/session_store.py
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from cryptography.fernet import Fernet, InvalidToken
+
+from config import settings
+from src.utils.sqlite_store import connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS gms_sessions (
+    host TEXT NOT NULL,
+    user TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    saved_at REAL NOT NULL,
+    PRIMARY KEY (host, user)
+);
+"""
+
+
+class SessionStore:
+    """Sessões do GMS (cookies + localStorage) por (host, usuário), cifradas.
+
+    Todo Chrome novo preenchia usuário e senha e esperava o sidebar_tax, e
+    com muitos jobs começando juntos os logins esbarravam no limite do GMS.
+    Aqui o estado da sessão é guardado depois de um login bem-sucedido e
+    injetado nos navegadores novos antes da navegação; o formulário só é
+    usado quando a sessão salva não vale mais.
+
+    O payload é cifrado com Fernet (GMS_SESSION_KEY) — cookies de sessão
+    valem tanto quanto a senha — e expira em max_age_seconds pelo timestamp
+    do próprio token. Chave trocada ou token adulterado contam como sessão
+    ausente. SQLite (WAL) compartilhado como os demais estados do GMS.
+    """
+
+    def __init__(self, path: Path, key: str, max_age_seconds: int):
+        self.path = Path(path)
+        self.max_age_seconds = max_age_seconds
+        self._fernet = Fernet(key.encode() if isinstance(key, str) else key)
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(self.path)
+        self._conn.executescript(_SCHEMA)
+
+    def load(self, host: str, user: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM gms_sessions WHERE host = ? AND user = ?", (host, user)
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            return json.loads(self._fernet.decrypt(row["payload"], ttl=self.max_age_seconds or None))
+        except (InvalidToken, ValueError):
+            # Expirada, chave trocada ou corrompida: tanto faz, vale o login.
+            self.discard(host, user)
+            return None
+
+    def save(self, host: str, user: str, state: Dict) -> None:
+        payload = self._fernet.encrypt(json.dumps(state).encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO gms_sessions (host, user, payload, saved_at) VALUES (?, ?, ?, ?)",
+                (host, user, payload, time.time()),
+            )
+
+    def discard(self, host: str, user: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM gms_sessions WHERE host = ? AND user = ?", (host, user))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_shared_store: Optional[SessionStore] = None
+_shared_store_lock = threading.Lock()
+
+
+def shared_session_store() -> Optional[SessionStore]:
+    """Store do processo; None sem GMS_SESSION_KEY."""
+    global _shared_store
+    if not settings.gms_session_key:
+        return None
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = SessionStore(
+                Path(settings.gms_session_path) if settings.gms_session_path else settings.DATA_DIR / "gms_sessions.sqlite3",
+                settings.gms_session_key,
+                settings.gms_session_max_age_seconds,
+            )
+        return _shared_store
@@ -0,0 +1,21 @@
+# src/utils/sqlite_store.py
+import sqlite3
+from pathlib import Path
+
+
+def connect_sqlite(path: Path, timeout: float = 10.0) -> sqlite3.Connection:
+    """Abre um SQLite local do worker (outbox, journal...) em modo WAL.
+
+    WAL deixa leitores e o escritor trabalharem juntos — vários slots e a
+    thread de envio usam o mesmo arquivo — e synchronous=NORMAL basta: o que
+    importa é sobreviver a crash/restart do processo, não a queda de energia.
+    A conexão é compartilhada entre threads; quem usa serializa com um lock.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=timeout, check_same_thread=False, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={int(timeout * 1000)}")
+    return conn
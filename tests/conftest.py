@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# Os módulos do bot são importados a partir da raiz (config, src, worker),
+# como no `python worker.py` do container.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,133 @@
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import worker as worker_module
+from config import settings
+from src.core.job_messages import cancel_routing_key, parse_cancel_message
+from src.utils.cancellation_watcher import CancellationWatcher
+
+
+class FakeBroker:
+    """RabbitMQ em memória: exchange topic com bindings por routing key
+    exata e entrega síncrona ao callback do consumidor."""
+
+    def __init__(self):
+        self.exchanges = {}
+        self.bindings = set()
+        self.consumers = {}
+        self._queues = 0
+
+    def publish(self, exchange, routing_key, body):
+        for bound_exchange, queue, key in list(self.bindings):
+            if bound_exchange == exchange and key == routing_key:
+                method = SimpleNamespace(routing_key=routing_key)
+                self.consumers[queue](None, method, None, body)
+
+
+class FakeChannel:
+    def __init__(self, broker):
+        self.broker = broker
+        self.is_closed = False
+
+    def exchange_declare(self, exchange, exchange_type, durable):
+        self.broker.exchanges[exchange] = exchange_type
+
+    def queue_declare(self, queue, exclusive, auto_delete):
+        self.broker._queues += 1
+        return SimpleNamespace(method=SimpleNamespace(queue=f"amq.gen-{self.broker._queues}"))
+
+    def basic_consume(self, queue, on_message_callback, auto_ack):
+        self.broker.consumers[queue] = on_message_callback
+
+    def queue_bind(self, queue, exchange, routing_key):
+        self.broker.bindings.add((exchange, queue, routing_key))
+
+    def queue_unbind(self, queue, exchange, routing_key):
+        self.broker.bindings.discard((exchange, queue, routing_key))
+
+
+class FakeConnection:
+    # A thread da conexão do pika roda o callback; aqui, na hora.
+    def add_callback_threadsafe(self, callback):
+        callback()
+
+
+def _worker(broker, exchange):
+    # Só o estado que a assinatura de controle usa; o __init__ abre o
+    # outbox, o diário e a sessão HTTP do maestro.
+    w = worker_module.RabbitMQWorker.__new__(worker_module.RabbitMQWorker)
+    w.control_exchange = exchange
+    w._control_queue = None
+    w._cancel_watchers = {}
+    w._cancel_watchers_lock = threading.Lock()
+    w.channel = FakeChannel(broker)
+    w.connection = FakeConnection()
+    return w
+
+
+def test_control_exchange_is_opt_in():
+    assert type(settings).model_fields["rabbitmq_control_exchange"].default == ""
+
+
+def test_push_cancel_triggers_only_the_subscribed_job():
+    broker = FakeBroker()
+    w = _worker(broker, "maestro.control")
+    w._setup_control_queue()
+    assert broker.exchanges == {"maestro.control": "topic"}
+    assert w._cancellation_poll_interval() == settings.cancellation_heartbeat_seconds
+
+    canceled = []
+    watcher = CancellationWatcher(lambda job_id: False, "job-1", on_cancel=lambda: canceled.append("job-1"))
+    other = CancellationWatcher(lambda job_id: False, "job-2")
+    w._subscribe_cancel("job-1", watcher)
+    w._subscribe_cancel("job-2", other)
+
+    broker.publish("maestro.control", cancel_routing_key("job-1"), b"")
+    assert watcher.cancel_event.is_set()
+    assert canceled == ["job-1"]
+    assert not other.cancel_event.is_set()
+
+    # Mensagem repetida não dispara o callback de novo.
+    broker.publish("maestro.control", cancel_routing_key("job-1"), b"")
+    assert canceled == ["job-1"]
+
+
+def test_unsubscribe_removes_binding():
+    broker = FakeBroker()
+    w = _worker(broker, "maestro.control")
+    w._setup_control_queue()
+    watcher = CancellationWatcher(lambda job_id: False, "job-1")
+    w._subscribe_cancel("job-1", watcher)
+    w._unsubscribe_cancel("job-1")
+
+    assert broker.bindings == set()
+    broker.publish("maestro.control", cancel_routing_key("job-1"), b"")
+    assert not watcher.cancel_event.is_set()
+
+
+def test_without_exchange_keeps_fast_poll():
+    broker = FakeBroker()
+    w = _worker(broker, "")
+    w._setup_control_queue()
+    assert broker.exchanges == {}
+    assert w._control_queue is None
+    assert w._cancellation_poll_interval() == worker_module._CANCELLATION_POLL_INTERVAL
+
+    watcher = CancellationWatcher(lambda job_id: False, "job-1")
+    w._subscribe_cancel("job-1", watcher)
+    assert broker.bindings == set()
+
+
+@pytest.mark.parametrize("routing_key, body, expected", [
+    ("cancel.abc", b"", "abc"),
+    ("cancel.", json.dumps({"job_id": "abc"}).encode(), "abc"),
+    ("", json.dumps({"job_id": "abc", "action": "cancel"}), "abc"),
+    ("", json.dumps({"job_id": "abc", "action": "pause"}), None),
+    ("other.abc", b"not json", None),
+    ("", json.dumps(["abc"]), None),
+])
+def test_parse_cancel_message(routing_key, body, expected):
+    assert parse_cancel_message(routing_key, body) == expected
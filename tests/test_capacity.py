@@ -0,0 +1,147 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from src.core import capacity
+from src.core.capacity import CapacityServer, CapacityTracker, observed_queues
+from src.core.job_cost import JobCostEstimator
+from src.core.job_scheduler import HEADER_JOB_COST
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(capacity.time, "monotonic", clock)
+    return clock
+
+
+def _tracker(free_slots=1, draining=False):
+    return CapacityTracker("worker-a", 2, JobCostEstimator(), lambda: free_slots, lambda: draining)
+
+
+def test_in_flight_remaining_seconds(clock):
+    tracker = _tracker()
+    tracker.job_started(1, "job-b", 600)
+    tracker.job_started(0, "job-a", 100)
+    clock.now += 250
+
+    snapshot = tracker.snapshot()
+    assert [job["job_id"] for job in snapshot["in_flight"]] == ["job-a", "job-b"]
+    # job-a passou da estimativa: não fica negativo.
+    assert snapshot["in_flight"][0]["remaining_seconds"] == 0
+    assert snapshot["in_flight"][1] == {
+        "slot_id": 1, "job_id": "job-b", "elapsed_seconds": 250,
+        "estimated_seconds": 600, "remaining_seconds": 350,
+    }
+    assert snapshot["in_flight_remaining_seconds"] == 350
+    assert snapshot["work_seconds"] == 350
+
+    tracker.job_finished(1)
+    assert tracker.snapshot()["in_flight_remaining_seconds"] == 0
+
+
+def test_backlog_priced_by_recent_estimates(clock):
+    tracker = _tracker()
+    tracker.observe_cost("jobs", 100)
+    tracker.observe_cost("jobs", 300)
+    tracker.observe_queue("jobs", 3)
+
+    snapshot = tracker.snapshot()
+    assert snapshot["queues"]["jobs"] == {"messages": 3, "estimated_seconds": 600, "delayed": False}
+    assert snapshot["backlog_messages"] == 3
+    assert snapshot["backlog_seconds"] == 600
+    assert snapshot["queues_updated_at"] is not None
+
+
+def test_backlog_without_samples_uses_default_cost(clock):
+    tracker = _tracker()
+    tracker.observe_queue("jobs", 2)
+    default = JobCostEstimator().estimate_seconds({})
+    assert tracker.snapshot()["backlog_seconds"] == round(2 * default)
+
+
+def test_delayed_queues_stay_out_of_work_seconds(clock):
+    tracker = _tracker()
+    tracker.observe_cost("jobs", 120)
+    tracker.observe_queue("jobs", 1)
+    tracker.observe_queue("jobs.retry.30s", 4, cost_key="jobs", delayed=True)
+    tracker.job_started(0, "job-a", 200)
+
+    snapshot = tracker.snapshot()
+    assert snapshot["delayed_messages"] == 4
+    assert snapshot["delayed_seconds"] == 480
+    assert snapshot["backlog_messages"] == 1
+    assert snapshot["work_seconds"] == 200 + 120
+
+
+def test_negative_depth_and_slots(clock):
+    tracker = _tracker(free_slots=0, draining=True)
+    tracker.observe_queue("jobs", -5)
+    snapshot = tracker.snapshot()
+    assert snapshot["queues"]["jobs"]["messages"] == 0
+    assert snapshot["slots_total"] == 2
+    assert snapshot["slots_free"] == 0
+    assert snapshot["draining"] is True
+
+
+def test_estimate_prefers_router_header():
+    tracker = _tracker()
+    assert tracker.estimate({}, {HEADER_JOB_COST: "42.5"}) == 42.5
+    assert tracker.estimate({}, {HEADER_JOB_COST: "x"}) == JobCostEstimator().estimate_seconds({})
+
+
+def test_observed_queues():
+    queues = observed_queues("jobs", True, ["jobs.retry.30s"])
+    assert queues[0] == ("jobs", "jobs", False)
+    assert ("jobs.retry.30s", "jobs", True) in queues
+    assert len(queues) == 4
+    assert observed_queues("jobs", False, []) == [("jobs", "jobs", False)]
+
+
+def _get(port, path):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_capacity_server():
+    tracker = _tracker()
+    tracker.observe_cost("jobs", 50)
+    tracker.observe_queue("jobs", 2)
+    server = CapacityServer(tracker, "127.0.0.1", 0)
+    server.start()
+    try:
+        port = server._server.server_address[1]
+        status, body = _get(port, "/capacity/?pretty")
+        assert status == 200
+        assert body["worker_id"] == "worker-a"
+        assert body["backlog_seconds"] == 100
+        assert _get(port, "/healthz") == (200, {"status": "ok"})
+        assert _get(port, "/nada")[0] == 404
+    finally:
+        server.stop()
+    assert server._server is None
+
+
+def test_capacity_server_port_in_use():
+    first = CapacityServer(_tracker(), "127.0.0.1", 0)
+    first.start()
+    try:
+        second = CapacityServer(_tracker(), "127.0.0.1", first._server.server_address[1])
+        second.start()  # só loga; o worker segue sem o endpoint
+        assert second._server is None
+        second.stop()
+    finally:
+        first.stop()
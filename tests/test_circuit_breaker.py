@@ -0,0 +1,109 @@
+import pytest
+
+from src.utils import circuit_breaker
+from src.utils.circuit_breaker import STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN, CircuitBreaker, host_of
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def breaker(tmp_path, clock):
+    breaker = CircuitBreaker(tmp_path / "circuits.sqlite3", failure_threshold=3, open_seconds=120)
+    yield breaker
+    breaker.close()
+
+
+def test_opens_after_consecutive_failures(breaker, clock):
+    for _ in range(2):
+        breaker.record_failure("gms")
+    assert breaker.admit("gms") is None
+    breaker.record_failure("gms")
+    assert breaker.state("gms")["state"] == STATE_OPEN
+    clock.now += 20
+    assert breaker.admit("gms") == pytest.approx(100)
+
+
+def test_success_resets_failure_count(breaker):
+    breaker.record_failure("gms")
+    breaker.record_failure("gms")
+    breaker.record_success("gms")
+    breaker.record_failure("gms")
+    assert breaker.state("gms")["state"] == STATE_CLOSED
+    assert breaker.state("gms")["failures"] == 1
+
+
+def test_single_probe_after_open_period(breaker, clock):
+    for _ in range(3):
+        breaker.record_failure("gms")
+    clock.now += 121
+    assert breaker.admit("gms") is None
+    assert breaker.state("gms")["state"] == STATE_HALF_OPEN
+    # Enquanto a sonda roda, os outros jobs esperam.
+    assert breaker.admit("gms") == pytest.approx(120)
+
+    breaker.record_success("gms")
+    assert breaker.state("gms")["state"] == STATE_CLOSED
+    assert breaker.admit("gms") is None
+
+
+def test_failed_probe_reopens(breaker, clock):
+    for _ in range(3):
+        breaker.record_failure("gms")
+    clock.now += 121
+    breaker.admit("gms")
+    breaker.record_failure("gms")
+    assert breaker.state("gms")["state"] == STATE_OPEN
+    assert breaker.admit("gms") == pytest.approx(120)
+
+
+def test_lost_probe_is_replaced(breaker, clock):
+    for _ in range(3):
+        breaker.record_failure("gms")
+    clock.now += 121
+    breaker.admit("gms")
+    clock.now += circuit_breaker._PROBE_TIMEOUT_SECONDS + 1
+    assert breaker.admit("gms") is None
+
+
+def test_hosts_are_independent_and_shared_through_the_file(tmp_path, clock):
+    path = tmp_path / "circuits.sqlite3"
+    first = CircuitBreaker(path, failure_threshold=1, open_seconds=60)
+    second = CircuitBreaker(path, failure_threshold=1, open_seconds=60)
+    first.record_failure("a")
+    assert second.admit("a") == pytest.approx(60)
+    assert second.admit("b") is None
+    assert second.admit(None) is None
+    first.close()
+    second.close()
+
+
+def test_host_of():
+    assert host_of("https://gms.example.com/login?x=1") == "gms.example.com"
+    assert host_of(None) is None
+
+
+def test_blocked_for_only_reads(breaker, clock):
+    assert breaker.blocked_for("gms") is None
+    for _ in range(3):
+        breaker.record_failure("gms")
+    clock.now += 20
+    assert breaker.blocked_for("gms") == pytest.approx(100)
+    # Na hora da sonda, blocked_for libera mas não vira a sonda.
+    clock.now += 101
+    assert breaker.blocked_for("gms") is None
+    assert breaker.state("gms")["state"] == STATE_OPEN
+    assert breaker.admit("gms") is None
+    assert breaker.blocked_for("gms") is None
@@ -0,0 +1,102 @@
+import threading
+import time
+
+from src.core.coalescer import ExportCoalescer
+
+
+def _params(stores=("1", "2"), start="01/01/2020", end="31/01/2020", **extra):
+    return {"document_type": "nfe", "stores": list(stores), "start_date": start, "end_date": end, **extra}
+
+
+def _result(destination="/processed/nfe/2020-01"):
+    return {"status": "completed", "summary": {"destination": destination}}
+
+
+def _follow_while_leading(coalescer, leader_params, follower_params, leader_result=None):
+    """Segura o líder dentro do execute() até o seguidor começar a esperar."""
+    release = threading.Event()
+    results = {}
+
+    def execute():
+        release.wait(5)
+        return leader_result or _result()
+
+    leader = threading.Thread(target=lambda: results.setdefault("leader", coalescer.run("a", leader_params, execute)))
+    leader.start()
+    while not coalescer._exports:
+        time.sleep(0.01)
+
+    follower_calls = []
+
+    def follower_execute():
+        follower_calls.append(1)
+        return _result("/own")
+
+    follower = threading.Thread(
+        target=lambda: results.setdefault("follower", coalescer.run("b", follower_params, follower_execute))
+    )
+    follower.start()
+    while not coalescer._exports[0].followers and follower.is_alive():
+        time.sleep(0.01)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+    return results, follower_calls
+
+
+def test_subset_job_follows_running_leader():
+    coalescer = ExportCoalescer()
+    results, calls = _follow_while_leading(coalescer, _params(), _params(stores=("2",), start="10/01/2020"))
+    assert calls == []
+    assert results["follower"]["status"] == "completed"
+    assert results["follower"]["coalesced_with"] == "a"
+    assert results["follower"]["coalesced_subset"] is True
+    assert results["follower"]["destination"] == "/processed/nfe/2020-01"
+
+
+def test_failed_leader_makes_follower_run_its_own_export():
+    coalescer = ExportCoalescer()
+    results, calls = _follow_while_leading(
+        coalescer, _params(), _params(), leader_result={"status": "failed", "error": "x"}
+    )
+    assert calls == [1]
+    assert results["follower"]["summary"]["destination"] == "/own"
+
+
+def test_different_filters_do_not_coalesce():
+    coalescer = ExportCoalescer(reuse_seconds=60)
+    coalescer.run("a", _params(), _result)
+    calls = []
+    coalescer.run("b", _params(document_type="nfce"), lambda: calls.append(1) or _result())
+    assert calls == [1]
+
+
+def test_finished_export_not_reused_by_default():
+    coalescer = ExportCoalescer()
+    coalescer.run("a", _params(), _result)
+    calls = []
+    coalescer.run("b", _params(), lambda: calls.append(1) or _result())
+    assert calls == [1]
+
+
+def test_finished_export_reused_within_window():
+    coalescer = ExportCoalescer(reuse_seconds=60)
+    coalescer.run("a", _params(), _result)
+    result = coalescer.run("b", _params(stores=("1",)), lambda: _result("/own"))
+    assert result["coalesced_with"] == "a"
+
+
+def test_rewritten_destination_drops_finished_export():
+    coalescer = ExportCoalescer(reuse_seconds=60)
+    coalescer.run("a", _params(stores=("1",)), _result)
+    # Outro export (lojas diferentes) grava na mesma pasta de processed/.
+    coalescer.run("b", _params(stores=("9",)), _result)
+    calls = []
+    coalescer.run("c", _params(stores=("1",)), lambda: calls.append(1) or _result())
+    assert calls == [1]
+
+
+def test_invalid_period_just_executes():
+    coalescer = ExportCoalescer(reuse_seconds=60)
+    assert coalescer.run("a", _params(start="2020-01-01"), _result) == _result()
+    assert coalescer._exports == []
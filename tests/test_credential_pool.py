@@ -0,0 +1,151 @@
+import time
+
+import pytest
+
+from src.core import credential_pool
+from src.core.credential_pool import CredentialPool, GmsAccount, parse_accounts
+from src.utils.exceptions import CredentialUnavailableError
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(credential_pool.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def pool(tmp_path, clock):
+    pool = CredentialPool(
+        tmp_path / "accounts.sqlite3",
+        [GmsAccount("ana", "x"), GmsAccount("bia", "y")],
+        wait_seconds=0,
+        failure_cooldown_seconds=900,
+        max_failures=2,
+    )
+    yield pool
+    pool.close()
+
+
+def test_parse_accounts():
+    accounts = parse_accounts([{"user": "ana", "password": "x", "max_concurrent": 0}, {"gms_user": "bia", "gms_password": "y"}])
+    assert accounts == [GmsAccount("ana", "x", 1, 0), GmsAccount("bia", "y", 1, 0)]
+    with pytest.raises(ValueError):
+        parse_accounts([{"user": "ana"}])
+
+
+def test_least_loaded_account_then_over_limit_sharing(pool):
+    first = pool.acquire("j1")
+    second = pool.acquire("j2")
+    assert {first.user, second.user} == {"ana", "bia"}
+    # Todas no limite e prazo de espera vencido: divide em vez de falhar.
+    third = pool.acquire("j3")
+    assert third.user in ("ana", "bia")
+    assert sorted(s["in_flight"] for s in pool.stats()) == [1, 2]
+    for lease in (first, second, third):
+        lease.release()
+    assert [s["in_flight"] for s in pool.stats()] == [0, 0]
+
+
+def test_try_acquire_does_not_share_over_limit(pool):
+    lease = pool.try_acquire("ana")
+    assert lease.user == "ana"
+    assert pool.try_acquire("ana") is None
+    assert pool.try_acquire("desconhecida") is None
+    lease.release()
+    again = pool.try_acquire("ana")
+    assert again is not None
+    again.release()
+
+
+def test_lease_is_renewed_while_held(pool, clock, monkeypatch):
+    monkeypatch.setattr(credential_pool, "_LEASE_SECONDS", 0.3)
+    lease = pool.try_acquire("ana")
+    clock.now += 10
+    # Sem renovação o lease já teria vencido; o renovador (a cada 1/3 do
+    # prazo) empurra o vencimento para depois do relógio atual.
+    time.sleep(0.5)
+    assert pool.try_acquire("ana") is None
+    lease.release()
+    assert pool.try_acquire("ana") is not None
+
+
+def test_lease_of_dead_holder_expires(pool, clock):
+    lease = pool.try_acquire("ana")
+    # Processo morto: nem release nem renovação.
+    lease._released.set()
+    clock.now += credential_pool._LEASE_SECONDS - 1
+    assert pool.try_acquire("ana") is None
+    clock.now += 2
+    again = pool.try_acquire("ana")
+    assert again is not None
+    again.release()
+
+
+def test_login_failures_cool_the_account_down(pool, clock):
+    lease = pool.try_acquire("ana")
+    lease.login_failed()
+    lease.login_failed()
+    lease.release()
+    assert pool.try_acquire("ana") is None
+    other = pool.acquire("j1")
+    assert other.user == "bia"
+    other.release()
+
+    clock.now += 901
+    again = pool.try_acquire("ana")
+    assert again is not None
+    again.release()
+
+
+def test_successful_login_resets_the_failure_streak(pool):
+    lease = pool.try_acquire("ana")
+    lease.login_failed()
+    lease.login_succeeded()
+    lease.login_failed()
+    lease.release()
+    again = pool.try_acquire("ana")
+    assert again is not None
+    again.release()
+
+
+def test_all_accounts_quarantined_raise(pool):
+    for user in ("ana", "bia"):
+        lease = pool.try_acquire(user)
+        lease.login_failed()
+        lease.login_failed()
+        lease.release()
+    with pytest.raises(CredentialUnavailableError):
+        pool.acquire("j1")
+
+
+def test_logins_per_hour(tmp_path, clock):
+    pool = CredentialPool(tmp_path / "accounts.sqlite3", [GmsAccount("ana", "x", max_concurrent=2, max_logins_per_hour=1)])
+    lease = pool.try_acquire("ana")
+    lease.login_attempted()
+    assert pool.try_acquire("ana") is None
+    clock.now += 3601
+    again = pool.try_acquire("ana")
+    assert again is not None
+    for held in (lease, again):
+        held.release()
+    pool.close()
+
+
+def test_preferred_account_is_waited_for(tmp_path, clock):
+    pool = CredentialPool(tmp_path / "accounts.sqlite3", [GmsAccount("ana", "x"), GmsAccount("bia", "y")], wait_seconds=60)
+    preferred = pool.acquire("j1", preferred="bia")
+    assert preferred.user == "bia"
+    # A preferida ocupada é esperada mesmo com "ana" livre; interrompido
+    # durante a espera, volta sem conta.
+    assert pool.acquire("j2", preferred="bia", interrupted=lambda: True) is None
+    preferred.release()
+    pool.close()
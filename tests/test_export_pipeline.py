@@ -0,0 +1,151 @@
+import threading
+import time
+
+import pytest
+
+from src.core import export_pipeline
+from src.core.export_pipeline import STATE_PARKED, ExportPipeline, ExportPipelines, ExportTicket
+from src.utils.exceptions import JobCanceledException
+
+EXPORT_ARGS = {
+    "document_type": "NFe", "emitter": "Emitente", "operation_type": "Saída", "file_type": "XML",
+    "invoice_situation": "Autorizada", "start_date": "01/01/2024", "end_date": "31/01/2024", "stores": ["1"],
+}
+
+
+class FakeExportPage:
+    """Tabela de exportações do GMS em memória (mais recente primeiro)."""
+
+    def __init__(self):
+        self.rows = []
+        self.exports = 0
+        self.hidden = False
+        self.download_dir = None
+        self._following = None
+
+    def set_status(self, status):
+        for row in self.rows:
+            row[1] = status
+
+    def export_data(self, *args):
+        self.exports += 1
+        self.rows.insert(0, [(f"export-{self.exports}", "01/01/2024"), "Processando"])
+
+    def newest_export_signature(self):
+        return list(self.rows[0][0]) if self.rows else None
+
+    def export_statuses(self):
+        if self.hidden:
+            return {}
+        return {signature: (index, status) for index, (signature, status) in enumerate(self.rows)}
+
+    def refresh_export_table(self, stage="wait_for_export_completion"):
+        pass
+
+    def follow_export(self, index, signature):
+        self._following = signature
+
+    def download_exports(self):
+        (self.download_dir / f"{self._following[0]}.zip").write_text("xml")
+
+
+@pytest.fixture
+def page(tmp_path, monkeypatch):
+    page = FakeExportPage()
+    monkeypatch.setenv("BOT_PENDING_DIR", str(tmp_path / "pending"))
+    monkeypatch.setattr(export_pipeline, "_POLL_SECONDS", 0.05)
+    monkeypatch.setattr(export_pipeline, "wait_rate_limit", lambda host, action: None)
+    monkeypatch.setattr(export_pipeline, "shared_circuit_breaker", lambda: None)
+
+    def open_session(self, tickets):
+        # Sem Chrome nem login: a sessão "abre" direto na tela de exportação.
+        self.download_dir.mkdir(parents=True, exist_ok=True)
+        page.download_dir = self.download_dir
+        self._export_page = page
+        self._next_poll = 0.0
+        self._last_used = time.monotonic()
+
+    monkeypatch.setattr(ExportPipeline, "_open_session", open_session)
+    return page
+
+
+@pytest.fixture
+def pipelines():
+    return ExportPipelines(max_in_flight=2, idle_seconds=0.2)
+
+
+def _ticket(tmp_path, job_id, resume_row=None):
+    return ExportTicket(
+        job_id, EXPORT_ARGS, tmp_path / job_id, threading.Event(), threading.Event(), resume_row=resume_row,
+    )
+
+
+def _submit(pipelines, ticket):
+    return pipelines.submit("https://gms.example.com/login", "ana", "x", {}, True, ticket)
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condição não atingida a tempo"
+        time.sleep(0.01)
+
+
+def test_exports_are_parked_together_and_downloaded_per_job(tmp_path, page, pipelines):
+    first, second = _ticket(tmp_path, "a"), _ticket(tmp_path, "b")
+    _submit(pipelines, first)
+    _submit(pipelines, second)
+    # Os dois exports ficam no GMS ao mesmo tempo, na mesma sessão.
+    _wait_for(lambda: first.state == STATE_PARKED and second.state == STATE_PARKED)
+    assert page.exports == 2
+    assert first.signature != second.signature
+
+    page.set_status("Concluído")
+    first.wait()
+    second.wait()
+    assert [p.name for p in (tmp_path / "a").iterdir()] == ["export-1.zip"]
+    assert [p.name for p in (tmp_path / "b").iterdir()] == ["export-2.zip"]
+
+
+def test_error_status_fails_the_job(tmp_path, page, pipelines):
+    ticket = _submit(pipelines, _ticket(tmp_path, "a"))
+    _wait_for(lambda: ticket.state == STATE_PARKED)
+    page.set_status("Processado com Erro")
+    with pytest.raises(Exception, match="Com erro"):
+        ticket.wait()
+
+
+def test_missing_row_times_out(tmp_path, page, pipelines, monkeypatch):
+    monkeypatch.setattr(export_pipeline, "_MISSING_ROW_POLLS", 3)
+    ticket = _submit(pipelines, _ticket(tmp_path, "a"))
+    _wait_for(lambda: ticket.state == STATE_PARKED)
+    page.hidden = True
+    with pytest.raises(TimeoutError, match="3 leituras"):
+        ticket.wait()
+
+
+def test_parked_export_times_out(tmp_path, page, pipelines, monkeypatch):
+    monkeypatch.setattr(export_pipeline, "_EXPORT_TIMEOUT_SECONDS", 0.3)
+    ticket = _submit(pipelines, _ticket(tmp_path, "a"))
+    with pytest.raises(TimeoutError, match="tempo limite"):
+        ticket.wait()
+
+
+def test_resume_row_is_followed_without_a_new_export(tmp_path, page, pipelines):
+    page.rows.append([("export-antigo", "01/01/2024"), "Concluído"])
+    ticket = _submit(pipelines, _ticket(tmp_path, "a", resume_row=["export-antigo", "01/01/2024"]))
+    ticket.wait()
+    assert page.exports == 0
+    assert [p.name for p in (tmp_path / "a").iterdir()] == ["export-antigo.zip"]
+
+
+def test_canceled_ticket_is_dropped(tmp_path, page, pipelines):
+    ticket = _submit(pipelines, _ticket(tmp_path, "a"))
+    _wait_for(lambda: ticket.state == STATE_PARKED)
+    ticket.cancel_event.set()
+    with pytest.raises(JobCanceledException):
+        ticket.wait()
+    assert ticket.abandoned
+    page.set_status("Concluído")
+    time.sleep(0.2)
+    assert not (tmp_path / "a").exists()
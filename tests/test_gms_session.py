@@ -0,0 +1,120 @@
+import pytest
+
+from src.automation import gms_session
+from src.utils.exceptions import GmsUnavailableError, LoginError
+
+LOGIN_URL = "https://gms.example.com/login"
+SELECTORS = {"home_page": {"sidebar_tax": "#tax"}, "login_page": {}}
+
+
+class FakeLoginPage:
+    """LoginPage sem navegador: o teste escolhe o que cada passo faz."""
+
+    navigate_error = None
+    login_error = None
+    logged_in = False
+
+    def __init__(self, driver, selectors):
+        pass
+
+    def navigate_to_login_page(self, url, verification_selector=None):
+        if self.navigate_error:
+            raise self.navigate_error
+        return self.logged_in
+
+    def execute_login(self, user, password, verification_selector):
+        if self.login_error:
+            raise self.login_error
+
+
+class FakeHomePage:
+    opened = 0
+
+    def __init__(self, driver, selectors):
+        pass
+
+    def navigate_sidebar_export(self):
+        FakeHomePage.opened += 1
+
+
+class FakeLease:
+    def __init__(self):
+        self.events = []
+
+    def login_attempted(self):
+        self.events.append("attempted")
+
+    def login_succeeded(self):
+        self.events.append("succeeded")
+
+    def login_failed(self):
+        self.events.append("failed")
+
+
+class FakeBreaker:
+    def __init__(self):
+        self.events = []
+
+    def record_success(self, host):
+        self.events.append(("success", host))
+
+    def record_failure(self, host):
+        self.events.append(("failure", host))
+
+
+@pytest.fixture
+def login_page(monkeypatch):
+    page = type("LoginPage", (FakeLoginPage,), {})
+    FakeHomePage.opened = 0
+    monkeypatch.setattr(gms_session, "LoginPage", page)
+    monkeypatch.setattr(gms_session, "HomePage", FakeHomePage)
+    monkeypatch.setattr(gms_session, "inject_saved_session", lambda driver, url, user: False)
+    monkeypatch.setattr(gms_session, "save_session", lambda driver, url, user: None)
+    monkeypatch.setattr(gms_session, "discard_saved_session", lambda url, user: None)
+    return page
+
+
+def _open(**kwargs):
+    gms_session.open_export_screen(object(), SELECTORS, LOGIN_URL, "ana", "x", throttle=lambda action, stage: None, **kwargs)
+
+
+def test_login_counts_on_lease_and_closes_circuit(login_page):
+    lease, breaker = FakeLease(), FakeBreaker()
+    _open(lease=lease, breaker=breaker)
+    assert lease.events == ["attempted", "succeeded"]
+    assert breaker.events == [("success", "gms.example.com")]
+    assert FakeHomePage.opened == 1
+
+
+def test_saved_session_skips_login(login_page):
+    login_page.logged_in = True
+    lease = FakeLease()
+    _open(lease=lease)
+    assert lease.events == []
+    assert FakeHomePage.opened == 1
+
+
+def test_wrong_credential_is_the_account_not_the_host(login_page):
+    login_page.login_error = LoginError("senha")
+    lease, breaker = FakeLease(), FakeBreaker()
+    with pytest.raises(LoginError):
+        _open(lease=lease, breaker=breaker)
+    assert lease.events == ["attempted", "failed"]
+    assert ("failure", "gms.example.com") not in breaker.events
+
+
+def test_login_page_down_counts_against_host(login_page):
+    login_page.navigate_error = GmsUnavailableError("timeout")
+    lease, breaker = FakeLease(), FakeBreaker()
+    with pytest.raises(GmsUnavailableError):
+        _open(lease=lease, breaker=breaker)
+    assert breaker.events == [("failure", "gms.example.com")]
+    assert lease.events == []
+
+
+def test_interrupted_failure_is_not_counted(login_page):
+    login_page.navigate_error = GmsUnavailableError("timeout")
+    breaker = FakeBreaker()
+    with pytest.raises(GmsUnavailableError):
+        _open(breaker=breaker, interrupted=lambda: True)
+    assert breaker.events == []
@@ -0,0 +1,79 @@
+import pytest
+
+from src.utils import job_journal
+from src.utils.job_journal import JobJournal
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(job_journal.time, "time", clock)
+    return clock
+
+
+def test_only_successful_jobs_short_circuit(tmp_path):
+    journal = JobJournal(tmp_path / "journal.sqlite3")
+    journal.record("ok", "completed", "2024-01-01T00:00:00")
+    journal.record("empty", "completed_no_invoices")
+    journal.record("bad", "failed")
+    journal.record("stop", "canceled")
+
+    assert journal.lookup_succeeded("ok")["status"] == "completed"
+    assert journal.lookup_succeeded("empty")["status"] == "completed_no_invoices"
+    # Falha/cancelamento ficam no diário, mas o worker consulta o maestro.
+    assert journal.lookup("bad")["status"] == "failed"
+    assert journal.lookup_succeeded("bad") is None
+    assert journal.lookup_succeeded("stop") is None
+    assert journal.lookup_succeeded("unknown") is None
+    journal.close()
+
+
+def test_bounded_by_entries_keeping_the_newest(tmp_path, clock):
+    journal = JobJournal(tmp_path / "journal.sqlite3", max_entries=3)
+    for i in range(5):
+        journal.record(f"job-{i}", "completed")
+        clock.now += 1
+    assert journal.prune() == 2
+    assert journal.lookup("job-0") is None
+    assert journal.lookup("job-1") is None
+    assert [journal.lookup(f"job-{i}")["status"] for i in (2, 3, 4)] == ["completed"] * 3
+    journal.close()
+
+
+def test_bounded_by_age(tmp_path, clock):
+    journal = JobJournal(tmp_path / "journal.sqlite3", max_age_days=1)
+    journal.record("old", "completed")
+    clock.now += 12 * 3600
+    journal.record("new", "completed")
+    clock.now += 12 * 3600 + 1
+    # Expirada já some da consulta, antes mesmo do prune.
+    assert journal.lookup_succeeded("old") is None
+    assert journal.lookup("new") is not None
+    assert journal.prune() == 1
+    journal.close()
+
+
+def test_prune_runs_on_open_and_every_few_writes(tmp_path, clock, monkeypatch):
+    path = tmp_path / "journal.sqlite3"
+    first = JobJournal(path)
+    first.record("old", "completed")
+    first.close()
+    clock.now += 2 * 24 * 3600
+    reopened = JobJournal(path, max_age_days=1)
+    assert reopened.prune() == 0
+
+    monkeypatch.setattr(job_journal, "_PRUNE_EVERY", 2)
+    reopened.max_entries = 1
+    reopened.record("a", "completed")
+    clock.now += 1
+    reopened.record("b", "completed")
+    assert reopened.lookup("a") is None
+    reopened.close()
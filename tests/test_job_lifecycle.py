@@ -0,0 +1,127 @@
+import json
+
+import pytest
+
+from config import settings
+from src.core.job_lifecycle import JobDelivery, JobLifecycle, Settlement
+from src.core.job_messages import HEADER_CHECKPOINT
+from src.core.job_retry import HEADER_RETRY_ATTEMPT
+
+_PARAMS = {
+    "stores": ["001"],
+    "document_type": "NFe",
+    "start_date": "01/01/2025",
+    "end_date": "31/01/2025",
+    "gms_login_url": "https://gms.example/login",
+}
+
+
+def _body(job_id="job-1", **params):
+    return json.dumps({"job_id": job_id, "parameters": {**_PARAMS, **params}}).encode()
+
+
+@pytest.fixture
+def lifecycle(tmp_path, monkeypatch):
+    # Outbox e diário em tmp_path; sem circuito nem coalescer, que são
+    # singletons/threads do processo e não entram nas decisões testadas.
+    monkeypatch.setenv("BOT_DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "gms_circuit_failure_threshold", 0)
+    monkeypatch.setattr(settings, "export_coalescing", False)
+    monkeypatch.setattr(settings, "job_retry_max_attempts", 2)
+    state = {"draining": False}
+    lifecycle = JobLifecycle(
+        "jobs",
+        2,
+        report_log=lambda job_id, level, message: True,
+        free_slots=lambda: 2,
+        draining=lambda: state["draining"],
+        borrow_slot=lambda: None,
+        return_slot=lambda slot_id: None,
+    )
+    lifecycle.state = state
+    yield lifecycle
+    lifecycle.close()
+
+
+def _screened(lifecycle, body=None, headers=None):
+    job = JobDelivery(body or _body(), headers)
+    assert lifecycle.screen(job) is None
+    return job
+
+
+def test_drain_returns_the_message_untouched(lifecycle):
+    lifecycle.state["draining"] = True
+    assert lifecycle.screen(JobDelivery(_body(), None)) == Settlement(requeue=True)
+
+
+def test_unreadable_message_goes_to_dlx_without_finish(lifecycle):
+    job = JobDelivery(b"{not json", None)
+    with pytest.raises(json.JSONDecodeError) as raised:
+        lifecycle.screen(job)
+    assert lifecycle.failed(job, raised.value) == Settlement(requeue=False)
+
+
+def test_invalid_job_is_finished_as_failed(lifecycle):
+    job = JobDelivery(json.dumps({"job_id": "job-1", "parameters": {}}).encode(), None)
+    with pytest.raises(ValueError) as raised:
+        lifecycle.screen(job)
+    settlement = lifecycle.failed(job, raised.value)
+    assert settlement.requeue is False
+    assert settlement.finish[0] == "failed"
+    assert settlement.finish[1]["error_type"] == "ValidationError"
+
+
+def test_finished_job_short_circuits_its_redelivery(lifecycle):
+    job = _screened(lifecycle)
+    lifecycle.finish(job, "completed", {"completed_at": "2025-02-01T00:00:00", "duration_seconds": 60})
+
+    # Finish ainda no outbox ou job no diário: ack sem reprocessar.
+    assert lifecycle.screen(JobDelivery(_body(), None)) == Settlement()
+    lifecycle.outbox.delivered(lifecycle.outbox.due()[0].id)
+    assert lifecycle.screen(JobDelivery(_body(), None)) == Settlement()
+
+
+def test_terminal_in_maestro_is_acked(lifecycle):
+    job = _screened(lifecycle)
+    assert lifecycle.admit(job, {"status": "completed", "completed_at": None}) == Settlement()
+    assert lifecycle.admit(job, None) is None
+
+
+def test_transient_failure_is_retried_until_the_budget_runs_out(lifecycle):
+    job = _screened(lifecycle)
+    settlement = lifecycle.conclude(job, {"status": "failed", "transient": True, "error": "timeout"})
+    assert settlement.republish_to == lifecycle.retry_policy.retry_queue(lifecycle.retry_policy.delay_for(1))
+    assert settlement.headers == {HEADER_RETRY_ATTEMPT: 1}
+    assert settlement.finish is None
+
+    job = _screened(lifecycle, headers={HEADER_RETRY_ATTEMPT: 2})
+    settlement = lifecycle.conclude(job, {"status": "failed", "transient": True, "error": "timeout"})
+    assert settlement.republish_to is None
+    assert settlement.requeue is False
+    assert settlement.finish[0] == "failed"
+
+
+def test_transient_exception_is_retried_and_permanent_is_finished(lifecycle):
+    job = _screened(lifecycle)
+    assert lifecycle.failed(job, ConnectionError("reset")).headers == {HEADER_RETRY_ATTEMPT: 1}
+
+    settlement = lifecycle.failed(job, RuntimeError("boom"))
+    assert settlement.requeue is False
+    assert settlement.finish == ("failed", {"error": "boom", "error_type": "RuntimeError"})
+
+
+def test_suspended_job_goes_back_with_its_checkpoint(lifecycle):
+    job = _screened(lifecycle)
+    settlement = lifecycle.conclude(job, {"status": "suspended", "stage": "export", "checkpoint": {"stage": "export"}})
+    assert settlement.republish_to == "jobs"
+    assert HEADER_CHECKPOINT in settlement.headers
+    assert settlement.finish is None
+
+    assert lifecycle.conclude(job, {"status": "suspended", "stage": "login"}) == Settlement(requeue=True)
+
+
+def test_completed_job_is_finished_and_acked(lifecycle):
+    job = _screened(lifecycle)
+    settlement = lifecycle.conclude(job, {"status": "completed"})
+    assert settlement.requeue is None
+    assert settlement.finish == ("completed", {"status": "completed", "job_id": "job-1"})
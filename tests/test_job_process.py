@@ -0,0 +1,110 @@
+import sys
+import textwrap
+import threading
+
+import pytest
+
+from src.core import job_process
+from src.core.job_process import IPC_PREFIX, JobProcessSupervisor, encode_ipc_message
+
+
+class ScriptSupervisor(JobProcessSupervisor):
+    """Supervisor real com um filho de teste no lugar do main.py --ipc."""
+
+    def __init__(self, script, **kwargs):
+        kwargs.setdefault("poll_interval", 0.05)
+        super().__init__(**kwargs)
+        self.script = textwrap.dedent(script)
+
+    def _build_command(self, params_file, job_id, pending_dir):
+        return [sys.executable, "-c", self.script, str(params_file)]
+
+
+@pytest.fixture
+def pending_dir(tmp_path):
+    path = tmp_path / "slot-0"
+    path.mkdir()
+    return path
+
+
+def _run(supervisor, pending_dir, **kwargs):
+    logs = []
+    result = supervisor.run(
+        {"gms_password": "x"},
+        "job-1",
+        log_callback=lambda job_id, level, message: logs.append((job_id, level, message)),
+        pending_dir=pending_dir,
+        **kwargs,
+    )
+    return result, logs
+
+
+def test_ipc_lines_are_parsed_and_the_rest_ignored(pending_dir):
+    supervisor = ScriptSupervisor(f"""
+        import json, sys
+        prefix = {IPC_PREFIX!r}
+        print("saída crua do Chrome")
+        print(prefix + "{{não é json")
+        print({encode_ipc_message({"type": "log", "level": "WARNING", "message": "ação"})!r})
+        print({encode_ipc_message({"type": "result", "result": {"status": "completed"}})!r})
+        # O arquivo de parâmetros existe enquanto o filho roda.
+        print(prefix + json.dumps({{"type": "log", "message": open(sys.argv[1]).read()}}))
+    """)
+    result, logs = _run(supervisor, pending_dir)
+    assert result == {"status": "completed"}
+    assert logs[0] == ("job-1", "WARNING", "ação")
+    assert logs[1] == ("job-1", "INFO", '{"gms_password": "x"}')
+    # Senha não fica no disco depois do job.
+    assert list(pending_dir.parent.glob(".*-params.json")) == []
+
+
+def test_child_dying_without_result_is_transient(pending_dir):
+    result, _ = _run(ScriptSupervisor("import os; os._exit(3)"), pending_dir)
+    assert result["status"] == "failed"
+    assert result["error_type"] == "ChildProcessError"
+    assert result["transient"] is True
+    assert "exit code 3" in result["error"]
+
+
+def test_wall_clock_limit_kills_the_child(pending_dir):
+    supervisor = ScriptSupervisor("import time; time.sleep(60)", max_wall_seconds=1)
+    result, _ = _run(supervisor, pending_dir)
+    assert result["error_type"] == "WallClockLimitExceeded"
+    # Estouro de limite não é transitório: o mesmo job estouraria de novo.
+    assert result["transient"] is False
+    assert result["duration_seconds"] < 10
+
+
+def test_rss_limit_kills_the_child(pending_dir):
+    supervisor = ScriptSupervisor("""
+        import time
+        ballast = bytearray(200 * 1024 * 1024)
+        for i in range(0, len(ballast), 4096):
+            ballast[i] = 1
+        time.sleep(60)
+    """, max_rss_mb=100)
+    result, _ = _run(supervisor, pending_dir)
+    assert result["error_type"] == "MemoryLimitExceeded"
+    assert result["transient"] is False
+
+
+def test_cancel_is_sent_on_stdin(pending_dir):
+    supervisor = ScriptSupervisor(f"""
+        import sys
+        if sys.stdin.readline().strip() == {job_process.IPC_CANCEL_COMMAND!r}:
+            print({encode_ipc_message({"type": "result", "result": {"status": "canceled", "stage": "export"}})!r})
+    """)
+    cancel = threading.Event()
+    cancel.set()
+    result, _ = _run(supervisor, pending_dir, cancel_event=cancel)
+    assert result == {"status": "canceled", "stage": "export"}
+
+
+def test_child_ignoring_cancel_is_killed_after_grace(pending_dir, monkeypatch):
+    monkeypatch.setattr(job_process, "_CANCEL_GRACE_SECONDS", 0.3)
+    cancel = threading.Event()
+    cancel.set()
+    result, _ = _run(ScriptSupervisor("import time; time.sleep(60)"), pending_dir, cancel_event=cancel)
+    assert result["status"] == "canceled"
+    assert result["stage"] == "processo_encerrado"
+    assert result["duration_seconds"] < 10
@@ -0,0 +1,42 @@
+from src.core.job_retry import HEADER_RETRY_ATTEMPT, RetryDecision, RetryPolicy, retry_attempt
+
+
+def _policy():
+    return RetryPolicy("jobs", max_attempts=4, base_delay_seconds=30, max_delay_seconds=600)
+
+
+def test_backoff_is_capped():
+    policy = _policy()
+    assert [policy.delay_for(a) for a in range(1, 5)] == [30, 120, 480, 600]
+    assert policy.delays() == [30, 120, 480, 600]
+
+
+def test_next_retry_until_budget_is_exhausted():
+    policy = _policy()
+    assert policy.next_retry(None) == RetryDecision(1, 30, "jobs.retry.30s")
+    assert policy.next_retry({HEADER_RETRY_ATTEMPT: 2}) == RetryDecision(3, 480, "jobs.retry.480s")
+    assert policy.next_retry({HEADER_RETRY_ATTEMPT: "3"}).attempt == 4
+    assert policy.next_retry({HEADER_RETRY_ATTEMPT: 4}) is None
+
+
+def test_malformed_attempt_header_counts_as_first():
+    assert retry_attempt({HEADER_RETRY_ATTEMPT: "x"}) == 0
+    assert retry_attempt({HEADER_RETRY_ATTEMPT: -3}) == 0
+    assert retry_attempt({}) == 0
+
+
+def test_retry_queue_dead_letters_back_to_base_queue():
+    assert _policy().queue_arguments(120) == {
+        "x-message-ttl": 120000,
+        "x-dead-letter-exchange": "",
+        "x-dead-letter-routing-key": "jobs",
+    }
+
+
+def test_max_delay_never_below_base():
+    policy = RetryPolicy("jobs", max_attempts=2, base_delay_seconds=60, max_delay_seconds=10)
+    assert policy.delays() == [60]
+
+
+def test_zero_attempts_never_retries():
+    assert RetryPolicy("jobs", 0, 30, 600).next_retry(None) is None
@@ -0,0 +1,65 @@
+from src.core.job_splitter import merge_summaries, plan_shards
+
+
+def _params(start="01/01/2024", end="31/01/2024", stores=("1", "2", "3")):
+    return {"start_date": start, "end_date": end, "stores": list(stores), "document_type": "nfe"}
+
+
+def test_balanced_day_chunks():
+    shards = plan_shards(_params(), max_days=15, max_stores=0)
+    assert [(s["start_date"], s["end_date"]) for s in shards] == [
+        ("01/01/2024", "11/01/2024"),
+        ("12/01/2024", "22/01/2024"),
+        ("23/01/2024", "31/01/2024"),
+    ]
+    assert all(s["stores"] == ["1", "2", "3"] and s["document_type"] == "nfe" for s in shards)
+
+
+def test_days_times_store_groups():
+    shards = plan_shards(_params(end="10/01/2024", stores=("1", "2", "3", "4", "5")), max_days=5, max_stores=2)
+    # 2 faixas de dias × 3 grupos de lojas (2+2+1 → equilibrado 2+2+1).
+    assert len(shards) == 6
+    assert [s["stores"] for s in shards[:3]] == [["1", "2"], ["3", "4"], ["5"]]
+    assert {s["start_date"] for s in shards} == {"01/01/2024", "06/01/2024"}
+
+
+def test_single_shard_returns_original_params():
+    params = _params(end="05/01/2024")
+    assert plan_shards(params, max_days=15, max_stores=5) == [params]
+    assert plan_shards(params, max_days=0, max_stores=0) == [params]
+
+
+def test_unreadable_or_inverted_period_is_not_split():
+    for params in (_params(start="2024-01-01"), _params(start="10/01/2024", end="01/01/2024"), {"stores": ["1"]}):
+        assert plan_shards(params, max_days=1, max_stores=1) == [params]
+
+
+def test_no_stores_splits_by_days_only():
+    shards = plan_shards(_params(end="04/01/2024", stores=()), max_days=2, max_stores=1)
+    assert [s["stores"] for s in shards] == [[], []]
+
+
+def test_merge_summaries(tmp_path):
+    merged = merge_summaries([
+        {
+            "total_xml_files_analyzed": 3, "valid_invoices_found": 2,
+            "document_types": {"nfe_model_55": 2},
+            "operation_nature": {"exit_notes": 1, "entry_notes": 1},
+            "period_of_documents": ["2024-01-02", "2024-01-01"],
+            "stores_found": [{"cnpj": "1", "name": "Loja 1"}],
+        },
+        None,
+        {
+            "total_xml_files_analyzed": 1, "valid_invoices_found": 1,
+            "document_types": {"nfce_model_65": 1},
+            "period_of_documents": ["2024-01-01"],
+            "stores_found": [{"cnpj": "1", "name": "Outra"}, {"cnpj": "2", "name": "Loja 2"}],
+        },
+    ], tmp_path)
+    assert merged["total_xml_files_analyzed"] == 4
+    assert merged["valid_invoices_found"] == 3
+    assert merged["document_types"] == {"nfe_model_55": 2, "nfce_model_65": 1}
+    assert merged["operation_nature"] == {"exit_notes": 1, "entry_notes": 1}
+    assert merged["period_of_documents"] == ["2024-01-01", "2024-01-02"]
+    assert merged["stores_found"] == [{"cnpj": "1", "name": "Loja 1"}, {"cnpj": "2", "name": "Loja 2"}]
+    assert merged["destination"] == str(tmp_path)
@@ -0,0 +1,70 @@
+from datetime import datetime, time
+
+import pytest
+
+from src.core.job_window import HEADER_NOT_BEFORE, ExecutionWindowPolicy, in_window, next_opening, parse_window
+
+
+def test_parse_window():
+    assert parse_window(" 22:00 - 06:30 ") == (time(22, 0), time(6, 30))
+    for value in ("", "22h-06h", "25:00-06:00", "22:00-06:61"):
+        with pytest.raises(ValueError):
+            parse_window(value)
+
+
+def test_window_across_midnight():
+    window = parse_window("22:00-06:00")
+    assert in_window(window, datetime(2024, 1, 1, 23, 0))
+    assert in_window(window, datetime(2024, 1, 2, 5, 59))
+    assert not in_window(window, datetime(2024, 1, 2, 6, 0))
+    assert next_opening(window, datetime(2024, 1, 2, 10, 0)) == datetime(2024, 1, 2, 22, 0)
+
+
+def test_next_opening_tomorrow():
+    window = parse_window("01:00-05:00")
+    assert next_opening(window, datetime(2024, 1, 1, 7, 0)) == datetime(2024, 1, 2, 1, 0)
+    moment = datetime(2024, 1, 1, 2, 0)
+    assert next_opening(window, moment) == moment
+
+
+def test_explicit_window_defers_until_opening():
+    policy = ExecutionWindowPolicy("jobs")
+    now = datetime(2024, 1, 1, 10, 0)
+    assert policy.not_before({"execution_window": "22:00-06:00"}, None, 10, now) == datetime(2024, 1, 1, 22, 0)
+    assert policy.not_before({"execution_window": "08:00-18:00"}, None, 10, now) is None
+
+
+def test_large_jobs_go_to_offpeak_window():
+    policy = ExecutionWindowPolicy("jobs", offpeak_window="22:00-06:00", defer_larger_than_seconds=3600)
+    now = datetime(2024, 1, 1, 10, 0)
+    assert policy.not_before({}, None, 1800, now) is None
+    assert policy.not_before({}, None, 7200, now) == datetime(2024, 1, 1, 22, 0)
+    # O job pode baixar o limite do worker.
+    assert policy.not_before({"defer_if_larger_than_seconds": 600}, None, 1800, now) == datetime(2024, 1, 1, 22, 0)
+    with pytest.raises(ValueError):
+        policy.not_before({"defer_if_larger_than_seconds": "muito"}, None, 1800, now)
+
+
+def test_no_offpeak_window_never_defers_by_size():
+    policy = ExecutionWindowPolicy("jobs", defer_larger_than_seconds=60)
+    assert policy.not_before({}, None, 10 ** 6, datetime(2024, 1, 1, 10, 0)) is None
+
+
+def test_not_before_header_wins():
+    policy = ExecutionWindowPolicy("jobs")
+    now = datetime(2024, 1, 1, 10, 0)
+    later = datetime(2024, 1, 1, 12, 0)
+    params = {"execution_window": "22:00-06:00"}
+    assert policy.not_before(params, {HEADER_NOT_BEFORE: later.timestamp()}, 10, now) == later
+    # Chegada a hora, roda mesmo fora da janela.
+    assert policy.not_before(params, {HEADER_NOT_BEFORE: now.timestamp() - 1}, 10, now) is None
+    assert policy.not_before(params, {HEADER_NOT_BEFORE: "x"}, 10, now) is None
+
+
+def test_delay_steps():
+    assert ExecutionWindowPolicy.delay_step(10) == 60
+    assert ExecutionWindowPolicy.delay_step(899) == 300
+    assert ExecutionWindowPolicy.delay_step(7 * 3600) == 3600
+    policy = ExecutionWindowPolicy("jobs")
+    assert policy.delay_queue(300) == "jobs.defer.300s"
+    assert policy.queue_arguments(60)["x-dead-letter-routing-key"] == "jobs"
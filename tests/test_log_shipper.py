@@ -0,0 +1,86 @@
+import asyncio
+
+from src.utils.log_shipper import AsyncLogShipper, LogShipper
+
+
+class Sink:
+    """send_batch que recusa as primeiras `failures` chamadas."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = 0
+        self.delivered = []
+
+    def __call__(self, job_id, entries):
+        self.calls += 1
+        if self.calls <= self.failures:
+            return False
+        self.delivered.extend((job_id, e["message"]) for e in entries)
+        return True
+
+
+def test_batches_keep_order_per_job():
+    sink = Sink()
+    shipper = LogShipper(sink, batch_size=2, flush_interval=0.01)
+    shipper.start()
+    for i in range(5):
+        shipper.submit("a", "INFO", f"a{i}")
+    shipper.submit("b", "INFO", "b0")
+    assert shipper.flush(timeout=5)
+    shipper.stop()
+    assert [m for j, m in sink.delivered if j == "a"] == ["a0", "a1", "a2", "a3", "a4"]
+    assert ("b", "b0") in sink.delivered
+
+
+def test_failed_enqueue_is_retried_in_place():
+    sink = Sink(failures=2)
+    shipper = LogShipper(sink, flush_interval=0.01)
+    shipper.start()
+    shipper.submit("a", "INFO", "first")
+    shipper.submit("a", "INFO", "second")
+    assert shipper.flush("a", timeout=5)
+    shipper.stop()
+    assert sink.delivered == [("a", "first"), ("a", "second")]
+    assert shipper.dropped == 0
+
+
+def test_batch_dropped_after_attempts():
+    sink = Sink(failures=10)
+    shipper = LogShipper(sink, flush_interval=0.01)
+    shipper.start()
+    shipper.submit("a", "ERROR", "lost")
+    # flush volta: o lote descartado deixa de contar como pendente.
+    assert shipper.flush("a", timeout=5)
+    shipper.stop()
+    assert sink.delivered == []
+    assert sink.calls == 3
+    assert shipper.dropped == 1
+
+
+def test_full_queue_drops_low_priority_first():
+    shipper = LogShipper(Sink(), max_queue=2, block_timeout=0.01)
+    shipper.submit("a", "INFO", "old")
+    shipper.submit("a", "WARNING", "warn")
+    assert shipper.submit("a", "ERROR", "err")
+    assert [e["message"] for e in shipper._queue] == ["warn", "err"]
+    assert shipper.dropped == 1
+
+
+def test_async_shipper_retries_then_drops():
+    async def scenario():
+        calls = []
+
+        async def send_batch(job_id, entries):
+            calls.append([e["message"] for e in entries])
+            return len(calls) > 1
+
+        shipper = AsyncLogShipper(send_batch, flush_interval=0.01)
+        shipper.start()
+        shipper.submit("a", "INFO", "x")
+        assert await shipper.flush_async("a", timeout=5)
+        await shipper.stop_async()
+        return calls, shipper.dropped
+
+    calls, dropped = asyncio.run(scenario())
+    assert calls == [["x"], ["x"]]
+    assert dropped == 0
@@ -0,0 +1,78 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.core.maestro_client import MaestroClient
+
+
+class _Maestro:
+    """Maestro local: responde (status, corpo) a POSTs com gzip e 200 sem."""
+
+    def __init__(self, gzip_status, gzip_body):
+        self.requests = []
+        maestro = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                encoding = self.headers.get("Content-Encoding")
+                maestro.requests.append(encoding)
+                status, body = (gzip_status, gzip_body) if encoding == "gzip" else (200, "{}")
+                payload = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def maestro_factory():
+    servers = []
+
+    def make(status, body=""):
+        servers.append(_Maestro(status, body))
+        return servers[-1]
+
+    yield make
+    for server in servers:
+        server.close()
+
+
+def _post(maestro):
+    client = MaestroClient(maestro.url, gzip_min_bytes=10)
+    response = client.post("/api/v1/worker/jobs/1/finish", "finish", {"result": "x" * 100})
+    client.close()
+    return client, response
+
+
+def test_validation_400_keeps_gzip_and_does_not_repost(maestro_factory):
+    maestro = maestro_factory(400, '{"detail": "result.summary: field required"}')
+    client, response = _post(maestro)
+    assert response.status_code == 400
+    assert maestro.requests == ["gzip"]
+    assert client.gzip_min_bytes == 10
+
+
+@pytest.mark.parametrize("status, body", [
+    (415, ""),
+    (400, '{"detail": "Content-Encoding gzip not supported"}'),
+    (400, "could not decompress request body"),
+])
+def test_refused_encoding_falls_back_to_plain_body(maestro_factory, status, body):
+    maestro = maestro_factory(status, body)
+    client, response = _post(maestro)
+    assert response.status_code == 200
+    assert maestro.requests == ["gzip", None]
+    assert client.gzip_min_bytes == 0
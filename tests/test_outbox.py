@@ -0,0 +1,137 @@
+import pytest
+
+from src.utils import outbox as outbox_module
+from src.utils.outbox import MaestroOutbox, OutboxDispatcher, is_permanent_rejection
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(outbox_module.time, "time", clock)
+    # Sem jitter: o backoff fica no teto do intervalo sorteado.
+    monkeypatch.setattr(outbox_module.random, "uniform", lambda low, high: high)
+    return clock
+
+
+@pytest.fixture
+def outbox(tmp_path, clock):
+    outbox = MaestroOutbox(tmp_path / "outbox.sqlite3", max_age_seconds=3600, base_backoff=2, max_backoff=60)
+    yield outbox
+    outbox.close()
+
+
+def test_only_the_head_of_each_job_is_due(outbox):
+    outbox.enqueue("a", "start")
+    outbox.enqueue("a", "finish")
+    outbox.enqueue("b", "logs", {"lines": ["x"]})
+    due = outbox.due()
+    assert [(e.job_id, e.kind) for e in due] == [("a", "start"), ("b", "logs")]
+    assert due[1].payload == {"lines": ["x"]}
+
+    # O finish de "a" só sai depois que o start foi apagado.
+    assert "finish" not in [e.kind for e in outbox.due()]
+    outbox.delivered(due[0].id)
+    assert [(e.job_id, e.kind) for e in outbox.due()] == [("a", "finish"), ("b", "logs")]
+
+
+def test_failed_head_keeps_blocking_its_job(outbox, clock):
+    outbox.enqueue("a", "start")
+    outbox.enqueue("a", "finish")
+    head = outbox.due()[0]
+    outbox.failed(head, "timeout")
+    clock.now += 1
+    assert outbox.due() == []
+    clock.now += 1
+    assert [e.kind for e in outbox.due()] == ["start"]
+
+
+def test_claim_lease_expires_across_instances(tmp_path, clock):
+    path = tmp_path / "outbox.sqlite3"
+    first = MaestroOutbox(path)
+    second = MaestroOutbox(path)
+    first.enqueue("a", "start")
+
+    assert [e.kind for e in first.due()] == ["start"]
+    # Reservada para a primeira réplica: a segunda não entrega em dobro...
+    assert second.due() == []
+    # ...mas a dona a vê de novo (retry dentro do mesmo despachante).
+    assert [e.kind for e in first.due()] == ["start"]
+
+    # A primeira morreu no meio do POST: a reserva vence e a segunda assume.
+    clock.now += outbox_module._CLAIM_SECONDS + 1
+    assert [e.kind for e in second.due()] == ["start"]
+    assert first.due() == []
+    first.close()
+    second.close()
+
+
+def test_backoff_grows_and_is_capped(outbox, clock):
+    outbox.enqueue("a", "finish")
+    waits = []
+    for _ in range(7):
+        event = outbox.due()[0]
+        outbox.failed(event, "503")
+        started = clock.now
+        while not outbox.due():
+            clock.now += 1
+        waits.append(clock.now - started)
+    assert waits == [2, 4, 8, 16, 32, 60, 60]
+
+
+def test_failure_releases_the_claim(tmp_path, clock):
+    path = tmp_path / "outbox.sqlite3"
+    first = MaestroOutbox(path, base_backoff=2)
+    second = MaestroOutbox(path, base_backoff=2)
+    first.enqueue("a", "start")
+    first.failed(first.due()[0], "503")
+    clock.now += 2
+    assert [e.attempts for e in second.due()] == [1]
+    first.close()
+    second.close()
+
+
+def test_events_older_than_max_age_are_dropped(outbox, clock):
+    outbox.enqueue("a", "start")
+    outbox.enqueue("a", "finish")
+    clock.now += 3601
+    outbox.failed(outbox.due()[0], "503")
+    # A cabeça velha saiu e o próximo evento do job já é elegível.
+    assert outbox.pending("a", "start") == 0
+    assert [e.kind for e in outbox.due()] == ["finish"]
+
+
+def test_dispatcher_settles_delivered_rejected_and_failed(outbox, clock):
+    outbox.enqueue("ok", "start")
+    outbox.enqueue("retry", "start")
+    outbox.enqueue("boom", "start")
+
+    def deliver(event):
+        if event.job_id == "boom":
+            raise ConnectionError("recusado")
+        return event.job_id == "ok"
+
+    dispatcher = OutboxDispatcher(outbox, deliver)
+    assert dispatcher.run_once() == 1
+    assert outbox.pending("ok") == 0
+    assert outbox.pending("retry") == 1
+    assert outbox.pending("boom") == 1
+    # Falha reagendada: nada vence na rodada seguinte, logo depois.
+    assert dispatcher.run_once() == 0
+
+
+def test_is_permanent_rejection():
+    assert is_permanent_rejection(400)
+    assert is_permanent_rejection(404)
+    assert is_permanent_rejection(409)
+    assert not is_permanent_rejection(408)
+    assert not is_permanent_rejection(429)
+    assert not is_permanent_rejection(500)
+    assert not is_permanent_rejection(200)
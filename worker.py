@@ -1,483 +1,779 @@
-import logging
-import logging.config
-import json
-import time
-import signal
-import sys
-import threading
-from datetime import datetime, timezone
-from typing import Dict, Optional
-import pika
-import requests
-from pika import PlainCredentials, ConnectionParameters, BlockingConnection
-from pathlib import Path
-
-from config import settings
-from src.core.bot_runner import BotRunner
-from src.utils.cancellation_watcher import CancellationWatcher
-from src.utils.exceptions import ConfigurationError, ElementNotFoundError, LoginError
-
-# Interval (seconds) between heartbeat pumps while a long job runs in a thread.
-# Keep well below RabbitMQ heartbeat (600s) so two consecutive misses are impossible.
-_HEARTBEAT_PUMP_INTERVAL = 30
-
-# Cadência do polling de cancelamento. 15s dá ~20 polls de margem dentro da
-# janela de 5min do retry worker do maestro (last_heartbeat_at), e mantém a
-# latência clique-Cancelar → worker abortar em ~15s + a sleep ativa do bot.
-_CANCELLATION_POLL_INTERVAL = 15.0
-
-logging.config.dictConfig(settings.get_log_config())
-logger = logging.getLogger(__name__)
-
-
-class RabbitMQWorker:
-    def __init__(self):
-        self.connection: Optional[pika.BlockingConnection] = None
-        self.channel: Optional[pika.channel.Channel] = None
-        self.should_stop = False
-        
-        self.rabbitmq_host = settings.rabbitmq_host
-        self.rabbitmq_port = settings.rabbitmq_port
-        self.rabbitmq_user = settings.rabbitmq_user
-        self.rabbitmq_password = settings.rabbitmq_password
-        self.queue_name = settings.rabbitmq_queue
-        
-        self.maestro_url = settings.maestro_api_url
-        
-        signal.signal(signal.SIGINT, self._signal_handler)
-        signal.signal(signal.SIGTERM, self._signal_handler)
-    
-    def _signal_handler(self, signum, frame):
-        logger.info(f"Recebido sinal {signum}. Encerrando...")
-        self.should_stop = True
-        if self.connection and not self.connection.is_closed:
-            self.connection.close()
-        sys.exit(0)
-    
-    def connect(self):
-        max_retries = 5
-        retry_delay = 5
-        
-        for attempt in range(max_retries):
-            try:
-                logger.info(f"Conectando ao RabbitMQ em {self.rabbitmq_host}:{self.rabbitmq_port}...")
-                
-                credentials = pika.PlainCredentials(
-                    self.rabbitmq_user,
-                    self.rabbitmq_password
-                )
-                
-                parameters = pika.ConnectionParameters(
-                    host=self.rabbitmq_host,
-                    port=self.rabbitmq_port,
-                    credentials=credentials,
-                    heartbeat=600,
-                    blocked_connection_timeout=300
-                )
-                
-                self.connection = pika.BlockingConnection(parameters)
-                self.channel = self.connection.channel()
-                
-                self.channel.queue_declare(queue=self.queue_name, durable=True, arguments={"x-dead-letter-exchange": "maestro.dlx"})
-                
-                self.channel.basic_qos(prefetch_count=1)
-                
-                logger.info(f"✅ Conectado ao RabbitMQ. Aguardando mensagens na fila '{self.queue_name}'...")
-                return
-                
-            except Exception as e:
-                logger.error(f"Falha ao conectar (tentativa {attempt + 1}/{max_retries}): {e}")
-                if attempt < max_retries - 1:
-                    logger.info(f"Aguardando {retry_delay}s antes de tentar novamente...")
-                    time.sleep(retry_delay)
-                else:
-                    raise
-    
-    def _headers(self) -> Dict[str, str]:
-        # WHY: middleware do maestro tem bypass-se-vazio. Quando MAESTRO_WORKER_API_KEY
-        # não está populada, o worker não envia o header e o maestro aceita.
-        # Quando populada, mandamos em todos os callbacks (start/log/finish/cancellation)
-        # — coerência total, não dá pra metade autenticar e metade não.
-        headers = {"Content-Type": "application/json"}
-        if settings.maestro_worker_api_key:
-            headers["X-Worker-API-Key"] = settings.maestro_worker_api_key
-        return headers
-
-    def _make_request(self, method: str, endpoint: str, payload: Optional[Dict] = None) -> bool:
-        try:
-            url = f"{self.maestro_url.rstrip('/')}/{endpoint.lstrip('/')}"
-
-            logger.debug(f"Fazendo requisição {method} para {url}")
-
-            response = requests.request(
-                method=method,
-                url=url,
-                json=payload,
-                timeout=10,
-                headers=self._headers()
-            )
-
-            if response.status_code in [200, 201, 204]:
-                logger.debug(f"✅ Requisição bem sucedida: {method} {endpoint}")
-                return True
-            else:
-                logger.warning(f"⚠️ Falha na requisição. HTTP {response.status_code}: {response.text}")
-                return False
-
-        except requests.exceptions.RequestException as e:
-            logger.error(f"❌ Erro ao fazer requisição para Maestro: {e}")
-            return False
-        except Exception as e:
-            logger.error(f"❌ Erro inesperado ao fazer requisição: {e}")
-            return False
-
-    def _safe_ack(self, ch, method, requeue: Optional[bool] = None) -> None:
-        """Ack ou nack tolerante a canal fechado.
-
-        Se requeue is None, faz basic_ack. Caso contrário, basic_nack com o
-        requeue passado. Engole ChannelWrongStateError/StreamLostError/
-        ConnectionClosed: o job já foi reportado ao maestro, a reentrega vai
-        cair na verificação de idempotência (ver check_job_terminal).
-        """
-        try:
-            if requeue is None:
-                ch.basic_ack(delivery_tag=method.delivery_tag)
-            else:
-                ch.basic_nack(delivery_tag=method.delivery_tag, requeue=requeue)
-        except (pika.exceptions.ChannelWrongStateError,
-                pika.exceptions.StreamLostError,
-                pika.exceptions.ConnectionClosed) as e:
-            logger.warning(
-                f"⚠️ Canal RabbitMQ fechado antes do {'ack' if requeue is None else 'nack'} — "
-                f"job já foi reportado ao maestro; reentrega cairá no idempotency check. {e}"
-            )
-
-    def check_job_terminal(self, job_id: str) -> Optional[Dict]:
-        """Lê o status do job no maestro. Retorna o dict de status se terminal
-        (completed/completed_no_invoices/failed/canceled), None caso contrário.
-
-        Usado no início de process_message pra detectar redelivery: se o
-        maestro já tem o job em estado terminal, a mensagem que acabamos de
-        pegar é reentrega de um ack que falhou — basta ackear e descartar.
-
-        Em 404 retorna None (job sumiu do maestro, deixa o fluxo normal lidar).
-        Em erro de rede/5xx loga warning e retorna None (vai pelo caminho
-        normal; pior caso reprocessa, melhor que travar).
-        """
-        url = f"{self.maestro_url.rstrip('/')}/api/v1/worker/jobs/{job_id}/status"
-        try:
-            response = requests.get(url, headers=self._headers(), timeout=10)
-        except requests.exceptions.RequestException as e:
-            logger.warning(f"check_job_terminal: erro de rede consultando status do job {job_id}: {e}")
-            return None
-
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("terminal"):
-                return data
-            return None
-
-        if response.status_code == 404:
-            return None
-
-        logger.warning(f"check_job_terminal: status HTTP {response.status_code} para job {job_id}: {response.text}")
-        return None
-
-    def check_cancellation(self, job_id: str) -> bool:
-        """Polla o endpoint de cancelamento do maestro.
-
-        Cada chamada também atualiza last_heartbeat_at no maestro — é o sinal
-        de vida que o retry worker usa pra detectar worker morto (janela 5min).
-
-        Retorna True se o usuário pediu cancelamento, False caso contrário.
-        Propaga exceções em erros transientes (rede/timeout/5xx) para que o
-        CancellationWatcher logue warning e tente de novo no próximo ciclo
-        sem derrubar o job. 404 não propaga: trata como "sem cancelamento".
-        """
-        url = f"{self.maestro_url.rstrip('/')}/api/v1/worker/jobs/{job_id}/cancellation"
-        response = requests.get(url, headers=self._headers(), timeout=10)
-
-        if response.status_code == 200:
-            data = response.json()
-            return bool(data.get("cancellation_requested", False))
-
-        if response.status_code == 404:
-            # Job sumiu do maestro — não derruba o job em execução, só loga.
-            logger.warning(f"check_cancellation: job {job_id} retornou 404 (job não encontrado)")
-            return False
-
-        # 400 (UUID inválido) e 5xx: propaga pro watcher tratar como transiente.
-        response.raise_for_status()
-        return False
-    
-    def report_status_start(self, job_id: str) -> bool:
-        endpoint = f"/api/v1/worker/jobs/{job_id}/start"
-        logger.info(f"📤 Reportando início do job {job_id}")
-        return self._make_request("POST", endpoint)
-    
-    def report_log(self, job_id: str, level: str, message: str) -> bool:
-        endpoint = f"/api/v1/worker/jobs/{job_id}/log"
-        payload = {
-            "level": level,
-            "message": message
-        }
-        logger.debug(f"📝 Enviando log [{level}]: {message}")
-        return self._make_request("POST", endpoint, payload)
-    
-    def report_finish(self, job_id: str, status: str, result_data: Dict) -> bool:
-        endpoint = f"/api/v1/worker/jobs/{job_id}/finish"
-        payload = {
-            "status": status,
-            "result": result_data
-        }
-        logger.info(f"🏁 Reportando finalização do job {job_id} com status: {status}")
-        return self._make_request("POST", endpoint, payload)
-
-    def _run_bot_with_heartbeat(
-        self,
-        bot_params: Dict,
-        job_id: str,
-        cancel_event: Optional[threading.Event] = None,
-    ) -> Dict:
-        """Run BotRunner on a worker thread; pump pika data events on the main
-        thread so heartbeats stay alive during long (~1h) GMS exports.
-
-        cancel_event é repassado pro BotRunner pra que os loops longos de
-        polling do Selenium possam abortar quando o CancellationWatcher
-        sinalizar.
-
-        Returns the bot's result dict, or re-raises whatever the bot raised.
-        """
-        result_holder: Dict = {}
-        exc_holder: Dict = {}
-
-        def _target():
-            try:
-                bot_runner = BotRunner(
-                    bot_params,
-                    job_id=job_id,
-                    log_callback=self.report_log,
-                    cancel_event=cancel_event,
-                )
-                result_holder["result"] = bot_runner.run()
-            except BaseException as e:  # capture everything; main thread re-raises
-                exc_holder["exc"] = e
-
-        thread = threading.Thread(target=_target, name=f"bot-{job_id}", daemon=True)
-        thread.start()
-
-        while thread.is_alive():
-            # process_data_events drives the heartbeat frames and detects a dead
-            # connection early. We don't expect to receive other messages here
-            # because prefetch_count=1 and we haven't ack'd yet.
-            try:
-                self.connection.process_data_events(time_limit=_HEARTBEAT_PUMP_INTERVAL)
-            except Exception as e:
-                # If the connection died mid-job, keep waiting for the bot to
-                # finish so we don't leak a browser; reconnection happens after.
-                logger.warning(f"⚠️ process_data_events falhou durante job longo: {e}")
-                thread.join()
-                raise
-
-        if "exc" in exc_holder:
-            raise exc_holder["exc"]
-        return result_holder.get("result", {})
-    
-    def process_message(self, ch, method, properties, body):
-        job_id = None
-        
-        try:
-            message = json.loads(body)
-            
-            job_id = message.get("job_id")
-            
-            logger.info(f"📨 Mensagem recebida: {job_id}")
-            logger.info(f"Payload: {json.dumps(message, indent=2)}")
-            
-            params = message.get("parameters", {})
-            
-            if not job_id:
-                raise ValueError("Campo obrigatório 'job_id' não encontrado na mensagem")
-            
-            required_fields = ['stores', 'document_type', 'start_date', 'end_date', 'gms_login_url']
-            missing_fields = [field for field in required_fields if not params.get(field)]
-            
-            if missing_fields:
-                raise ValueError(f"Campos obrigatórios faltando em 'parameters': {', '.join(missing_fields)}")
-
-            # Idempotency: se o job já está em estado terminal no maestro, esta
-            # mensagem é redelivery de um ack que falhou — ackeia e descarta sem
-            # reprocessar. Sem isso, o reprocessamento de jobs grandes (8k+ XMLs)
-            # entra em loop quando o canal RabbitMQ é fechado por consumer_timeout.
-            terminal = self.check_job_terminal(job_id)
-            if terminal is not None:
-                logger.warning(
-                    f"♻️ Job {job_id} já está em estado terminal no maestro "
-                    f"(status={terminal.get('status')}, completed_at={terminal.get('completed_at')}). "
-                    f"Descartando redelivery sem reprocessar."
-                )
-                self._safe_ack(ch, method)
-                return
-
-            self.report_status_start(job_id)
-            self.report_log(job_id, "INFO", f"Job {job_id} iniciado. Preparando execução...")
-            
-            bot_params = {
-                'headless': params.get('headless', settings.headless),
-                'stores': params.get('stores', []),
-                'document_type': params.get('document_type'),
-                'emitter': params.get('emitter', 'Qualquer'),
-                'operation_type': params.get('operation_type', 'Qualquer'),
-                'file_type': params.get('file_type', 'XML'),
-                'invoice_situation': params.get('invoice_situation', 'Qualquer'),
-                'start_date': params.get('start_date'),
-                'end_date': params.get('end_date'),
-                'gms_user': params.get('gms_user'),
-                'gms_password': params.get('gms_password'),
-                'gms_login_url': params.get('gms_login_url')
-            }
-            
-            self.report_log(job_id, "INFO", f"Processando {len(bot_params['stores'])} loja(s)")
-            self.report_log(job_id, "INFO", f"Período: {bot_params['start_date']} a {bot_params['end_date']}")
-            self.report_log(job_id, "INFO", f"Tipo de documento: {bot_params['document_type']}")
-            
-            logger.info(f"🚀 Iniciando execução do job {job_id}")
-            self.report_log(job_id, "INFO", "Iniciando execução da automação...")
-
-            # Watcher vive entre /start e /finish. Cada GET dele atualiza
-            # last_heartbeat_at no maestro (mantém o job vivo aos olhos do
-            # retry worker) e detecta cancelamento solicitado via UI.
-            def _notify_cancel():
-                self.report_log(
-                    job_id,
-                    "WARNING",
-                    "Cancelamento solicitado pelo usuário. Encerrando após operação atual."
-                )
-
-            with CancellationWatcher(
-                check_fn=self.check_cancellation,
-                job_id=job_id,
-                poll_interval=_CANCELLATION_POLL_INTERVAL,
-                on_cancel=_notify_cancel,
-            ) as watcher:
-                result = self._run_bot_with_heartbeat(bot_params, job_id, watcher.cancel_event)
-
-            result['job_id'] = job_id
-
-            if result.get("status") == "completed":
-                self.report_log(job_id, "INFO", "Automação concluída com sucesso!")
-                self.report_finish(job_id, "completed", result)
-                logger.info(f"✅ Job {job_id} concluído com sucesso")
-
-            elif result.get("status") == "completed_no_invoices":
-                self.report_log(job_id, "INFO", "Automação concluída, porém nenhuma nota fiscal foi encontrada")
-                self.report_finish(job_id, "completed_no_invoices", result)
-                logger.info(f"✅ Job {job_id} concluído sem notas fiscais")
-
-            elif result.get("status") == "canceled":
-                stage = result.get("stage", "desconhecida")
-                self.report_log(job_id, "WARNING", f"Job cancelado pelo usuário (etapa: {stage}).")
-                self.report_finish(job_id, "canceled", result)
-                logger.info(f"🛑 Job {job_id} cancelado pelo usuário (etapa: {stage})")
-
-            else:
-                error_msg = result.get("error", "Falha desconhecida na execução")
-                self.report_log(job_id, "ERROR", f"Automação falhou: {error_msg}")
-                self.report_finish(job_id, "failed", result)
-                logger.error(f"❌ Job {job_id} falhou")
-            
-            self._safe_ack(ch, method)
-            logger.info(f"✅ Mensagem processada e confirmada: {job_id}")
-            
-        except json.JSONDecodeError as e:
-            logger.error(f"❌ Erro ao decodificar JSON: {e}")
-            logger.error(f"Body recebido: {body}")
-            if job_id:
-                self.report_log(job_id, "ERROR", f"Erro ao decodificar JSON: {str(e)}")
-                self.report_finish(job_id, "failed", {
-                    "error": f"JSON inválido: {str(e)}",
-                    "error_type": "JSONDecodeError"
-                })
-            self._safe_ack(ch, method, requeue=False)
-            
-        except ValueError as e:
-            logger.error(f"❌ Erro de validação: {e}")
-            if job_id:
-                self.report_log(job_id, "ERROR", f"Erro de validação: {str(e)}")
-                self.report_finish(job_id, "failed", {
-                    "error": str(e),
-                    "error_type": "ValidationError"
-                })
-            self._safe_ack(ch, method, requeue=False)
-            
-        except Exception as e:
-            logger.error(f"❌ Erro ao processar mensagem: {e}", exc_info=True)
-
-            if job_id:
-                try:
-                    self.report_log(job_id, "ERROR", f"Erro inesperado: {str(e)}")
-                    self.report_finish(job_id, "failed", {
-                        "error": str(e),
-                        "error_type": type(e).__name__
-                    })
-                except requests.exceptions.RequestException as api_error:
-                    logger.critical(f"❌ FALHA CRÍTICA ao reportar falha ao Maestro (problema de conexão/rede): {api_error}", exc_info=True)
-                except Exception as unexpected_error:
-                    logger.critical(f"❌ FALHA CRÍTICA ao reportar falha ao Maestro (erro inesperado): {unexpected_error}", exc_info=True)
-
-            # Falhas transitórias (rede, browser, timeout) são requeue=True para nova tentativa.
-            # Falhas permanentes (config inválida, seletor não encontrado, credenciais) são requeue=False.
-            _PERMANENT_EXCEPTIONS = (ConfigurationError, ElementNotFoundError, LoginError)
-            is_transient = isinstance(e, (ConnectionError, TimeoutError)) and not isinstance(e, _PERMANENT_EXCEPTIONS)
-            if is_transient:
-                logger.warning(f"⚠️ Falha transitória detectada ({type(e).__name__}). Mensagem será reprocessada.")
-            else:
-                logger.error(f"❌ Falha permanente detectada ({type(e).__name__}). Mensagem descartada.")
-            self._safe_ack(ch, method, requeue=is_transient)
-    
-    def start(self):
-        logger.info("=" * 60)
-        logger.info("🤖 Bot XML GMS Worker")
-        logger.info("=" * 60)
-        logger.info(f"Worker ID: {settings.worker_id}")
-        logger.info(f"RabbitMQ: {self.rabbitmq_host}:{self.rabbitmq_port}")
-        logger.info(f"Fila: {self.queue_name}")
-        logger.info(f"Maestro API: {self.maestro_url}")
-        logger.info("=" * 60)
-        
-        try:
-            self.connect()
-            
-            self.channel.basic_consume(
-                queue=self.queue_name,
-                on_message_callback=self.process_message,
-                auto_ack=False
-            )
-            
-            logger.info("🎯 Worker pronto. Aguardando tarefas...")
-            
-            self.channel.start_consuming()
-            
-        except KeyboardInterrupt:
-            logger.info("\n⚠️ Interrompido pelo usuário")
-        except Exception as e:
-            logger.critical(f"❌ Erro fatal no worker: {e}", exc_info=True)
-            raise
-        finally:
-            if self.connection and not self.connection.is_closed:
-                logger.info("Fechando conexão com RabbitMQ...")
-                self.connection.close()
-            logger.info("Worker encerrado.")
-
-
-def main():
-    try:
-        worker = RabbitMQWorker()
-        worker.start()
-        return 0
-    except Exception as e:
-        logger.critical(f"Falha ao iniciar worker: {e}", exc_info=True)
-        return 1
-
-if __name__ == "__main__":
-    sys.exit(main())
+import logging
+import logging.config
+import queue
+import time
+import signal
+import sys
+import threading
+from functools import partial
+from typing import Dict, List, Optional
+import pika
+import requests
+from pika import PlainCredentials, ConnectionParameters, BlockingConnection
+from pathlib import Path
+
+from config import settings
+from src.core.capacity import CapacityServer
+from src.core.job_lifecycle import (
+    JobDelivery,
+    JobLifecycle,
+    Settlement,
+    outbox_resolved,
+    read_cancellation,
+    read_terminal_status,
+)
+from src.core.job_messages import cancel_routing_key, parse_cancel_message
+from src.core.job_cost import SIZE_LARGE, SIZE_SMALL
+from src.core.job_process import JobProcessSupervisor
+from src.core.job_scheduler import size_class_queue
+from src.core.maestro_client import MaestroClient
+from src.utils.cancellation_watcher import CancellationWatcher
+from src.utils.log_shipper import LogShipper
+from src.utils.outbox import OutboxDispatcher, OutboxEvent
+
+# Quanto o callback do pika espera por um slot livre antes de devolver a
+# mensagem. Com prefetch == worker_slots o slot já foi liberado quando o
+# broker entrega a próxima; a espera só cobre a janela entre liberar o slot
+# e o ack agendado ser executado na thread da conexão.
+_SLOT_ACQUIRE_TIMEOUT = 5.0
+
+# Cadência do polling de cancelamento sem o push da exchange de controle.
+# 15s dá ~20 polls de margem dentro da janela de 5min do retry worker do
+# maestro (last_heartbeat_at), e mantém a latência clique-Cancelar → worker
+# abortar em ~15s + a sleep ativa do bot. Com o push ligado o poll vira só
+# heartbeat (settings.cancellation_heartbeat_seconds).
+_CANCELLATION_POLL_INTERVAL = 15.0
+
+# Com JOB_SCHEDULING=cost, a cada quanto a thread da conexão tenta puxar
+# jobs das filas de classe para slots livres (além do disparo imediato quando
+# um slot libera ou uma mensagem é roteada).
+_DISPATCH_INTERVAL = 2.0
+
+# Quanto o _settle espera os logs do job saírem da fila antes de
+# finalizar. Estourado, o finish segue — linha atrasada chegando depois do
+# finish é melhor que job preso esperando maestro lento.
+_LOG_FLUSH_TIMEOUT = 30.0
+
+# No drain, depois do prazo (settings.shutdown_grace_seconds) os jobs têm
+# mais este tempo para chegar num ponto de suspensão antes do worker sair.
+_SUSPEND_TIMEOUT = 60.0
+
+logging.config.dictConfig(settings.get_log_config())
+logger = logging.getLogger(__name__)
+
+
+class RabbitMQWorker:
+    def __init__(self):
+        self.connection: Optional[pika.BlockingConnection] = None
+        self.channel: Optional[pika.channel.Channel] = None
+        self.should_stop = False
+        # Drain: sem novos jobs; _suspend_event pede aos jobs em espera longa
+        # que devolvam o trabalho com checkpoint.
+        self._draining = threading.Event()
+        self._consumer_tags: List[str] = []
+        
+        self.rabbitmq_host = settings.rabbitmq_host
+        self.rabbitmq_port = settings.rabbitmq_port
+        self.rabbitmq_user = settings.rabbitmq_user
+        self.rabbitmq_password = settings.rabbitmq_password
+        self.queue_name = settings.rabbitmq_queue
+        self.control_exchange = settings.rabbitmq_control_exchange
+        # Fila exclusiva (nome gerado pelo broker) que recebe os cancelamentos
+        # por push; None = push indisponível, só polling.
+        self._control_queue: Optional[str] = None
+        self._cancel_watchers: Dict[str, CancellationWatcher] = {}
+        self._cancel_watchers_lock = threading.Lock()
+        
+        self.maestro_url = settings.maestro_api_url
+        # Sessão keep-alive única para todos os callbacks. Pool dimensionado
+        # para os slots (start/finish + watcher de cada um) mais o LogShipper.
+        self.maestro = MaestroClient(
+            self.maestro_url,
+            api_key=settings.maestro_worker_api_key,
+            pool_size=settings.worker_slots * 2 + 2,
+            gzip_min_bytes=settings.maestro_gzip_min_bytes,
+        )
+
+        # Slots de execução: cada job ocupa um slot (thread própria + pending
+        # isolado) enquanto a thread principal fica no start_consuming, que
+        # bombeia heartbeats e executa os acks agendados pelos slots.
+        self.worker_slots = settings.worker_slots
+        self._free_slots: "queue.Queue[int]" = queue.Queue()
+        for slot_id in range(self.worker_slots):
+            self._free_slots.put(slot_id)
+        self._slot_threads: Dict[int, threading.Thread] = {}
+        self._slot_threads_lock = threading.Lock()
+
+        # Validação, short-circuits de redelivery, adiamento, retry, finish e
+        # execução do job são comuns aos dois núcleos (ver JobLifecycle). Aqui
+        # fica o transporte: acks e publish na thread da conexão, HTTP do
+        # maestro e o CancellationWatcher.
+        self.lifecycle = JobLifecycle(
+            self.queue_name,
+            self.worker_slots,
+            report_log=self.report_log,
+            free_slots=self._free_slots.qsize,
+            draining=self._draining.is_set,
+            borrow_slot=self._borrow_slot,
+            return_slot=self._return_slot,
+        )
+        self.outbox = self.lifecycle.outbox
+        self.capacity = self.lifecycle.capacity
+        self.cost_scheduling = self.lifecycle.cost_scheduling
+        self.scheduler = self.lifecycle.scheduler
+        self.retry_policy = self.lifecycle.retry_policy
+        self.window_policy = self.lifecycle.window_policy
+        self._suspend_event = self.lifecycle.suspend_event
+
+        # Entrega do outbox ao maestro numa thread própria (ver MaestroOutbox).
+        self.outbox_dispatcher = OutboxDispatcher(self.outbox, self._deliver_outbox_event)
+        self._bulk_logs_enabled = True
+
+        # GET /capacity: as profundidades das filas são lidas pela thread da
+        # conexão (_capacity_tick); o servidor HTTP só lê o snapshot.
+        self.capacity_server = (
+            CapacityServer(self.capacity, settings.capacity_http_host, settings.capacity_http_port)
+            if settings.capacity_http_port else None
+        )
+
+        # Logs saem do bot por uma fila em memória, em lote, para o outbox: o
+        # bot e o process_message só enfileiram e nunca esperam HTTP. Nada
+        # vai direto ao maestro — só o outbox garante logs antes do finish;
+        # o fallback bulk → linha a linha fica em _deliver_logs.
+        self.log_shipper = LogShipper(
+            send_batch=self.lifecycle.enqueue_logs,
+            max_queue=settings.log_shipper_max_queue,
+            batch_size=settings.log_shipper_batch_size,
+        )
+
+        signal.signal(signal.SIGINT, self._signal_handler)
+        signal.signal(signal.SIGTERM, self._signal_handler)
+    
+    def _signal_handler(self, signum, frame):
+        if self._draining.is_set() or self.connection is None or self.connection.is_closed:
+            logger.info(f"Recebido sinal {signum}. Encerrando...")
+            self.should_stop = True
+            JobProcessSupervisor.kill_all()
+            if self.connection and not self.connection.is_closed:
+                self.connection.close()
+            sys.exit(0)
+
+        logger.info(
+            f"Recebido sinal {signum}. Drenando: sem novos jobs, até "
+            f"{settings.shutdown_grace_seconds}s para os em andamento (novo sinal encerra na hora)..."
+        )
+        self.should_stop = True
+        self._draining.set()
+        self._call_on_connection(self._cancel_consumers, "parar de consumir")
+        threading.Thread(target=self._drain, name="drain", daemon=True).start()
+
+    def _cancel_consumers(self) -> None:
+        # Thread da conexão. A fila de controle continua assinada: cancelamento
+        # por push ainda vale para os jobs que estão terminando.
+        for tag in self._consumer_tags:
+            try:
+                self.channel.basic_cancel(tag)
+            except Exception as e:
+                logger.warning(f"⚠️ Falha ao cancelar consumidor {tag}: {e}")
+        self._consumer_tags.clear()
+
+    def _slots_idle(self) -> bool:
+        return self._free_slots.qsize() >= self.worker_slots
+
+    def _wait_slots_idle(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while not self._slots_idle():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(1.0)
+        return True
+
+    def _drain(self) -> None:
+        """Espera os jobs terminarem; no prazo, suspende os que estão em
+        espera longa; então encerra o start_consuming."""
+        if not self._wait_slots_idle(settings.shutdown_grace_seconds):
+            logger.warning("⏸️ Prazo de drain esgotado. Suspendendo jobs em espera longa para retomada em outro worker...")
+            self._suspend_event.set()
+            if not self._wait_slots_idle(_SUSPEND_TIMEOUT):
+                logger.warning("⚠️ Jobs ainda em andamento após a suspensão. Encerrando; as mensagens sem ack voltam para a fila.")
+                JobProcessSupervisor.kill_all()
+        logger.info("✅ Drain concluído.")
+        # Acks já agendados pelos slots rodam antes (fila de callbacks em ordem).
+        self._call_on_connection(self.channel.stop_consuming, "encerrar o consumo")
+    
+    def connect(self):
+        max_retries = 5
+        retry_delay = 5
+        
+        for attempt in range(max_retries):
+            try:
+                logger.info(f"Conectando ao RabbitMQ em {self.rabbitmq_host}:{self.rabbitmq_port}...")
+                
+                credentials = pika.PlainCredentials(
+                    self.rabbitmq_user,
+                    self.rabbitmq_password
+                )
+                
+                parameters = pika.ConnectionParameters(
+                    host=self.rabbitmq_host,
+                    port=self.rabbitmq_port,
+                    credentials=credentials,
+                    heartbeat=600,
+                    blocked_connection_timeout=300
+                )
+                
+                self.connection = pika.BlockingConnection(parameters)
+                self.channel = self.connection.channel()
+                
+                self.channel.queue_declare(queue=self.queue_name, durable=True, arguments={"x-dead-letter-exchange": "maestro.dlx"})
+                
+                for delay in self.retry_policy.delays():
+                    self.channel.queue_declare(
+                        queue=self.retry_policy.retry_queue(delay),
+                        durable=True,
+                        arguments=self.retry_policy.queue_arguments(delay),
+                    )
+                for delay in self.window_policy.delays():
+                    self.channel.queue_declare(
+                        queue=self.window_policy.delay_queue(delay),
+                        durable=True,
+                        arguments=self.window_policy.queue_arguments(delay),
+                    )
+                
+                self.channel.basic_qos(prefetch_count=self.worker_slots)
+                self._setup_control_queue()
+                if self.cost_scheduling:
+                    for size_class in (SIZE_SMALL, SIZE_LARGE):
+                        self.channel.queue_declare(
+                            queue=size_class_queue(self.queue_name, size_class),
+                            durable=True,
+                            arguments={"x-dead-letter-exchange": "maestro.dlx"},
+                        )
+                    # Confirms: o roteador só ackeia a original depois que o
+                    # broker confirmou a cópia na fila da classe.
+                    self.channel.confirm_delivery()
+                
+                logger.info(f"✅ Conectado ao RabbitMQ. Aguardando mensagens na fila '{self.queue_name}'...")
+                return
+                
+            except Exception as e:
+                logger.error(f"Falha ao conectar (tentativa {attempt + 1}/{max_retries}): {e}")
+                if attempt < max_retries - 1:
+                    logger.info(f"Aguardando {retry_delay}s antes de tentar novamente...")
+                    time.sleep(retry_delay)
+                else:
+                    raise
+    
+    def _setup_control_queue(self) -> None:
+        """Assina a exchange de controle para cancelamento por push.
+
+        Falha aqui não impede o worker de subir: sem a fila de controle os
+        watchers voltam ao polling rápido.
+        """
+        self._control_queue = None
+        if not self.control_exchange:
+            return
+        try:
+            self.channel.exchange_declare(exchange=self.control_exchange, exchange_type="topic", durable=True)
+            result = self.channel.queue_declare(queue="", exclusive=True, auto_delete=True)
+            self.channel.basic_consume(
+                queue=result.method.queue,
+                on_message_callback=self._on_control_message,
+                auto_ack=True,
+            )
+            self._control_queue = result.method.queue
+            logger.info(f"📡 Cancelamento por push ativo (exchange '{self.control_exchange}')")
+        except Exception as e:
+            logger.warning(f"⚠️ Não foi possível assinar a exchange de controle: {e}. Usando só polling.")
+
+    def _on_control_message(self, ch, method, properties, body):
+        """Callback do pika (thread da conexão) para a fila de controle."""
+        job_id = parse_cancel_message(method.routing_key, body)
+        if job_id is None:
+            logger.debug(f"Mensagem de controle ignorada (routing key {method.routing_key})")
+            return
+        with self._cancel_watchers_lock:
+            watcher = self._cancel_watchers.get(job_id)
+        if watcher is None:
+            logger.debug(f"Cancelamento para job {job_id}, que não roda neste worker")
+            return
+        watcher.trigger("push")
+
+    def _call_on_connection(self, callback, what: str) -> None:
+        """Agenda callback na thread da conexão, tolerando conexão fechada."""
+        try:
+            self.connection.add_callback_threadsafe(callback)
+        except (pika.exceptions.ConnectionWrongStateError,
+                pika.exceptions.StreamLostError,
+                pika.exceptions.ConnectionClosed) as e:
+            logger.warning(f"⚠️ Conexão RabbitMQ fechada antes de {what}: {e}")
+
+    def _bind_cancel(self, job_id: str, bind: bool) -> None:
+        # Roda na thread da conexão (via _call_on_connection).
+        if self._control_queue is None or self.channel is None or self.channel.is_closed:
+            return
+        try:
+            if bind:
+                self.channel.queue_bind(self._control_queue, self.control_exchange, cancel_routing_key(job_id))
+            else:
+                self.channel.queue_unbind(self._control_queue, self.control_exchange, cancel_routing_key(job_id))
+        except Exception as e:
+            logger.warning(f"⚠️ Falha ao {'assinar' if bind else 'remover'} cancelamento do job {job_id}: {e}")
+
+    def _subscribe_cancel(self, job_id: str, watcher: CancellationWatcher) -> None:
+        with self._cancel_watchers_lock:
+            self._cancel_watchers[job_id] = watcher
+        if self._control_queue is not None:
+            self._call_on_connection(partial(self._bind_cancel, job_id, True), f"assinar cancelamento do job {job_id}")
+
+    def _unsubscribe_cancel(self, job_id: str) -> None:
+        with self._cancel_watchers_lock:
+            self._cancel_watchers.pop(job_id, None)
+        if self._control_queue is not None:
+            self._call_on_connection(partial(self._bind_cancel, job_id, False), f"remover cancelamento do job {job_id}")
+
+    def _cancellation_poll_interval(self) -> float:
+        if self._control_queue is not None:
+            return settings.cancellation_heartbeat_seconds
+        return _CANCELLATION_POLL_INTERVAL
+
+    def _make_request(self, method: str, endpoint: str, payload: Optional[Dict] = None, name: str = "") -> bool:
+        try:
+            logger.debug(f"Fazendo requisição {method} para {self.maestro.url(endpoint)}")
+
+            if method == "GET":
+                response = self.maestro.get(endpoint, name=name)
+            else:
+                response = self.maestro.post(endpoint, name=name, payload=payload)
+
+            if response.status_code in [200, 201, 204]:
+                logger.debug(f"✅ Requisição bem sucedida: {method} {endpoint}")
+                return True
+            else:
+                logger.warning(f"⚠️ Falha na requisição. HTTP {response.status_code}: {response.text}")
+                return False
+
+        except requests.exceptions.RequestException as e:
+            logger.error(f"❌ Erro ao fazer requisição para Maestro: {e}")
+            return False
+        except Exception as e:
+            logger.error(f"❌ Erro inesperado ao fazer requisição: {e}")
+            return False
+
+    def _safe_ack(self, ch, method, requeue: Optional[bool] = None) -> None:
+        """Ack ou nack tolerante a canal fechado.
+
+        Se requeue is None, faz basic_ack. Caso contrário, basic_nack com o
+        requeue passado. Engole ChannelWrongStateError/StreamLostError/
+        ConnectionClosed: o job já foi reportado ao maestro, a reentrega vai
+        cair na verificação de idempotência (ver check_job_terminal).
+
+        Só pode rodar na thread da conexão; os slots usam _ack_threadsafe.
+        """
+        try:
+            if requeue is None:
+                ch.basic_ack(delivery_tag=method.delivery_tag)
+            else:
+                ch.basic_nack(delivery_tag=method.delivery_tag, requeue=requeue)
+        except (pika.exceptions.ChannelWrongStateError,
+                pika.exceptions.StreamLostError,
+                pika.exceptions.ConnectionClosed) as e:
+            logger.warning(
+                f"⚠️ Canal RabbitMQ fechado antes do {'ack' if requeue is None else 'nack'} — "
+                f"job já foi reportado ao maestro; reentrega cairá no idempotency check. {e}"
+            )
+
+    def _ack_threadsafe(self, ch, method, requeue: Optional[bool] = None) -> None:
+        """Agenda _safe_ack na thread da conexão.
+
+        BlockingConnection não é thread-safe: os slots não podem chamar
+        basic_ack direto. add_callback_threadsafe enfileira o ack para o
+        próximo ciclo do start_consuming. Conexão já fechada recebe o mesmo
+        tratamento tolerante do _safe_ack.
+        """
+        try:
+            self.connection.add_callback_threadsafe(partial(self._safe_ack, ch, method, requeue))
+        except (pika.exceptions.ConnectionWrongStateError,
+                pika.exceptions.StreamLostError,
+                pika.exceptions.ConnectionClosed) as e:
+            logger.warning(
+                f"⚠️ Conexão RabbitMQ fechada antes do {'ack' if requeue is None else 'nack'} — "
+                f"reentrega cairá no idempotency check. {e}"
+            )
+
+    def _republish(self, ch, method, properties, body, routing_key: str, headers: Dict, what: str) -> None:
+        """Agenda (thread da conexão) a cópia da mensagem com headers extras
+        em routing_key e o ack da original. Se a publicação falhar, cai no
+        requeue imediato.
+        """
+        def _publish():
+            properties.headers = {**(properties.headers or {}), **headers}
+            properties.delivery_mode = 2
+            try:
+                ch.basic_publish(exchange="", routing_key=routing_key, body=body, properties=properties)
+            except Exception as e:
+                logger.error(f"❌ Falha ao publicar em '{routing_key}' ({what}): {e}. Devolvendo à fila.")
+                self._safe_ack(ch, method, requeue=True)
+                return
+            self._safe_ack(ch, method)
+
+        self._call_on_connection(_publish, what)
+
+    def check_job_terminal(self, job_id: str) -> Optional[Dict]:
+        """Lê o status do job no maestro. Retorna o dict de status se terminal
+        (completed/completed_no_invoices/failed/canceled), None caso contrário.
+
+        Usado no início de process_message pra detectar redelivery: se o
+        maestro já tem o job em estado terminal, a mensagem que acabamos de
+        pegar é reentrega de um ack que falhou — basta ackear e descartar.
+
+        Em 404 retorna None (job sumiu do maestro, deixa o fluxo normal lidar).
+        Em erro de rede/5xx loga warning e retorna None (vai pelo caminho
+        normal; pior caso reprocessa, melhor que travar).
+        """
+        try:
+            response = self.maestro.get(f"/api/v1/worker/jobs/{job_id}/status", name="status")
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"check_job_terminal: erro de rede consultando status do job {job_id}: {e}")
+            return None
+        return read_terminal_status(job_id, response)
+
+    def check_cancellation(self, job_id: str) -> bool:
+        """Polla o endpoint de cancelamento do maestro.
+
+        Cada chamada também atualiza last_heartbeat_at no maestro — é o sinal
+        de vida que o retry worker usa pra detectar worker morto (janela 5min).
+
+        Retorna True se o usuário pediu cancelamento, False caso contrário.
+        Propaga exceções em erros transientes (rede/timeout/5xx) para que o
+        CancellationWatcher logue warning e tente de novo no próximo ciclo
+        sem derrubar o job. 404 não propaga: trata como "sem cancelamento".
+        """
+        response = self.maestro.get(f"/api/v1/worker/jobs/{job_id}/cancellation", name="cancellation")
+        return read_cancellation(job_id, response)
+    
+    def report_log(self, job_id: str, level: str, message: str) -> bool:
+        """Enfileira o log no LogShipper; não faz HTTP na thread de quem chama.
+
+        Retorna False apenas se a linha foi descartada pela fila cheia.
+        """
+        logger.debug(f"📝 Enfileirando log [{level}]: {message}")
+        return self.log_shipper.submit(job_id, level, message)
+
+    def _deliver_logs(self, event: OutboxEvent) -> bool:
+        entries = event.payload["logs"]
+        if self._bulk_logs_enabled:
+            response = self.maestro.post(f"/api/v1/worker/jobs/{event.job_id}/logs", name="logs", payload=event.payload)
+            if response.status_code not in (404, 405):
+                return outbox_resolved(event, response)
+            self._bulk_logs_enabled = False
+            logger.warning("⚠️ Endpoint bulk de logs indisponível no maestro. Usando envio linha a linha.")
+
+        # Linha a linha: numa falha no meio o lote inteiro volta pro retry e
+        # as linhas já entregues chegam de novo (at-least-once).
+        for entry in entries:
+            response = self.maestro.post(
+                f"/api/v1/worker/jobs/{event.job_id}/log",
+                name="log",
+                payload={"level": entry["level"], "message": entry["message"]},
+            )
+            if not outbox_resolved(event, response):
+                return False
+        return True
+
+    def _deliver_outbox_event(self, event: OutboxEvent) -> bool:
+        """Entrega um evento do outbox (thread do OutboxDispatcher)."""
+        if event.kind == "logs":
+            return self._deliver_logs(event)
+        endpoint = f"/api/v1/worker/jobs/{event.job_id}/{event.kind}"
+        response = self.maestro.post(endpoint, name=event.kind, payload=event.payload)
+        return outbox_resolved(event, response)
+
+    def _borrow_slot(self) -> Optional[int]:
+        """Slot ocioso para um shard, ou None.
+
+        WHY só com JOB_SCHEDULING=cost: lá os slots puxam das filas de
+        classe (basic_get) e slot emprestado só deixa de puxar. No modo fifo
+        o broker continua empurrando até o prefetch, e a mensagem sem slot
+        ficaria indo e voltando pra fila enquanto o shard roda.
+        """
+        if not self.cost_scheduling:
+            return None
+        try:
+            return self._free_slots.get_nowait()
+        except queue.Empty:
+            return None
+
+    def _return_slot(self, slot_id: int) -> None:
+        self._free_slots.put(slot_id)
+        self._call_on_connection(self._dispatch, f"despachar job para o slot {slot_id}")
+
+    def _on_message(self, ch, method, properties, body):
+        """Callback do pika (thread da conexão): entrega a mensagem a um slot.
+
+        Não pode bloquear além do necessário — enquanto roda, nenhum heartbeat
+        nem ack dos outros slots é processado.
+        """
+        try:
+            slot_id = self._free_slots.get(timeout=_SLOT_ACQUIRE_TIMEOUT)
+        except queue.Empty:
+            logger.warning("⚠️ Nenhum slot livre para a mensagem recebida. Devolvendo à fila.")
+            self._safe_ack(ch, method, requeue=True)
+            return
+
+        self._start_slot(slot_id, ch, method, properties, body)
+
+    def _start_slot(self, slot_id: int, ch, method, properties, body) -> None:
+        thread = threading.Thread(
+            target=self._run_slot,
+            args=(slot_id, ch, method, properties, body),
+            name=f"slot-{slot_id}",
+            daemon=True,
+        )
+        with self._slot_threads_lock:
+            self._slot_threads[slot_id] = thread
+        thread.start()
+
+    def _run_slot(self, slot_id: int, ch, method, properties, body):
+        try:
+            self.process_message(ch, method, properties, body, slot_id=slot_id)
+        finally:
+            with self._slot_threads_lock:
+                self._slot_threads.pop(slot_id, None)
+            self.capacity.job_finished(slot_id)
+            self._free_slots.put(slot_id)
+            if self.cost_scheduling:
+                self._call_on_connection(self._dispatch, f"despachar job para o slot {slot_id}")
+
+    def _on_route_message(self, ch, method, properties, body):
+        """Roteador (JOB_SCHEDULING=cost, thread da conexão).
+
+        Republica na fila da classe com os headers de custo (ver
+        JobLifecycle.route) e só então ackeia a original.
+        """
+        route = self.lifecycle.route(body, properties.headers)
+        properties.headers = route.headers
+        properties.delivery_mode = 2
+        try:
+            ch.basic_publish(
+                exchange="",
+                routing_key=route.queue,
+                body=body,
+                properties=properties,
+                mandatory=True,
+            )
+        except (pika.exceptions.UnroutableError, pika.exceptions.NackError) as e:
+            logger.error(f"❌ Falha ao rotear job {route.job_id} para a fila '{route.size_class}': {e}. Devolvendo à fila.")
+            self._safe_ack(ch, method, requeue=True)
+            return
+
+        self._safe_ack(ch, method)
+        logger.info(f"🧭 Job {route.job_id} roteado para '{route.size_class}' (estimativa {route.estimated / 60:.0f}min)")
+        self._dispatch()
+
+    def _next_class_message(self, slot_id: int):
+        for size_class, queue_name in self.lifecycle.class_queues(slot_id):
+            method, properties, body = self.channel.basic_get(queue=queue_name, auto_ack=False)
+            if method is not None:
+                self.lifecycle.dispatched(size_class)
+                return method, properties, body
+        return None
+
+    def _dispatch(self) -> None:
+        """Puxa jobs das filas de classe para os slots livres (thread da conexão).
+
+        Slots reservados primeiro (ids menores): o small vai pra eles e os
+        slots gerais ficam para o large.
+        """
+        if not self.cost_scheduling or self._draining.is_set() or self.channel is None or self.channel.is_closed:
+            return
+
+        free: List[int] = []
+        while True:
+            try:
+                free.append(self._free_slots.get_nowait())
+            except queue.Empty:
+                break
+        if not free:
+            return
+
+        used = set()
+        try:
+            backlog = self.channel.queue_declare(queue=self.lifecycle.large_queue, passive=True).method.message_count
+            self.scheduler.observe_large_backlog(backlog)
+
+            for slot_id in sorted(free):
+                delivery = self._next_class_message(slot_id)
+                if delivery is None:
+                    continue
+                used.add(slot_id)
+                self._start_slot(slot_id, self.channel, *delivery)
+        except Exception as e:
+            logger.warning(f"⚠️ Falha ao despachar jobs das filas de classe: {e}")
+        finally:
+            for slot_id in free:
+                if slot_id not in used:
+                    self._free_slots.put(slot_id)
+
+    def _dispatch_tick(self) -> None:
+        self._dispatch()
+        if self.connection is not None and self.connection.is_open:
+            self.connection.call_later(_DISPATCH_INTERVAL, self._dispatch_tick)
+
+    def _refresh_capacity(self) -> None:
+        """Profundidade das filas para o CapacityTracker (thread da conexão)."""
+        if self.channel is None or self.channel.is_closed:
+            return
+        for name, cost_key, delayed in self.lifecycle.observed_queues():
+            try:
+                count = self.channel.queue_declare(queue=name, passive=True).method.message_count
+            except Exception as e:
+                logger.debug(f"Falha ao ler profundidade da fila '{name}': {e}")
+                return
+            self.capacity.observe_queue(name, count, cost_key=cost_key, delayed=delayed)
+
+    def _capacity_tick(self) -> None:
+        self._refresh_capacity()
+        if self.connection is not None and self.connection.is_open:
+            self.connection.call_later(settings.capacity_refresh_seconds, self._capacity_tick)
+
+    def _wait_for_active_jobs(self) -> None:
+        # Conexão caiu no meio de jobs longos: espera os bots terminarem pra
+        # não vazar Chrome. Os acks vão falhar (tolerado) e a reentrega cai
+        # no idempotency check.
+        with self._slot_threads_lock:
+            threads = list(self._slot_threads.values())
+        if threads:
+            logger.warning(f"⏳ Aguardando {len(threads)} job(s) em andamento finalizarem...")
+        for thread in threads:
+            thread.join()
+
+    def process_message(self, ch, method, properties, body, slot_id: int = 0):
+        """Passos do JobLifecycle na thread do slot; o primeiro Settlement
+        encerra a mensagem."""
+        job = JobDelivery(body, properties.headers, slot_id)
+        try:
+            settlement = self.lifecycle.screen(job)
+            if settlement is None:
+                settlement = self.lifecycle.admit(job, self.check_job_terminal(job.job_id))
+            if settlement is None:
+                self.lifecycle.start(job)
+                settlement = self.lifecycle.conclude(job, self._execute_watched(job))
+        except Exception as e:
+            settlement = self.lifecycle.failed(job, e)
+        self._settle(ch, method, properties, body, job, settlement)
+
+    def _execute_watched(self, job: JobDelivery) -> Dict:
+        """JobLifecycle.execute com o CancellationWatcher vivo.
+
+        Watcher vive entre /start e /finish. Cada GET dele atualiza
+        last_heartbeat_at no maestro (mantém o job vivo aos olhos do retry
+        worker) e detecta cancelamento solicitado via UI. Com a exchange de
+        controle, o cancelamento chega antes por push (_on_control_message →
+        watcher.trigger) e o poll é só heartbeat.
+        """
+        watcher = CancellationWatcher(
+            check_fn=self.check_cancellation,
+            job_id=job.job_id,
+            poll_interval=self._cancellation_poll_interval(),
+            on_cancel=partial(self.lifecycle.notify_cancel, job.job_id),
+        )
+        self._subscribe_cancel(job.job_id, watcher)
+        try:
+            with watcher:
+                return self.lifecycle.execute(job, watcher.cancel_event)
+        finally:
+            self._unsubscribe_cancel(job.job_id)
+
+    def _settle(self, ch, method, properties, body, job: JobDelivery, settlement: Settlement) -> None:
+        """Aplica o Settlement: finish (depois dos logs do job) e então
+        ack/nack ou republicação, agendados na thread da conexão."""
+        if settlement.finish is not None:
+            try:
+                # O flush só garante que os logs entraram no outbox antes do
+                # finish; a ordem de entrega vem dele.
+                self.log_shipper.flush(job.job_id, timeout=_LOG_FLUSH_TIMEOUT)
+                self.lifecycle.finish(job, *settlement.finish)
+            except Exception as e:
+                # Sem finish gravado, a mensagem não pode sumir com um ack:
+                # vai para a DLX.
+                logger.critical(f"❌ FALHA CRÍTICA ao registrar a finalização do job {job.job_id}: {e}", exc_info=True)
+                self._ack_threadsafe(ch, method, requeue=False)
+                return
+        if settlement.republish_to:
+            self._republish(ch, method, properties, body, settlement.republish_to, settlement.headers, settlement.what)
+        else:
+            self._ack_threadsafe(ch, method, requeue=settlement.requeue)
+
+    def start(self):
+        logger.info("=" * 60)
+        logger.info("🤖 Bot XML GMS Worker")
+        logger.info("=" * 60)
+        logger.info(f"Worker ID: {settings.worker_id}")
+        logger.info(f"RabbitMQ: {self.rabbitmq_host}:{self.rabbitmq_port}")
+        logger.info(f"Fila: {self.queue_name}")
+        logger.info(f"Slots: {self.worker_slots} (isolamento: {settings.job_isolation})")
+        logger.info(f"Maestro API: {self.maestro_url}")
+        logger.info("=" * 60)
+        
+        try:
+            self.outbox_dispatcher.start()
+            self.log_shipper.start()
+            if self.capacity_server is not None:
+                self.capacity_server.start()
+            self.connect()
+            
+            self._consumer_tags.append(self.channel.basic_consume(
+                queue=self.queue_name,
+                on_message_callback=self._on_route_message if self.cost_scheduling else self._on_message,
+                auto_ack=False
+            ))
+            if self.cost_scheduling:
+                logger.info(
+                    f"🧭 Agendamento por custo: small até {settings.small_job_max_seconds}s, "
+                    f"{self.scheduler.reserved_small_slots} slot(s) reservado(s) para small"
+                )
+                self.connection.call_later(_DISPATCH_INTERVAL, self._dispatch_tick)
+            if self.capacity_server is not None:
+                self._capacity_tick()
+            
+            logger.info("🎯 Worker pronto. Aguardando tarefas...")
+            
+            self.channel.start_consuming()
+            
+        except KeyboardInterrupt:
+            logger.info("\n⚠️ Interrompido pelo usuário")
+        except Exception as e:
+            logger.critical(f"❌ Erro fatal no worker: {e}", exc_info=True)
+            self._wait_for_active_jobs()
+            raise
+        finally:
+            if self.connection and not self.connection.is_closed:
+                logger.info("Fechando conexão com RabbitMQ...")
+                self.connection.close()
+            if self.capacity_server is not None:
+                self.capacity_server.stop()
+            self.log_shipper.stop()
+            self.outbox_dispatcher.stop()
+            self.lifecycle.close()
+            logger.info(f"Latência dos callbacks do maestro: {self.maestro.latency_snapshot()}")
+            self.maestro.close()
+            logger.info("Worker encerrado.")
+
+
+def main():
+    if settings.worker_core == "asyncio":
+        # Import tardio: aio-pika/httpx só são exigidos por quem usa o núcleo.
+        from src.core.async_worker import run_async_worker
+        return run_async_worker()
+
+    try:
+        worker = RabbitMQWorker()
+        worker.start()
+        return 0
+    except Exception as e:
+        logger.critical(f"Falha ao iniciar worker: {e}", exc_info=True)
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())